@@ -0,0 +1,16 @@
+"""
+Point d'entrée de `python -m aiterminal`.
+En mode démon, la commande est transmise au démon sans charger la CLI.
+"""
+
+import sys
+
+from .client import forward
+
+if __name__ == "__main__":
+    code = forward(sys.argv[1:])
+    if code is not None:
+        sys.exit(code)
+    
+    from .cli import run_cli
+    run_cli()
@@ -0,0 +1,369 @@
+"""
+Module du contrôle d'admission de l'API.
+Limite le débit de chaque client par route (seau à jetons) et le nombre d'appels
+simultanés vers chaque service amont (OpenAI, requêtes HTTP sortantes, ping) :
+au-delà, la requête est refusée aussitôt (429 avec Retry-After) au lieu d'attendre
+son tour, si bien qu'une surcharge ne fait pas grossir les files ni la latence.
+"""
+
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from .config import Config
+from .metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# Service amont sollicité par chaque route (limites `upstream_concurrency`)
+ROUTE_UPSTREAMS = {
+    "/api/generate": "openai",
+    "/api/analyze": "openai",
+    "/api/network/ping": "ping",
+    "/api/network/http": "http"
+}
+
+# Route équivalente de chaque commande du canal WebSocket: même seau, mêmes limites
+COMMAND_ROUTES = {
+    "generate": "/api/generate",
+    "analyze": "/api/analyze",
+    "ping": "/api/network/ping",
+    "http": "/api/network/http"
+}
+
+# Poids de la dernière durée dans la moyenne glissante des appels amont
+DURATION_EWMA_ALPHA = 0.2
+
+ADMISSION_REJECTED = get_metrics_registry().counter(
+    "aiterminal_admission_rejected_total", "Requêtes refusées par le contrôle d'admission, par route et motif",
+    ("route", "reason")
+)
+UPSTREAM_IN_FLIGHT = get_metrics_registry().gauge(
+    "aiterminal_upstream_in_flight", "Appels en cours vers chaque service amont admis par le contrôle d'admission",
+    ("upstream",)
+)
+
+class RateLimitedError(Exception):
+    """Levée lorsqu'une requête dépasse une limite ; elle pourra être réessayée après `retry_after` secondes."""
+    
+    def __init__(self, message: str, retry_after: float, reason: str):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+    
+    @property
+    def headers(self) -> Dict[str, str]:
+        """En-têtes de la réponse 429 (Retry-After en secondes entières, arrondi au-dessus)."""
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+class RequestTooLargeError(ValueError):
+    """Levée lorsqu'une requête coûte plus de jetons que la rafale de sa route : elle ne serait jamais admise."""
+
+def request_cost(route: str, data: Any) -> float:
+    """
+    Calcule le nombre de jetons consommés par une requête.
+    
+    Un ping coûte un jeton par paquet demandé, les autres requêtes un jeton.
+    
+    Args:
+        route (str): Le modèle de la route (ex: '/api/network/ping').
+        data (Any): Le corps JSON de la requête ou les paramètres de la commande.
+    
+    Returns:
+        float: Le coût de la requête.
+    """
+    if route == "/api/network/ping" and isinstance(data, dict):
+        try:
+            return float(max(1, int(data.get("count", 4))))
+        except (TypeError, ValueError):
+            # Le gestionnaire refusera la requête
+            return 1.0
+    return 1.0
+
+class TokenBucket:
+    """Seau à jetons : se remplit de `rate` jetons par seconde, jusqu'à `burst` jetons."""
+    
+    __slots__ = ("tokens", "updated")
+    
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+    
+    def take(self, cost: float, rate: float, burst: float, now: float) -> float:
+        """
+        Prend `cost` jetons s'ils sont disponibles.
+        
+        Les limites sont passées à chaque appel : une modification de config.json
+        s'applique aux seaux existants.
+        
+        Returns:
+            float: 0 si les jetons ont été pris, sinon le délai en secondes avant qu'ils le soient.
+        """
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / rate
+
+class Admission:
+    """Requête admise : libère sa place auprès du service amont à la fin de son traitement."""
+    
+    def __init__(self, controller: Optional["AdmissionController"] = None, upstream: Optional[str] = None):
+        self._controller = controller
+        self._upstream = upstream
+        self._started = time.monotonic()
+    
+    def release(self):
+        """Libère la place (sans effet au-delà du premier appel)."""
+        if self._upstream is not None:
+            self._controller._release(self._upstream, time.monotonic() - self._started)
+            self._upstream = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.release()
+
+class AdmissionController:
+    """
+    Contrôle d'admission des requêtes de l'API.
+    
+    Chaque route de `rate_limits` a un seau à jetons par client ({"rate": jetons
+    par seconde, "burst": taille du seau}) ; les routes absentes ne sont pas
+    limitées. Un client est identifié par sa clé d'API si elle figure dans
+    `api_clients`, sinon par son adresse IP. Les routes qui appellent un service
+    amont (ROUTE_UPSTREAMS) sont de plus limitées à `upstream_concurrency` appels
+    simultanés par service, tous clients confondus. Les limites sont relues à
+    chaque requête et valent pour le processus : avec plusieurs processus, chacun
+    applique les siennes.
+    """
+    
+    def __init__(self, config: Config):
+        """
+        Initialise le contrôleur.
+        
+        Args:
+            config (Config): La configuration de l'application.
+        """
+        self.config = config
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._in_flight: Dict[str, int] = {}
+        self._durations: Dict[str, float] = {}
+    
+    def identify(self, headers: Mapping[str, str], remote_addr: Optional[str]) -> str:
+        """
+        Identifie le client d'une requête.
+        
+        Args:
+            headers (Mapping[str, str]): Les en-têtes (insensibles à la casse).
+            remote_addr (str, optional): L'adresse de la connexion.
+        
+        Returns:
+            str: Le nom du client de `api_clients` ('key:<nom>') ou son adresse ('ip:<adresse>').
+        """
+        api_key = headers.get("X-API-Key") or ""
+        authorization = headers.get("Authorization") or ""
+        if not api_key and authorization[:7].lower() == "bearer ":
+            api_key = authorization[7:].strip()
+        if api_key:
+            # Une clé inconnue ne donne pas de seau à part: changer de clé ne contourne pas la limite
+            name = (self.config.get_value("api_clients") or {}).get(api_key)
+            if name:
+                return f"key:{name}"
+        if self.config.get_value("rate_limit_trust_proxy", False):
+            forwarded = headers.get("X-Forwarded-For") or ""
+            if forwarded:
+                return f"ip:{forwarded.split(',')[0].strip()}"
+        return f"ip:{remote_addr or 'inconnue'}"
+    
+    def admit(self, client: str, route: str, cost: float = 1.0, hold_upstream: bool = True) -> Admission:
+        """
+        Admet une requête ou la refuse aussitôt.
+        
+        Args:
+            client (str): L'identité du client (voir identify).
+            route (str): Le modèle de la route (ex: '/api/jobs/<job_id>').
+            cost (float): Le nombre de jetons consommés (voir request_cost).
+            hold_upstream (bool): Réserver la place auprès du service amont ; sans elle, seuls
+                                  les jetons sont pris (voir acquire_upstream).
+        
+        Returns:
+            Admission: La place accordée, à libérer à la fin de la requête.
+        
+        Raises:
+            RateLimitedError: Si le client a épuisé son seau ou si le service amont est saturé.
+            RequestTooLargeError: Si le coût dépasse la rafale de la route.
+        """
+        if not self.config.get_value("admission_enabled", True):
+            return Admission()
+        limit = (self.config.get_value("rate_limits") or {}).get(route) or {}
+        rate = float(limit.get("rate", 0))
+        burst = float(limit.get("burst", rate))
+        upstream = ROUTE_UPSTREAMS.get(route)
+        max_in_flight = self._max_in_flight(upstream) if hold_upstream else 0
+        if rate > 0 and cost > burst:
+            raise RequestTooLargeError(f"Requête trop coûteuse pour {route}: {cost:g} jetons pour une rafale de {burst:g}")
+        
+        now = time.monotonic()
+        rejection = None
+        with self._lock:
+            # Concurrence d'abord: un refus ne doit pas coûter de jetons au client
+            if max_in_flight > 0 and self._in_flight.get(upstream, 0) >= max_in_flight:
+                rejection = self._saturated(upstream, max_in_flight)
+            elif rate > 0:
+                wait = self._take(client, route, cost, rate, burst, now)
+                if wait > 0:
+                    rejection = RateLimitedError(f"Trop de requêtes sur {route}, réessayer dans {wait:.1f}s", wait, "rate")
+            if rejection is None:
+                return self._hold(upstream, max_in_flight)
+        ADMISSION_REJECTED.inc(route, rejection.reason)
+        raise rejection
+    
+    def acquire_upstream(self, route: str) -> Admission:
+        """
+        Réserve une place auprès du service amont d'une route, sans prendre de jetons.
+        
+        Une tâche de fond paie ses jetons à la soumission (admit avec hold_upstream=False)
+        et ne réserve sa place qu'au moment de s'exécuter : les tâches en attente
+        dans la file ne comptent pas parmi les appels en cours.
+        
+        Args:
+            route (str): Le modèle de la route.
+        
+        Returns:
+            Admission: La place accordée, à libérer à la fin de l'appel.
+        
+        Raises:
+            RateLimitedError: Si le service amont est saturé.
+        """
+        if not self.config.get_value("admission_enabled", True):
+            return Admission()
+        upstream = ROUTE_UPSTREAMS.get(route)
+        max_in_flight = self._max_in_flight(upstream)
+        with self._lock:
+            if max_in_flight <= 0 or self._in_flight.get(upstream, 0) < max_in_flight:
+                return self._hold(upstream, max_in_flight)
+            rejection = self._saturated(upstream, max_in_flight)
+        ADMISSION_REJECTED.inc(route, rejection.reason)
+        raise rejection
+    
+    def admit_request(self, route: str, headers: Mapping[str, str], remote_addr: Optional[str],
+                      load_body: Callable[[], Any]) -> Admission:
+        """
+        Admet une requête HTTP (voir admit).
+        
+        Args:
+            route (str): Le modèle de la route.
+            headers (Mapping[str, str]): Les en-têtes.
+            remote_addr (str, optional): L'adresse de la connexion.
+            load_body (Callable[[], Any]): Décode le corps JSON (appelée seulement si le coût en dépend).
+        
+        Returns:
+            Admission: La place accordée.
+        """
+        cost = request_cost(route, load_body()) if route == "/api/network/ping" else 1.0
+        return self.admit(self.identify(headers, remote_addr), route, cost)
+    
+    def admit_command(self, client: str, kind: str, params: Any, hold_upstream: bool = True) -> Admission:
+        """
+        Admet une commande du canal WebSocket ou une tâche de fond (voir admit).
+        
+        Elle consomme les jetons de la route équivalente (COMMAND_ROUTES) et, avec
+        `hold_upstream`, occupe une place auprès de son service amont ; les autres
+        types sont admis d'office.
+        
+        Args:
+            client (str): L'identité du client (voir identify).
+            kind (str): Le type de commande (ping, http, generate, analyze...).
+            params (Any): Les paramètres de la commande.
+            hold_upstream (bool): Réserver aussi la place auprès du service amont.
+        
+        Returns:
+            Admission: La place accordée, à libérer à la fin de la commande.
+        """
+        route = COMMAND_ROUTES.get(kind)
+        if route is None:
+            return Admission()
+        return self.admit(client, route, request_cost(route, params), hold_upstream)
+    
+    def _max_in_flight(self, upstream: Optional[str]) -> int:
+        if upstream is None:
+            return 0
+        return int((self.config.get_value("upstream_concurrency") or {}).get(upstream, 0))
+    
+    def _saturated(self, upstream: str, max_in_flight: int) -> RateLimitedError:
+        # Doit être appelé avec le verrou acquis
+        retry_after = self._durations.get(upstream, 1.0) / max_in_flight
+        return RateLimitedError(
+            f"Service {upstream} saturé ({max_in_flight} appels en cours), réessayer dans {retry_after:.1f}s",
+            retry_after, "concurrency"
+        )
+    
+    def _hold(self, upstream: Optional[str], max_in_flight: int) -> Admission:
+        # Doit être appelé avec le verrou acquis
+        if max_in_flight <= 0:
+            return Admission()
+        self._in_flight[upstream] = self._in_flight.get(upstream, 0) + 1
+        UPSTREAM_IN_FLIGHT.set(self._in_flight[upstream], upstream)
+        return Admission(self, upstream)
+    
+    def _take(self, client: str, route: str, cost: float, rate: float, burst: float, now: float) -> float:
+        # Doit être appelé avec le verrou acquis
+        key = (client, route)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(burst, now)
+            # Un seau oublié est plein: évincer le moins récent ne fait que rendre des jetons
+            if len(self._buckets) > int(self.config.get_value("rate_limit_max_clients", 10000)):
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(cost, rate, burst, now)
+    
+    def _release(self, upstream: str, duration: float):
+        with self._lock:
+            self._in_flight[upstream] = max(0, self._in_flight.get(upstream, 0) - 1)
+            UPSTREAM_IN_FLIGHT.set(self._in_flight[upstream], upstream)
+            previous = self._durations.get(upstream)
+            self._durations[upstream] = duration if previous is None else (
+                previous + DURATION_EWMA_ALPHA * (duration - previous)
+            )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Récupère l'état du contrôleur.
+        
+        Returns:
+            Dict[str, Any]: Appels amont en cours, durée moyenne de ces appels et nombre de seaux.
+        """
+        with self._lock:
+            return {
+                "in_flight": dict(self._in_flight),
+                "average_duration": {name: round(value, 3) for name, value in self._durations.items()},
+                "buckets": len(self._buckets)
+            }
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+def get_admission_controller(config: Config) -> AdmissionController:
+    """
+    Récupère le contrôleur d'admission du processus (créé au premier appel).
+    
+    Args:
+        config (Config): La configuration lue à chaque requête.
+    
+    Returns:
+        AdmissionController: Le contrôleur partagé.
+    """
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(config)
+        return _controller
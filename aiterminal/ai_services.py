@@ -5,16 +5,169 @@ Gère les interactions avec les APIs d'IA comme OpenAI.
 
 import os
 import json
+import math
+import time
+import asyncio
 import logging
-from openai import OpenAI
-from typing import Optional, Dict, Any
+import itertools
+import threading
+import weakref
+import httpx
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from openai import OpenAI, AsyncOpenAI
+from typing import Callable, Optional, Dict, Any, List, Set
 
 from .config import Config
+from .conversation import ConversationMemory, ConversationSession
+from .metrics import AI_TOKENS, UPSTREAM_DURATION, record_cache
+from .resilience import CircuitOpenError, RetryPolicy, get_circuit_breaker
+from .routing import ModelRouter, RouteDecision, is_timeout_error
+from .tracing import span, traced
+from .usage import get_usage_tracker, make_record
 
 logger = logging.getLogger(__name__)
 
-class AIService:
-    """Service pour interagir avec les APIs d'IA."""
+API_KEY_MISSING_MESSAGE = "Clé API OpenAI non configurée. Utilisez 'aiterminal config --api-key=votre-clé' pour configurer."
+
+# Clés de configuration dont la modification impose de recréer le client OpenAI ou la politique de réessai
+CLIENT_CONFIG_KEYS = {"api_key", "base_url", "timeout", "connect_timeout"}
+RETRY_CONFIG_KEYS = {"retry_max_attempts", "retry_base_delay", "retry_max_delay"}
+
+# Pools de connexions HTTP partagés par toutes les instances de service du processus
+_http_client: Optional[httpx.Client] = None
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_http_lock = threading.Lock()
+
+# Connexions par sous-pool du client asynchrone: httpcore parcourt toutes les connexions
+# du pool pour chaque requête en attente, un coût quadratique au-delà de quelques dizaines
+ASYNC_POOL_SHARD_CONNECTIONS = 8
+
+def _http_limits(config: Config) -> httpx.Limits:
+    """
+    Construit les limites du pool de connexions à partir de la configuration.
+    
+    Args:
+        config (Config): L'objet de configuration.
+    
+    Returns:
+        httpx.Limits: Les limites du pool.
+    """
+    return httpx.Limits(
+        max_connections=config.get_value("http_max_connections", 100),
+        max_keepalive_connections=config.get_value("http_max_keepalive", 20),
+        keepalive_expiry=config.get_value("http_keepalive_expiry", 30)
+    )
+
+def _http_timeout(config: Config) -> httpx.Timeout:
+    """
+    Construit les timeouts explicites des appels HTTP à partir de la configuration.
+    
+    Args:
+        config (Config): L'objet de configuration.
+    
+    Returns:
+        httpx.Timeout: Les timeouts (global et connexion).
+    """
+    return httpx.Timeout(config.get_value("timeout", 30), connect=config.get_value("connect_timeout", 5))
+
+def get_http_client(config: Config) -> httpx.Client:
+    """
+    Récupère le client HTTP synchrone partagé, en le créant si besoin.
+    
+    Args:
+        config (Config): L'objet de configuration.
+    
+    Returns:
+        httpx.Client: Le client HTTP partagé.
+    """
+    global _http_client
+    with _http_lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(limits=_http_limits(config), timeout=_http_timeout(config))
+        return _http_client
+
+class ShardedAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Transport asynchrone qui répartit les requêtes, à tour de rôle, entre plusieurs
+    petits pools de connexions.
+    
+    Les limites de la configuration (http_max_connections, http_max_keepalive) sont
+    partagées entre les sous-pools de ASYNC_POOL_SHARD_CONNECTIONS connexions : le
+    nombre total de connexions est le même qu'avec un seul pool, mais la gestion de
+    chaque pool reste bon marché quand des centaines de requêtes sont en cours.
+    """
+    
+    def __init__(self, limits: httpx.Limits):
+        """
+        Initialise les sous-pools.
+        
+        Args:
+            limits (httpx.Limits): Les limites globales.
+        """
+        max_connections = limits.max_connections or ASYNC_POOL_SHARD_CONNECTIONS
+        count = max(1, math.ceil(max_connections / ASYNC_POOL_SHARD_CONNECTIONS))
+        keepalive = limits.max_keepalive_connections
+        shard_limits = httpx.Limits(
+            max_connections=math.ceil(max_connections / count),
+            max_keepalive_connections=math.ceil(keepalive / count) if keepalive is not None else None,
+            keepalive_expiry=limits.keepalive_expiry
+        )
+        # Un seul contexte TLS: le charger coûte plusieurs dizaines de millisecondes
+        ssl_context = httpx.create_ssl_context()
+        self._shards = [httpx.AsyncHTTPTransport(verify=ssl_context, limits=shard_limits) for _ in range(count)]
+        self._next = itertools.cycle(self._shards)
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await next(self._next).handle_async_request(request)
+    
+    async def aclose(self):
+        for shard in self._shards:
+            await shard.aclose()
+
+def get_async_http_client(config: Config) -> httpx.AsyncClient:
+    """
+    Récupère le client HTTP asynchrone partagé pour la boucle d'événements courante.
+    
+    Les connexions d'un client asynchrone sont liées à leur boucle d'événements,
+    il y a donc un pool par boucle (découpé en sous-pools, voir ShardedAsyncTransport).
+    
+    Args:
+        config (Config): L'objet de configuration.
+    
+    Returns:
+        httpx.AsyncClient: Le client HTTP partagé par la boucle courante.
+    """
+    loop = asyncio.get_running_loop()
+    with _http_lock:
+        client = _async_http_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(transport=ShardedAsyncTransport(_http_limits(config)),
+                                       timeout=_http_timeout(config))
+            _async_http_clients[loop] = client
+        return client
+
+async def close_async_http_client():
+    """Ferme le pool HTTP asynchrone de la boucle d'événements courante (arrêt du serveur ASGI)."""
+    loop = asyncio.get_running_loop()
+    with _http_lock:
+        client = _async_http_clients.pop(loop, None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+def _deadline_from_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Convertit un timeout relatif en échéance absolue (horloge monotone)."""
+    return time.monotonic() + timeout if timeout is not None else None
+
+class BaseAIService(ABC):
+    """
+    Base commune des services IA synchrone et asynchrone.
+    
+    Regroupe la construction des prompts, la politique de résilience
+    et les réponses hors ligne. Les traitements sont écrits une seule fois
+    sous forme de générateurs (méthodes `_*_steps`) qui émettent les
+    opérations de transport ; chaque sous-classe les exécute (voir _run).
+    """
     
     def __init__(self, config: Config):
         """
@@ -25,130 +178,562 @@ class AIService:
         """
         self.config = config
         self.client = self._initialize_client()
+        self.retry_policy = self._build_retry_policy()
+        self.circuit_breaker = get_circuit_breaker(
+            "openai",
+            failure_threshold=config.get_value("circuit_failure_threshold", 5),
+            reset_timeout=config.get_value("circuit_reset_timeout", 30)
+        )
+        self.router = ModelRouter(config)
+        self.usage = get_usage_tracker()
+        self.usage.configure(config)
+        self._memory: Optional[ConversationMemory] = None
+        config.subscribe(self._on_config_change)
+    
+    def _build_retry_policy(self) -> RetryPolicy:
+        """Construit la politique de réessai à partir de la configuration."""
+        return RetryPolicy(
+            max_attempts=self.config.get_value("retry_max_attempts", 3),
+            base_delay=self.config.get_value("retry_base_delay", 0.5),
+            max_delay=self.config.get_value("retry_max_delay", 8.0)
+        )
+    
+    def _on_config_change(self, changed: Set[str]):
+        """
+        Applique une modification de la configuration sans recréer le service.
+        
+        Args:
+            changed (Set[str]): Les clés modifiées.
+        """
+        if changed & CLIENT_CONFIG_KEYS:
+            self.client = self._initialize_client()
+        if changed & RETRY_CONFIG_KEYS:
+            self.retry_policy = self._build_retry_policy()
+        if any(key.startswith("usage_") or key == "model_prices" for key in changed):
+            self.usage.configure(self.config)
     
+    @abstractmethod
     def _initialize_client(self):
         """
         Initialise le client OpenAI.
         
         Returns:
-            OpenAI: Le client OpenAI initialisé.
+            Le client OpenAI initialisé.
+        """
+    
+    def _next_candidate(self, decision: RouteDecision, index: int, error: Exception) -> bool:
+        """
+        Enregistre l'échec d'un candidat et indique s'il faut passer au modèle de repli.
+        
+        Args:
+            decision (RouteDecision): La décision de routage en cours.
+            index (int): Position du candidat qui a échoué.
+            error (Exception): L'erreur levée.
+        
+        Returns:
+            bool: True si un modèle de repli doit être essayé.
+        """
+        if index + 1 < len(decision.candidates) and is_timeout_error(error):
+            logger.warning(f"Timeout du modèle {decision.candidates[index]}, repli sur {decision.candidates[index + 1]}")
+            decision.fallback_used = True
+            return True
+        decision.model_used = decision.candidates[index]
+        self.router.record_decision(decision)
+        return False
+    
+    def _record_usage(self, decision: RouteDecision, started: float, response=None):
+        """
+        Enregistre les tokens et la durée d'un appel routé (réussi si `response` est fourni).
+        
+        Args:
+            decision (RouteDecision): La décision de routage de l'appel.
+            started (float): Instant de début de l'appel (horloge monotone).
+            response: La réponse de l'API, ou None en cas d'échec.
+        """
+        record = make_record(
+            decision.task,
+            decision.model_used or decision.model,
+            time.monotonic() - started,
+            usage=getattr(response, "usage", None),
+            error=response is None
+        )
+        self.usage.record(record)
+        if response is not None:
+            record_cache("openai_prompt", record["cache_hit"])
+            AI_TOKENS.inc("prompt", amount=record["prompt_tokens"])
+            AI_TOKENS.inc("cached", amount=record["cached_tokens"])
+            AI_TOKENS.inc("completion", amount=record["completion_tokens"])
+    
+    def _client_kwargs(self) -> Dict[str, Any]:
+        """
+        Paramètres communs de construction des clients OpenAI.
+        
+        Returns:
+            Dict[str, Any]: Les paramètres du client.
         """
         api_key = self.config.get_api_key()
         if not api_key:
             logger.warning("Clé API OpenAI non configurée")
         
-        return OpenAI(api_key=api_key)
+        # Les réessais sont gérés par la RetryPolicy afin de coopérer avec le disjoncteur
+        return {
+            "api_key": api_key,
+            "base_url": self.config.get_base_url(),
+            "max_retries": 0,
+            "timeout": _http_timeout(self.config)
+        }
     
-    def generate_text(self, prompt: str, model: Optional[str] = None, temperature: Optional[float] = None) -> str:
+    def _before_attempt(self, deadline: Optional[float], kwargs: Dict[str, Any]):
         """
-        Génère du texte à partir d'un prompt en utilisant OpenAI.
+        Prépare une tentative : vérifie le disjoncteur et propage l'échéance.
         
         Args:
-            prompt (str): Le prompt à envoyer à l'IA.
-            model (str, optional): Le modèle à utiliser. Si None, utilise celui configuré.
-            temperature (float, optional): La température pour la génération. Si None, utilise celle configurée.
+            deadline (float, optional): Échéance absolue de l'appel.
+            kwargs (Dict[str, Any]): Paramètres de l'appel, complétés avec le timeout restant.
+        
+        Raises:
+            TimeoutError: Si l'échéance est déjà dépassée.
+            CircuitOpenError: Si le disjoncteur est ouvert.
+        """
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Délai de l'appel IA dépassé")
+            kwargs["timeout"] = remaining
+        self.circuit_breaker.before_call()
+    
+    def _after_failure(self, attempt: int, error: Exception, deadline: Optional[float]) -> Optional[float]:
+        """
+        Enregistre un échec et calcule le délai avant la prochaine tentative.
+        
+        Args:
+            attempt (int): Numéro de la tentative qui a échoué.
+            error (Exception): L'erreur levée.
+            deadline (float, optional): Échéance absolue de l'appel.
+        
+        Returns:
+            Optional[float]: Le délai d'attente, ou None s'il ne faut pas réessayer.
+        """
+        if self.retry_policy.is_failure(error):
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.release()
+        
+        delay = self.retry_policy.compute_delay(attempt, error)
+        if delay is not None and deadline is not None and time.monotonic() + delay >= deadline:
+            # Inutile d'attendre si la prochaine tentative dépasserait l'échéance
+            return None
+        if delay is not None:
+            logger.warning(f"Erreur transitoire OpenAI (tentative {attempt}), nouvel essai dans {delay:.2f}s: {str(error)}")
+        return delay
+    
+    def _record_stream_outcome(self, error: Optional[Exception] = None):
+        """
+        Enregistre auprès du disjoncteur l'issue d'une réponse en streaming, connue à la fin de sa lecture.
+        
+        Args:
+            error (Exception, optional): L'erreur levée pendant la lecture, None si elle a abouti.
+        """
+        if error is None:
+            self.circuit_breaker.record_success()
+        elif self.retry_policy.is_failure(error) or isinstance(error, httpx.TransportError):
+            # Coupure du flux (httpx.ReadError...): le service est aussi indisponible qu'à l'appel
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.release()
+    
+    def _completion_steps(self, deadline: Optional[float], kwargs: Dict[str, Any]):
+        """
+        Déroule les tentatives d'un appel de complétion à travers le disjoncteur et la politique de réessai.
+        
+        Émet les opérations de transport ("create", "sleep") exécutées par le service (voir _run)
+        et reçoit leur résultat, ou leur erreur.
+        
+        Args:
+            deadline (float, optional): Échéance absolue (horloge monotone) de l'appel.
+            kwargs (Dict[str, Any]): Paramètres transmis à client.chat.completions.create.
+        
+        Returns:
+            La réponse de l'API.
+        
+        Raises:
+            CircuitOpenError: Si le disjoncteur est ouvert.
+            TimeoutError: Si l'échéance est dépassée.
+            Exception: L'erreur de la dernière tentative si tous les essais échouent.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt(deadline, kwargs)
+            attempt_started = time.perf_counter()
+            try:
+                with span("openai.chat.completions", model=kwargs.get("model"), attempt=attempt):
+                    response = yield ("create", kwargs)
+            except Exception as error:
+                UPSTREAM_DURATION.observe(time.perf_counter() - attempt_started, "openai", "chat.completions", "error")
+                delay = self._after_failure(attempt, error, deadline)
+                if delay is None:
+                    raise
+                with span("ai.retry_wait", delay_s=round(delay, 3)):
+                    yield ("sleep", delay)
+                continue
+            except BaseException:
+                # Annulation ou interruption: la place de sonde est rendue sans compter d'échec
+                self.circuit_breaker.release()
+                raise
             
+            UPSTREAM_DURATION.observe(time.perf_counter() - attempt_started, "openai", "chat.completions", "ok")
+            if not kwargs.get("stream"):
+                # En streaming, l'issue n'est connue qu'après la lecture du flux (voir _complete_steps)
+                self.circuit_breaker.record_success()
+            return response
+    
+    def _complete_steps(self, task: str, messages, deadline: Optional[float] = None, model: Optional[str] = None,
+                        on_delta: Optional[Callable[[str], Any]] = None, **kwargs):
+        """
+        Déroule un appel routé : choix du modèle, puis repli sur le modèle secondaire en cas de timeout.
+        
+        Args:
+            task (str): Type de tâche (chat, summary, sentiment, entities, code).
+            messages (list): Les messages à envoyer.
+            deadline (float, optional): Échéance absolue de l'appel.
+            model (str, optional): Modèle imposé par l'appelant.
+            on_delta (Callable, optional): Active le streaming : appelée avec chaque fragment
+                                           de la réponse (opération "collect").
+            **kwargs: Autres paramètres de client.chat.completions.create.
+        
         Returns:
-            str: Le texte généré.
+            La réponse de l'API.
+        """
+        if on_delta is not None:
+            kwargs.update(stream=True, stream_options={"include_usage": True})
+        decision = self.router.route(task, messages, model=model, deadline=deadline)
+        started = time.monotonic()
+        for index, candidate in enumerate(decision.candidates):
+            start = time.monotonic()
+            parts: List[str] = []
+            try:
+                response = yield from self._completion_steps(
+                    decision.attempt_deadline(index, deadline),
+                    dict(kwargs, model=candidate, messages=messages)
+                )
+                if on_delta is not None:
+                    try:
+                        response = yield ("collect", response, on_delta, parts)
+                    except Exception as stream_error:
+                        self._record_stream_outcome(stream_error)
+                        raise
+                    self._record_stream_outcome()
+            except Exception as error:
+                self.router.observe(candidate, time.monotonic() - start, error)
+                # Pas de repli une fois des fragments transmis: la réponse serait répétée
+                if not parts and self._next_candidate(decision, index, error):
+                    continue
+                if not isinstance(error, CircuitOpenError):
+                    self._record_usage(decision, started)
+                raise
             
-        Raises:
-            Exception: Si une erreur se produit lors de la génération.
+            self.router.observe(candidate, time.monotonic() - start)
+            decision.model_used = candidate
+            self.router.record_decision(decision)
+            self._record_usage(decision, started, response)
+            return response
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Récupère les métriques de résilience du service.
+        
+        Returns:
+            Dict[str, Any]: L'état du disjoncteur et la politique de réessai.
+        """
+        return {
+            "circuit_breaker": self.circuit_breaker.get_stats(),
+            "retry_policy": {
+                "max_attempts": self.retry_policy.max_attempts,
+                "base_delay": self.retry_policy.base_delay,
+                "max_delay": self.retry_policy.max_delay
+            },
+            "routing": self.router.stats.get_stats(),
+            "usage": self.usage.get_stats()
+        }
+    
+    @property
+    def memory(self) -> ConversationMemory:
+        """Mémoire conversationnelle par défaut (sessions enregistrées dans session_dir)."""
+        if self._memory is None:
+            self._memory = ConversationMemory(self.config)
+        return self._memory
+    
+    @staticmethod
+    def _chat_result(session: ConversationSession, answer: str, response=None) -> Dict[str, Any]:
+        """
+        Construit le résultat d'un tour de conversation.
+        
+        Args:
+            session (ConversationSession): La session.
+            answer (str): La réponse de l'assistant.
+            response: La réponse de l'API, ou None en mode hors ligne.
+        
+        Returns:
+            Dict[str, Any]: La réponse, la session et les tokens consommés (dont ceux servis par le cache).
+        """
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "response": answer,
+            "session_id": session.session_id,
+            "messages": len(session.turns),
+            "summarized_messages": session.summarized_messages,
+            "usage": {
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0
+            } if usage is not None else None
+        }
+    
+    def _summary_messages(self, memory: ConversationMemory, session: ConversationSession, evicted) -> Dict[str, Any]:
+        """
+        Paramètres de l'appel qui met à jour le résumé glissant d'une session.
+        
+        Args:
+            memory (ConversationMemory): La mémoire conversationnelle.
+            session (ConversationSession): La session.
+            evicted (list): Les messages à intégrer au résumé.
+        
+        Returns:
+            Dict[str, Any]: Les messages et paramètres de génération.
+        """
+        return {
+            "messages": [{"role": "user", "content": memory.summary_prompt(session, evicted)}],
+            "temperature": 0.2,
+            "max_tokens": memory.summary_max_tokens
+        }
+    
+    def _generation_params(self, temperature: Optional[float]) -> Dict[str, Any]:
+        """
+        Résout les paramètres de génération à partir des arguments et de la configuration.
+        
+        Args:
+            temperature (float, optional): La température demandée.
+        
+        Returns:
+            Dict[str, Any]: Les paramètres temperature et max_tokens.
+        """
+        return {
+            "temperature": temperature if temperature is not None else self.config.get_value("temperature", 0.7),
+            "max_tokens": self.config.get_value("max_tokens", 2000)
+        }
+    
+    @staticmethod
+    def _sentiment_prompt(text: str) -> str:
+        """Construit le prompt d'analyse de sentiment."""
+        return (
+            "Effectue une analyse de sentiment sur le texte suivant et réponds exclusivement au format JSON. "
+            "Le JSON doit contenir: 'sentiment' (positive, negative, ou neutral), 'score' (entre -1 et 1), "
+            "et 'explanation' (courte explication).\n\n"
+            f"Texte : {text}"
+        )
+    
+    @staticmethod
+    def _entities_prompt(text: str) -> str:
+        """Construit le prompt d'extraction d'entités."""
+        return (
+            "Extrait les entités nommées du texte suivant et réponds exclusivement au format JSON. "
+            "Les catégories à identifier: personnes, lieux, organisations, dates, etc. "
+            "Le format doit être: {'entities': {'personnes': [...], 'lieux': [...], ...}}\n\n"
+            f"Texte : {text}"
+        )
+    
+    @staticmethod
+    def _summary_prompt(text: str) -> str:
+        """Construit le prompt de résumé."""
+        return f"Résume le texte suivant de manière concise tout en conservant les points clés:\n\n{text}"
+    
+    @staticmethod
+    def _code_prompt(description: str, language: str) -> str:
+        """Construit le prompt de génération de code."""
+        return (
+            f"Génère du code {language} pour la tâche suivante. "
+            f"Retourne uniquement le code, sans explication ni commentaire d'introduction:\n\n"
+            f"{description}"
+        )
+    
+    def _generate_steps(self, prompt: str, task: str, model: Optional[str] = None,
+                        temperature: Optional[float] = None, timeout: Optional[float] = None,
+                        on_delta: Optional[Callable[[str], Any]] = None):
+        """
+        Déroule la génération de texte d'une tâche (generate_text, summarize_text et generate_code).
+        
+        Args:
+            prompt (str): Le prompt à envoyer à l'IA.
+            task (str): Type de tâche pour le routage.
+            model (str, optional): Le modèle à utiliser. Si None, le routeur le choisit.
+            temperature (float, optional): La température pour la génération. Si None, utilise celle configurée.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+            on_delta (Callable, optional): Reçoit les fragments de la réponse au fil du streaming.
+        
+        Returns:
+            str: Le texte généré, ou une réponse hors ligne en cas d'échec.
         """
         try:
-            model = model or self.config.get_model()
-            temperature = temperature if temperature is not None else self.config.get_value("temperature", 0.7)
-            max_tokens = self.config.get_value("max_tokens", 2000)
+            deadline = _deadline_from_timeout(timeout)
+            params = self._generation_params(temperature)
             
             if not self.config.get_api_key():
-                return "Erreur: Clé API OpenAI non configurée. Utilisez 'aiterminal config --api-key=votre-clé' pour configurer."
+                return f"Erreur: {API_KEY_MISSING_MESSAGE}"
             
             try:
-                response = self.client.chat.completions.create(
-                    model=model,  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=temperature,
-                    max_tokens=max_tokens
+                response = yield from self._complete_steps(
+                    task,
+                    [{"role": "user", "content": prompt}],
+                    deadline=deadline,
+                    model=model,
+                    on_delta=on_delta,
+                    **params
                 )
                 
                 return response.choices[0].message.content
+            except CircuitOpenError as circuit_error:
+                # Échec rapide: pas d'appel réseau tant que le disjoncteur est ouvert
+                logger.debug(str(circuit_error))
+                return self._fallback_response(prompt)
             except Exception as api_error:
                 logger.error(f"Erreur API OpenAI: {str(api_error)}")
                 return self._fallback_response(prompt)
-                
+        
         except Exception as e:
             logger.error(f"Erreur lors de la génération de texte: {str(e)}")
             return self._fallback_response(prompt)
     
-    def _fallback_response(self, prompt: str) -> str:
+    def _compact_steps(self, memory: ConversationMemory, session: ConversationSession, deadline: Optional[float]):
         """
-        Fournit une réponse par défaut lorsque l'API OpenAI n'est pas disponible.
+        Déroule le résumé de la moitié la plus ancienne de l'historique d'une session.
         
         Args:
-            prompt (str): Le prompt original.
-            
+            memory (ConversationMemory): La mémoire conversationnelle.
+            session (ConversationSession): La session.
+            deadline (float, optional): Échéance absolue de l'appel.
+        """
+        evicted = memory.evict(session)
+        try:
+            response = yield from self._complete_steps("summary", deadline=deadline,
+                                                       **self._summary_messages(memory, session, evicted))
+            summary = response.choices[0].message.content or memory.offline_summary(session, evicted)
+        except Exception as e:
+            logger.warning(f"Résumé de l'historique impossible, extraits conservés à la place: {str(e)}")
+            summary = memory.offline_summary(session, evicted)
+        memory.apply_summary(session, summary, evicted)
+        memory.save(session)
+    
+    def _chat_steps(self, prompt: str, session_id: Optional[str], memory: Optional[ConversationMemory],
+                    model: Optional[str], temperature: Optional[float], timeout: Optional[float],
+                    on_delta: Optional[Callable[[str], Any]] = None):
+        """
+        Déroule un tour de conversation (voir AIService.chat).
+        
         Returns:
-            str: Une réponse par défaut.
+            Dict[str, Any]: La réponse, l'identifiant de session et les tokens consommés.
+        
+        Raises:
+            ValueError: Si l'identifiant de session est invalide.
         """
-        # Réponses simples pour des cas courants
-        if "bonjour" in prompt.lower() or "salut" in prompt.lower():
-            return "Bonjour ! Je suis AITerminal, votre assistant en mode hors ligne. Comment puis-je vous aider ?"
-            
-        elif "comment" in prompt.lower() and ("vas" in prompt.lower() or "allez" in prompt.lower()):
-            return "Je fonctionne actuellement en mode hors ligne, mais je suis prêt à vous aider avec des fonctionnalités de base."
-            
-        elif "aide" in prompt.lower() or "help" in prompt.lower():
-            return "Je peux vous aider avec plusieurs tâches, même en mode hors ligne. Vous pouvez utiliser des commandes comme 'ping', 'http', ou 'système' pour accéder à diverses fonctionnalités."
-            
-        elif "merci" in prompt.lower():
-            return "Je vous en prie ! N'hésitez pas si vous avez besoin d'autre chose."
-            
-        else:
-            return ("Je fonctionne actuellement en mode hors ligne car la connexion à l'API OpenAI n'est pas disponible. "
-                   "Veuillez vérifier votre clé API ou votre connexion internet. "
-                   "Vous pouvez toujours utiliser les fonctionnalités réseau, système et autres commandes qui ne nécessitent pas l'IA.")
+        memory = memory or self.memory
+        session = memory.load(session_id)
+        if not self.config.get_api_key():
+            return self._chat_result(session, f"Erreur: {API_KEY_MISSING_MESSAGE}")
+        
+        deadline = _deadline_from_timeout(timeout)
+        if memory.needs_compaction(session, prompt):
+            yield from self._compact_steps(memory, session, deadline)
+        
+        try:
+            response = yield from self._complete_steps(
+                "chat",
+                memory.build_messages(session, prompt),
+                deadline=deadline,
+                model=model,
+                on_delta=on_delta,
+                **self._generation_params(temperature)
+            )
+        except CircuitOpenError as circuit_error:
+            logger.debug(str(circuit_error))
+            return self._chat_result(session, self._fallback_response(prompt))
+        except Exception as api_error:
+            logger.error(f"Erreur API OpenAI: {str(api_error)}")
+            return self._chat_result(session, self._fallback_response(prompt))
+        
+        answer = response.choices[0].message.content
+        memory.record_exchange(session, prompt, answer)
+        return self._chat_result(session, answer or "", response)
     
-    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
+    def _json_steps(self, task: str, prompt: str, fallback: Callable[[], Dict[str, Any]],
+                    timeout: Optional[float]):
         """
-        Analyse le sentiment d'un texte.
+        Déroule un appel en mode JSON (sentiment, entités) et décode la réponse.
         
         Args:
-            text (str): Le texte à analyser.
-            
+            task (str): Type de tâche pour le routage.
+            prompt (str): Le prompt à envoyer.
+            fallback (Callable): Fournit le résultat hors ligne en cas d'échec.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+        
         Returns:
-            Dict[str, Any]: Les résultats de l'analyse de sentiment.
-            
-        Raises:
-            Exception: Si une erreur se produit lors de l'analyse.
+            Dict[str, Any]: La réponse décodée, ou le résultat hors ligne.
         """
         try:
-            model = self.config.get_model()
+            deadline = _deadline_from_timeout(timeout)
             
             if not self.config.get_api_key():
-                return {"error": "Clé API OpenAI non configurée. Utilisez 'aiterminal config --api-key=votre-clé' pour configurer."}
-            
-            prompt = (
-                "Effectue une analyse de sentiment sur le texte suivant et réponds exclusivement au format JSON. "
-                "Le JSON doit contenir: 'sentiment' (positive, negative, ou neutral), 'score' (entre -1 et 1), "
-                "et 'explanation' (courte explication).\n\n"
-                f"Texte : {text}"
-            )
+                return {"error": API_KEY_MISSING_MESSAGE}
             
             try:
-                response = self.client.chat.completions.create(
-                    model=model,  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
-                    messages=[{"role": "user", "content": prompt}],
+                response = yield from self._complete_steps(
+                    task,
+                    [{"role": "user", "content": prompt}],
+                    deadline=deadline,
                     response_format={"type": "json_object"}
                 )
                 
-                result = json.loads(response.choices[0].message.content)
-                return result
+                return json.loads(response.choices[0].message.content)
+            except CircuitOpenError as circuit_error:
+                # Échec rapide: pas d'appel réseau tant que le disjoncteur est ouvert
+                logger.debug(str(circuit_error))
+                return fallback()
             except Exception as api_error:
                 logger.error(f"Erreur API OpenAI: {str(api_error)}")
-                return self._fallback_sentiment_analysis(text)
-                
+                return fallback()
+        
         except Exception as e:
-            logger.error(f"Erreur lors de l'analyse de sentiment: {str(e)}")
-            return self._fallback_sentiment_analysis(text)
+            logger.error(f"Erreur lors de l'analyse ({task}): {str(e)}")
+            return fallback()
+    
+    def _fallback_response(self, prompt: str) -> str:
+        """
+        Fournit une réponse par défaut lorsque l'API OpenAI n'est pas disponible.
+        
+        Args:
+            prompt (str): Le prompt original.
+        
+        Returns:
+            str: Une réponse par défaut.
+        """
+        # Réponses simples pour des cas courants
+        if "bonjour" in prompt.lower() or "salut" in prompt.lower():
+            return "Bonjour ! Je suis AITerminal, votre assistant en mode hors ligne. Comment puis-je vous aider ?"
+        
+        elif "comment" in prompt.lower() and ("vas" in prompt.lower() or "allez" in prompt.lower()):
+            return "Je fonctionne actuellement en mode hors ligne, mais je suis prêt à vous aider avec des fonctionnalités de base."
+        
+        elif "aide" in prompt.lower() or "help" in prompt.lower():
+            return "Je peux vous aider avec plusieurs tâches, même en mode hors ligne. Vous pouvez utiliser des commandes comme 'ping', 'http', ou 'système' pour accéder à diverses fonctionnalités."
+        
+        elif "merci" in prompt.lower():
+            return "Je vous en prie ! N'hésitez pas si vous avez besoin d'autre chose."
+        
+        else:
+            return ("Je fonctionne actuellement en mode hors ligne car la connexion à l'API OpenAI n'est pas disponible. "
+                   "Veuillez vérifier votre clé API ou votre connexion internet. "
+                   "Vous pouvez toujours utiliser les fonctionnalités réseau, système et autres commandes qui ne nécessitent pas l'IA.")
     
     def _fallback_sentiment_analysis(self, text: str) -> Dict[str, Any]:
         """
@@ -156,7 +741,7 @@ class AIService:
         
         Args:
             text (str): Le texte à analyser.
-            
+        
         Returns:
             Dict[str, Any]: Une analyse de sentiment par défaut.
         """
@@ -189,78 +774,15 @@ class AIService:
             "offline_mode": True
         }
     
-    def summarize_text(self, text: str) -> str:
-        """
-        Résume un texte.
-        
-        Args:
-            text (str): Le texte à résumer.
-            
-        Returns:
-            str: Le résumé du texte.
-            
-        Raises:
-            Exception: Si une erreur se produit lors du résumé.
-        """
-        try:
-            prompt = f"Résume le texte suivant de manière concise tout en conservant les points clés:\n\n{text}"
-            return self.generate_text(prompt)
-        except Exception as e:
-            logger.error(f"Erreur lors du résumé: {str(e)}")
-            raise Exception(f"Erreur lors du résumé: {str(e)}")
-    
-    def extract_entities(self, text: str) -> Dict[str, Any]:
+    def _fallback_entity_extraction(self, text: str) -> Dict[str, Any]:
         """
-        Extrait les entités nommées d'un texte.
+        Fournit une extraction d'entités par défaut lorsque l'API OpenAI n'est pas disponible.
         
         Args:
             text (str): Le texte à analyser.
-            
+        
         Returns:
-            Dict[str, Any]: Les entités extraites.
-            
-        Raises:
-            Exception: Si une erreur se produit lors de l'extraction.
-        """
-        try:
-            model = self.config.get_model()
-            
-            if not self.config.get_api_key():
-                return {"error": "Clé API OpenAI non configurée. Utilisez 'aiterminal config --api-key=votre-clé' pour configurer."}
-            
-            prompt = (
-                "Extrait les entités nommées du texte suivant et réponds exclusivement au format JSON. "
-                "Les catégories à identifier: personnes, lieux, organisations, dates, etc. "
-                "Le format doit être: {'entities': {'personnes': [...], 'lieux': [...], ...}}\n\n"
-                f"Texte : {text}"
-            )
-            
-            try:
-                response = self.client.chat.completions.create(
-                    model=model,  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
-                    messages=[{"role": "user", "content": prompt}],
-                    response_format={"type": "json_object"}
-                )
-                
-                result = json.loads(response.choices[0].message.content)
-                return result
-            except Exception as api_error:
-                logger.error(f"Erreur API OpenAI: {str(api_error)}")
-                return self._fallback_entity_extraction(text)
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de l'extraction d'entités: {str(e)}")
-            return self._fallback_entity_extraction(text)
-    
-    def _fallback_entity_extraction(self, text: str) -> Dict[str, Any]:
-        """
-        Fournit une extraction d'entités par défaut lorsque l'API OpenAI n'est pas disponible.
-        
-        Args:
-            text (str): Le texte à analyser.
-            
-        Returns:
-            Dict[str, Any]: Des entités extraites par défaut.
+            Dict[str, Any]: Des entités extraites par défaut.
         """
         # Analyse simpliste basée sur des patterns communs
         import re
@@ -286,29 +808,500 @@ class AIService:
             "offline_mode": True,
             "note": "Extraction effectuée en mode hors ligne avec une précision limitée."
         }
+
+class AIService(BaseAIService):
+    """Service pour interagir avec les APIs d'IA."""
+    
+    def _initialize_client(self):
+        """
+        Initialise le client OpenAI.
+        
+        Returns:
+            OpenAI: Le client OpenAI initialisé, adossé au pool HTTP partagé.
+        """
+        return OpenAI(http_client=get_http_client(self.config), **self._client_kwargs())
+    
+    def _run(self, steps):
+        """
+        Exécute les opérations de transport émises par un générateur d'étapes.
+        
+        Args:
+            steps (Generator): Le générateur (méthodes `_*_steps` de BaseAIService).
+        
+        Returns:
+            La valeur retournée par le générateur.
+        """
+        value, error = None, None
+        while True:
+            try:
+                operation = steps.send(value) if error is None else steps.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            value, error = None, None
+            try:
+                value = self._perform(*operation)
+            except BaseException as e:
+                error = e
+    
+    def _perform(self, operation: str, *args):
+        """
+        Exécute une opération de transport : appel de l'API, attente ou lecture d'un flux.
+        
+        Args:
+            operation (str): "create", "sleep" ou "collect".
+            *args: Les paramètres de l'opération.
+        
+        Returns:
+            Le résultat de l'opération.
+        """
+        if operation == "create":
+            return self.client.chat.completions.create(**args[0])
+        if operation == "sleep":
+            time.sleep(args[0])
+            return None
+        return self._collect_stream(*args)
+    
+    def _create_completion(self, deadline: Optional[float] = None, **kwargs):
+        """
+        Appelle l'API de complétion à travers le disjoncteur et la politique de réessai.
+        
+        Args:
+            deadline (float, optional): Échéance absolue (horloge monotone) de l'appel.
+            **kwargs: Paramètres transmis à client.chat.completions.create.
+        
+        Returns:
+            La réponse de l'API.
+        """
+        return self._run(self._completion_steps(deadline, kwargs))
     
-    def generate_code(self, description: str, language: str = "python") -> str:
+    @staticmethod
+    def _collect_stream(stream, on_delta: Callable[[str], Any], parts: List[str]):
+        """
+        Lit une réponse en streaming et la reconstitue.
+        
+        Args:
+            stream: Le flux renvoyé par client.chat.completions.create(stream=True).
+            on_delta (Callable): Appelée avec chaque fragment de texte ; si elle retourne
+                                 False, la lecture s'arrête et le flux est fermé.
+            parts (List[str]): Reçoit les fragments lus.
+        
+        Returns:
+            Une réponse de même forme que celle d'un appel sans streaming (choices, usage).
+        """
+        usage = None
+        try:
+            for chunk in stream:
+                usage = chunk.usage or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    if on_delta(parts[-1]) is False:
+                        break
+        finally:
+            stream.close()
+        message = SimpleNamespace(content="".join(parts))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+    
+    def _complete(self, task: str, messages, deadline: Optional[float] = None, model: Optional[str] = None,
+                  on_delta: Optional[Callable[[str], Any]] = None, **kwargs):
+        """
+        Effectue un appel routé, en streaming si on_delta est fourni (voir _complete_steps).
+        
+        Returns:
+            La réponse de l'API.
+        """
+        return self._run(self._complete_steps(task, messages, deadline, model, on_delta, **kwargs))
+    
+    @traced("ai.generate_text")
+    def generate_text(self, prompt: str, model: Optional[str] = None, temperature: Optional[float] = None,
+                      timeout: Optional[float] = None, on_delta: Optional[Callable[[str], Any]] = None) -> str:
+        """
+        Génère du texte à partir d'un prompt en utilisant OpenAI.
+        
+        Args:
+            prompt (str): Le prompt à envoyer à l'IA.
+            model (str, optional): Le modèle à utiliser. Si None, utilise celui configuré.
+            temperature (float, optional): La température pour la génération. Si None, utilise celle configurée.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+            on_delta (Callable, optional): Active le streaming : reçoit chaque fragment de la réponse
+                                           et peut l'interrompre en retournant False.
+        
+        Returns:
+            str: Le texte généré.
+        
+        Raises:
+            Exception: Si une erreur se produit lors de la génération.
+        """
+        return self._run(self._generate_steps(prompt, "chat", model, temperature, timeout, on_delta))
+    
+    @traced("ai.chat")
+    def chat(self, prompt: str, session_id: Optional[str] = None, memory: Optional[ConversationMemory] = None,
+             model: Optional[str] = None, temperature: Optional[float] = None,
+             timeout: Optional[float] = None, on_delta: Optional[Callable[[str], Any]] = None) -> Dict[str, Any]:
+        """
+        Génère une réponse dans le contexte d'une conversation.
+        
+        Les échanges précédents de la session sont renvoyés à l'API (dans la limite
+        de history_size et history_max_tokens), les plus anciens sous forme de résumé.
+        
+        Args:
+            prompt (str): Le message de l'utilisateur.
+            session_id (str, optional): L'identifiant de session. Si None, une nouvelle session est créée.
+            memory (ConversationMemory, optional): Mémoire à utiliser (par défaut, sessions sur disque).
+            model (str, optional): Le modèle à utiliser. Si None, le routeur le choisit.
+            temperature (float, optional): La température pour la génération. Si None, utilise celle configurée.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais et résumé compris.
+            on_delta (Callable, optional): Active le streaming : reçoit chaque fragment de la réponse
+                                           et peut l'interrompre en retournant False (la réponse
+                                           partielle est alors conservée dans l'historique).
+        
+        Returns:
+            Dict[str, Any]: La réponse, l'identifiant de session et les tokens consommés.
+        
+        Raises:
+            ValueError: Si l'identifiant de session est invalide.
+        """
+        return self._run(self._chat_steps(prompt, session_id, memory, model, temperature, timeout, on_delta))
+    
+    @traced("ai.analyze_sentiment")
+    def analyze_sentiment(self, text: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Analyse le sentiment d'un texte.
+        
+        Args:
+            text (str): Le texte à analyser.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+        
+        Returns:
+            Dict[str, Any]: Les résultats de l'analyse de sentiment.
+        """
+        return self._run(self._json_steps("sentiment", self._sentiment_prompt(text),
+                                          lambda: self._fallback_sentiment_analysis(text), timeout))
+    
+    @traced("ai.summarize_text")
+    def summarize_text(self, text: str, timeout: Optional[float] = None) -> str:
+        """
+        Résume un texte.
+        
+        Args:
+            text (str): Le texte à résumer.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+        
+        Returns:
+            str: Le résumé du texte.
+        
+        Raises:
+            Exception: Si une erreur se produit lors du résumé.
+        """
+        try:
+            return self._run(self._generate_steps(self._summary_prompt(text), "summary", timeout=timeout))
+        except Exception as e:
+            logger.error(f"Erreur lors du résumé: {str(e)}")
+            raise Exception(f"Erreur lors du résumé: {str(e)}")
+    
+    @traced("ai.extract_entities")
+    def extract_entities(self, text: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Extrait les entités nommées d'un texte.
+        
+        Args:
+            text (str): Le texte à analyser.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+        
+        Returns:
+            Dict[str, Any]: Les entités extraites.
+        """
+        return self._run(self._json_steps("entities", self._entities_prompt(text),
+                                          lambda: self._fallback_entity_extraction(text), timeout))
+    
+    @traced("ai.generate_code")
+    def generate_code(self, description: str, language: str = "python", timeout: Optional[float] = None) -> str:
         """
         Génère du code basé sur une description.
         
         Args:
             description (str): Description du code à générer.
             language (str): Langage de programmation cible.
-            
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+        
         Returns:
             str: Le code généré.
-            
+        
         Raises:
             Exception: Si une erreur se produit lors de la génération.
         """
         try:
-            prompt = (
-                f"Génère du code {language} pour la tâche suivante. "
-                f"Retourne uniquement le code, sans explication ni commentaire d'introduction:\n\n"
-                f"{description}"
-            )
-            
-            return self.generate_text(prompt)
+            return self._run(self._generate_steps(self._code_prompt(description, language), "code", timeout=timeout))
         except Exception as e:
             logger.error(f"Erreur lors de la génération de code: {str(e)}")
             raise Exception(f"Erreur lors de la génération de code: {str(e)}")
+
+class AsyncAIService(BaseAIService):
+    """
+    Service IA asynchrone basé sur AsyncOpenAI.
+    
+    Un seul processus peut ainsi mener de nombreux appels en parallèle
+    sans un thread par requête. Les appels partagent un pool HTTP par
+    boucle d'événements et propagent leur échéance à chaque tentative.
+    """
+    
+    def _initialize_client(self):
+        """
+        Le client asynchrone est lié à la boucle d'événements, il est créé au premier appel.
+        
+        Returns:
+            None
+        """
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+        return None
+    
+    def _get_client(self) -> AsyncOpenAI:
+        """
+        Récupère le client AsyncOpenAI de la boucle d'événements courante.
+        
+        Returns:
+            AsyncOpenAI: Le client adossé au pool HTTP asynchrone partagé.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(http_client=get_async_http_client(self.config), **self._client_kwargs())
+            self._clients[loop] = client
+        return client
+    
+    async def _run(self, steps):
+        """
+        Exécute les opérations de transport émises par un générateur d'étapes (voir AIService._run).
+        
+        Args:
+            steps (Generator): Le générateur (méthodes `_*_steps` de BaseAIService).
+        
+        Returns:
+            La valeur retournée par le générateur.
+        """
+        value, error = None, None
+        while True:
+            try:
+                operation = steps.send(value) if error is None else steps.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            value, error = None, None
+            try:
+                value = await self._perform(*operation)
+            except BaseException as e:
+                # Y compris asyncio.CancelledError: le générateur rend sa place de sonde
+                error = e
+    
+    async def _perform(self, operation: str, *args):
+        """
+        Exécute une opération de transport : appel de l'API ou attente.
+        
+        Args:
+            operation (str): "create" ou "sleep" (pas de streaming en asynchrone).
+            *args: Les paramètres de l'opération.
+        
+        Returns:
+            Le résultat de l'opération.
+        
+        Raises:
+            ValueError: Si l'opération n'est pas prise en charge.
+        """
+        if operation == "create":
+            return await self._get_client().chat.completions.create(**args[0])
+        if operation == "sleep":
+            await asyncio.sleep(args[0])
+            return None
+        raise ValueError(f"Opération non prise en charge par le service asynchrone: {operation}")
+    
+    async def _create_completion(self, deadline: Optional[float] = None, **kwargs):
+        """
+        Appelle l'API de complétion à travers le disjoncteur et la politique de réessai.
+        
+        Args:
+            deadline (float, optional): Échéance absolue (horloge monotone) de l'appel.
+            **kwargs: Paramètres transmis à client.chat.completions.create.
+        
+        Returns:
+            La réponse de l'API.
+        """
+        return await self._run(self._completion_steps(deadline, kwargs))
+    
+    async def _complete(self, task: str, messages, deadline: Optional[float] = None, model: Optional[str] = None,
+                        **kwargs):
+        """
+        Effectue un appel routé (voir BaseAIService._complete_steps).
+        
+        Returns:
+            La réponse de l'API.
+        """
+        return await self._run(self._complete_steps(task, messages, deadline, model, **kwargs))
+    
+    @traced("ai.generate_text")
+    async def generate_text(self, prompt: str, model: Optional[str] = None, temperature: Optional[float] = None,
+                            timeout: Optional[float] = None) -> str:
+        """
+        Génère du texte à partir d'un prompt en utilisant OpenAI.
+        
+        Args:
+            prompt (str): Le prompt à envoyer à l'IA.
+            model (str, optional): Le modèle à utiliser. Si None, utilise celui configuré.
+            temperature (float, optional): La température pour la génération. Si None, utilise celle configurée.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+        
+        Returns:
+            str: Le texte généré, ou une réponse hors ligne en cas d'échec.
+        """
+        return await self._run(self._generate_steps(prompt, "chat", model, temperature, timeout))
+    
+    @traced("ai.chat")
+    async def chat(self, prompt: str, session_id: Optional[str] = None, memory: Optional[ConversationMemory] = None,
+                   model: Optional[str] = None, temperature: Optional[float] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Génère une réponse dans le contexte d'une conversation (voir AIService.chat).
+        
+        Args:
+            prompt (str): Le message de l'utilisateur.
+            session_id (str, optional): L'identifiant de session. Si None, une nouvelle session est créée.
+            memory (ConversationMemory, optional): Mémoire à utiliser (par défaut, sessions sur disque).
+            model (str, optional): Le modèle à utiliser. Si None, le routeur le choisit.
+            temperature (float, optional): La température pour la génération.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais et résumé compris.
+        
+        Returns:
+            Dict[str, Any]: La réponse, l'identifiant de session et les tokens consommés.
+        
+        Raises:
+            ValueError: Si l'identifiant de session est invalide.
+        """
+        return await self._run(self._chat_steps(prompt, session_id, memory, model, temperature, timeout))
+    
+    @traced("ai.analyze_sentiment")
+    async def analyze_sentiment(self, text: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Analyse le sentiment d'un texte.
+        
+        Args:
+            text (str): Le texte à analyser.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+        
+        Returns:
+            Dict[str, Any]: Les résultats de l'analyse de sentiment.
+        """
+        return await self._run(self._json_steps("sentiment", self._sentiment_prompt(text),
+                                                lambda: self._fallback_sentiment_analysis(text), timeout))
+    
+    @traced("ai.summarize_text")
+    async def summarize_text(self, text: str, timeout: Optional[float] = None) -> str:
+        """
+        Résume un texte.
+        
+        Args:
+            text (str): Le texte à résumer.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+        
+        Returns:
+            str: Le résumé du texte.
+        """
+        return await self._run(self._generate_steps(self._summary_prompt(text), "summary", timeout=timeout))
+    
+    @traced("ai.extract_entities")
+    async def extract_entities(self, text: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Extrait les entités nommées d'un texte.
+        
+        Args:
+            text (str): Le texte à analyser.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+        
+        Returns:
+            Dict[str, Any]: Les entités extraites.
+        """
+        return await self._run(self._json_steps("entities", self._entities_prompt(text),
+                                                lambda: self._fallback_entity_extraction(text), timeout))
+    
+    @traced("ai.generate_code")
+    async def generate_code(self, description: str, language: str = "python", timeout: Optional[float] = None) -> str:
+        """
+        Génère du code basé sur une description.
+        
+        Args:
+            description (str): Description du code à générer.
+            language (str): Langage de programmation cible.
+            timeout (float, optional): Délai maximal de l'appel en secondes, réessais compris.
+        
+        Returns:
+            str: Le code généré.
+        """
+        return await self._run(self._generate_steps(self._code_prompt(description, language), "code", timeout=timeout))
+    
+    @traced("ai.analyze_all")
+    async def analyze_all(self, text: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Lance en parallèle le résumé, l'analyse de sentiment et l'extraction d'entités.
+        
+        Les trois appels partagent la même échéance : la durée totale est celle
+        de l'appel le plus lent et non la somme des trois.
+        
+        Args:
+            text (str): Le texte à analyser.
+            timeout (float, optional): Délai maximal commun aux trois appels, en secondes.
+        
+        Returns:
+            Dict[str, Any]: Les clés 'summary', 'sentiment' et 'entities'.
+        """
+        summary, sentiment, entities = await asyncio.gather(
+            self.summarize_text(text, timeout=timeout),
+            self.analyze_sentiment(text, timeout=timeout),
+            self.extract_entities(text, timeout=timeout)
+        )
+        return {"summary": summary, "sentiment": sentiment, "entities": entities}
+    
+    def get_analysis_handler(self, analysis_type: str):
+        """
+        Récupère la méthode correspondant à un type d'analyse.
+        
+        Args:
+            analysis_type (str): Type d'analyse (sentiment, summary, entities, all).
+        
+        Returns:
+            La coroutine d'analyse, appelée avec (texte, timeout=...).
+        
+        Raises:
+            Exception: Si le type d'analyse est inconnu.
+        """
+        handlers = {
+            "sentiment": self.analyze_sentiment,
+            "summary": self.summarize_text,
+            "entities": self.extract_entities,
+            "all": self.analyze_all
+        }
+        if analysis_type not in handlers:
+            raise Exception(f"Type d'analyse inconnu: {analysis_type}")
+        return handlers[analysis_type]
+    
+    @traced("ai.analyze_many")
+    async def analyze_many(self, texts, analysis_type: str = "sentiment", concurrency: int = 10,
+                           timeout: Optional[float] = None) -> list:
+        """
+        Analyse une liste de textes avec un nombre borné d'appels simultanés.
+        
+        Args:
+            texts (Iterable[str]): Les textes à analyser.
+            analysis_type (str): Type d'analyse (sentiment, summary, entities, all).
+            concurrency (int): Nombre maximal d'appels simultanés.
+            timeout (float, optional): Délai maximal de chaque analyse, en secondes.
+        
+        Returns:
+            list: Les résultats, dans l'ordre des textes.
+        
+        Raises:
+            Exception: Si le type d'analyse est inconnu.
+        """
+        handler = self.get_analysis_handler(analysis_type)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def run(text):
+            async with semaphore:
+                return await handler(text, timeout=timeout)
+        
+        return await asyncio.gather(*(run(text) for text in texts))
@@ -0,0 +1,360 @@
+"""
+Module de détection d'anomalies.
+Repère les écarts des métriques système et de la latence ping dans l'historique
+(EWMA, z-score et référence saisonnière, vectorisés avec NumPy) et fait expliquer
+par l'IA les seules fenêtres signalées, par lots.
+"""
+
+import re
+import math
+import time
+import logging
+import warnings
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config import Config
+from .timeseries import format_series_value, get_history_store
+
+logger = logging.getLogger(__name__)
+
+# Période de la référence saisonnière (une journée) et nombre minimal de périodes observées
+SEASON = 86400
+MIN_SEASONS = 3
+
+# Seuil de la référence saisonnière: un écart habituel à cette heure-là n'est pas signalé
+SEASONAL_THRESHOLD = 3.0
+
+# Écart type minimal par série: en dessous, une variation n'est que du bruit
+MIN_DEVIATION = {"cpu": 2.0, "memory": 1.0, "ping_rtt": 2.0}
+MIN_DEVIATION_RATE = 64 * 1024  # Débits en octets par seconde
+
+# Fenêtres signalées séparées de moins de points que cela: fusionnées
+MERGE_GAP = 3
+
+EXPLAIN_PROMPT = (
+    "Tu es administrateur système. Des anomalies ont été détectées sur une machine "
+    "(heures locales, valeurs habituelles entre parenthèses). Pour chacune, donne en une ou deux "
+    "phrases la cause la plus probable et la première vérification à faire. Réponds avec exactement "
+    "une ligne par anomalie, au format `N: explication`.\n\n"
+)
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise Exception("NumPy est requis pour la détection d'anomalies (pip install numpy)")
+    return numpy
+
+def ewma(values, alpha: float):
+    """
+    Moyenne mobile exponentielle, vectorisée.
+    
+    La récurrence m[t] = (1 - a) m[t-1] + a x[t] est calculée par blocs sous sa
+    forme fermée (somme cumulée pondérée par (1 - a)^-i), les blocs étant assez
+    courts pour que les poids restent précis en float64.
+    
+    Args:
+        values (numpy.ndarray): La série, sans NaN.
+        alpha (float): Poids du dernier point (0 < alpha <= 1).
+    
+    Returns:
+        numpy.ndarray: La moyenne à chaque point (point compris).
+    """
+    np = _numpy()
+    values = np.asarray(values, dtype=np.float64)
+    result = np.empty_like(values)
+    if not len(values):
+        return result
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        result[:] = values
+        return result
+    block = max(1, int(12 / -math.log10(decay)))  # (1 - a)^-block <= 1e12
+    powers = decay ** np.arange(1, block + 1)
+    state = values[0]
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        scale = powers[:len(chunk)]
+        result[start:start + len(chunk)] = scale * (state + alpha * np.cumsum(chunk / scale))
+        state = result[start + len(chunk) - 1]
+    return result
+
+def _fill_gaps(values):
+    """Remplace les NaN par la dernière valeur connue (la première pour les NaN de tête)."""
+    np = _numpy()
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return np.zeros_like(values), valid
+    index = np.where(valid, np.arange(len(values)), 0)
+    np.maximum.accumulate(index, out=index)
+    filled = values[index]
+    filled[:np.argmax(valid)] = values[np.argmax(valid)]
+    return filled, valid
+
+def ewma_zscores(values, alpha: float, min_std: float):
+    """
+    Écart de chaque point à la moyenne EWMA des points précédents, en écarts types EWMA.
+    
+    Args:
+        values (numpy.ndarray): La série (NaN pour les points manquants).
+        alpha (float): Poids du dernier point.
+        min_std (float): Écart type minimal.
+    
+    Returns:
+        Tuple: z-scores (0 pour les points manquants et la mise en route), moyenne
+               attendue et écart type attendu à chaque point.
+    """
+    np = _numpy()
+    filled, valid = _fill_gaps(values)
+    mean = ewma(filled, alpha)
+    expected = np.concatenate((filled[:1], mean[:-1]))
+    variance = ewma((filled - expected) ** 2, alpha)
+    std = np.maximum(np.sqrt(np.concatenate((variance[:1], variance[:-1]))), min_std)
+    zscores = np.where(valid, (filled - expected) / std, 0.0)
+    # Mise en route à partir du premier point mesuré, pas du début de la période lue
+    zscores[:int(np.argmax(valid)) + int(2 / alpha)] = 0.0
+    return zscores, expected, std
+
+def seasonal_zscores(values, first_timestamp: float, step: float, min_std: float):
+    """
+    Écart de chaque point à la médiane des autres jours à la même heure, en MAD.
+    
+    Args:
+        values (numpy.ndarray): La série, à pas régulier (NaN pour les points manquants).
+        first_timestamp (float): Instant du premier point.
+        step (float): Pas de la série en secondes.
+        min_std (float): Écart type minimal.
+    
+    Returns:
+        Optional[numpy.ndarray]: Les z-scores robustes, ou None si l'historique couvre
+                                 moins de MIN_SEASONS jours ou si le pas ne divise pas une journée.
+    """
+    np = _numpy()
+    if SEASON % step or len(values) * step < MIN_SEASONS * SEASON:
+        return None
+    period = int(SEASON // step)
+    offset = int(first_timestamp % SEASON // step)
+    rows = -(-(offset + len(values)) // period)
+    grid = np.full(rows * period, np.nan)
+    grid[offset:offset + len(values)] = values
+    grid = grid.reshape(rows, period)
+    with warnings.catch_warnings():  # Heures sans aucun échantillon: médiane NaN, z-score nul
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(grid, axis=0)
+        spread = np.maximum(1.4826 * np.nanmedian(np.abs(grid - median), axis=0), min_std)
+    zscores = ((grid - median) / spread).reshape(-1)[offset:offset + len(values)]
+    return np.nan_to_num(zscores, nan=0.0)
+
+def find_windows(flags, merge_gap: int = MERGE_GAP) -> List[Tuple[int, int]]:
+    """
+    Regroupe les points signalés en fenêtres [début, fin] (indices inclus).
+    
+    Args:
+        flags (numpy.ndarray): Booléens par point.
+        merge_gap (int): Écart maximal (en points) entre deux fenêtres fusionnées.
+    """
+    np = _numpy()
+    indices = np.flatnonzero(flags)
+    if not len(indices):
+        return []
+    breaks = np.flatnonzero(np.diff(indices) > merge_gap)
+    starts = np.concatenate((indices[:1], indices[breaks + 1]))
+    ends = np.concatenate((indices[breaks], indices[-1:]))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+class AnomalyDetector:
+    """
+    Détecteur d'anomalies des séries de l'historique (voir timeseries.py).
+    
+    Un point est signalé quand il s'écarte de plus de `anomaly_threshold` écarts
+    types de sa moyenne EWMA et, si l'historique couvre au moins MIN_SEASONS
+    jours, de plus de SEASONAL_THRESHOLD écarts robustes de la médiane des
+    autres jours à la même heure (un pic quotidien habituel n'est pas signalé).
+    """
+    
+    def __init__(self, config: Config, ai_service=None):
+        """
+        Initialise le détecteur.
+        
+        Args:
+            config (Config): L'objet de configuration.
+            ai_service (AIService, optional): Le service IA des explications.
+        """
+        self.config = config
+        self.ai_service = ai_service
+        self.threshold = float(config.get_value("anomaly_threshold", 4.0))
+        self.alpha = float(config.get_value("anomaly_ewma_alpha", 0.1))
+    
+    def detect(self, timestamps: Sequence[float], series: Dict[str, Sequence[Optional[float]]], step: float,
+               since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Détecte les anomalies de séries à pas régulier.
+        
+        Args:
+            timestamps (Sequence[float]): Instants des points.
+            series (Dict[str, Sequence]): Valeurs par série (None pour un point manquant).
+            step (float): Pas des séries en secondes.
+            since (float, optional): Ne signale que les fenêtres qui se terminent après cet
+                                     instant (les points antérieurs servent de référence).
+        
+        Returns:
+            List[Dict[str, Any]]: Les fenêtres, par écart décroissant : series, start, end,
+                                  peak_time, peak_value, expected, zscore, seasonal_zscore,
+                                  points et context (valeurs des autres séries au pic).
+        """
+        np = _numpy()
+        if not len(timestamps):
+            return []
+        times = np.asarray(timestamps, dtype=np.float64)
+        arrays = {name: np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+                  for name, values in series.items()}
+        
+        anomalies = []
+        for name, values in arrays.items():
+            if np.isnan(values).all():
+                continue
+            min_std = MIN_DEVIATION.get(name, MIN_DEVIATION_RATE)
+            zscores, expected, std = ewma_zscores(values, self.alpha, min_std)
+            flags = np.abs(zscores) > self.threshold
+            seasonal = seasonal_zscores(values, times[0], step, min_std)
+            if seasonal is not None:
+                flags &= np.abs(seasonal) > SEASONAL_THRESHOLD
+            
+            covered = -1
+            for low, high in find_windows(flags):
+                if low <= covered:  # Déjà inclus dans la fenêtre précédente prolongée
+                    continue
+                # L'EWMA absorbe l'anomalie dès ses premiers points: la fenêtre dure tant que les
+                # valeurs restent hors de la bande attendue au début de l'écart
+                outside = np.abs(values[high:] - expected[low]) > self.threshold * std[low]
+                inside = np.flatnonzero(~outside)
+                high = high + (int(inside[0]) - 1 if len(inside) else len(outside) - 1)
+                high = covered = max(high, low)
+                if since is not None and times[high] < since:
+                    continue
+                peak = low + int(np.argmax(np.abs(zscores[low:high + 1])))
+                anomalies.append({
+                    "series": name,
+                    "start": float(times[low]),
+                    "end": float(times[high] + step),
+                    "peak_time": float(times[peak]),
+                    "peak_value": float(values[peak]),
+                    "expected": float(expected[peak]),
+                    "zscore": round(float(zscores[peak]), 2),
+                    "seasonal_zscore": round(float(seasonal[peak]), 2) if seasonal is not None else None,
+                    "points": high - low + 1,
+                    "context": {other: (None if np.isnan(data[peak]) else float(data[peak]))
+                                for other, data in arrays.items() if other != name}
+                })
+        anomalies.sort(key=lambda anomaly: -abs(anomaly["zscore"]))
+        return anomalies
+    
+    def _describe(self, index: int, anomaly: Dict[str, Any]) -> str:
+        clock = lambda timestamp: time.strftime("%d/%m %H:%M", time.localtime(timestamp))
+        name = anomaly["series"]
+        context = ", ".join(f"{other} {format_series_value(other, value)}" for other, value in anomaly["context"].items()
+                            if value is not None)
+        return (f"{index}. {name} de {clock(anomaly['start'])} à {clock(anomaly['end'])} : "
+                f"{format_series_value(name, anomaly['peak_value'])} (habituel {format_series_value(name, anomaly['expected'])}, "
+                f"écart {anomaly['zscore']:+.1f} σ). Au même moment : {context or 'aucune autre mesure'}.")
+    
+    def explain(self, anomalies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Ajoute une explication de l'IA aux anomalies les plus marquées.
+        
+        Les fenêtres sont envoyées par lots de `anomaly_explain_batch` dans un seul
+        prompt chacun ; au-delà de `anomaly_explain_max` fenêtres, les suivantes ne
+        sont pas expliquées. Si l'IA est hors ligne (pas de clé API, disjoncteur
+        ouvert ou appel en échec), la réponse de repli n'est pas reprise : les
+        fenêtres du lot sont marquées 'explanation_unavailable'.
+        
+        Args:
+            anomalies (List[Dict[str, Any]]): Les anomalies (voir detect).
+        
+        Returns:
+            List[Dict[str, Any]]: Les mêmes anomalies, avec les clés 'explanation'
+                                  et 'explanation_unavailable'.
+        
+        Raises:
+            Exception: Si aucun service IA n'est disponible.
+        """
+        if self.ai_service is None:
+            raise Exception("Aucun service IA pour expliquer les anomalies")
+        batch = max(1, int(self.config.get_value("anomaly_explain_batch", 10)))
+        selected = anomalies[:max(0, int(self.config.get_value("anomaly_explain_max", 20)))]
+        for anomaly in anomalies:
+            anomaly["explanation"] = None
+            anomaly["explanation_unavailable"] = False
+        
+        for start in range(0, len(selected), batch):
+            group = selected[start:start + batch]
+            prompt = EXPLAIN_PROMPT + "\n".join(self._describe(index, anomaly)
+                                                for index, anomaly in enumerate(group, 1))
+            try:
+                if not self.config.get_api_key():
+                    raise Exception("clé API absente")
+                response = self.ai_service.generate_text(prompt, temperature=0.2)
+                # Le service répond par un texte de repli au lieu de lever une erreur
+                if not response or response == self.ai_service._fallback_response(prompt):
+                    raise Exception("IA hors ligne")
+            except Exception as e:
+                logger.error(f"Erreur lors de l'explication des anomalies: {str(e)}")
+                for anomaly in group:
+                    anomaly["explanation_unavailable"] = True
+                continue
+            lines = {}
+            for line in response.splitlines():
+                match = re.match(r"\s*(\d+)\s*[:.)-]\s*(.+)", line)
+                if match:
+                    lines[int(match.group(1))] = match.group(2).strip()
+            for index, anomaly in enumerate(group, 1):
+                anomaly["explanation"] = lines.get(index)
+            if not lines and len(group) == 1:
+                group[0]["explanation"] = response.strip()
+        return anomalies
+    
+    def analyze(self, start: float, end: float, baseline: float = 7 * SEASON, step: float = 60,
+                explain: bool = False) -> Dict[str, Any]:
+        """
+        Analyse l'historique enregistré.
+        
+        Args:
+            start (float): Début de la période analysée.
+            end (float): Fin de la période analysée.
+            baseline (float): Durée d'historique lue avant `end` pour établir la référence.
+            step (float): Pas des séries en secondes.
+            explain (bool): Faire expliquer les anomalies par l'IA.
+        
+        Returns:
+            Dict[str, Any]: start, end, step, baseline, points (avec au moins un échantillon)
+                            et anomalies.
+        
+        Raises:
+            Exception: Si l'historique ne peut pas être lu ou analysé.
+        """
+        try:
+            history = get_history_store(self.config).query(min(start, end - baseline), end, step)
+            # Seaux sans aucun échantillon (enregistreur arrêté) : retirés aux bords, NaN ignorés ailleurs
+            timestamps, series = history["timestamps"], history["series"]
+            filled = [index for index in range(len(timestamps))
+                      if any(values[index] is not None for values in series.values())]
+            if filled:
+                low, high = filled[0], filled[-1] + 1
+                timestamps = timestamps[low:high]
+                series = {name: values[low:high] for name, values in series.items()}
+            else:
+                timestamps, series = [], {}
+            anomalies = self.detect(timestamps, series, history["step"], since=start)
+            if explain and anomalies:
+                self.explain(anomalies)
+            return {
+                "start": start,
+                "end": end,
+                "step": history["step"],
+                "baseline": baseline,
+                "points": len(filled),
+                "anomalies": anomalies
+            }
+        except Exception as e:
+            logger.error(f"Erreur lors de la détection d'anomalies: {str(e)}")
+            raise Exception(f"Erreur lors de la détection d'anomalies: {str(e)}")
@@ -0,0 +1,676 @@
+"""
+Module du mode de service asynchrone (ASGI).
+Expose les routes de main.py sur un serveur ASGI (uvicorn) : les appels à OpenAI,
+les pings et les requêtes HTTP sortantes y sont des coroutines, si bien qu'un
+processus mène de nombreuses requêtes à la fois sans un thread par requête.
+
+Modèle de concurrence : chaque processus (`asgi_workers`) exécute une boucle
+d'événements. Les opérations d'E/S (AsyncAIService, AsyncNetworkService, attente
+des tâches de fond et du flux SSE) n'y occupent aucun thread ; les appels bloquants
+restants (psutil, historique, SQLite, journal d'usage) passent par un pool de
+`asgi_blocking_threads` threads par processus.
+"""
+
+import os
+import json
+import time
+import signal
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Union
+from urllib.parse import parse_qs
+
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import BadRequest, MethodNotAllowed, NotFound
+from werkzeug.routing import Map, Rule
+
+from .admission import RateLimitedError, RequestTooLargeError, get_admission_controller
+from .metrics import CONTENT_TYPE, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS, get_metrics_registry
+from .services import ServiceRegistry
+from .system import MAX_SAMPLE_INTERVAL, PROCESS_SORT_KEYS
+from .usage import set_usage_source
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+
+class Request:
+    """Requête HTTP reçue par l'application ASGI, corps déjà lu."""
+    
+    def __init__(self, scope: Dict[str, Any], body: bytes):
+        """
+        Initialise la requête.
+        
+        Args:
+            scope (Dict[str, Any]): La portée ASGI de la connexion HTTP.
+            body (bytes): Le corps complet.
+        """
+        self.method = scope["method"]
+        self.path = scope["path"]
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        self.args = {key: values[-1] for key, values in query.items()}
+        self.headers = Headers([(key.decode("latin-1"), value.decode("latin-1"))
+                                for key, value in scope.get("headers", ())])
+        self.remote_addr = (scope.get("client") or (None,))[0]
+        self.body = body
+    
+    @property
+    def json(self) -> Any:
+        """
+        Le corps décodé comme JSON (None s'il est vide).
+        
+        Raises:
+            BadRequest: Si le corps n'est pas du JSON valide.
+        """
+        if not self.body:
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise BadRequest("Corps JSON invalide")
+
+class Response:
+    """Réponse HTTP : corps complet, ou itérateur asynchrone d'octets pour une réponse en flux."""
+    
+    def __init__(self, body: Union[bytes, str, AsyncIterator[bytes]] = b"", status: int = 200,
+                 content_type: str = "application/json", headers: Optional[Dict[str, str]] = None):
+        """
+        Initialise la réponse.
+        
+        Args:
+            body (bytes | str | AsyncIterator[bytes]): Le corps ; une chaîne est encodée en UTF-8.
+            status (int): Le code de statut.
+            content_type (str): Le type de contenu.
+            headers (Dict[str, str], optional): En-têtes supplémentaires.
+        """
+        self.body = body.encode("utf-8") if isinstance(body, str) else body
+        self.status = status
+        self.content_type = content_type
+        self.headers = dict(headers or {})
+
+def jsonify(data: Any, status: int = 200) -> Response:
+    """Réponse JSON (les valeurs non sérialisables sont converties en chaînes)."""
+    return Response(json.dumps(data, ensure_ascii=False, default=str), status)
+
+def make_response(result: Any) -> Response:
+    """
+    Convertit la valeur retournée par un gestionnaire, comme Flask : une Response,
+    des données JSON, ou un tuple (données, statut) ou (données, statut, en-têtes).
+    """
+    status = None
+    headers = {}
+    if isinstance(result, tuple):
+        result, status, *rest = result
+        headers = rest[0] if rest else {}
+    response = result if isinstance(result, Response) else jsonify(result)
+    if status is not None:
+        response.status = status
+    response.headers.update(headers)
+    return response
+
+class AsyncApp:
+    """
+    Application ASGI aux routes déclarées comme avec Flask.
+    
+    Les routes sont des règles Werkzeug (mêmes modèles d'URL que main.py) et les
+    gestionnaires des coroutines qui reçoivent la requête et les variables de l'URL.
+    Les requêtes /api/* alimentent les mêmes métriques que le middleware WSGI et
+    passent par le même contrôle d'admission (429 au-delà des limites).
+    
+    À l'arrêt (SIGTERM ou SIGINT), le serveur cesse d'accepter des connexions et
+    laisse aux requêtes en cours `asgi_shutdown_timeout` secondes pour se terminer ;
+    les réponses en flux (SSE) sont closes aussitôt, le navigateur se reconnecte
+    à un autre processus.
+    """
+    
+    def __init__(self, services: ServiceRegistry):
+        """
+        Initialise l'application.
+        
+        Args:
+            services (ServiceRegistry): Le registre des services.
+        """
+        self.services = services
+        self.url_map = Map()
+        self._handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self._adapter = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._index: Optional[bytes] = None
+    
+    def route(self, path: str, methods=("GET",)):
+        """
+        Déclare un gestionnaire pour un modèle d'URL.
+        
+        Args:
+            path (str): Le modèle d'URL (syntaxe Werkzeug, ex: '/api/jobs/<job_id>').
+            methods (tuple): Les méthodes HTTP acceptées.
+        """
+        def decorator(handler):
+            self.url_map.add(Rule(path, methods=list(methods), endpoint=handler.__name__))
+            self._handlers[handler.__name__] = handler
+            self._adapter = None
+            return handler
+        return decorator
+    
+    @property
+    def stopping(self) -> asyncio.Event:
+        """Positionné à l'arrêt du serveur : les réponses en flux se terminent."""
+        if self._stopping is None:
+            self._stopping = asyncio.Event()
+        return self._stopping
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "websocket":
+            # Le canal /ws repose sur flask-sock: l'interface web repasse par /api/jobs
+            await receive()
+            await send({"type": "websocket.close", "code": 1000})
+    
+    def startup(self):
+        """Prépare le processus : pool de threads des appels bloquants, services, arrêt propre."""
+        config = self.services.config
+        self._loop = asyncio.get_running_loop()
+        threads = max(1, int(config.get_value("asgi_blocking_threads", 32)))
+        self._loop.set_default_executor(ThreadPoolExecutor(threads, thread_name_prefix="aiterminal-asgi"))
+        
+        # Import d'openai et construction des clients avant la première requête
+        self.services.async_ai
+        self.services.async_network
+        
+        # Historique des métriques système (metrics_history): un seul processus enregistre, les autres lisent
+        if config.get_value("metrics_history", False):
+            from .timeseries import MetricsRecorder
+            MetricsRecorder(config).start()
+        
+        # Le serveur installe ses gestionnaires de signaux avant le démarrage de l'application:
+        # on les enchaîne pour fermer les flux dès la demande d'arrêt, sans attendre le délai de grâce
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                previous = signal.getsignal(signum)
+                if callable(previous):
+                    signal.signal(signum, lambda sig, frame, previous=previous: (self.stop_streams(), previous(sig, frame)))
+    
+    def stop_streams(self):
+        """Termine les réponses en flux en cours (appelable depuis un gestionnaire de signal)."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.stopping.set)
+    
+    async def shutdown(self):
+        """Libère les ressources du processus une fois les requêtes terminées."""
+        import sys
+        
+        self.stopping.set()
+        if "aiterminal.ai_services" in sys.modules:
+            from .ai_services import close_async_http_client
+            await close_async_http_client()
+    
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self.startup()
+                except Exception as e:
+                    logger.error(f"Erreur lors du démarrage du serveur ASGI: {str(e)}")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                try:
+                    await self.shutdown()
+                except Exception as e:
+                    logger.error(f"Erreur lors de l'arrêt du serveur ASGI: {str(e)}")
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    
+    async def _http(self, scope, receive, send):
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        request = Request(scope, bytes(body))
+        
+        measured = request.path.startswith("/api/")
+        route = "unmatched"
+        response: Optional[Response] = None
+        started = time.perf_counter()
+        if measured:
+            HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            if self._adapter is None:
+                self._adapter = self.url_map.bind("localhost")
+            try:
+                rule, values = self._adapter.match(request.path, request.method, return_rule=True)
+                route = rule.rule
+                set_usage_source(request.path)
+                admission = get_admission_controller(self.services.config).admit_request(
+                    route, request.headers, request.remote_addr, lambda: request.json
+                )
+                with admission:
+                    response = make_response(await self._handlers[rule.endpoint](request, **values))
+            except NotFound:
+                response = jsonify({"error": f"Route inconnue: {request.method} {request.path}"}, 404)
+            except MethodNotAllowed:
+                response = jsonify({"error": f"Méthode non autorisée: {request.method} {request.path}"}, 405)
+            except BadRequest as e:
+                response = jsonify({"error": e.description}, 400)
+            except RateLimitedError as e:
+                response = make_response(({"error": str(e), "retry_after": round(e.retry_after, 2)}, 429, e.headers))
+            except RequestTooLargeError as e:
+                response = jsonify({"error": str(e)}, 400)
+            except Exception as e:
+                logger.error(f"Erreur lors de la requête {request.method} {request.path}: {str(e)}")
+                response = jsonify({"error": str(e)}, 500)
+        finally:
+            if measured:
+                HTTP_REQUESTS_IN_PROGRESS.dec()
+                # Comme en WSGI, la durée s'arrête avant l'envoi du corps d'une réponse en flux
+                status = str(response.status) if response is not None else "500"
+                HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, route, request.method, status)
+        
+        headers = [(b"content-type", response.content_type.encode("latin-1"))]
+        headers.extend((key.lower().encode("latin-1"), str(value).encode("latin-1"))
+                       for key, value in response.headers.items())
+        if isinstance(response.body, bytes):
+            headers.append((b"content-length", str(len(response.body)).encode("latin-1")))
+            await send({"type": "http.response.start", "status": response.status, "headers": headers})
+            await send({"type": "http.response.body", "body": response.body})
+        else:
+            await send({"type": "http.response.start", "status": response.status, "headers": headers})
+            await self._stream(response.body, receive, send)
+    
+    async def _stream(self, chunks: AsyncIterator[bytes], receive, send):
+        """Envoie une réponse en flux jusqu'à sa fin, la déconnexion du client ou l'arrêt du serveur."""
+        async def disconnected():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+        
+        gone = asyncio.ensure_future(disconnected())
+        stopping = asyncio.ensure_future(self.stopping.wait())
+        try:
+            while True:
+                pending = asyncio.ensure_future(chunks.__anext__())
+                done, _ = await asyncio.wait((pending, gone, stopping), return_when=asyncio.FIRST_COMPLETED)
+                if pending not in done:
+                    # Annulé à son point d'attente: le générateur exécute ses blocs finally
+                    pending.cancel()
+                    await asyncio.wait((pending,))
+                    break
+                try:
+                    chunk = pending.result()
+                except StopAsyncIteration:
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            if not gone.done():
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            gone.cancel()
+            stopping.cancel()
+            await chunks.aclose()
+    
+    async def index_page(self) -> bytes:
+        """La page de l'interface web (index.html n'utilise pas Jinja: servie telle quelle)."""
+        if self._index is None:
+            path = os.path.join(TEMPLATES_DIR, "index.html")
+            self._index = await asyncio.to_thread(lambda: open(path, "rb").read())
+        return self._index
+
+# Services partagés par les requêtes du processus, comme dans main.py
+services = ServiceRegistry()
+app = AsyncApp(services)
+
+@app.route('/metrics')
+async def metrics(request):
+    """Métriques du processus au format texte de Prometheus"""
+    return Response(get_metrics_registry().render(), content_type=CONTENT_TYPE)
+
+@app.route('/')
+async def index(request):
+    """Page d'accueil de l'interface web d'AITerminal"""
+    return Response(await app.index_page(), content_type="text/html; charset=utf-8")
+
+@app.route('/api/generate', methods=['POST'])
+async def generate(request):
+    """API pour générer du contenu avec l'IA"""
+    data = request.json or {}
+    prompt = data.get('prompt', '')
+    
+    if not prompt:
+        return {"error": "Aucun prompt fourni"}, 400
+    
+    try:
+        from .conversation import ConversationMemory, get_memory_store
+        
+        ai_service = services.async_ai
+        
+        # Avec la clé 'session_id' (même nulle), la réponse tient compte des échanges précédents
+        if 'session_id' in data:
+            memory = ConversationMemory(services.config, get_memory_store())
+            chat = await ai_service.chat(prompt, data['session_id'] or None, memory=memory)
+            return {"result": chat["response"], "session_id": chat["session_id"], "usage": chat["usage"]}
+        
+        result = await ai_service.generate_text(prompt)
+        return {"result": result}
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@app.route('/api/analyze', methods=['POST'])
+async def analyze(request):
+    """API pour analyser du texte"""
+    data = request.json or {}
+    text = data.get('text', '')
+    analysis_type = data.get('type', 'sentiment')
+    
+    if not text:
+        return {"error": "Aucun texte fourni"}, 400
+    
+    try:
+        ai_service = services.async_ai
+        
+        if analysis_type == 'sentiment':
+            result = await ai_service.analyze_sentiment(text)
+        elif analysis_type == 'summary':
+            result = {"summary": await ai_service.summarize_text(text)}
+        elif analysis_type == 'entities':
+            result = await ai_service.extract_entities(text)
+        else:
+            return {"error": f"Type d'analyse non reconnu: {analysis_type}"}, 400
+        
+        return result
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@app.route('/api/system', methods=['GET'])
+async def system_info(request):
+    """API pour récupérer des informations système (psutil, dans le pool de threads)"""
+    info_type = request.args.get('type', 'all')
+    try:
+        interval = float(request.args['interval']) if 'interval' in request.args else None
+        if interval is not None:
+            # La mesure occupe un thread du serveur: fenêtre bornée
+            interval = min(interval, MAX_SAMPLE_INTERVAL)
+    except ValueError:
+        return {"error": "Le paramètre 'interval' doit être un nombre"}, 400
+    
+    try:
+        system_service = services.system
+        
+        if info_type == 'cpu':
+            result = await asyncio.to_thread(system_service.get_cpu_info)
+        elif info_type == 'memory':
+            result = await asyncio.to_thread(system_service.get_memory_info)
+        elif info_type == 'disk':
+            result = await asyncio.to_thread(system_service.get_disk_info, interval)
+        elif info_type == 'network':
+            result = await asyncio.to_thread(system_service.get_network_info, interval)
+        elif info_type == 'processes':
+            sort_by = request.args.get('sort', 'cpu')
+            if sort_by not in PROCESS_SORT_KEYS:
+                return {"error": f"Critère de tri non reconnu: {sort_by}"}, 400
+            try:
+                limit = int(request.args.get('limit', 10))
+            except ValueError:
+                return {"error": "Le paramètre 'limit' doit être un entier"}, 400
+            result = await asyncio.to_thread(system_service.get_process_info, sort_by, limit)
+        elif info_type == 'all':
+            # Les quatre mesures en parallèle: la seconde d'échantillonnage du CPU n'attend pas les autres
+            cpu, memory, disk, network = await asyncio.gather(
+                asyncio.to_thread(system_service.get_cpu_info),
+                asyncio.to_thread(system_service.get_memory_info),
+                asyncio.to_thread(system_service.get_disk_info, interval),
+                asyncio.to_thread(system_service.get_network_info, interval)
+            )
+            result = {'cpu': cpu, 'memory': memory, 'disk': disk, 'network': network}
+        else:
+            return {"error": f"Type d'information non reconnu: {info_type}"}, 400
+        
+        return result
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@app.route('/api/system/stream', methods=['GET'])
+async def system_stream(request):
+    """Flux SSE des métriques système: état complet, puis uniquement les champs modifiés"""
+    from .broadcast import get_system_broadcaster
+    
+    return Response(get_system_broadcaster(services.config).subscribe_async(), content_type='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/system/history', methods=['GET'])
+async def system_history(request):
+    """API pour interroger l'historique des métriques système"""
+    from .timeseries import get_history_store
+    from .utils import parse_duration
+    
+    try:
+        end = float(request.args['end']) if 'end' in request.args else time.time()
+        if 'start' in request.args:
+            start = float(request.args['start'])
+        else:
+            start = end - parse_duration(request.args.get('range', '24h'))
+        step = parse_duration(request.args['step']) if 'step' in request.args else None
+        series = [name for name in request.args.get('series', '').split(',') if name] or None
+        store = get_history_store(services.config)
+        result = await asyncio.to_thread(store.query, start, end, step, request.args.get('agg', 'avg'), series)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": str(e)}, 500
+    return result
+
+@app.route('/api/system/anomalies', methods=['GET'])
+async def system_anomalies(request):
+    """API pour détecter (et expliquer) les anomalies de l'historique des métriques"""
+    from .anomaly import AnomalyDetector
+    from .utils import parse_duration
+    
+    try:
+        end = time.time()
+        start = end - parse_duration(request.args.get('range', '24h'))
+        baseline = parse_duration(request.args.get('baseline', '7d'))
+        step = parse_duration(request.args.get('step', '1m'))
+        explain = request.args.get('explain') in ('1', 'true')
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    try:
+        # Calcul vectorisé et explication groupée: une seule requête IA, dans le pool de threads
+        detector = AnomalyDetector(services.config, services.ai if explain else None)
+        result = await asyncio.to_thread(detector.analyze, start, end, baseline, step, explain)
+    except Exception as e:
+        return {"error": str(e)}, 500
+    return result
+
+@app.route('/api/network/ping', methods=['POST'])
+async def ping(request):
+    """API pour effectuer un ping"""
+    data = request.json or {}
+    host = data.get('host', '')
+    count = data.get('count', 4)
+    
+    if not host:
+        return {"error": "Aucun hôte fourni"}, 400
+    
+    try:
+        network_service = services.async_network
+        
+        results = await network_service.ping(host, count)
+        summary = network_service.get_ping_summary(results)
+        
+        return {"results": results, "summary": summary}
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@app.route('/api/network/http', methods=['POST'])
+async def http_request(request):
+    """API pour effectuer une requête HTTP"""
+    data = request.json or {}
+    url = data.get('url', '')
+    
+    if not url:
+        return {"error": "Aucune URL fournie"}, 400
+    
+    try:
+        return await services.async_network.http_request(
+            url=url,
+            method=data.get('method', 'GET'),
+            headers_str=data.get('headers', None),
+            data_str=data.get('data', None),
+            timeout=data.get('timeout', 10)
+        )
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@app.route('/api/jobs', methods=['POST'])
+async def submit_job(request):
+    """API pour lancer une opération longue (ping, http, generate, analyze) en tâche de fond"""
+    from .jobs import QueueFullError, get_job_queue
+    
+    data = request.json or {}
+    # Jetons de la route équivalente à la soumission ; la place amont est prise par le worker (JobQueue._acquire)
+    controller = get_admission_controller(services.config)
+    try:
+        controller.admit_command(
+            controller.identify(request.headers, request.remote_addr), data.get('kind', ''), data.get('params'),
+            hold_upstream=False
+        )
+    except RateLimitedError as e:
+        return {"error": str(e), "retry_after": round(e.retry_after, 2)}, 429, e.headers
+    except RequestTooLargeError as e:
+        return {"error": str(e)}, 400
+    try:
+        job = get_job_queue(services).submit(
+            data.get('kind', ''), data.get('params'), data.get('priority', 'normal'), data.get('timeout')
+        )
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}, 400
+    except QueueFullError as e:
+        return {"error": str(e)}, 503, {"Retry-After": "5"}
+    except Exception as e:
+        return {"error": str(e)}, 500
+    return job.to_dict(with_result=False), 202, {"Location": f"/api/jobs/{job.id}"}
+
+@app.route('/api/jobs', methods=['GET'])
+async def list_jobs(request):
+    """API pour lister les tâches de fond en mémoire"""
+    from .jobs import get_job_queue
+    
+    job_queue = get_job_queue(services)
+    return {"jobs": [job.to_dict(with_result=False) for job in job_queue.list()], "counts": job_queue.counts()}
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+async def job_status(request, job_id):
+    """API pour suivre une tâche: ?since=N et ?wait=S (long polling, sans thread pendant l'attente)"""
+    from .jobs import get_job_queue
+    
+    try:
+        since = int(request.args.get('since', 0))
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), 30.0)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    job = await get_job_queue(services).wait_async(job_id, since, wait)
+    if job is None:
+        return {"error": f"Tâche inconnue ou expirée: {job_id}"}, 404
+    return job.to_dict(since=since)
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+async def job_result(request, job_id):
+    """API pour récupérer le résultat d'une tâche (202 tant qu'elle n'est pas terminée)"""
+    from .jobs import get_job_queue
+    
+    job = get_job_queue(services).get(job_id)
+    if job is None:
+        return {"error": f"Tâche inconnue ou expirée: {job_id}"}, 404
+    if job.status in ('queued', 'running'):
+        return job.to_dict(with_result=False), 202
+    if job.status != 'done':
+        return {"error": job.error, "status": job.status}, 504 if job.status == 'timeout' else 500
+    return job.result
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+async def cancel_job(request, job_id):
+    """API pour annuler une tâche en attente ou en cours"""
+    from .jobs import get_job_queue
+    
+    job = get_job_queue(services).cancel(job_id)
+    if job is None:
+        return {"error": f"Tâche inconnue ou expirée: {job_id}"}, 404
+    return job.to_dict(with_result=False)
+
+@app.route('/api/stats', methods=['GET'])
+async def usage_stats(request):
+    """API pour consulter l'usage des tokens, la latence et le coût des appels IA"""
+    group_by = [key for key in request.args.get('by', 'source,task,model').split(',') if key]
+    origin = request.args.get('source', 'memory')
+    
+    def collect():
+        from .resilience import get_all_breaker_stats
+        from .routing import get_routing_stats
+        from .usage import get_usage_tracker, load_usage_log
+        
+        tracker = get_usage_tracker()
+        tracker.configure(services.config)
+        
+        if origin == 'log':
+            if not tracker.log_path:
+                return {"error": "Journal d'usage désactivé (usage_log_path)"}, 400
+            usage = load_usage_log(tracker.log_path, group_by, tracker=tracker)
+        elif origin == 'memory':
+            usage = tracker.get_stats(group_by)
+        else:
+            return {"error": f"Source non reconnue: {origin}"}, 400
+        
+        return {
+            "usage": usage,
+            "routing": get_routing_stats().get_stats(),
+            "circuit_breakers": get_all_breaker_stats(),
+            "admission": get_admission_controller(services.config).get_stats()
+        }
+    
+    try:
+        # Lecture éventuelle du journal NDJSON: dans le pool de threads
+        return await asyncio.to_thread(collect)
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+def serve(host: str = "0.0.0.0", port: int = 5000, workers: Optional[int] = None):
+    """
+    Lance l'application sur uvicorn.
+    
+    Args:
+        host (str): Adresse d'écoute.
+        port (int): Port d'écoute.
+        workers (int, optional): Nombre de processus. Si None, utilise `asgi_workers`.
+    
+    Raises:
+        Exception: Si uvicorn n'est pas installé.
+    """
+    try:
+        import uvicorn
+    except ImportError:
+        logger.error("uvicorn n'est pas installé (pip install uvicorn)")
+        raise Exception("uvicorn n'est pas installé (pip install uvicorn)")
+    
+    config = services.config
+    # Les processus importent l'application par son nom et relisent config.json
+    uvicorn.run(
+        "aiterminal.asgi:app",
+        host=host,
+        port=port,
+        workers=max(1, workers or int(config.get_value("asgi_workers", 1))),
+        lifespan="on",
+        timeout_graceful_shutdown=float(config.get_value("asgi_shutdown_timeout", 30)),
+        # Pas de journal par requête, comme gunicorn par défaut
+        access_log=False
+    )
@@ -0,0 +1,214 @@
+"""
+Module de diffusion des métriques système en Server-Sent Events.
+Un seul thread échantillonne le système et encode, une fois par mesure, les
+champs qui ont changé ; chaque client connecté reçoit les mêmes octets.
+"""
+
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from .config import Config
+from .metrics import get_metrics_registry
+from .utils import NotifyingCondition
+
+logger = logging.getLogger(__name__)
+
+# Commentaire SSE envoyé sans nouvelle mesure pour garder la connexion ouverte (proxys)
+KEEPALIVE_INTERVAL = 15.0
+
+STREAM_EVENTS = get_metrics_registry().counter(
+    "aiterminal_stream_events_total", "Événements SSE des métriques système encodés, par type", ("event",)
+)
+
+def flatten(value: Any, prefix: str = "", into: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Aplatit un échantillon en clés pointées ('memory.percent', 'cpu_per_core.3').
+    
+    Les flottants sont arrondis au dixième : une variation plus fine ne produit pas d'événement.
+    
+    Args:
+        value (Any): L'échantillon (dictionnaires et listes imbriqués).
+        prefix (str): Préfixe des clés.
+        into (Dict[str, Any], optional): Dictionnaire à compléter.
+    
+    Returns:
+        Dict[str, Any]: Les valeurs par clé.
+    """
+    flat = into if into is not None else {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flatten(item, f"{prefix}{key}.", flat)
+    elif isinstance(value, (list, tuple)):
+        for index, item in enumerate(value):
+            flatten(item, f"{prefix}{index}.", flat)
+    else:
+        flat[prefix[:-1]] = round(value, 1) if isinstance(value, float) else value
+    return flat
+
+def encode_event(sequence: int, event: str, data: Dict[str, Any]) -> bytes:
+    """Encode un événement SSE (JSON compact sur une ligne)."""
+    payload = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return f"id: {sequence}\nevent: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+class SystemBroadcaster:
+    """
+    Diffuseur des métriques système à un nombre quelconque de clients.
+    
+    Le thread d'échantillonnage ne tourne que tant qu'au moins un client est abonné.
+    À chaque mesure (`metrics_stream_interval` secondes), seuls les champs modifiés
+    sont encodés, une fois, dans un événement 'delta' ; les clients le recopient tel
+    quel. Un nouveau client, ou un client qui a manqué une mesure, reçoit d'abord
+    l'état complet ('snapshot'), encodé au plus une fois par mesure.
+    """
+    
+    def __init__(self, config: Config):
+        """
+        Initialise le diffuseur.
+        
+        Args:
+            config (Config): L'objet de configuration.
+        """
+        self.config = config
+        self.interval = max(0.1, float(config.get_value("metrics_stream_interval", 1.0)))
+        self._condition = NotifyingCondition()
+        self._sequence = 0
+        self._state: Dict[str, Any] = {}
+        self._delta = b""
+        self._snapshot = b""
+        self._snapshot_sequence = -1
+        self._subscribers = 0
+        self._running = False
+    
+    @property
+    def subscribers(self) -> int:
+        """Nombre de clients abonnés."""
+        return self._subscribers
+    
+    def _run(self):
+        from .system import SystemSampler
+        
+        sampler = SystemSampler(history=1)
+        next_sample = time.monotonic()
+        while True:
+            with self._condition:
+                if not self._subscribers:
+                    self._running = False
+                    return
+            try:
+                state = flatten(sampler.sample())
+            except Exception as e:
+                logger.error(f"Erreur lors de la diffusion des métriques: {str(e)}")
+                state = self._state
+            # Clés disparues (interface retirée): null pour que le client les oublie
+            changes = {key: value for key, value in state.items() if self._state.get(key) != value}
+            changes.update((key, None) for key in self._state.keys() - state.keys())
+            with self._condition:
+                self._sequence += 1
+                self._state = state
+                self._delta = encode_event(self._sequence, "delta", changes)
+                self._condition.notify_all()
+            STREAM_EVENTS.inc("delta")
+            next_sample += self.interval
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+    
+    def _snapshot_event(self) -> bytes:
+        # Appelée sous le verrou: un seul encodage de l'état complet par mesure
+        if self._snapshot_sequence != self._sequence:
+            self._snapshot = encode_event(self._sequence, "snapshot", self._state)
+            self._snapshot_sequence = self._sequence
+            STREAM_EVENTS.inc("snapshot")
+        return self._snapshot
+    
+    def _join(self) -> bytes:
+        with self._condition:
+            self._subscribers += 1
+            if not self._running:
+                self._running = True
+                threading.Thread(target=self._run, name="aiterminal-broadcast", daemon=True).start()
+        return f"retry: {int(self.interval * 2000)}\n\n".encode("utf-8")
+    
+    def _leave(self):
+        with self._condition:
+            self._subscribers -= 1
+    
+    def _next_event(self, last: Optional[int], updated: bool) -> Tuple[bytes, Optional[int]]:
+        # Appelée sous le verrou: l'événement à envoyer et la dernière mesure transmise
+        if not updated:
+            return b": keepalive\n\n", last
+        if last is not None and self._sequence == last + 1:
+            return self._delta, self._sequence
+        return self._snapshot_event(), self._sequence
+    
+    def subscribe(self) -> Iterator[bytes]:
+        """
+        Abonne un client : produit les événements SSE jusqu'à la fermeture du générateur.
+        
+        Yields:
+            bytes: Événements 'snapshot' puis 'delta', et commentaires de maintien.
+        """
+        retry = self._join()
+        try:
+            yield retry
+            last = None
+            while True:
+                with self._condition:
+                    updated = self._condition.wait_for(lambda: self._sequence != last and self._sequence > 0,
+                                                       timeout=KEEPALIVE_INTERVAL)
+                    event, last = self._next_event(last, updated)
+                yield event
+        finally:
+            self._leave()
+    
+    async def subscribe_async(self) -> AsyncIterator[bytes]:
+        """
+        Comme subscribe(), pour un serveur asynchrone : l'attente n'occupe pas de thread.
+        
+        Yields:
+            bytes: Événements 'snapshot' puis 'delta', et commentaires de maintien.
+        """
+        retry = self._join()
+        try:
+            yield retry
+            last = None
+            with self._condition.listen() as changed:
+                while True:
+                    changed.clear()
+                    with self._condition:
+                        updated = self._sequence != last and self._sequence > 0
+                    if not updated:
+                        try:
+                            await asyncio.wait_for(changed.wait(), KEEPALIVE_INTERVAL)
+                            continue
+                        except asyncio.TimeoutError:
+                            pass
+                    with self._condition:
+                        event, last = self._next_event(last, updated)
+                    yield event
+        finally:
+            self._leave()
+
+_broadcaster: Optional[SystemBroadcaster] = None
+_broadcaster_lock = threading.Lock()
+
+def get_system_broadcaster(config: Config) -> SystemBroadcaster:
+    """
+    Récupère le diffuseur des métriques système du processus.
+    
+    Args:
+        config (Config): L'objet de configuration (utilisé à la création uniquement).
+    
+    Returns:
+        SystemBroadcaster: Le diffuseur partagé.
+    """
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = SystemBroadcaster(config)
+            get_metrics_registry().gauge(
+                "aiterminal_stream_subscribers", "Clients abonnés au flux SSE des métriques système"
+            ).set_function(lambda: _broadcaster.subscribers)
+        return _broadcaster
@@ -0,0 +1,346 @@
+"""
+Module d'analyse de fichiers en masse.
+Lit un fichier JSONL, CSV ou texte en flux, analyse chaque enregistrement avec un nombre
+borné d'appels simultanés et un débit maximal, écrit les résultats dans l'ordre et
+enregistre sa progression pour reprendre une exécution interrompue.
+"""
+
+import os
+import csv
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Iterator, Optional, Tuple, Callable
+
+from .config import Config
+from .ai_services import AsyncAIService
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+def count_records(path: str) -> int:
+    """
+    Compte rapidement les enregistrements d'un fichier (lignes non vides, en-tête CSV exclu).
+    
+    Args:
+        path (str): Chemin du fichier.
+    
+    Returns:
+        int: Le nombre approximatif d'enregistrements.
+    """
+    count = 0
+    last = b"\n"
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        count += 1
+    if path.lower().endswith(".csv"):
+        count -= 1
+    return max(count, 0)
+
+def iter_records(path: str, text_field: str = "text",
+                 skip: int = 0) -> Iterator[Tuple[int, Dict[str, Any], Optional[str]]]:
+    """
+    Lit les enregistrements d'un fichier un par un, sans le charger en mémoire.
+    
+    Formats acceptés selon l'extension : .csv (colonne `text_field`), .jsonl/.json
+    (un objet JSON par ligne, ou une chaîne) et, sinon, une ligne de texte par enregistrement.
+    Une ligne JSON invalide, qui n'est pas un objet ou sans champ de texte donne
+    un enregistrement {"error": message} sans texte (None), sans interrompre la lecture.
+    
+    Args:
+        path (str): Chemin du fichier.
+        text_field (str): Nom du champ contenant le texte à analyser.
+        skip (int): Nombre d'enregistrements à ignorer au début (reprise).
+    
+    Returns:
+        Iterator[Tuple[int, Dict[str, Any], Optional[str]]]: Des triplets (index, enregistrement, texte).
+    
+    Raises:
+        Exception: Si le fichier CSV n'a pas la colonne de texte.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if extension == ".csv":
+            reader = csv.DictReader(f)
+            if reader.fieldnames and text_field not in reader.fieldnames:
+                raise Exception(f"Colonne '{text_field}' absente de {path} (colonnes: {', '.join(reader.fieldnames)})")
+            for index, row in enumerate(reader):
+                if index >= skip:
+                    yield index, row, row[text_field] or ""
+            return
+        
+        index = 0
+        for line in f:
+            if not line.strip():
+                continue
+            if index >= skip:
+                if extension in (".jsonl", ".json", ".ndjson"):
+                    error = None
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        record, error = None, f"JSON invalide: {str(e)}"
+                    if isinstance(record, str):
+                        record = {text_field: record}
+                    if error is None and not isinstance(record, dict):
+                        error = f"Objet JSON attendu, {type(record).__name__} trouvé"
+                    elif error is None and text_field not in record:
+                        error = f"Champ '{text_field}' absent"
+                    if error is not None:
+                        yield index, {"error": error}, None
+                    else:
+                        yield index, record, str(record[text_field])
+                else:
+                    text = line.rstrip("\r\n")
+                    yield index, {text_field: text}, text
+            index += 1
+
+class RateLimiter:
+    """Espace les départs d'appels d'au moins 1/rate seconde (boucle d'événements unique)."""
+    
+    def __init__(self, rate: float):
+        """
+        Initialise le limiteur.
+        
+        Args:
+            rate (float): Nombre maximal d'appels par seconde (0 pour ne pas limiter).
+        """
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = 0.0
+    
+    async def wait(self):
+        """Attend le prochain créneau disponible."""
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class BulkAnalyzer:
+    """
+    Analyse un fichier d'enregistrements et écrit un résultat JSONL par enregistrement.
+    
+    Les résultats sont écrits dans l'ordre du fichier d'entrée. Un point de reprise
+    (`<sortie>.checkpoint`) mémorise le nombre d'enregistrements écrits et la taille
+    correspondante du fichier de sortie ; une nouvelle exécution avec les mêmes
+    paramètres reprend à cet endroit.
+    """
+    
+    def __init__(self, config: Config, analysis_type: str = "sentiment", concurrency: Optional[int] = None,
+                 rate_limit: Optional[float] = None, text_field: str = "text", timeout: Optional[float] = None):
+        """
+        Initialise l'analyseur.
+        
+        Args:
+            config (Config): L'objet de configuration.
+            analysis_type (str): Type d'analyse (sentiment, summary, entities, all).
+            concurrency (int, optional): Appels simultanés maximum (par défaut bulk_concurrency).
+            rate_limit (float, optional): Appels par seconde maximum, 0 pour illimité (par défaut bulk_rate_limit).
+            text_field (str): Champ ou colonne contenant le texte.
+            timeout (float, optional): Délai maximal de chaque analyse, en secondes.
+        """
+        self.config = config
+        self.analysis_type = analysis_type
+        self.concurrency = max(1, concurrency or config.get_value("bulk_concurrency", 8))
+        self.rate_limit = rate_limit if rate_limit is not None else config.get_value("bulk_rate_limit", 0)
+        self.text_field = text_field
+        self.timeout = timeout
+        self.checkpoint_interval = config.get_value("bulk_checkpoint_interval", 2.0)
+    
+    def _checkpoint_path(self, output_path: str) -> str:
+        return output_path + CHECKPOINT_SUFFIX
+    
+    def load_checkpoint(self, input_path: str, output_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Charge le point de reprise d'une exécution précédente.
+        
+        Args:
+            input_path (str): Chemin du fichier d'entrée.
+            output_path (str): Chemin du fichier de sortie.
+        
+        Returns:
+            Optional[Dict[str, Any]]: Le point de reprise, ou None s'il n'y en a pas.
+        
+        Raises:
+            Exception: Si le point de reprise concerne un autre fichier ou une autre analyse.
+        """
+        path = self._checkpoint_path(output_path)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        expected = {
+            "input": os.path.abspath(input_path),
+            "analysis_type": self.analysis_type,
+            "text_field": self.text_field
+        }
+        for key, value in expected.items():
+            if checkpoint.get(key) != value:
+                raise Exception(
+                    f"Le point de reprise {path} ne correspond pas à cette exécution ({key}: "
+                    f"{checkpoint.get(key)!r} au lieu de {value!r}). Utilisez --restart pour recommencer."
+                )
+        return checkpoint
+    
+    def _save_checkpoint(self, input_path: str, output_path: str, done: int, offset: int, completed: bool = False):
+        """Enregistre le point de reprise (écriture atomique)."""
+        path = self._checkpoint_path(output_path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "input": os.path.abspath(input_path),
+                "analysis_type": self.analysis_type,
+                "text_field": self.text_field,
+                "done": done,
+                "output_offset": offset,
+                "completed": completed,
+                "updated_at": time.time()
+            }, f)
+        os.replace(tmp_path, path)
+    
+    def run(self, input_path: str, output_path: str, resume: bool = True,
+            on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+            progress_interval: float = 1.0) -> Dict[str, Any]:
+        """
+        Analyse le fichier d'entrée et écrit les résultats.
+        
+        Args:
+            input_path (str): Fichier JSONL, CSV ou texte à analyser.
+            output_path (str): Fichier JSONL de sortie.
+            resume (bool): Reprendre au point de reprise s'il existe (sinon, recommencer).
+            on_progress (Callable, optional): Appelée avec l'état d'avancement (voir _progress).
+            progress_interval (float): Intervalle minimal entre deux appels de on_progress, en secondes.
+        
+        Returns:
+            Dict[str, Any]: Le bilan de l'exécution.
+        
+        Raises:
+            Exception: Si le point de reprise est incompatible ou si l'entrée est illisible.
+        """
+        checkpoint = self.load_checkpoint(input_path, output_path) if resume else None
+        if checkpoint and not os.path.exists(output_path):
+            logger.warning(f"Fichier de sortie {output_path} absent, l'analyse reprend depuis le début")
+            checkpoint = None
+        if checkpoint and checkpoint.get("completed"):
+            logger.info(f"Analyse déjà terminée pour {output_path}")
+            return {"processed": 0, "skipped": checkpoint["done"], "errors": 0, "elapsed": 0.0,
+                    "rate": 0.0, "output": output_path, "completed": True}
+        return asyncio.run(self._run(input_path, output_path, checkpoint, on_progress, progress_interval))
+    
+    def _progress(self, started: float, total: int, skipped: int, processed: int, errors: int) -> Dict[str, Any]:
+        """Calcule l'état d'avancement : débit et temps restant estimé."""
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        remaining = max(total - skipped - processed, 0)
+        return {
+            "total": total,
+            "done": skipped + processed,
+            "processed": processed,
+            "skipped": skipped,
+            "errors": errors,
+            "elapsed": elapsed,
+            "rate": rate,
+            "eta": remaining / rate if rate > 0 else None
+        }
+    
+    async def _run(self, input_path: str, output_path: str, checkpoint: Optional[Dict[str, Any]],
+                   on_progress: Optional[Callable[[Dict[str, Any]], None]], progress_interval: float) -> Dict[str, Any]:
+        """Boucle principale : lecture en flux, appels bornés et écriture ordonnée."""
+        service = AsyncAIService(self.config)
+        handler = service.get_analysis_handler(self.analysis_type)
+        limiter = RateLimiter(self.rate_limit)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Résultats en attente d'écriture bornés: un enregistrement lent ne fait pas grossir la mémoire
+        window = asyncio.Semaphore(self.concurrency * 4)
+        
+        skipped = checkpoint["done"] if checkpoint else 0
+        offset = checkpoint["output_offset"] if checkpoint else 0
+        total = count_records(input_path)
+        started = time.monotonic()
+        state = {"next": skipped, "processed": 0, "errors": 0, "last_checkpoint": started, "last_progress": 0.0}
+        results: Dict[int, bytes] = {}
+        tasks = set()
+        
+        output = open(output_path, 'r+b' if checkpoint else 'wb')
+        output.seek(offset)
+        output.truncate()
+        
+        def write_ready():
+            while state["next"] in results:
+                output.write(results.pop(state["next"]))
+                state["next"] += 1
+                window.release()
+            now = time.monotonic()
+            if now - state["last_checkpoint"] >= self.checkpoint_interval:
+                output.flush()
+                os.fsync(output.fileno())
+                self._save_checkpoint(input_path, output_path, state["next"], output.tell())
+                state["last_checkpoint"] = now
+            if on_progress and now - state["last_progress"] >= progress_interval:
+                on_progress(self._progress(started, total, skipped, state["processed"], state["errors"]))
+                state["last_progress"] = now
+        
+        async def analyze(index: int, record: Dict[str, Any], text: Optional[str]):
+            entry: Dict[str, Any] = {"index": index}
+            if "id" in record:
+                entry["id"] = record["id"]
+            try:
+                if text is None:
+                    # Enregistrement illisible (voir iter_records): signalé sans appel à l'API
+                    raise ValueError(record["error"])
+                async with semaphore:
+                    await limiter.wait()
+                    result = await handler(text, timeout=self.timeout)
+                entry["result"] = result
+                if isinstance(result, dict) and result.get("offline_mode"):
+                    state["errors"] += 1
+            except Exception as e:
+                logger.error(f"Erreur lors de l'analyse de l'enregistrement {index}: {str(e)}")
+                entry["error"] = str(e)
+                state["errors"] += 1
+            state["processed"] += 1
+            results[index] = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+            write_ready()
+        
+        completed = False
+        try:
+            for index, record, text in iter_records(input_path, self.text_field, skip=skipped):
+                await window.acquire()
+                task = asyncio.create_task(analyze(index, record, text))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+            completed = True
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            output.flush()
+            os.fsync(output.fileno())
+            self._save_checkpoint(input_path, output_path, state["next"], output.tell(), completed=completed)
+            output.close()
+        
+        progress = self._progress(started, total, skipped, state["processed"], state["errors"])
+        if on_progress:
+            on_progress(progress)
+        return {
+            "processed": progress["processed"],
+            "skipped": skipped,
+            "errors": progress["errors"],
+            "elapsed": progress["elapsed"],
+            "rate": progress["rate"],
+            "output": output_path,
+            "completed": completed
+        }
@@ -0,0 +1,293 @@
+"""
+Module du canal WebSocket de l'interface web.
+Multiplexe sur une seule connexion par navigateur les commandes du terminal
+(IA, analyse, ping, HTTP, système) et leurs résultats partiels : fragments de
+réponse de l'IA, réponses de ping, mesures système périodiques.
+"""
+
+import json
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from .admission import Admission, RateLimitedError, RequestTooLargeError, get_admission_controller
+from .jobs import Job, JobCancelled, default_handlers
+from .metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_TYPES = ("cpu", "memory", "disk", "network", "all")
+
+CHANNEL_MESSAGES = get_metrics_registry().counter(
+    "aiterminal_ws_messages_total", "Messages du canal WebSocket, par sens", ("direction",)
+)
+CHANNEL_DROPPED = get_metrics_registry().counter(
+    "aiterminal_ws_dropped_total", "Mesures périodiques non envoyées à un client trop lent"
+)
+
+class ChannelCommand(Job):
+    """Une commande du canal : ses événements partent directement vers le client."""
+    
+    streaming = True
+    
+    def __init__(self, channel: "TerminalChannel", command_id: str, kind: str, params: Dict[str, Any], timeout: float):
+        """
+        Initialise la commande.
+        
+        Args:
+            channel (TerminalChannel): Le canal qui a reçu la commande.
+            command_id (str): Identifiant choisi par le client, repris dans chaque réponse.
+            kind (str): Type de commande.
+            params (Dict[str, Any]): Paramètres de la commande.
+            timeout (float): Durée maximale d'exécution en secondes.
+        """
+        super().__init__(kind, params, 0, timeout)
+        self.id = command_id
+        self.channel = channel
+        self.started = time.time()
+    
+    def report(self, event: Any):
+        """Envoie un événement de progression (bloque si le client ne suit pas)."""
+        self.check()
+        if not self.channel.send(self.id, "progress", event, cancel=self.cancel_event):
+            raise JobCancelled(self.id)
+    
+    def delta(self, text: str) -> bool:
+        """Envoie un fragment de la réponse de l'IA ; False pour interrompre la génération."""
+        return not self.cancel_event.is_set() and self.channel.send(self.id, "delta", text, cancel=self.cancel_event)
+
+class TerminalChannel:
+    """
+    Session du terminal web sur une connexion WebSocket.
+    
+    Le client envoie des messages JSON {"id", "type", "params"}, où le type est celui
+    d'une tâche de fond (ping, http, generate, analyze), 'system' ou 'watch' ; chaque
+    réponse reprend l'identifiant : {"id", "event": "delta" | "progress" | "result"
+    | "error" | "cancelled", "data"}. Chaque commande s'exécute dans son propre thread
+    (`ws_max_commands` au plus par connexion) et {"id", "type": "cancel"} l'interrompt.
+    
+    Les envois passent par une file bornée (`ws_send_queue` messages) vidée par un
+    seul thread : quand le client lit moins vite que les commandes ne produisent,
+    les fragments de l'IA et les réponses de ping attendent (la commande ralentit),
+    tandis que les mesures de 'watch' sont abandonnées au profit des suivantes.
+    
+    Les commandes generate, analyze, ping et http passent par le contrôle d'admission,
+    avec le seau du client et les limites de la route HTTP équivalente.
+    """
+    
+    def __init__(self, services, send: Callable[[str], None], client: str = "ip:inconnue"):
+        """
+        Initialise le canal et démarre le thread d'envoi.
+        
+        Args:
+            services (ServiceRegistry): Le registre des services.
+            send (Callable[[str], None]): Envoie un message texte au client (appelée par un seul thread).
+            client (str): Identité du client pour le contrôle d'admission (voir AdmissionController.identify).
+        """
+        self.services = services
+        self.config = services.config
+        self.client = client
+        self.admission = get_admission_controller(self.config)
+        self.max_commands = int(self.config.get_value("ws_max_commands", 8))
+        self.timeout = float(self.config.get_value("jobs_timeout", 60))
+        self.handlers = default_handlers(services)
+        self.handlers.update(system=self._system, watch=self._watch)
+        self._send = send
+        self._outbox: "queue.Queue" = queue.Queue(maxsize=int(self.config.get_value("ws_send_queue", 256)))
+        self._commands: Dict[str, ChannelCommand] = {}
+        self._lock = threading.Lock()
+        self.closed = threading.Event()
+        threading.Thread(target=self._sender, name="aiterminal-ws-send", daemon=True).start()
+    
+    def _sender(self):
+        while True:
+            message = self._outbox.get()
+            if message is None:
+                return
+            try:
+                self._send(message)
+                CHANNEL_MESSAGES.inc("sent")
+            except Exception as e:
+                logger.info(f"Canal WebSocket fermé pendant un envoi: {str(e)}")
+                self.close()
+                return
+    
+    def send(self, command_id: Optional[str], event: str, data: Any = None, droppable: bool = False,
+             cancel: Optional[threading.Event] = None) -> bool:
+        """
+        Met un message en file d'envoi.
+        
+        Args:
+            command_id (str, optional): Identifiant de la commande concernée.
+            event (str): Type d'événement.
+            data (Any): Contenu sérialisable en JSON.
+            droppable (bool): Abandonner le message plutôt qu'attendre si la file est pleine.
+            cancel (threading.Event, optional): Interrompt l'attente quand il est positionné.
+        
+        Returns:
+            bool: False si le canal est fermé ou la commande annulée avant l'envoi.
+        """
+        message = json.dumps({"id": command_id, "event": event, "data": data}, ensure_ascii=False, default=str)
+        if droppable:
+            try:
+                self._outbox.put_nowait(message)
+            except queue.Full:
+                CHANNEL_DROPPED.inc()
+            return not self.closed.is_set()
+        while not self.closed.is_set() and not (cancel is not None and cancel.is_set()):
+            try:
+                self._outbox.put(message, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def handle(self, raw: str):
+        """
+        Traite un message reçu du client.
+        
+        Args:
+            raw (str): Le message JSON.
+        """
+        CHANNEL_MESSAGES.inc("received")
+        try:
+            message = json.loads(raw)
+            command_id = str(message["id"])
+            kind = message.get("type", "")
+        except (ValueError, TypeError, KeyError):
+            self.send(None, "error", "Message invalide: JSON avec 'id' et 'type' attendu")
+            return
+        
+        if kind == "cancel":
+            command = self._commands.get(command_id)
+            if command is not None:
+                command.cancel_event.set()
+            return
+        if kind not in self.handlers:
+            self.send(command_id, "error", f"Commande non reconnue: {kind}")
+            return
+        params = message.get("params") or {}
+        if not isinstance(params, dict):
+            self.send(command_id, "error", "Paramètres invalides: objet JSON attendu")
+            return
+        
+        try:
+            admission = self.admission.admit_command(self.client, kind, params)
+        except (RateLimitedError, RequestTooLargeError) as e:
+            self.send(command_id, "error", str(e))
+            return
+        
+        # Jusqu'au démarrage du thread de la commande, la place amont est libérée ici
+        command = None
+        try:
+            with self._lock:
+                if command_id in self._commands:
+                    raise ValueError(f"Identifiant déjà utilisé par une commande en cours: {command_id}")
+                if len(self._commands) >= self.max_commands:
+                    raise ValueError(f"Trop de commandes en cours ({self.max_commands} au plus)")
+                command = self._commands[command_id] = ChannelCommand(self, command_id, kind, dict(params), self.timeout)
+            threading.Thread(target=self._run, args=(command, admission), name=f"aiterminal-ws-{kind}", daemon=True).start()
+        except Exception as e:
+            admission.release()
+            if command is not None:
+                with self._lock:
+                    self._commands.pop(command_id, None)
+            self.send(command_id, "error", str(e))
+    
+    def _run(self, command: ChannelCommand, admission: Admission):
+        try:
+            result = self.handlers[command.kind](command)
+            if command.cancel_event.is_set():
+                raise JobCancelled(command.id)
+            self.send(command.id, "result", result)
+        except JobCancelled:
+            self.send(command.id, "cancelled")
+        except Exception as e:
+            logger.error(f"Erreur lors de la commande {command.kind} du canal: {str(e)}")
+            self.send(command.id, "error", str(e))
+        finally:
+            admission.release()
+            with self._lock:
+                self._commands.pop(command.id, None)
+    
+    def _system(self, command: ChannelCommand) -> Dict[str, Any]:
+        info_type = command.params.get("info", "all")
+        if info_type not in SYSTEM_TYPES:
+            raise ValueError(f"Type d'information non reconnu: {info_type}")
+        system = self.services.system
+        readers = {
+            "cpu": system.get_cpu_info,
+            "memory": system.get_memory_info,
+            "disk": system.get_disk_info,
+            "network": system.get_network_info
+        }
+        if info_type != "all":
+            return readers[info_type]()
+        return {name: reader() for name, reader in readers.items()}
+    
+    def _watch(self, command: ChannelCommand):
+        """Envoie une mesure système toutes les `interval` secondes jusqu'à l'annulation."""
+        from .system import SystemSampler
+        
+        interval = max(float(command.params.get("interval", 1.0)), 0.2)
+        sampler = SystemSampler(history=1)
+        while not command.cancel_event.wait(interval) and not self.closed.is_set():
+            self.send(command.id, "progress", sampler.sample(), droppable=True)
+        raise JobCancelled(command.id)
+    
+    def close(self):
+        """Ferme le canal : annule les commandes en cours et arrête le thread d'envoi."""
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        with self._lock:
+            for command in self._commands.values():
+                command.cancel_event.set()
+        try:
+            self._outbox.put_nowait(None)
+        except queue.Full:
+            # Le thread d'envoi est bloqué sur un client mort: il s'arrêtera sur l'erreur d'envoi
+            pass
+
+def register_websocket(app, services, path: str = "/ws") -> bool:
+    """
+    Ajoute la route WebSocket du terminal à l'application Flask.
+    
+    Nécessite flask-sock (pip install flask-sock) ; sans lui, l'interface web
+    continue d'utiliser les routes HTTP.
+    
+    Args:
+        app (Flask): L'application.
+        services (ServiceRegistry): Le registre des services.
+        path (str): Chemin de la route.
+    
+    Returns:
+        bool: True si la route a été ajoutée.
+    """
+    try:
+        from flask_sock import ConnectionClosed, Sock
+    except ImportError:
+        logger.info("flask-sock n'est pas installé: canal WebSocket désactivé (pip install flask-sock)")
+        return False
+    
+    from flask import request
+    
+    sock = Sock(app)
+    
+    @sock.route(path)
+    def terminal_channel(ws):
+        client = get_admission_controller(services.config).identify(request.headers, request.remote_addr)
+        channel = TerminalChannel(services, ws.send, client)
+        try:
+            while not channel.closed.is_set():
+                message = ws.receive(timeout=1.0)
+                if message is not None:
+                    channel.handle(message)
+        except ConnectionClosed:
+            pass
+        finally:
+            channel.close()
+    
+    return True
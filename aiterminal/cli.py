@@ -5,19 +5,18 @@ Gère les commandes et l'interaction utilisateur.
 
 import os
 import sys
+import time
 import typer
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional
+from rich import box
 from rich.console import Console
 from rich.table import Table
-from rich import print as rprint
 
-from .config import Config
-from .ai_services import AIService
-from .network import NetworkService
-from .system import SystemService
-from .internet import InternetService
-from .utils import format_response
+from .output import RecordWriter, emit, get_output_mode, is_machine_output, print_response, set_output_mode
+from .services import ServiceRegistry
+from .usage import get_usage_tracker, load_usage_log, set_usage_source
+from .utils import parse_duration
 
 # Initialiser Typer
 app = typer.Typer(
@@ -27,96 +26,303 @@ app = typer.Typer(
 console = Console()
 logger = logging.getLogger(__name__)
 
-# Services
-config = Config()
-ai_service = AIService(config)
-network_service = NetworkService(config)
-system_service = SystemService(config)
-internet_service = InternetService(config)
+# Services, construits au premier usage: chaque commande n'importe que ce dont elle a besoin
+services = ServiceRegistry()
 
 @app.callback()
-def callback():
+def callback(
+    ctx: typer.Context,
+    output: str = typer.Option("table", "--output", envvar="AITERMINAL_OUTPUT",
+                               help="Format de sortie: table, json ou ndjson (un enregistrement par ligne, au fil de l'eau)"),
+    settings: Optional[List[str]] = typer.Option(None, "--set",
+                                                 help="Surcharge clé=valeur de la configuration pour cette commande (répétable)"),
+    profile: bool = typer.Option(False, "--profile", help="Affiche sur stderr l'arbre des durées (spans) de la commande"),
+    profile_output: Optional[str] = typer.Option(None, "--profile-output",
+                                                 help="Fichier de profil: .prof pour cProfile, sinon piles repliées (flamegraph)")
+):
     """
     AITerminal - Un terminal intelligent en ligne de commande.
     """
-    pass
+    set_usage_source(f"cli:{ctx.invoked_subcommand}")
+    try:
+        set_output_mode(output)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--output")
+    try:
+        overrides = parse_settings(settings or [])
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--set")
+    # Toujours appliqué: dans le démon et le shell, efface les surcharges de la commande précédente
+    services.config.set_overrides(overrides)
+    if profile or profile_output:
+        start_profiling(ctx, f"cli:{ctx.invoked_subcommand}", profile, profile_output)
+
+def start_profiling(ctx: typer.Context, name: str, show: bool, path: Optional[str]):
+    """
+    Trace la commande et publie le profil à sa fin (stderr et/ou fichier).
+    
+    Args:
+        ctx (typer.Context): Le contexte de la commande, dont la fermeture termine la trace.
+        name (str): Nom du span racine.
+        show (bool): Afficher l'arbre des spans sur stderr.
+        path (str, optional): Fichier de profil (voir Profiler.dump).
+    """
+    from .tracing import Profiler, format_span_tree, wants_cprofile
+    
+    profiler = Profiler(name, cprofile=wants_cprofile(path))
+    profiler.start()
+    
+    def finish():
+        root = profiler.stop()
+        if show:
+            # Sur stderr, pour ne pas corrompre une sortie json ou ndjson
+            sys.stderr.write(format_span_tree(root) + "\n")
+        if path:
+            try:
+                profiler.dump(path)
+                sys.stderr.write(f"Profil écrit dans {path}\n")
+            except Exception as e:
+                sys.stderr.write(f"Erreur: {str(e)}\n")
+    
+    ctx.call_on_close(finish)
+
+def parse_settings(settings: List[str]) -> Dict[str, Any]:
+    """
+    Analyse les surcharges `clé=valeur` de l'option --set.
+    
+    La valeur est lue comme du JSON (nombres, booléens, listes...), sinon comme du texte.
+    
+    Args:
+        settings (List[str]): Les surcharges.
+    
+    Returns:
+        Dict[str, Any]: Les valeurs, par clé.
+    
+    Raises:
+        ValueError: Si une surcharge n'a pas la forme clé=valeur.
+    """
+    import json
+    
+    overrides = {}
+    for setting in settings:
+        key, sep, raw = setting.partition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"Surcharge invalide: {setting} (attendu: clé=valeur)")
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        overrides[key.strip()] = value
+    return overrides
+
+def print_error(message: str):
+    """
+    Affiche une erreur dans la console.
+    
+    En sortie json ou ndjson, l'erreur est écrite sur stderr pour ne pas corrompre
+    la sortie standard, et la commande se termine avec le code 1.
+    
+    Args:
+        message (str): Le message d'erreur.
+    """
+    if is_machine_output():
+        sys.stderr.write(f"Erreur: {message}\n")
+        raise typer.Exit(1)
+    console.print(f"[bold red]Erreur:[/bold red] {message}")
 
 @app.command("config")
 def configure(
     api_key: Optional[str] = typer.Option(None, "--api-key", "-k", help="Définir la clé API OpenAI"),
     model: Optional[str] = typer.Option(None, "--model", "-m", help="Définir le modèle OpenAI à utiliser"),
+    base_url: Optional[str] = typer.Option(None, "--base-url", help="URL d'une API compatible OpenAI (\"\" pour revenir à l'API officielle)"),
     show: bool = typer.Option(False, "--show", "-s", help="Afficher la configuration actuelle")
 ):
     """
     Configurer les paramètres de AITerminal.
     """
     if show:
-        conf = config.get_config()
+        conf = dict(services.config.get_config())
+        if conf.get("api_key"):
+            # Masquer la clé API pour des raisons de sécurité
+            value = conf["api_key"]
+            conf["api_key"] = value[:4] + "..." + value[-4:] if len(value) > 8 else "***"
+        if is_machine_output():
+            emit(conf)
+            return
+        
         table = Table(title="Configuration Actuelle")
         table.add_column("Paramètre", style="cyan")
         table.add_column("Valeur", style="green")
         
         for key, value in conf.items():
-            if key == "api_key" and value:
-                # Masquer la clé API pour des raisons de sécurité
-                display_value = value[:4] + "..." + value[-4:] if len(value) > 8 else "***"
-            else:
-                display_value = str(value)
-            table.add_row(key, display_value)
+            table.add_row(key, str(value))
         
         console.print(table)
         return
-
-    if api_key:
-        config.set_value("api_key", api_key)
-        console.print("[green]Clé API mise à jour[/green]")
     
-    if model:
-        config.set_value("model", model)
-        console.print(f"[green]Modèle défini sur: [bold]{model}[/bold][/green]")
+    updated = []
+    try:
+        if api_key:
+            services.config.set_value("api_key", api_key)
+            updated.append("api_key")
+            if not is_machine_output():
+                console.print("[green]Clé API mise à jour[/green]")
+        
+        if model:
+            services.config.set_value("model", model)
+            updated.append("model")
+            if not is_machine_output():
+                console.print(f"[green]Modèle défini sur: [bold]{model}[/bold][/green]")
+        
+        if base_url is not None:
+            services.config.set_value("base_url", base_url)
+            updated.append("base_url")
+            if not is_machine_output():
+                console.print(f"[green]URL de l'API définie sur: [bold]{base_url or 'API OpenAI officielle'}[/bold][/green]")
+    except Exception as e:
+        logger.error(f"Erreur lors de la mise à jour de la configuration: {str(e)}")
+        print_error(str(e))
+        raise typer.Exit(1)
+    
+    if is_machine_output():
+        emit({"updated": updated})
 
 @app.command("ai")
 def generate_ai_content(
     prompt: str = typer.Argument(..., help="Prompt à envoyer à l'IA"),
     model: Optional[str] = typer.Option(None, "--model", "-m", help="Modèle à utiliser (par défaut: celui configuré)"),
-    temperature: float = typer.Option(0.7, "--temperature", "-t", help="Température pour la génération (0.0-1.0)")
+    temperature: float = typer.Option(0.7, "--temperature", "-t", help="Température pour la génération (0.0-1.0)"),
+    session: Optional[str] = typer.Option(None, "--session", "-s", help="Poursuivre la conversation de cette session"),
+    reset: bool = typer.Option(False, "--reset", help="Effacer l'historique de la session avant d'envoyer le prompt")
 ):
     """
     Générer du contenu avec l'IA.
     """
     try:
+        if not session:
+            with console.status("[bold green]Génération en cours...[/bold green]"):
+                response = services.ai.generate_text(prompt, model, temperature)
+            if is_machine_output():
+                emit({"response": response})
+            else:
+                print_response(response)
+            return
+        
+        if reset:
+            services.ai.memory.clear(session)
         with console.status("[bold green]Génération en cours...[/bold green]"):
-            response = ai_service.generate_text(prompt, model, temperature)
-        rprint(format_response(response))
+            result = services.ai.chat(prompt, session, model=model, temperature=temperature)
+        if is_machine_output():
+            emit(result)
+            return
+        print_response(result["response"])
+        
+        usage = result["usage"]
+        details = f"Session {result['session_id']} · {result['messages']} messages"
+        if result["summarized_messages"]:
+            details += f" (+{result['summarized_messages']} résumés)"
+        if usage:
+            details += (f" · {usage['prompt_tokens']} tokens d'entrée dont {usage['cached_tokens']} en cache, "
+                        f"{usage['completion_tokens']} en sortie")
+        console.print(f"[dim]{details}[/dim]")
     except Exception as e:
         logger.error(f"Erreur lors de la génération de contenu: {str(e)}")
-        console.print(f"[bold red]Erreur:[/bold red] {str(e)}")
+        print_error(str(e))
 
 @app.command("analyze")
 def analyze_text(
-    text: str = typer.Argument(..., help="Texte à analyser"),
-    type: str = typer.Option("sentiment", "--type", "-t", 
-                             help="Type d'analyse (sentiment, summary, entities)")
+    text: Optional[str] = typer.Argument(None, help="Texte à analyser"),
+    type: str = typer.Option("sentiment", "--type", "-t",
+                             help="Type d'analyse (sentiment, summary, entities)"),
+    input: Optional[str] = typer.Option(None, "--input", "-i", help="Fichier JSONL, CSV ou texte à analyser en masse"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Fichier JSONL des résultats (avec --input)"),
+    field: str = typer.Option("text", "--field", "-f", help="Champ ou colonne contenant le texte (avec --input)"),
+    concurrency: Optional[int] = typer.Option(None, "--concurrency", "-c", help="Appels simultanés maximum (avec --input)"),
+    rate: Optional[float] = typer.Option(None, "--rate", help="Appels par seconde maximum, 0 pour illimité (avec --input)"),
+    restart: bool = typer.Option(False, "--restart", help="Ignorer le point de reprise et recommencer (avec --input)")
 ):
     """
     Analyser du texte avec l'IA.
     """
+    if input:
+        analyze_file(input, output, type, field, concurrency, rate, restart)
+        return
+    if not text:
+        print_error("Indiquez un texte ou un fichier avec --input")
+        return
+    
     try:
         with console.status(f"[bold green]Analyse {type} en cours...[/bold green]"):
             if type == "sentiment":
-                result = ai_service.analyze_sentiment(text)
+                result = services.ai.analyze_sentiment(text)
             elif type == "summary":
-                result = ai_service.summarize_text(text)
+                result = services.ai.summarize_text(text)
             elif type == "entities":
-                result = ai_service.extract_entities(text)
+                result = services.ai.extract_entities(text)
             else:
-                console.print(f"[bold red]Type d'analyse inconnu: {type}[/bold red]")
+                print_error(f"Type d'analyse inconnu: {type}")
                 return
         
-        rprint(format_response(result))
+        if is_machine_output():
+            emit({"type": type, "result": result})
+        else:
+            print_response(result)
+    except typer.Exit:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'analyse: {str(e)}")
-        console.print(f"[bold red]Erreur:[/bold red] {str(e)}")
+        print_error(str(e))
+
+def analyze_file(input_path: str, output_path: Optional[str], analysis_type: str, field: str,
+                 concurrency: Optional[int], rate: Optional[float], restart: bool):
+    """
+    Analyse un fichier en masse et affiche le débit et le temps restant estimé.
+    
+    Args:
+        input_path (str): Fichier à analyser.
+        output_path (str, optional): Fichier de sortie (par défaut <entrée>.<type>.jsonl).
+        analysis_type (str): Type d'analyse.
+        field (str): Champ ou colonne contenant le texte.
+        concurrency (int, optional): Appels simultanés maximum.
+        rate (float, optional): Appels par seconde maximum.
+        restart (bool): Ignorer le point de reprise.
+    """
+    from .bulk import BulkAnalyzer
+    
+    output_path = output_path or f"{os.path.splitext(input_path)[0]}.{analysis_type}.jsonl"
+    analyzer = BulkAnalyzer(services.config, analysis_type, concurrency=concurrency, rate_limit=rate, text_field=field)
+    
+    def report(progress):
+        eta = f"{progress['eta']:.0f}s" if progress["eta"] is not None else "?"
+        console.print(
+            f"{progress['done']}/{progress['total']} enregistrements · {progress['rate']:.1f}/s · "
+            f"erreurs: {progress['errors']} · temps restant: {eta}",
+            highlight=False
+        )
+    
+    try:
+        stats = analyzer.run(input_path, output_path, resume=not restart,
+                             on_progress=None if is_machine_output() else report,
+                             progress_interval=2.0 if console.is_terminal else 30.0)
+    except KeyboardInterrupt:
+        console.print("[yellow]Interrompu. Relancez la même commande pour reprendre là où l'analyse s'est arrêtée.[/yellow]")
+        raise typer.Exit(130)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'analyse de {input_path}: {str(e)}")
+        print_error(str(e))
+        raise typer.Exit(1)
+    
+    if is_machine_output():
+        emit(stats)
+        return
+    if stats["skipped"] and not stats["processed"]:
+        console.print(f"[green]Analyse déjà terminée: {output_path}[/green] (--restart pour recommencer)")
+        return
+    console.print(
+        f"[green]Terminé:[/green] {stats['processed']} enregistrements analysés "
+        f"({stats['skipped']} repris) en {stats['elapsed']:.1f}s, {stats['rate']:.1f}/s, "
+        f"{stats['errors']} erreurs → {output_path}"
+    )
 
 @app.command("search")
 def search_internet(
@@ -128,7 +334,13 @@ def search_internet(
     """
     try:
         with console.status("[bold green]Recherche en cours...[/bold green]"):
-            results = internet_service.search(query, limit)
+            results = services.internet.search(query, limit)
+        
+        if is_machine_output():
+            with RecordWriter() as writer:
+                for result in results:
+                    writer.write(result)
+            return
         
         table = Table(title=f"Résultats pour: {query}")
         table.add_column("Titre", style="cyan")
@@ -145,7 +357,7 @@ def search_internet(
         console.print(table)
     except Exception as e:
         logger.error(f"Erreur lors de la recherche: {str(e)}")
-        console.print(f"[bold red]Erreur:[/bold red] {str(e)}")
+        print_error(str(e))
 
 @app.command("ping")
 def ping_host(
@@ -156,16 +368,26 @@ def ping_host(
     Envoyer des requêtes ping à un hôte.
     """
     try:
-        with console.status(f"[bold green]Ping vers {host}...[/bold green]"):
-            results = network_service.ping(host, count)
+        if is_machine_output():
+            # Une réponse par enregistrement, dès sa réception, puis le résumé
+            results = []
+            with RecordWriter() as writer:
+                for result in services.network.iter_ping(host, count):
+                    results.append(result)
+                    writer.write(dict(result, host=host))
+                writer.write({"host": host, "summary": services.network.get_ping_summary(results)})
+            return
         
-        for result in results:
+        results = []
+        console.print(f"[bold green]Ping vers {host}...[/bold green]")
+        for result in services.network.iter_ping(host, count):
+            results.append(result)
             if result.get("success"):
                 console.print(f"[green]{result.get('message')}[/green]")
             else:
                 console.print(f"[red]{result.get('message')}[/red]")
         
-        summary = network_service.get_ping_summary(results)
+        summary = services.network.get_ping_summary(results)
         console.print(f"\n[bold]--- Résumé ping pour {host} ---[/bold]")
         console.print(f"Paquets: Envoyés = {summary['sent']}, Reçus = {summary['received']}, "
                       f"Perdus = {summary['lost']} ({summary['loss_percent']}% perte)")
@@ -174,19 +396,44 @@ def ping_host(
                          f"Moy = {summary['avg_rtt']}")
     except Exception as e:
         logger.error(f"Erreur lors du ping: {str(e)}")
-        console.print(f"[bold red]Erreur:[/bold red] {str(e)}")
+        print_error(str(e))
 
 @app.command("sys")
 def system_info(
-    type: str = typer.Option("all", "--type", "-t", 
-                             help="Type d'information (cpu, memory, disk, network, all)")
+    type: str = typer.Option("all", "--type", "-t",
+                             help="Type d'information (cpu, memory, disk, network, processes, all)"),
+    sort: str = typer.Option("cpu", "--sort", "-s", help="Tri des processus (cpu, memory, threads, files, io)"),
+    limit: int = typer.Option(10, "--limit", "-l", help="Nombre de processus affichés"),
+    watch: bool = typer.Option(False, "--watch", "-w", help="Tableau de bord rafraîchi en continu (Ctrl+C pour quitter)"),
+    interval: Optional[float] = typer.Option(None, "--interval", "-i",
+                                             help="Fenêtre de mesure des débits disque et réseau en secondes "
+                                                  "(défaut: sys_sample_interval), ou période avec --watch (défaut: sys_watch_interval)"),
+    count: int = typer.Option(0, "--count", "-n", help="Nombre de mesures avec --watch (0 pour illimité)")
 ):
     """
     Afficher des informations système.
     """
+    if watch:
+        watch_system(interval, count)
+        return
+    
     try:
+        if type == "processes":
+            show_processes(sort, limit)
+            return
+        
+        if is_machine_output():
+            readers = {
+                "cpu": services.system.get_cpu_info,
+                "memory": services.system.get_memory_info,
+                "disk": lambda: services.system.get_disk_info(interval),
+                "network": lambda: services.system.get_network_info(interval)
+            }
+            emit({name: reader() for name, reader in readers.items() if type in ("all", name)})
+            return
+        
         if type == "all" or type == "cpu":
-            cpu_info = system_service.get_cpu_info()
+            cpu_info = services.system.get_cpu_info()
             console.print("[bold cyan]--- Information CPU ---[/bold cyan]")
             console.print(f"Utilisation CPU: {cpu_info['percent']}%")
             console.print(f"Cœurs physiques: {cpu_info['physical_cores']}")
@@ -195,7 +442,7 @@ def system_info(
             console.print()
         
         if type == "all" or type == "memory":
-            mem_info = system_service.get_memory_info()
+            mem_info = services.system.get_memory_info()
             console.print("[bold cyan]--- Mémoire ---[/bold cyan]")
             console.print(f"Total: {mem_info['total']} GB")
             console.print(f"Utilisée: {mem_info['used']} GB ({mem_info['percent']}%)")
@@ -203,24 +450,122 @@ def system_info(
             console.print()
         
         if type == "all" or type == "disk":
-            disk_info = system_service.get_disk_info()
+            from .dashboard import format_rate
+            
+            disk_info = services.system.get_disk_info(interval)
             console.print("[bold cyan]--- Espace Disque ---[/bold cyan]")
-            console.print(f"Total: {disk_info['total']} GB")
-            console.print(f"Utilisé: {disk_info['used']} GB ({disk_info['percent']}%)")
-            console.print(f"Libre: {disk_info['free']} GB")
+            for partition in disk_info["partitions"]:
+                console.print(f"{partition['mountpoint']} ({partition['device']}, {partition['fstype']}): "
+                              f"{short_size(partition['used'])}/{short_size(partition['total'])} "
+                              f"({partition['percent']}%), libre {short_size(partition['free'])}")
+            console.print(f"[bold]Activité sur {disk_info['interval']:g} s[/bold]")
+            for name, device in disk_info["devices"].items():
+                idle = not any(device[key] for key in ("read_iops", "write_iops"))
+                if idle and name.startswith(PSEUDO_DISKS):
+                    continue
+                busy = f", occupé {device['busy_percent']}%" if "busy_percent" in device else ""
+                console.print(f"{name}: lecture {device['read_iops']:g} op/s {format_rate(device['read_bytes_per_s'])}, "
+                              f"écriture {device['write_iops']:g} op/s {format_rate(device['write_bytes_per_s'])}{busy}")
             console.print()
         
         if type == "all" or type == "network":
-            net_info = system_service.get_network_info()
-            console.print("[bold cyan]--- Réseau ---[/bold cyan]")
-            console.print(f"Octets envoyés: {net_info['bytes_sent']}")
-            console.print(f"Octets reçus: {net_info['bytes_recv']}")
-            console.print(f"Paquets envoyés: {net_info['packets_sent']}")
-            console.print(f"Paquets reçus: {net_info['packets_recv']}")
+            from .dashboard import format_rate
+            
+            net_info = services.system.get_network_info(interval)
+            console.print(f"[bold cyan]--- Réseau (sur {net_info['interval']:g} s) ---[/bold cyan]")
+            for name, nic in net_info["interfaces"].items():
+                state = "actif" if nic["is_up"] else "inactif"
+                line = (f"{name} ({state}): ↓ {format_rate(nic['recv_bytes_per_s'])} {nic['recv_packets_per_s']:g} paq/s, "
+                        f"↑ {format_rate(nic['sent_bytes_per_s'])} {nic['sent_packets_per_s']:g} paq/s")
+                if nic["error_rate"]:
+                    line += f", [red]erreurs et pertes {nic['error_rate']:.2%}[/red]"
+                console.print(line)
             console.print()
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des informations système: {str(e)}")
-        console.print(f"[bold red]Erreur:[/bold red] {str(e)}")
+        print_error(str(e))
+
+# Périphériques virtuels masqués dans `sys` quand ils sont inactifs
+PSEUDO_DISKS = ("loop", "ram", "zram")
+
+def short_size(value: Optional[int]) -> str:
+    """Formate une taille en octets sur quelques caractères (1.5K, 340M...)."""
+    if value is None:
+        return "-"
+    for unit in ("", "K", "M", "G"):
+        if value < 1024 or unit == "G":
+            return f"{value:.0f}{unit}" if not unit else f"{value:.1f}{unit}"
+        value /= 1024
+
+def show_processes(sort: str, limit: int):
+    """
+    Affiche les processus les plus consommateurs.
+    
+    Args:
+        sort (str): Critère de tri.
+        limit (int): Nombre de processus.
+    """
+    info = services.system.get_process_info(sort, limit)
+    if is_machine_output():
+        emit(info)
+        return
+    
+    # Sans bordures verticales: les neuf colonnes tiennent dans 80 caractères
+    table = Table(title=f"Processus ({len(info['processes'])} sur {info['total']}, tri: {sort})",
+                  box=box.SIMPLE_HEAD, collapse_padding=True, pad_edge=False)
+    table.add_column("PID", justify="right", style="cyan", no_wrap=True)
+    table.add_column("Nom", style="bold", no_wrap=True, max_width=20)
+    table.add_column("Util.", no_wrap=True, max_width=10)
+    for name in ("CPU %", "RSS", "Thr.", "Fich.", "Lu", "Écrit"):
+        table.add_column(name, justify="right", no_wrap=True, style="green" if name == "CPU %" else None)
+    
+    for process in info["processes"]:
+        table.add_row(
+            str(process["pid"]),
+            process["name"],
+            process["username"] or "-",
+            f"{process['cpu_percent']:.1f}",
+            short_size(process["memory_rss"]),
+            str(process["threads"]),
+            str(process["open_files"]),
+            short_size(process["io_read_bytes"]),
+            short_size(process["io_write_bytes"])
+        )
+    console.print(table)
+
+def watch_system(interval: Optional[float], count: int):
+    """
+    Affiche le tableau de bord système, ou un échantillon par période en json/ndjson.
+    
+    Args:
+        interval (float, optional): Période en secondes (par défaut sys_watch_interval).
+        count (int): Nombre de mesures (0 pour illimité).
+    """
+    from .system import SystemSampler
+    
+    config = services.config
+    period = max(0.1, interval if interval is not None else config.get_value("sys_watch_interval", 1.0))
+    try:
+        sampler = SystemSampler(config.get_value("sys_watch_history", 120))
+        if not is_machine_output():
+            from .dashboard import SystemDashboard
+            SystemDashboard(sampler, period, console).run(count)
+            return
+        
+        with RecordWriter() as writer:
+            taken = 0
+            next_tick = time.monotonic()
+            while not count or taken < count:
+                if taken:
+                    next_tick += period
+                    time.sleep(max(0.0, next_tick - time.monotonic()))
+                writer.write(sampler.sample())
+                taken += 1
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Erreur lors du suivi du système: {str(e)}")
+        print_error(str(e))
 
 @app.command("http")
 def http_request(
@@ -235,7 +580,12 @@ def http_request(
     """
     try:
         with console.status(f"[bold green]Envoi d'une requête {method} à {url}...[/bold green]"):
-            response = network_service.http_request(url, method, headers, data, timeout)
+            response = services.network.http_request(url, method, headers, data, timeout)
+        
+        if is_machine_output():
+            # Le contenu est sérialisé tel quel, sans nouvelle analyse ni indentation
+            emit(response)
+            return
         
         console.print(f"[bold]Status:[/bold] [{'green' if response['status_code'] < 400 else 'red'}]{response['status_code']} {response['reason']}[/{'green' if response['status_code'] < 400 else 'red'}]")
         
@@ -249,12 +599,12 @@ def http_request(
             try:
                 # Tenter de formater le JSON pour une meilleure lisibilité
                 content = response['content']
-                rprint(format_response(content))
+                print_response(content)
             except:
                 console.print(response['content'])
     except Exception as e:
         logger.error(f"Erreur lors de la requête HTTP: {str(e)}")
-        console.print(f"[bold red]Erreur:[/bold red] {str(e)}")
+        print_error(str(e))
 
 @app.command("code")
 def generate_code(
@@ -266,7 +616,11 @@ def generate_code(
     """
     try:
         with console.status(f"[bold green]Génération de code {language}...[/bold green]"):
-            code = ai_service.generate_code(description, language)
+            code = services.ai.generate_code(description, language)
+        
+        if is_machine_output():
+            emit({"language": language, "code": code})
+            return
         
         console.print(f"[bold green]Code {language} généré:[/bold green]")
         console.print(f"```{language}")
@@ -274,7 +628,344 @@ def generate_code(
         console.print("```")
     except Exception as e:
         logger.error(f"Erreur lors de la génération de code: {str(e)}")
-        console.print(f"[bold red]Erreur:[/bold red] {str(e)}")
+        print_error(str(e))
+
+@app.command("run")
+def run_script(
+    script: str = typer.Argument(..., help="Script de commandes (texte, une commande par ligne, ou YAML)"),
+    concurrency: Optional[int] = typer.Option(None, "--concurrency", "-c", help="Étapes simultanées maximum"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Fichier JSON des résultats de chaque étape")
+):
+    """
+    Exécuter un script de commandes, en parallèle quand les étapes sont indépendantes.
+    """
+    import json
+    from .runner import ScriptRunner, parse_script
+    
+    styles = {"ok": "green", "error": "red", "skipped": "yellow"}
+    
+    def report(step):
+        detail = f" ({step.error})" if step.error else ""
+        duration = f" {step.duration:.2f}s" if step.duration is not None else ""
+        console.print(f"[{styles[step.status]}]{step.status:<7}[/{styles[step.status]}] {step.id}{duration}{detail}",
+                      highlight=False)
+    
+    # En NDJSON, chaque étape est écrite dès qu'elle se termine
+    writer = RecordWriter() if get_output_mode() == "ndjson" else None
+    if writer:
+        on_step = lambda step: writer.write(step.to_dict())
+    else:
+        on_step = None if is_machine_output() else report
+    
+    try:
+        runner = ScriptRunner(services.config, services, concurrency)
+        steps = parse_script(script)
+        summary = runner.run(steps, on_step=on_step)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'exécution du script: {str(e)}")
+        print_error(str(e))
+        raise typer.Exit(1)
+    
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if is_machine_output():
+        if writer:
+            writer.write({key: value for key, value in summary.items() if key != "steps"})
+        else:
+            emit(summary)
+        if summary["error"] or summary["skipped"]:
+            raise typer.Exit(1)
+        return
+    
+    table = Table(title=f"Script {os.path.basename(script)}")
+    table.add_column("Étape", style="cyan", no_wrap=True)
+    table.add_column("Commande")
+    table.add_column("Dépend de")
+    table.add_column("État", no_wrap=True)
+    table.add_column("Début", justify="right", no_wrap=True)
+    table.add_column("Durée", justify="right", no_wrap=True)
+    table.add_column("Résultat")
+    for step in summary["steps"]:
+        result = step["error"] or step["result"]
+        preview = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+        table.add_row(
+            step["id"],
+            step["command"],
+            ", ".join(step["depends_on"]) or "-",
+            f"[{styles[step['status']]}]{step['status']}[/{styles[step['status']]}]",
+            f"{step['started']:.2f}" if step["started"] is not None else "-",
+            f"{step['duration']:.2f}" if step["duration"] is not None else "-",
+            preview.replace("\n", " ")[:40] if preview else "-"
+        )
+    console.print(table)
+    
+    speedup = summary["step_time"] / summary["elapsed"] if summary["elapsed"] else 1.0
+    console.print(f"{len(steps)} étapes en {summary['elapsed']:.2f}s ({summary['step_time']:.2f}s cumulées, ×{speedup:.1f}) · "
+                  f"{summary['ok']} réussies, {summary['error']} en échec, {summary['skipped']} ignorées", highlight=False)
+    
+    if output:
+        console.print(f"[green]Résultats enregistrés dans {output}[/green]")
+    if summary["error"] or summary["skipped"]:
+        raise typer.Exit(1)
+
+@app.command("shell")
+def interactive_shell():
+    """
+    Ouvrir un shell interactif qui garde les services chauds entre les commandes.
+    """
+    from .shell import Shell
+    Shell(services.config).run()
+
+@app.command("daemon")
+def manage_daemon(
+    action: str = typer.Argument("status", help="Action: start, stop ou status")
+):
+    """
+    Gérer le démon qui garde les services chauds entre les commandes.
+    """
+    from . import daemon
+    
+    if action == "start":
+        with console.status("[bold green]Démarrage du démon...[/bold green]"):
+            status = daemon.start()
+        if status is None:
+            print_error(f"le démon n'a pas démarré (voir {daemon.socket_path()}.log)")
+            raise typer.Exit(1)
+    elif action == "stop":
+        stopped = daemon.control("stop") is not None
+        if is_machine_output():
+            emit({"running": False, "stopped": stopped})
+        elif stopped:
+            console.print("[green]Démon arrêté[/green]")
+        else:
+            console.print("[yellow]Aucun démon en cours d'exécution[/yellow]")
+        return
+    elif action == "status":
+        status = daemon.control("status")
+        if status is None:
+            if is_machine_output():
+                emit({"running": False})
+            else:
+                console.print("[yellow]Aucun démon en cours d'exécution[/yellow]")
+            return
+    else:
+        print_error(f"Action inconnue: {action}")
+        raise typer.Exit(1)
+    
+    if is_machine_output():
+        emit(dict(status, running=True))
+        return
+    
+    table = Table(title="Démon AITerminal")
+    table.add_column("Paramètre", style="cyan")
+    table.add_column("Valeur", style="green")
+    table.add_row("PID", str(status["pid"]))
+    table.add_row("Socket", status["socket"])
+    table.add_row("Répertoire", status["cwd"])
+    table.add_row("Actif depuis", f"{status['uptime']:.0f}s")
+    table.add_row("Commandes traitées", str(status["requests"]))
+    table.add_row("Inactif depuis", f"{status['idle']:.0f}s (arrêt après {status['idle_timeout']:.0f}s)")
+    table.add_row("Services chargés", ", ".join(status["services"]) or "-")
+    console.print(table)
+
+@app.command("stats")
+def usage_stats(
+    by: str = typer.Option("task,model", "--by", "-b", help="Regroupement: source, task, model (séparés par des virgules)"),
+    since: Optional[str] = typer.Option(None, "--since", help="Période à couvrir, ex: 30m, 24h, 7d")
+):
+    """
+    Afficher la consommation de tokens, la latence et le coût des appels IA.
+    """
+    try:
+        group_by = [key.strip() for key in by.split(",") if key.strip()]
+        tracker = get_usage_tracker()
+        tracker.configure(services.config)
+        
+        if tracker.log_path:
+            start = time.time() - parse_duration(since) if since else None
+            stats = load_usage_log(tracker.log_path, group_by, since=start, tracker=tracker)
+            origin = tracker.log_path
+        else:
+            stats = tracker.get_stats(group_by)
+            origin = "processus courant"
+            if not is_machine_output():
+                console.print("[yellow]Journal d'usage désactivé: seuls les appels de ce processus sont comptés. "
+                              "Activez-le avec 'usage_log_path' dans config.json.[/yellow]")
+        
+        if is_machine_output():
+            emit(dict(stats, origin=origin))
+            return
+        
+        if not stats["groups"]:
+            console.print(f"Aucun appel IA enregistré ({origin}).")
+            return
+        
+        table = Table(title=f"Usage IA ({origin})")
+        for key in stats["group_by"]:
+            table.add_column(key.capitalize(), style="cyan")
+        for column in ("Appels", "Err.", "Tok. entrée", "dont cache", "Tok. sortie", "Moy. (ms)", "Max (ms)", "Coût ($)"):
+            table.add_column(column, justify="right", style="green")
+        
+        for row in stats["groups"] + [dict({key: "TOTAL" for key in stats["group_by"]}, **stats["totals"])]:
+            table.add_row(
+                *[str(row[key]) for key in stats["group_by"]],
+                str(int(row["calls"])),
+                str(int(row["errors"])),
+                str(int(row["prompt_tokens"])),
+                str(int(row["cached_tokens"])),
+                str(int(row["completion_tokens"])),
+                f"{row['latency_ms_avg']:.0f}",
+                f"{row['latency_ms_max']:.0f}",
+                f"{row['cost_usd']:.4f}"
+            )
+        
+        console.print(table)
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture des statistiques: {str(e)}")
+        print_error(str(e))
+
+@app.command("history")
+def system_history(
+    range_: str = typer.Option("24h", "--range", "-r", help="Période couverte, ex: 1h, 24h, 7d"),
+    step: Optional[str] = typer.Option(None, "--step", "-s", help="Pas des points, ex: 1m, 1h (défaut: un point par colonne)"),
+    aggregation: str = typer.Option("avg", "--agg", "-a", help="Agrégation: avg, min ou max"),
+    series: Optional[str] = typer.Option(None, "--series",
+                                         help="Séries (cpu, memory, disk_read, disk_write, net_recv, net_sent, ping_rtt)"),
+    record: bool = typer.Option(False, "--record", help="Enregistrer l'historique au premier plan (Ctrl+C pour arrêter)")
+):
+    """
+    Afficher (ou enregistrer) l'historique des métriques système.
+    """
+    from .timeseries import MetricsRecorder, format_series_value, get_history_store
+    
+    if record:
+        recorder = MetricsRecorder(services.config)
+        if not recorder.start():
+            print_error(f"un autre processus enregistre déjà dans {recorder.store.directory}")
+            raise typer.Exit(1)
+        console.print(f"[green]Enregistrement dans {recorder.store.directory} toutes les {recorder.interval:g} s "
+                      f"(Ctrl+C pour arrêter)[/green]")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            recorder.stop()
+            console.print(f"{recorder.samples} échantillons enregistrés")
+        return
+    
+    try:
+        end = time.time()
+        duration = parse_duration(range_)
+        width = max(10, console.width - 52)
+        names = [name.strip() for name in series.split(",") if name.strip()] if series else None
+        result = get_history_store(services.config).query(
+            end - duration, end, parse_duration(step) if step else duration / width, aggregation, names
+        )
+        if is_machine_output():
+            emit(result)
+            return
+        
+        from .dashboard import sparkline
+        
+        console.print(f"[bold cyan]Historique sur {range_}[/bold cyan] (pas {result['step']:g} s, "
+                      f"résolution {result['resolution']} s, {aggregation})")
+        for name, values in result["series"].items():
+            known = [value for value in values if value is not None]
+            if not known:
+                console.print(f"{name:<11} [dim]aucune donnée[/dim]")
+                continue
+            points = [value if value is not None else 0.0 for value in values]
+            console.print(f"{name:<11} [green]{sparkline(points, width, 100.0 if name in ('cpu', 'memory') else None)}[/green] "
+                          f"moy {format_series_value(name, sum(known) / len(known))}, "
+                          f"max {format_series_value(name, max(known))}")
+        if not any(value is not None for values in result["series"].values() for value in values):
+            console.print("[yellow]Aucun échantillon: activez 'metrics_history' ou lancez 'aiterminal history --record'.[/yellow]")
+    except ValueError as e:
+        print_error(str(e))
+        raise typer.Exit(1)
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture de l'historique: {str(e)}")
+        print_error(str(e))
+
+@app.command("anomalies")
+def system_anomalies(
+    range_: str = typer.Option("24h", "--range", "-r", help="Période analysée, ex: 1h, 24h, 7d"),
+    baseline: str = typer.Option("7d", "--baseline", "-b", help="Historique de référence lu avant la fin de la période"),
+    step: str = typer.Option("1m", "--step", "-s", help="Pas des séries analysées"),
+    threshold: Optional[float] = typer.Option(None, "--threshold", "-t", help="Seuil en écarts types (défaut: anomaly_threshold)"),
+    explain: bool = typer.Option(False, "--explain", "-e", help="Faire expliquer les anomalies par l'IA")
+):
+    """
+    Détecter les anomalies dans l'historique des métriques système.
+    """
+    from .anomaly import AnomalyDetector
+    from .timeseries import format_series_value
+    
+    try:
+        end = time.time()
+        detector = AnomalyDetector(services.config, services.ai if explain else None)
+        if threshold is not None:
+            detector.threshold = threshold
+        with console.status("[bold green]Analyse de l'historique...[/bold green]"):
+            result = detector.analyze(end - parse_duration(range_), end, parse_duration(baseline),
+                                      parse_duration(step), explain)
+        if is_machine_output():
+            emit(result)
+            return
+        
+        anomalies = result["anomalies"]
+        console.print(f"[bold cyan]Anomalies sur {range_}[/bold cyan] ({result['points']} points au pas de "
+                      f"{result['step']:g} s, référence {baseline})")
+        if not anomalies:
+            console.print("[green]Aucune anomalie détectée.[/green]")
+            return
+        
+        clock = lambda timestamp: time.strftime("%d/%m %H:%M", time.localtime(timestamp))
+        table = Table(box=box.SIMPLE_HEAD, collapse_padding=True, pad_edge=False)
+        table.add_column("Série", style="cyan", no_wrap=True)
+        table.add_column("Début", no_wrap=True)
+        table.add_column("Fin", no_wrap=True)
+        table.add_column("Pic", justify="right", style="red", no_wrap=True)
+        table.add_column("Habituel", justify="right", style="green", no_wrap=True)
+        table.add_column("σ", justify="right", no_wrap=True)
+        if explain:
+            table.add_column("Explication", ratio=1)
+        for anomaly in anomalies:
+            name = anomaly["series"]
+            row = [name, clock(anomaly["start"]), clock(anomaly["end"]),
+                   format_series_value(name, anomaly["peak_value"]), format_series_value(name, anomaly["expected"]),
+                   f"{anomaly['zscore']:+.1f}"]
+            if explain:
+                if anomaly.get("explanation_unavailable"):
+                    row.append("[dim]indisponible (IA hors ligne)[/dim]")
+                else:
+                    row.append(anomaly.get("explanation") or "[dim]-[/dim]")
+            table.add_row(*row)
+        console.print(table)
+    except ValueError as e:
+        print_error(str(e))
+        raise typer.Exit(1)
+    except Exception as e:
+        logger.error(f"Erreur lors de la détection d'anomalies: {str(e)}")
+        print_error(str(e))
+
+@app.command("serve")
+def serve_web(
+    host: str = typer.Option("0.0.0.0", "--host", help="Adresse d'écoute"),
+    port: int = typer.Option(5000, "--port", "-p", help="Port d'écoute"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", help="Nombre de processus (par défaut asgi_workers)")
+):
+    """
+    Servir l'interface web et les routes /api/* en mode asynchrone (ASGI, uvicorn).
+    """
+    from .asgi import serve
+    
+    try:
+        serve(host, port, workers)
+    except Exception as e:
+        print_error(str(e))
+        raise typer.Exit(1)
 
 @app.command("help")
 def show_help():
@@ -296,6 +987,13 @@ def show_help():
         ("sys", "Afficher des informations système"),
         ("http", "Envoyer une requête HTTP"),
         ("code", "Générer du code avec l'IA"),
+        ("stats", "Afficher l'usage des tokens, la latence et le coût des appels IA"),
+        ("history", "Afficher ou enregistrer l'historique des métriques système"),
+        ("anomalies", "Détecter (et expliquer par l'IA) les anomalies de l'historique"),
+        ("run", "Exécuter un script de commandes en parallèle (texte ou YAML)"),
+        ("shell", "Ouvrir un shell interactif (historique, complétion, tâches de fond)"),
+        ("daemon", "Gérer le démon qui garde les services chauds (start, stop, status)"),
+        ("serve", "Servir l'interface web en mode asynchrone (ASGI, uvicorn)"),
         ("help", "Afficher cette aide")
     ]
     
@@ -314,19 +1012,26 @@ def show_help():
     console.print("\n[bold]Exemples d'utilisation:[/bold]")
     console.print("  aiterminal config --api-key=your-api-key")
     console.print("  aiterminal ai \"Explique-moi comment fonctionne l'apprentissage par renforcement\"")
+    console.print("  aiterminal ai \"Et en pratique ?\" --session=projet")
     console.print("  aiterminal analyze \"Ce produit est incroyable !\" --type=sentiment")
+    console.print("  aiterminal analyze --input=avis.jsonl --type=sentiment --output=resultats.jsonl --concurrency=16")
     console.print("  aiterminal search \"Python best practices 2023\"")
     console.print("  aiterminal ping google.com")
     console.print("  aiterminal sys --type=cpu")
     console.print("  aiterminal http https://api.example.com/data")
     console.print("  aiterminal code \"Fonction pour calculer le nombre de Fibonacci\" --language=python")
+    console.print("  aiterminal stats --by=source,model --since=24h")
+    console.print("  aiterminal --output=ndjson ping google.com | jq .time_ms")
+    console.print("  aiterminal run script.yaml --output=resultats.json")
+    console.print("  aiterminal shell")
+    console.print("  AITERMINAL_DAEMON=1 aiterminal sys --type=memory")
 
 def run_cli():
     """
     Point d'entrée pour l'exécution du CLI.
     """
     try:
-        app()
+        app(prog_name="aiterminal")
     except Exception as e:
         logger.error(f"Erreur non gérée: {str(e)}")
         console.print(f"[bold red]Erreur fatale:[/bold red] {str(e)}")
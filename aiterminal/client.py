@@ -0,0 +1,289 @@
+"""
+Module du client léger du démon AITerminal.
+Transmet une commande au démon par socket Unix et restitue sa sortie au fil de l'eau.
+N'importe que la bibliothèque standard pour que le démarrage reste minimal.
+"""
+
+import os
+import sys
+import json
+import stat
+import socket
+import struct
+import hashlib
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+# Trames échangées: type (1 octet) + longueur (4 octets) + contenu
+FRAME_HEADER = struct.Struct(">cI")
+FRAME_REQUEST = b"r"
+FRAME_STDOUT = b"o"
+FRAME_STDERR = b"e"
+FRAME_EXIT = b"x"
+
+# Variables transmises au démon avec chaque commande (config.ENV_PREFIX, non importé pour démarrer vite)
+ENV_PREFIX = "AITERMINAL_"
+
+# Commandes toujours exécutées dans le processus courant (le shell a besoin du terminal)
+LOCAL_COMMANDS = {"daemon", "shell"}
+
+# Options globales suivies d'une valeur (à ne pas confondre avec le nom de la commande)
+GLOBAL_VALUE_OPTIONS = {"--output", "--set", "--profile-output"}
+
+def send_frame(sock: socket.socket, kind: bytes, payload: bytes):
+    """Envoie une trame."""
+    sock.sendall(FRAME_HEADER.pack(kind, len(payload)) + payload)
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connexion au démon interrompue")
+        data += chunk
+    return data
+
+def recv_frame(sock: socket.socket) -> Tuple[bytes, bytes]:
+    """Reçoit une trame et retourne (type, contenu)."""
+    kind, size = FRAME_HEADER.unpack(_recv_exact(sock, FRAME_HEADER.size))
+    return kind, _recv_exact(sock, size) if size else b""
+
+def config_path(cwd: Optional[str] = None) -> str:
+    """Chemin du config.json utilisé par une commande lancée depuis `cwd`."""
+    return os.path.join(os.path.abspath(cwd or os.getcwd()), "config.json")
+
+def runtime_dir() -> str:
+    """
+    Répertoire privé (0700) des sockets et journaux des démons de l'utilisateur.
+    
+    $XDG_RUNTIME_DIR/aiterminal, sinon $TMPDIR/aiterminal-<uid> (ou /tmp). Il est
+    créé au besoin ; un répertoire existant doit appartenir à l'utilisateur et ne
+    pas être un lien symbolique, sans quoi un autre utilisateur pourrait y placer
+    son propre socket.
+    
+    Returns:
+        str: Le chemin du répertoire.
+    
+    Raises:
+        PermissionError: Si le chemin n'est pas un répertoire de l'utilisateur.
+    """
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base:
+        path = os.path.join(base, "aiterminal")
+    else:
+        path = os.path.join(os.environ.get("TMPDIR") or "/tmp", f"aiterminal-{os.getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"Répertoire du démon non sûr: {path} (répertoire d'un autre utilisateur ou lien)")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+def socket_path(cwd: Optional[str] = None) -> str:
+    """
+    Chemin du socket du démon associé à un fichier de configuration.
+    
+    Un démon sert un seul config.json (celui du répertoire courant), son socket
+    est donc dérivé du chemin de ce fichier.
+    
+    Args:
+        cwd (str, optional): Répertoire de la commande (par défaut le répertoire courant).
+    
+    Returns:
+        str: Le chemin du socket Unix, dans runtime_dir().
+    
+    Raises:
+        PermissionError: Si le répertoire des sockets n'est pas sûr.
+    """
+    digest = hashlib.sha1(config_path(cwd).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(runtime_dir(), f"{digest}.sock")
+
+def _read_settings(cwd: str) -> Dict[str, Any]:
+    try:
+        with open(config_path(cwd), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def daemon_enabled(cwd: Optional[str] = None) -> bool:
+    """
+    Indique si les commandes doivent passer par le démon.
+    
+    La variable d'environnement AITERMINAL_DAEMON (1/0) a priorité sur l'option
+    'daemon' de config.json.
+    """
+    env = os.environ.get("AITERMINAL_DAEMON")
+    if env is not None:
+        return env.strip().lower() in ("1", "true", "yes", "on")
+    return bool(_read_settings(cwd or os.getcwd()).get("daemon", False))
+
+def spawn_daemon(cwd: Optional[str] = None) -> subprocess.Popen:
+    """
+    Lance le démon en arrière-plan, détaché du terminal.
+    
+    Args:
+        cwd (str, optional): Répertoire de travail du démon (celui de config.json).
+    
+    Returns:
+        subprocess.Popen: Le processus lancé.
+    """
+    cwd = os.path.abspath(cwd or os.getcwd())
+    path = socket_path(cwd)
+    # Le démon doit importer ce même paquet, même s'il n'est pas installé
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Les variables AITERMINAL_* accompagnent chaque commande: le démon ne garde pas celles du client qui l'a lancé
+    env = {key: value for key, value in os.environ.items() if not key.startswith(ENV_PREFIX)}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+    # O_NOFOLLOW: un lien symbolique à la place du journal ne doit pas rediriger l'écriture
+    log = os.open(path + ".log", os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    try:
+        return subprocess.Popen(
+            [sys.executable, "-m", "aiterminal.daemon", "--socket", path],
+            cwd=cwd, env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True
+        )
+    finally:
+        os.close(log)
+
+def _peer_uid(sock: socket.socket) -> Optional[int]:
+    """Utilisateur du processus à l'autre bout du socket, ou None si le système ne le fournit pas."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", credentials)[1]
+
+def connect(path: str, timeout: float = 0.5) -> Optional[socket.socket]:
+    """
+    Se connecte au démon de l'utilisateur.
+    
+    Le socket doit appartenir à l'utilisateur courant, de même que le processus
+    qui l'écoute (SO_PEERCRED, lorsque le système le fournit) : les commandes et
+    leur sortie ne doivent pas transiter par le processus d'un autre utilisateur.
+    
+    Returns:
+        Optional[socket.socket]: La connexion, ou None si le démon ne répond pas ou n'est pas celui de l'utilisateur.
+    """
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return None
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+        peer_uid = _peer_uid(sock)
+    except OSError:
+        sock.close()
+        return None
+    if peer_uid is not None and peer_uid != os.getuid():
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+def request(sock: socket.socket, payload: Dict[str, Any], stdout=None, stderr=None) -> int:
+    """
+    Envoie une requête au démon et recopie sa sortie jusqu'au code de retour.
+    
+    Args:
+        sock (socket.socket): La connexion au démon.
+        payload (Dict[str, Any]): La requête.
+        stdout: Flux de sortie (par défaut sys.stdout).
+        stderr: Flux d'erreur (par défaut sys.stderr).
+    
+    Returns:
+        int: Le code de retour de la commande.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    send_frame(sock, FRAME_REQUEST, json.dumps(payload).encode("utf-8"))
+    while True:
+        kind, data = recv_frame(sock)
+        if kind == FRAME_STDOUT:
+            stdout.write(data.decode("utf-8", "replace"))
+            stdout.flush()
+        elif kind == FRAME_STDERR:
+            stderr.write(data.decode("utf-8", "replace"))
+            stderr.flush()
+        elif kind == FRAME_EXIT:
+            return int(data or 0)
+
+def _command_name(argv: List[str]) -> Optional[str]:
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg in GLOBAL_VALUE_OPTIONS:
+            skip = True
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+def _runs_locally(argv: List[str]) -> bool:
+    command = _command_name(argv)
+    if command in LOCAL_COMMANDS:
+        return True
+    # Les analyses de fichiers sont longues et doivent recevoir Ctrl-C pour enregistrer leur reprise
+    if command == "analyze":
+        return any(arg in ("--input", "-i") or arg.startswith("--input=") for arg in argv)
+    # Le tableau de bord continu et l'enregistreur d'historique ont besoin du terminal et de Ctrl-C
+    if command == "history":
+        return "--record" in argv
+    return command == "sys" and any(arg in ("--watch", "-w") for arg in argv)
+
+def client_environment() -> Dict[str, str]:
+    """Variables AITERMINAL_* du client, appliquées par le démon le temps de la commande."""
+    return {key: value for key, value in os.environ.items() if key.startswith(ENV_PREFIX)}
+
+def forward(argv: List[str]) -> Optional[int]:
+    """
+    Exécute une commande via le démon si le mode démon est activé.
+    
+    Si le démon ne répond pas, il est lancé en arrière-plan pour les commandes
+    suivantes et la commande courante s'exécute dans ce processus. Les variables
+    AITERMINAL_* du client (AITERMINAL_OUTPUT, AITERMINAL_<CLÉ>) sont transmises
+    avec la commande.
+    
+    Args:
+        argv (List[str]): Les arguments de la commande.
+    
+    Returns:
+        Optional[int]: Le code de retour, ou None si la commande doit s'exécuter localement.
+    """
+    if _runs_locally(argv) or not daemon_enabled():
+        return None
+    
+    try:
+        path = socket_path()
+    except OSError:
+        return None
+    sock = connect(path)
+    if sock is None:
+        try:
+            spawn_daemon()
+        except OSError:
+            pass
+        return None
+    
+    try:
+        columns = os.get_terminal_size(sys.stdout.fileno()).columns if sys.stdout.isatty() else None
+    except OSError:
+        columns = None
+    try:
+        return request(sock, {"argv": argv, "isatty": sys.stdout.isatty(), "columns": columns,
+                              "env": client_environment()})
+    except BrokenPipeError:
+        # Sortie fermée par le lecteur (par exemple `| head`): fin silencieuse
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (ConnectionError, OSError):
+        # Le démon s'est arrêté pendant la commande: la sortie est incomplète
+        sys.stderr.write("Connexion au démon AITerminal perdue\n")
+        return 1
+    finally:
+        sock.close()
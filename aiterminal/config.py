@@ -4,76 +4,335 @@ Gère le chargement et l'enregistrement des paramètres de configuration.
 """
 
 import os
+import copy
 import json
+import time
 import logging
+import tempfile
+import threading
+import weakref
 from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
 
 logger = logging.getLogger(__name__)
 
+# Préfixe des variables d'environnement qui surchargent la configuration (ex: AITERMINAL_MODEL)
+ENV_PREFIX = "AITERMINAL_"
+
+# Intervalle minimal entre deux vérifications de config.json (secondes)
+RELOAD_CHECK_INTERVAL = 1.0
+
 DEFAULT_CONFIG = {
     "api_key": "",
     "model": "gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
+    "base_url": "",
     "max_tokens": 2000,
     "temperature": 0.7,
     "search_engine": "duckduckgo",
     "timeout": 30,
-    "history_size": 10
+    "history_size": 10,
+    "history_max_tokens": 3000,
+    "history_summary_max_tokens": 300,
+    "session_dir": "",
+    "retry_max_attempts": 3,
+    "retry_base_delay": 0.5,
+    "retry_max_delay": 8.0,
+    "circuit_failure_threshold": 5,
+    "circuit_reset_timeout": 30,
+    "connect_timeout": 5,
+    "http_max_connections": 100,
+    "http_max_keepalive": 20,
+    "model_routing": {
+        "enabled": True,
+        "fallback_model": "gpt-4o-mini",
+        "primary_timeout": 15,
+        "stats_max_age": 300,
+        "rules": [
+            {"tasks": ["sentiment", "entities"], "max_prompt_tokens": 1000, "model": "gpt-4o-mini"},
+            {"tasks": ["summary"], "max_prompt_tokens": 500, "model": "gpt-4o-mini"}
+        ]
+    },
+    "usage_log_path": "",
+    "usage_log_max_bytes": 10485760,
+    "usage_log_backups": 3,
+    "bulk_concurrency": 8,
+    "bulk_rate_limit": 0,
+    "bulk_checkpoint_interval": 2.0,
+    "daemon": False,
+    "daemon_idle_timeout": 600,
+    "daemon_preload": ["system", "ai"],
+    "shell_history_file": "",
+    "shell_history_size": 1000,
+    "run_concurrency": 4,
+    "sys_watch_interval": 1.0,
+    "sys_watch_history": 120,
+    "process_sample_interval": 0.5,
+    "sys_sample_interval": 1.0,
+    "sys_sample_max_age": 30.0,
+    "metrics_history": False,
+    "metrics_history_dir": "",
+    "metrics_history_interval": 10,
+    "metrics_history_tiers": [],
+    "metrics_history_ping_host": "",
+    "anomaly_threshold": 4.0,
+    "anomaly_ewma_alpha": 0.1,
+    "anomaly_explain_batch": 10,
+    "anomaly_explain_max": 20,
+    "jobs_workers": 4,
+    "jobs_max_queued": 100,
+    "jobs_timeout": 60,
+    "jobs_max_timeout": 600,
+    "jobs_result_ttl": 600,
+    "jobs_db_path": "",
+    "ws_max_commands": 8,
+    "ws_send_queue": 256,
+    "metrics_stream_interval": 1.0,
+    "asgi_workers": 1,
+    "asgi_blocking_threads": 32,
+    "asgi_shutdown_timeout": 30,
+    "admission_enabled": True,
+    "rate_limits": {
+        "/api/generate": {"rate": 1, "burst": 10},
+        "/api/analyze": {"rate": 1, "burst": 10},
+        "/api/network/ping": {"rate": 2, "burst": 20},
+        "/api/network/http": {"rate": 5, "burst": 20},
+        "/api/jobs": {"rate": 2, "burst": 20}
+    },
+    "upstream_concurrency": {"openai": 32, "http": 32, "ping": 8},
+    "api_clients": {},
+    "rate_limit_trust_proxy": False,
+    "rate_limit_max_clients": 10000
 }
 
 class Config:
-    """Classe pour gérer la configuration de l'application."""
+    """
+    Classe pour gérer la configuration de l'application.
+    
+    Les valeurs sont résolues par couches, de la moins à la plus prioritaire :
+    valeurs par défaut, config.json, variables d'environnement AITERMINAL_<CLÉ>
+    et surcharges de la ligne de commande. Le fichier est relu uniquement si sa
+    date de modification, son inode ou sa taille change, et réécrit de façon
+    atomique. Les abonnés sont prévenus des clés modifiées.
+    """
     
-    def __init__(self, config_path=None):
+    def __init__(self, config_path=None, overrides: Optional[Dict[str, Any]] = None):
         """
         Initialise la configuration.
         
         Args:
             config_path (str, optional): Chemin vers le fichier de configuration. 
                                          Par défaut, utilise config.json dans le répertoire courant.
+            overrides (Dict[str, Any], optional): Surcharges prioritaires (ligne de commande).
         """
         self.config_path = config_path or os.path.join(os.getcwd(), "config.json")
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._overrides = dict(overrides or {})
+        self._file_config: Dict[str, Any] = {}
+        self._file_stamp = None
+        self._next_check = 0.0
         self.config = self._load_config()
     
-    def _load_config(self):
+    def _file_signature(self):
+        """Identifie la version du fichier (mtime, inode, taille), ou None s'il n'existe pas."""
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+    
+    def _read_file(self, strict: bool = False) -> Dict[str, Any]:
         """
-        Charge la configuration depuis le fichier.
-        Si le fichier n'existe pas, crée une configuration par défaut.
+        Lit config.json.
+        
+        Args:
+            strict (bool): Lever une exception si le fichier existe mais est invalide.
         
         Returns:
-            dict: La configuration chargée.
+            dict: Le contenu du fichier (vide s'il n'existe pas ou s'il est invalide).
+        
+        Raises:
+            Exception: Si `strict` et que le fichier ne peut pas être lu.
         """
         try:
-            if not os.path.exists(self.config_path):
-                logger.info(f"Fichier de configuration non trouvé à {self.config_path}. Création par défaut.")
-                self._save_config(DEFAULT_CONFIG)
-                return DEFAULT_CONFIG.copy()
-            
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                
-            # S'assurer que toutes les clés par défaut sont présentes
-            for key, value in DEFAULT_CONFIG.items():
-                if key not in config:
-                    config[key] = value
-                    
-            return config
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("le fichier doit contenir un objet JSON")
+            return data
+        except FileNotFoundError:
+            return {}
         except Exception as e:
+            if strict:
+                logger.error(f"Configuration illisible, non modifiée ({self.config_path}): {str(e)}")
+                raise Exception(f"Configuration illisible, non modifiée ({self.config_path}): {str(e)}")
             logger.error(f"Erreur lors du chargement de la configuration: {str(e)}")
             logger.info("Utilisation de la configuration par défaut.")
-            return DEFAULT_CONFIG.copy()
+            return {}
+    
+    def _env_config(self) -> Dict[str, Any]:
+        """
+        Lit les surcharges AITERMINAL_<CLÉ> des variables d'environnement.
+        
+        Les valeurs sont interprétées comme du JSON (nombres, booléens, listes),
+        sinon comme du texte.
+        """
+        values = {}
+        for key in DEFAULT_CONFIG:
+            raw = os.environ.get(ENV_PREFIX + key.upper())
+            if raw is None:
+                continue
+            try:
+                values[key] = json.loads(raw)
+            except ValueError:
+                values[key] = raw
+        return values
+    
+    def _merge(self) -> Dict[str, Any]:
+        """Combine les couches: défauts < fichier < environnement < surcharges."""
+        # Copie profonde: les valeurs imbriquées (model_routing...) ne doivent pas modifier DEFAULT_CONFIG
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        config.update(self._file_config)
+        config.update(self._env_config())
+        config.update(self._overrides)
+        return config
+    
+    def _load_config(self):
+        """
+        Charge la configuration depuis le fichier.
+        Le fichier n'est pas créé s'il n'existe pas : les valeurs par défaut s'appliquent.
+        
+        Returns:
+            dict: La configuration chargée.
+        """
+        self._file_stamp = self._file_signature()
+        self._file_config = self._read_file() if self._file_stamp else {}
+        if self._file_stamp is None:
+            logger.debug(f"Fichier de configuration non trouvé à {self.config_path}, valeurs par défaut utilisées")
+        self._next_check = time.monotonic() + RELOAD_CHECK_INTERVAL
+        return self._merge()
     
     def _save_config(self, config):
         """
-        Enregistre la configuration dans le fichier.
+        Enregistre la configuration dans le fichier, de façon atomique.
+        
+        Le contenu est écrit dans un fichier temporaire du même répertoire, puis
+        renommé : un lecteur concurrent voit l'ancien ou le nouveau fichier, jamais
+        un fichier tronqué.
         
         Args:
             config (dict): La configuration à enregistrer.
+        
+        Raises:
+            Exception: Si le fichier ne peut pas être écrit.
         """
+        directory = os.path.dirname(os.path.abspath(self.config_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".config.", suffix=".tmp", dir=directory)
         try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_path)
         except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             logger.error(f"Erreur lors de l'enregistrement de la configuration: {str(e)}")
+            raise Exception(f"Erreur lors de l'enregistrement de la configuration: {str(e)}")
+    
+    def _apply(self, config: Dict[str, Any]):
+        """Remplace la configuration effective et prévient les abonnés des clés modifiées."""
+        with self._lock:
+            previous = self.config
+            self.config = config
+            changed = {key for key in set(previous) | set(config) if previous.get(key) != config.get(key)}
+            subscribers = list(self._subscribers)
+        if not changed:
+            return
+        logger.info(f"Configuration modifiée: {', '.join(sorted(changed))}")
+        for ref in subscribers:
+            callback = ref()
+            if callback is None:
+                continue
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.error(f"Erreur d'un abonné à la configuration: {str(e)}")
+    
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Relit config.json s'il a changé depuis le dernier chargement.
+        
+        Sans `force`, la vérification (un appel à stat) a lieu au plus une fois
+        par RELOAD_CHECK_INTERVAL.
+        
+        Args:
+            force (bool): Vérifier immédiatement.
+        
+        Returns:
+            bool: True si la configuration a été rechargée.
+        """
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        with self._lock:
+            self._next_check = now + RELOAD_CHECK_INTERVAL
+            stamp = self._file_signature()
+            if stamp == self._file_stamp:
+                return False
+            config = self._load_config()
+        self._apply(config)
+        return True
+    
+    def subscribe(self, callback: Callable[[Set[str]], None]):
+        """
+        Abonne une fonction aux changements de configuration.
+        
+        La fonction reçoit l'ensemble des clés dont la valeur effective a changé.
+        Les méthodes liées sont référencées faiblement : s'abonner n'empêche pas
+        la libération de l'objet.
+        
+        Args:
+            callback (Callable[[Set[str]], None]): La fonction à appeler.
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+        with self._lock:
+            self._subscribers = [r for r in self._subscribers if r() is not None] + [ref]
+    
+    def unsubscribe(self, callback: Callable[[Set[str]], None]):
+        """Désabonne une fonction."""
+        with self._lock:
+            self._subscribers = [r for r in self._subscribers if r() is not None and r() != callback]
+    
+    def reload_environment(self):
+        """Relit les variables AITERMINAL_<CLÉ> (le démon applique celles du client à chaque commande)."""
+        with self._lock:
+            config = self._merge()
+        self._apply(config)
+    
+    def set_overrides(self, overrides: Dict[str, Any]):
+        """
+        Remplace les surcharges de la ligne de commande (prioritaires sur tout le reste).
+        
+        Args:
+            overrides (Dict[str, Any]): Les valeurs imposées, par clé.
+        """
+        with self._lock:
+            self._overrides = dict(overrides)
+            config = self._merge()
+        self._apply(config)
+    
+    def set_override(self, key, value):
+        """
+        Impose une valeur sans l'enregistrer dans config.json.
+        
+        Args:
+            key (str): La clé à surcharger.
+            value: La valeur imposée.
+        """
+        with self._lock:
+            overrides = dict(self._overrides, **{key: value})
+        self.set_overrides(overrides)
     
     def get_config(self):
         """
@@ -82,6 +341,7 @@ class Config:
         Returns:
             dict: La configuration actuelle.
         """
+        self.refresh()
         return self.config.copy()
     
     def get_value(self, key, default=None):
@@ -95,18 +355,30 @@ class Config:
         Returns:
             La valeur associée à la clé ou la valeur par défaut si la clé n'existe pas.
         """
+        self.refresh()
         return self.config.get(key, default)
     
     def set_value(self, key, value):
         """
         Définit une valeur dans la configuration et l'enregistre.
         
+        Le fichier est relu juste avant l'écriture afin de conserver les
+        modifications faites entre-temps par un autre processus ; s'il existe
+        mais ne peut pas être lu, il n'est pas écrasé.
+        
         Args:
             key (str): La clé à définir.
             value: La valeur à associer à la clé.
+        
+        Raises:
+            Exception: Si le fichier est illisible ou ne peut pas être écrit.
         """
-        self.config[key] = value
-        self._save_config(self.config)
+        with self._lock:
+            data = self._read_file(strict=True)
+            data[key] = value
+            self._save_config(data)
+            config = self._load_config()
+        self._apply(config)
     
     def get_api_key(self):
         """
@@ -115,7 +387,7 @@ class Config:
         Returns:
             str: La clé API OpenAI.
         """
-        return os.environ.get("OPENAI_API_KEY", self.config.get("api_key", ""))
+        return os.environ.get("OPENAI_API_KEY", self.get_value("api_key", ""))
     
     def get_model(self):
         """
@@ -124,4 +396,34 @@ class Config:
         Returns:
             str: Le nom du modèle OpenAI.
         """
-        return self.config.get("model", "gpt-4o")  # the newest OpenAI model is "gpt-4o"
+        return self.get_value("model", "gpt-4o")  # the newest OpenAI model is "gpt-4o"
+    
+    def get_base_url(self):
+        """
+        Récupère l'URL de base de l'API compatible OpenAI, en priorité depuis les variables d'environnement.
+        Permet de pointer le client vers un serveur local (par exemple aiterminal.mock_openai).
+        
+        Returns:
+            str: L'URL de base, ou None pour utiliser l'API OpenAI par défaut.
+        """
+        return os.environ.get("OPENAI_BASE_URL") or self.get_value("base_url") or None
+
+_shared_configs: Dict[str, Config] = {}
+_shared_lock = threading.Lock()
+
+def get_shared_config(config_path: Optional[str] = None) -> Config:
+    """
+    Retourne l'instance de configuration partagée par le processus pour un fichier.
+    
+    Args:
+        config_path (str, optional): Chemin du fichier (par défaut config.json du répertoire courant).
+    
+    Returns:
+        Config: La configuration partagée, rechargée automatiquement si le fichier change.
+    """
+    path = os.path.abspath(config_path or os.path.join(os.getcwd(), "config.json"))
+    with _shared_lock:
+        config = _shared_configs.get(path)
+        if config is None:
+            config = _shared_configs[path] = Config(path)
+        return config
@@ -0,0 +1,452 @@
+"""
+Module de mémoire conversationnelle.
+Conserve les derniers échanges de chaque session dans un tampon circulaire borné,
+les limite à un budget de tokens et résume progressivement les échanges les plus anciens.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from .config import Config
+from .metrics import get_metrics_registry, record_cache
+from .utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Préfixe fixe de toutes les conversations: il doit rester identique d'un appel
+# à l'autre pour que le cache de prompt du fournisseur puisse s'appliquer
+SYSTEM_PROMPT = (
+    "Tu es AITerminal, un assistant en ligne de commande. "
+    "Réponds de manière concise et précise, dans la langue de l'utilisateur."
+)
+
+SUMMARY_PREFIX = "Résumé des échanges précédents de cette conversation :\n"
+
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# Verrous répartis par session: deux appels sur une même session ne s'écrasent pas
+_SESSION_LOCKS = tuple(threading.Lock() for _ in range(64))
+
+def new_session_id() -> str:
+    """Génère un identifiant de session."""
+    return uuid.uuid4().hex[:12]
+
+def validate_session_id(session_id: str) -> str:
+    """
+    Vérifie qu'un identifiant de session est utilisable comme nom de fichier.
+    
+    Args:
+        session_id (str): L'identifiant à vérifier.
+    
+    Returns:
+        str: L'identifiant.
+    
+    Raises:
+        ValueError: Si l'identifiant contient des caractères non autorisés.
+    """
+    if not _SESSION_ID_PATTERN.match(session_id or ""):
+        raise ValueError(f"Identifiant de session invalide: {session_id!r} (lettres, chiffres, '_', '-', '.')")
+    return session_id
+
+class ConversationSession:
+    """
+    État d'une conversation : résumé glissant et derniers messages.
+    
+    Les messages sont stockés sous forme compacte (rôle, contenu, tokens estimés)
+    dans un deque borné.
+    """
+    
+    def __init__(self, session_id: str, max_messages: int):
+        self.session_id = session_id
+        self.turns: deque = deque(maxlen=max_messages)
+        self.summary = ""
+        self.summary_tokens = 0
+        self.summarized_messages = 0
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+    
+    @property
+    def history_tokens(self) -> int:
+        """Tokens estimés du résumé et des messages conservés."""
+        return self.summary_tokens + sum(turn[2] for turn in self.turns)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Sérialise la session."""
+        return {
+            "session_id": self.session_id,
+            "summary": self.summary,
+            "summarized_messages": self.summarized_messages,
+            "turns": [list(turn) for turn in self.turns],
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_messages: int) -> "ConversationSession":
+        """Reconstruit une session sérialisée par to_dict."""
+        session = cls(data["session_id"], max_messages)
+        session.turns.extend(tuple(turn) for turn in data.get("turns", []))
+        session.summary = data.get("summary", "")
+        session.summary_tokens = estimate_tokens(session.summary)
+        session.summarized_messages = data.get("summarized_messages", 0)
+        session.created_at = data.get("created_at", session.created_at)
+        session.updated_at = data.get("updated_at", session.updated_at)
+        return session
+
+class FileSessionStore:
+    """Stockage des sessions dans un fichier JSON par session (utilisé par la CLI)."""
+    
+    def __init__(self, directory: str):
+        """
+        Initialise le stockage.
+        
+        Args:
+            directory (str): Répertoire des fichiers de session.
+        """
+        self.directory = directory
+    
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{validate_session_id(session_id)}.json")
+    
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Charge une session, ou None si elle n'existe pas."""
+        path = self._path(session_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement de la session {session_id}: {str(e)}")
+            return None
+    
+    def save(self, session_id: str, data: Dict[str, Any]):
+        """Enregistre une session (écriture atomique)."""
+        path = self._path(session_id)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    
+    def delete(self, session_id: str) -> bool:
+        """Supprime une session. Retourne True si elle existait."""
+        path = self._path(session_id)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+    
+    def list_sessions(self) -> List[str]:
+        """Liste les identifiants des sessions enregistrées."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+class MemorySessionStore:
+    """Stockage des sessions en mémoire, borné en LRU (utilisé par l'interface web)."""
+    
+    def __init__(self, max_sessions: int = 1000):
+        """
+        Initialise le stockage.
+        
+        Args:
+            max_sessions (int): Nombre maximal de sessions conservées.
+        """
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Charge une session, ou None si elle n'existe pas."""
+        with self._lock:
+            data = self._sessions.get(validate_session_id(session_id))
+            if data is not None:
+                self._sessions.move_to_end(session_id)
+        record_cache("sessions", data is not None)
+        return data
+    
+    def save(self, session_id: str, data: Dict[str, Any]):
+        """Enregistre une session et évince la moins récemment utilisée si besoin."""
+        with self._lock:
+            self._sessions[validate_session_id(session_id)] = data
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+    
+    def delete(self, session_id: str) -> bool:
+        """Supprime une session. Retourne True si elle existait."""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+    
+    def list_sessions(self) -> List[str]:
+        """Liste les identifiants des sessions conservées."""
+        with self._lock:
+            return list(self._sessions)
+    
+    def count(self) -> int:
+        """Nombre de sessions conservées."""
+        return len(self._sessions)
+
+_memory_store: Optional[MemorySessionStore] = None
+_memory_store_lock = threading.Lock()
+
+def get_memory_store(max_sessions: int = 1000) -> MemorySessionStore:
+    """
+    Récupère le stockage de sessions en mémoire du processus.
+    
+    Args:
+        max_sessions (int): Nombre maximal de sessions (à la création uniquement).
+    
+    Returns:
+        MemorySessionStore: Le stockage partagé.
+    """
+    global _memory_store
+    with _memory_store_lock:
+        if _memory_store is None:
+            _memory_store = MemorySessionStore(max_sessions)
+            get_metrics_registry().gauge(
+                "aiterminal_sessions_in_memory", "Sessions de conversation conservées en mémoire"
+            ).set_function(_memory_store.count)
+        return _memory_store
+
+class ConversationMemory:
+    """
+    Construit les messages d'une conversation dans un budget de tokens.
+    
+    Les messages envoyés commencent toujours par le même message système, suivi
+    du résumé glissant puis des échanges récents dans l'ordre. Entre deux
+    compactages, chaque appel prolonge donc exactement le prompt du précédent.
+    Le compactage retire d'un coup la moitié la plus ancienne de l'historique
+    pour que le préfixe change le moins souvent possible.
+    
+    Les écritures d'une même session sont sérialisées et tiennent compte des
+    échanges enregistrés entre-temps par un autre appel (requêtes simultanées).
+    """
+    
+    def __init__(self, config: Config, store=None):
+        """
+        Initialise la mémoire conversationnelle.
+        
+        Args:
+            config (Config): L'objet de configuration.
+            store (optional): Stockage des sessions (par défaut, fichiers dans session_dir).
+        """
+        self.config = config
+        self.store = store or FileSessionStore(self.session_dir())
+        self.max_messages = max(2, 2 * config.get_value("history_size", 10))
+        self.max_tokens = config.get_value("history_max_tokens", 3000)
+        self.summary_max_tokens = config.get_value("history_summary_max_tokens", 300)
+    
+    def session_dir(self) -> str:
+        """Répertoire des sessions de la CLI (par défaut 'sessions' à côté de config.json)."""
+        return self.config.get_value("session_dir") or os.path.join(
+            os.path.dirname(os.path.abspath(self.config.config_path)), "sessions"
+        )
+    
+    def load(self, session_id: Optional[str] = None) -> ConversationSession:
+        """
+        Charge une session existante ou en crée une nouvelle.
+        
+        Args:
+            session_id (str, optional): L'identifiant de session. Si None, un nouvel identifiant est généré.
+        
+        Returns:
+            ConversationSession: La session.
+        
+        Raises:
+            ValueError: Si l'identifiant est invalide.
+        """
+        session_id = validate_session_id(session_id) if session_id else new_session_id()
+        data = self.store.load(session_id)
+        if data is None:
+            return ConversationSession(session_id, self.max_messages)
+        return ConversationSession.from_dict(data, self.max_messages)
+    
+    @staticmethod
+    def _session_lock(session_id: str) -> threading.Lock:
+        return _SESSION_LOCKS[hash(session_id) % len(_SESSION_LOCKS)]
+    
+    def _write(self, session: ConversationSession):
+        # Doit être appelé avec le verrou de la session acquis
+        session.updated_at = time.time()
+        self.store.save(session.session_id, session.to_dict())
+    
+    def save(self, session: ConversationSession) -> bool:
+        """
+        Enregistre une session, sauf si un autre appel l'a modifiée depuis son chargement.
+        
+        Args:
+            session (ConversationSession): La session.
+        
+        Returns:
+            bool: True si la session a été enregistrée.
+        """
+        with self._session_lock(session.session_id):
+            data = self.store.load(session.session_id)
+            if data is not None and data.get("updated_at") != session.updated_at:
+                return False
+            self._write(session)
+            return True
+    
+    def record_exchange(self, session: ConversationSession, prompt: str, answer: Optional[str]):
+        """
+        Ajoute un échange terminé à la session et l'enregistre.
+        
+        Si un autre appel a enregistré la session depuis son chargement, l'échange
+        est ajouté à la version enregistrée, qui remplace celle de `session`.
+        
+        Args:
+            session (ConversationSession): La session.
+            prompt (str): Le message de l'utilisateur.
+            answer (str, optional): La réponse de l'assistant (None: rien n'est ajouté).
+        """
+        with self._session_lock(session.session_id):
+            data = self.store.load(session.session_id)
+            if data is not None and data.get("updated_at") != session.updated_at:
+                latest = ConversationSession.from_dict(data, self.max_messages)
+                session.turns = latest.turns
+                session.summary = latest.summary
+                session.summary_tokens = latest.summary_tokens
+                session.summarized_messages = latest.summarized_messages
+                session.updated_at = latest.updated_at
+            self.append(session, prompt, answer)
+            self._write(session)
+    
+    def clear(self, session_id: str) -> bool:
+        """Efface une session. Retourne True si elle existait."""
+        return self.store.delete(validate_session_id(session_id))
+    
+    def needs_compaction(self, session: ConversationSession, prompt: str) -> bool:
+        """
+        Indique si l'historique doit être résumé avant d'ajouter un nouvel échange.
+        
+        Args:
+            session (ConversationSession): La session.
+            prompt (str): Le prochain message de l'utilisateur.
+        
+        Returns:
+            bool: True si le tampon est plein ou si le budget de tokens serait dépassé.
+        """
+        if not session.turns:
+            return False
+        if len(session.turns) + 2 > self.max_messages:
+            return True
+        return session.history_tokens + estimate_tokens(prompt) > self.max_tokens
+    
+    def evict(self, session: ConversationSession) -> List[Tuple[str, str, int]]:
+        """
+        Retire les échanges les plus anciens à résumer.
+        
+        Retire au moins la moitié des messages, par paires question/réponse,
+        puis continue tant que l'historique restant dépasse la moitié du budget.
+        
+        Args:
+            session (ConversationSession): La session.
+        
+        Returns:
+            List[Tuple[str, str, int]]: Les messages retirés (rôle, contenu, tokens).
+        """
+        evicted = []
+        target = max(2, len(session.turns) // 2)
+        while session.turns and (
+            len(evicted) < target or session.history_tokens > self.max_tokens // 2
+        ):
+            evicted.append(session.turns.popleft())
+            if session.turns and session.turns[0][0] == "assistant":
+                evicted.append(session.turns.popleft())
+        return evicted
+    
+    def summary_prompt(self, session: ConversationSession, evicted: List[Tuple[str, str, int]]) -> str:
+        """
+        Construit le prompt de mise à jour du résumé glissant.
+        
+        Args:
+            session (ConversationSession): La session.
+            evicted (List[Tuple[str, str, int]]): Les messages à intégrer au résumé.
+        
+        Returns:
+            str: Le prompt.
+        """
+        exchanges = "\n".join(
+            f"{'Utilisateur' if role == 'user' else 'Assistant'} : {content}" for role, content, _ in evicted
+        )
+        return (
+            f"Mets à jour le résumé d'une conversation en y intégrant les nouveaux échanges. "
+            f"Conserve les faits, décisions, préférences et questions ouvertes utiles pour la suite. "
+            f"Réponds uniquement par le résumé, en {self.summary_max_tokens * 3 // 4} mots au maximum.\n\n"
+            f"Résumé actuel :\n{session.summary or '(vide)'}\n\n"
+            f"Nouveaux échanges :\n{exchanges}"
+        )
+    
+    def offline_summary(self, session: ConversationSession, evicted: List[Tuple[str, str, int]]) -> str:
+        """
+        Résumé de secours lorsque l'API n'est pas disponible : extraits tronqués des échanges.
+        
+        Args:
+            session (ConversationSession): La session.
+            evicted (List[Tuple[str, str, int]]): Les messages à intégrer au résumé.
+        
+        Returns:
+            str: Le résumé, limité à history_summary_max_tokens.
+        """
+        lines = [session.summary] if session.summary else []
+        for role, content, _ in evicted:
+            excerpt = " ".join(content.split())[:200]
+            lines.append(f"- {'Utilisateur' if role == 'user' else 'Assistant'} : {excerpt}")
+        text = "\n".join(lines)
+        max_chars = self.summary_max_tokens * 4
+        return text[-max_chars:] if len(text) > max_chars else text
+    
+    def apply_summary(self, session: ConversationSession, summary: str, evicted: List[Tuple[str, str, int]]):
+        """
+        Remplace le résumé glissant après compactage.
+        
+        Args:
+            session (ConversationSession): La session.
+            summary (str): Le nouveau résumé.
+            evicted (List[Tuple[str, str, int]]): Les messages intégrés au résumé.
+        """
+        session.summary = summary.strip()
+        session.summary_tokens = estimate_tokens(session.summary)
+        session.summarized_messages += len(evicted)
+    
+    def build_messages(self, session: ConversationSession, prompt: str) -> List[Dict[str, str]]:
+        """
+        Construit les messages à envoyer : préfixe stable, résumé, échanges récents puis le prompt.
+        
+        Args:
+            session (ConversationSession): La session.
+            prompt (str): Le message de l'utilisateur.
+        
+        Returns:
+            List[Dict[str, str]]: Les messages au format de l'API.
+        """
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        if session.summary:
+            messages.append({"role": "system", "content": SUMMARY_PREFIX + session.summary})
+        messages.extend({"role": role, "content": content} for role, content, _ in session.turns)
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    def append(self, session: ConversationSession, prompt: str, answer: Optional[str]):
+        """
+        Ajoute un échange terminé à la session (sans l'enregistrer).
+        
+        Args:
+            session (ConversationSession): La session.
+            prompt (str): Le message de l'utilisateur.
+            answer (str, optional): La réponse de l'assistant. Si None (réponse sans
+                                    contenu), l'échange n'est pas conservé.
+        """
+        if answer is None:
+            return
+        session.turns.append(("user", prompt, estimate_tokens(prompt)))
+        session.turns.append(("assistant", answer, estimate_tokens(answer)))
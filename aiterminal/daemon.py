@@ -0,0 +1,321 @@
+"""
+Module du démon AITerminal.
+Garde les services, les pools de connexions et les caches chauds dans un processus
+de fond, et exécute les commandes transmises par le client léger (voir client.py).
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import logging
+import threading
+import socketserver
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
+from typing import Dict, Any, Optional
+
+from .client import (
+    ENV_PREFIX, FRAME_REQUEST, FRAME_STDOUT, FRAME_STDERR, FRAME_EXIT,
+    connect, recv_frame, request, send_frame, socket_path, spawn_daemon
+)
+
+logger = logging.getLogger(__name__)
+
+class FrameWriter:
+    """Flux texte qui transmet chaque écriture au client sous forme de trame."""
+    
+    def __init__(self, sock: socket.socket, kind: bytes, isatty: bool = False):
+        self.sock = sock
+        self.kind = kind
+        self._isatty = isatty
+        self.encoding = "utf-8"
+    
+    def write(self, text: str) -> int:
+        if text:
+            send_frame(self.sock, self.kind, text.encode("utf-8"))
+        return len(text)
+    
+    def flush(self):
+        pass
+    
+    def isatty(self) -> bool:
+        return self._isatty
+
+@contextmanager
+def client_environment(env: Dict[str, str]):
+    """
+    Remplace les variables AITERMINAL_* du démon par celles du client le temps d'une commande.
+    
+    Args:
+        env (Dict[str, str]): Les variables du client (voir client.client_environment).
+    """
+    saved = {key: value for key, value in os.environ.items() if key.startswith(ENV_PREFIX)}
+    for key in saved:
+        del os.environ[key]
+    os.environ.update({key: str(value) for key, value in env.items() if key.startswith(ENV_PREFIX)})
+    try:
+        yield
+    finally:
+        for key in [key for key in os.environ if key.startswith(ENV_PREFIX)]:
+            del os.environ[key]
+        os.environ.update(saved)
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serveur du démon : une connexion par commande.
+    
+    Les commandes s'exécutent une à la fois, car la CLI écrit sur sys.stdout et
+    sur une console Rich globale ; les connexions suivantes attendent leur tour.
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, path: str, idle_timeout: float):
+        """
+        Initialise le serveur.
+        
+        Args:
+            path (str): Chemin du socket Unix.
+            idle_timeout (float): Arrêt après ce nombre de secondes sans commande (0 pour jamais).
+        """
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.started_at = time.time()
+        self.last_activity = time.monotonic()
+        self.requests = 0
+        self.active = 0
+        self.command_lock = threading.Lock()
+        self._activity_lock = threading.Lock()
+        
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, DaemonRequestHandler)
+        finally:
+            os.umask(old_umask)
+    
+    def refresh_services(self):
+        """Recharge config.json s'il a été modifié ; les services abonnés s'adaptent."""
+        from . import cli
+        cli.services.config.refresh(force=True)
+    
+    def get_status(self) -> Dict[str, Any]:
+        """État du démon."""
+        from . import cli
+        return {
+            "pid": os.getpid(),
+            "socket": self.path,
+            "cwd": os.getcwd(),
+            "uptime": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "idle": round(time.monotonic() - self.last_activity, 1),
+            "idle_timeout": self.idle_timeout,
+            "services": cli.services.loaded()
+        }
+    
+    def run_command(self, payload: Dict[str, Any], sock: socket.socket) -> int:
+        """
+        Exécute une commande de la CLI en redirigeant sa sortie vers le client.
+        
+        Args:
+            payload (Dict[str, Any]): La requête (argv, isatty, columns, env).
+            sock (socket.socket): La connexion du client.
+        
+        Returns:
+            int: Le code de retour de la commande.
+        """
+        import rich
+        from rich.console import Console
+        from . import cli
+        
+        isatty = bool(payload.get("isatty"))
+        stdout = FrameWriter(sock, FRAME_STDOUT, isatty)
+        stderr = FrameWriter(sock, FRAME_STDERR, isatty)
+        with self.command_lock:
+            self.requests += 1
+            self.refresh_services()
+            # La console de la CLI et celle de rich.print suivent le terminal du client
+            cli.console = Console(file=stdout, width=payload.get("columns"))
+            rich.reconfigure(file=stdout, width=payload.get("columns"))
+            try:
+                # Les commandes s'exécutent une à la fois: l'environnement du processus peut suivre le client
+                with client_environment(payload.get("env") or {}), redirect_stdout(stdout), redirect_stderr(stderr):
+                    cli.services.config.reload_environment()
+                    try:
+                        cli.app(args=payload.get("argv", []), prog_name="aiterminal")
+                    except SystemExit as exit_error:
+                        code = exit_error.code
+                        return code if isinstance(code, int) else (0 if code is None else 1)
+                    except Exception as e:
+                        logger.error(f"Erreur non gérée: {str(e)}")
+                        cli.console.print(f"[bold red]Erreur fatale:[/bold red] {str(e)}")
+                        return 1
+                return 0
+            finally:
+                # La configuration du démon retrouve sa propre couche d'environnement
+                cli.services.config.reload_environment()
+                cli.console = Console()
+                rich.reconfigure()
+    
+    def begin_request(self):
+        """Signale le début du traitement d'une connexion."""
+        with self._activity_lock:
+            self.active += 1
+            self.last_activity = time.monotonic()
+    
+    def end_request(self):
+        """Signale la fin du traitement d'une connexion."""
+        with self._activity_lock:
+            self.active -= 1
+            self.last_activity = time.monotonic()
+    
+    def watch_idle(self):
+        """Arrête le serveur après idle_timeout secondes sans commande."""
+        while self.idle_timeout:
+            time.sleep(min(5.0, self.idle_timeout))
+            with self._activity_lock:
+                idle = self.active == 0 and time.monotonic() - self.last_activity >= self.idle_timeout
+            if idle:
+                logger.info(f"Aucune commande depuis {self.idle_timeout:.0f}s, arrêt du démon")
+                self.shutdown()
+                return
+
+class DaemonRequestHandler(socketserver.BaseRequestHandler):
+    """Traite une connexion : une requête, la sortie en flux, puis le code de retour."""
+    
+    def handle(self):
+        server: DaemonServer = self.server
+        server.begin_request()
+        try:
+            kind, data = recv_frame(self.request)
+            if kind != FRAME_REQUEST:
+                return
+            payload = json.loads(data.decode("utf-8"))
+            control = payload.get("control")
+            if control == "status":
+                send_frame(self.request, FRAME_STDOUT, json.dumps(server.get_status()).encode("utf-8"))
+                code = 0
+            elif control == "stop":
+                code = 0
+            else:
+                code = server.run_command(payload, self.request)
+            send_frame(self.request, FRAME_EXIT, str(code).encode("utf-8"))
+            if control == "stop":
+                # Après la réponse: shutdown() attend la fin de serve_forever, d'où le thread séparé
+                threading.Thread(target=server.shutdown, daemon=True).start()
+        except (ConnectionError, BrokenPipeError):
+            logger.warning("Client déconnecté avant la fin de la commande")
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement d'une requête: {str(e)}")
+        finally:
+            server.end_request()
+
+def serve(path: Optional[str] = None, idle_timeout: Optional[float] = None):
+    """
+    Démarre le démon au premier plan et le préchauffe.
+    
+    Args:
+        path (str, optional): Chemin du socket (par défaut celui du config.json courant).
+        idle_timeout (float, optional): Délai d'inactivité avant arrêt (par défaut daemon_idle_timeout).
+    
+    Raises:
+        Exception: Si un autre démon écoute déjà sur ce socket.
+    """
+    from . import cli
+    
+    path = path or socket_path()
+    existing = connect(path)
+    if existing is not None:
+        existing.close()
+        raise Exception(f"Un démon AITerminal écoute déjà sur {path}")
+    if os.path.exists(path):
+        os.remove(path)
+    
+    config = cli.services.config
+    if idle_timeout is None:
+        idle_timeout = config.get_value("daemon_idle_timeout", 600)
+    
+    # Préchauffage: modules, services et pools HTTP sont prêts avant la première commande
+    for name in config.get_value("daemon_preload", ["system", "ai"]):
+        try:
+            getattr(cli.services, name)
+        except Exception as e:
+            logger.warning(f"Préchargement du service {name} impossible: {str(e)}")
+    
+    server = DaemonServer(path, idle_timeout)
+    threading.Thread(target=server.watch_idle, daemon=True).start()
+    logger.info(f"Démon AITerminal prêt sur {path} (pid {os.getpid()})")
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+        logger.info("Démon AITerminal arrêté")
+
+def control(command: str, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Envoie une commande de contrôle au démon.
+    
+    Args:
+        command (str): 'status' ou 'stop'.
+        path (str, optional): Chemin du socket.
+    
+    Returns:
+        Optional[Dict[str, Any]]: La réponse du démon, ou None s'il ne répond pas.
+    """
+    sock = connect(path or socket_path())
+    if sock is None:
+        return None
+    
+    buffer = io.StringIO()
+    try:
+        request(sock, {"control": command}, stdout=buffer, stderr=buffer)
+    finally:
+        sock.close()
+    text = buffer.getvalue()
+    return json.loads(text) if text else {}
+
+def start(wait: float = 10.0) -> Optional[Dict[str, Any]]:
+    """
+    Lance le démon en arrière-plan s'il ne tourne pas, et attend qu'il réponde.
+    
+    Args:
+        wait (float): Délai maximal d'attente en secondes.
+    
+    Returns:
+        Optional[Dict[str, Any]]: L'état du démon, ou None s'il n'a pas démarré à temps.
+    """
+    status = control("status")
+    if status is not None:
+        return status
+    process = spawn_daemon()
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return None
+        status = control("status")
+        if status is not None:
+            return status
+        time.sleep(0.1)
+    return None
+
+def main():
+    """Point d'entrée de `python -m aiterminal.daemon`."""
+    parser = argparse.ArgumentParser(description="Démon AITerminal (services chauds partagés par les commandes)")
+    parser.add_argument("--socket", default=None, help="Chemin du socket Unix (défaut: dérivé de config.json)")
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="Arrêt après N secondes sans commande (défaut: daemon_idle_timeout)")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        serve(args.socket, args.idle_timeout)
+    except Exception as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
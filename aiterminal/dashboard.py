@@ -0,0 +1,189 @@
+"""
+Module du tableau de bord système (`aiterminal sys --watch`).
+Affiche dans un rich.Live l'utilisation CPU par cœur, la mémoire et les débits
+disque et réseau, avec leurs sparklines.
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rich.console import Console, Group
+from rich.live import Live
+from rich.text import Text
+
+from .system import SystemSampler
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+# Largeur des étiquettes et des valeurs, pour aligner les sparklines
+LABEL_WIDTH = 9
+VALUE_WIDTH = 22
+
+# Une ligne: segments (texte, style)
+Line = Tuple[Tuple[str, str], ...]
+
+def sparkline(values: Iterable[float], width: int, maximum: Optional[float] = None) -> str:
+    """
+    Dessine une série avec des caractères de bloc.
+    
+    Args:
+        values (Iterable[float]): Les valeurs, de la plus ancienne à la plus récente.
+        width (int): Nombre maximal de caractères (les dernières valeurs sont gardées).
+        maximum (float, optional): Valeur du bloc plein (par défaut le maximum de la série).
+    
+    Returns:
+        str: La sparkline, alignée à droite sur `width` caractères.
+    """
+    points = list(values)[-width:] if width > 0 else []
+    top = maximum if maximum is not None else max(points, default=0.0)
+    if top <= 0:
+        return (SPARK_CHARS[0] * len(points)).rjust(width)
+    last = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[min(last, int(value / top * last + 0.5))] for value in points).rjust(width)
+
+def format_rate(bytes_per_s: float) -> str:
+    """Formate un débit en octets par seconde."""
+    for unit in ("o/s", "Ko/s", "Mo/s", "Go/s"):
+        if bytes_per_s < 1024 or unit == "Go/s":
+            return f"{bytes_per_s:.1f} {unit}" if unit != "o/s" else f"{bytes_per_s:.0f} {unit}"
+        bytes_per_s /= 1024
+
+def _usage_style(percent: float) -> str:
+    if percent >= 90:
+        return "bold red"
+    if percent >= 70:
+        return "yellow"
+    return "green"
+
+class SystemDashboard:
+    """
+    Tableau de bord rafraîchi à intervalle fixe.
+    
+    Les lignes sont comparées à celles de l'image précédente : seules les lignes
+    modifiées sont reconstruites, et l'image n'est pas redessinée si rien n'a
+    changé. Live est utilisé sans thread de rafraîchissement automatique.
+    """
+    
+    def __init__(self, sampler: SystemSampler, interval: float = 1.0, console: Optional[Console] = None):
+        """
+        Initialise le tableau de bord.
+        
+        Args:
+            sampler (SystemSampler): L'échantillonneur.
+            interval (float): Période de rafraîchissement en secondes.
+            console (Console, optional): La console d'affichage.
+        """
+        self.sampler = sampler
+        self.interval = max(0.1, interval)
+        self.console = console or Console()
+        self.frames = 0
+        self.redraws = 0
+        self._lines: List[Line] = []
+        self._texts: List[Text] = []
+    
+    def build_lines(self, sample: Dict[str, Any], width: int) -> List[Line]:
+        """
+        Compose les lignes d'une image.
+        
+        Args:
+            sample (Dict[str, Any]): L'échantillon (voir SystemSampler.sample).
+            width (int): Largeur disponible.
+        
+        Returns:
+            List[Line]: Les lignes, en segments (texte, style).
+        """
+        history = self.sampler.history
+        spark_width = max(0, width - LABEL_WIDTH - VALUE_WIDTH - 2)
+        memory = sample["memory"]
+        lines: List[Line] = [
+            ((f"Système · rafraîchi toutes les {self.interval:g} s · Ctrl+C pour quitter", "dim"),),
+            (
+                ("CPU".ljust(LABEL_WIDTH), "bold cyan"),
+                (f"{sample['cpu_percent']:5.1f} %".ljust(VALUE_WIDTH), _usage_style(sample["cpu_percent"])),
+                (sparkline(history["cpu"], spark_width, 100.0), "green")
+            )
+        ]
+        
+        # Cœurs: barres de 10 caractères, autant par ligne que la largeur le permet
+        cell = 24
+        per_line = max(1, (width - 2) // cell)
+        cores = sample["cpu_per_core"]
+        for start in range(0, len(cores), per_line):
+            segments = [("  ", "")]
+            for index in range(start, min(start + per_line, len(cores))):
+                percent = cores[index]
+                filled = int(round(percent / 10))
+                segments += [
+                    (f"#{index:<3}{percent:5.1f}% ", ""),
+                    ("█" * filled, _usage_style(percent)),
+                    ("░" * (10 - filled) + " ", "dim")
+                ]
+            lines.append(tuple(segments))
+        
+        used = f"{memory['used'] / 1024 ** 3:.1f}/{memory['total'] / 1024 ** 3:.1f} Go"
+        lines.append((
+            ("Mémoire".ljust(LABEL_WIDTH), "bold cyan"),
+            (f"{memory['percent']:5.1f} %  {used}".ljust(VALUE_WIDTH), _usage_style(memory["percent"])),
+            (sparkline(history["memory"], spark_width, 100.0), "green")
+        ))
+        
+        for label, series in (
+            ("Disque", (("↓ lecture", "disk_read", sample["disk_io"]["read_bytes_per_s"]),
+                        ("↑ écriture", "disk_write", sample["disk_io"]["write_bytes_per_s"]))),
+            ("Réseau", (("↓ reçu", "net_recv", sample["net_io"]["recv_bytes_per_s"]),
+                        ("↑ envoyé", "net_sent", sample["net_io"]["sent_bytes_per_s"])))
+        ):
+            for index, (name, key, value) in enumerate(series):
+                lines.append((
+                    ((label if index == 0 else "").ljust(LABEL_WIDTH), "bold cyan"),
+                    (f"{name:<11}{format_rate(value)}".ljust(VALUE_WIDTH), ""),
+                    (sparkline(history[key], spark_width), "magenta")
+                ))
+        return lines
+    
+    def render(self, sample: Dict[str, Any]) -> Optional[Group]:
+        """
+        Produit l'image d'un échantillon, ou None si elle est identique à la précédente.
+        
+        Args:
+            sample (Dict[str, Any]): L'échantillon.
+        
+        Returns:
+            Optional[Group]: Les lignes à afficher.
+        """
+        lines = self.build_lines(sample, self.console.width)
+        if lines == self._lines:
+            return None
+        texts = []
+        for index, line in enumerate(lines):
+            if index < len(self._lines) and self._lines[index] == line:
+                texts.append(self._texts[index])
+            else:
+                texts.append(Text.assemble(*line, no_wrap=True, overflow="crop"))
+        self._lines, self._texts = lines, texts
+        return Group(*texts)
+    
+    def run(self, count: int = 0):
+        """
+        Affiche le tableau de bord jusqu'à Ctrl+C (ou `count` images).
+        
+        Args:
+            count (int): Nombre d'images à afficher (0 pour illimité).
+        """
+        next_tick = time.monotonic()
+        with Live(console=self.console, auto_refresh=False, transient=False) as live:
+            while True:
+                frame = self.render(self.sampler.sample())
+                self.frames += 1
+                if frame is not None:
+                    live.update(frame, refresh=True)
+                    self.redraws += 1
+                if count and self.frames >= count:
+                    return
+                # Cadence fixe: le temps de mesure et d'affichage est déduit de l'attente
+                next_tick += self.interval
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.monotonic()
@@ -11,6 +11,8 @@ from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
 
 from .config import Config
+from .metrics import time_upstream
+from .tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +29,7 @@ class InternetService:
         self.config = config
         self.search_engine = config.get_value("search_engine", "duckduckgo")
     
+    @traced("internet.search")
     def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
         Effectue une recherche sur internet.
@@ -74,11 +77,13 @@ class InternetService:
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
             }
             
-            response = requests.get(url, headers=headers, timeout=self.config.get_value("timeout", 30))
-            response.raise_for_status()
+            with span("duckduckgo.fetch"), time_upstream("duckduckgo", "search"):
+                response = requests.get(url, headers=headers, timeout=self.config.get_value("timeout", 30))
+                response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, "html.parser")
-            search_results = soup.find_all("div", class_="result")
+            with span("html.parse", bytes=len(response.content)):
+                soup = BeautifulSoup(response.text, "html.parser")
+                search_results = soup.find_all("div", class_="result")
             
             count = 0
             for result in search_results:
@@ -116,6 +121,7 @@ class InternetService:
             logger.error(f"Erreur inattendue lors de la recherche DuckDuckGo: {str(e)}")
             raise Exception(f"Erreur inattendue lors de la recherche DuckDuckGo: {str(e)}")
     
+    @traced("internet.get_page_content")
     def get_page_content(self, url: str) -> Dict[str, Any]:
         """
         Récupère le contenu d'une page web.
@@ -134,10 +140,12 @@ class InternetService:
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
             }
             
-            response = requests.get(url, headers=headers, timeout=self.config.get_value("timeout", 30))
-            response.raise_for_status()
+            with span("web.fetch", url=url), time_upstream("web", "page"):
+                response = requests.get(url, headers=headers, timeout=self.config.get_value("timeout", 30))
+                response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, "html.parser")
+            with span("html.parse", bytes=len(response.content)):
+                soup = BeautifulSoup(response.text, "html.parser")
             
             # Extraire le titre
             title = soup.title.string if soup.title else ""
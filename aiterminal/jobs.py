@@ -0,0 +1,546 @@
+"""
+Module des tâches de fond de l'interface web.
+Exécute les opérations longues (ping, requêtes HTTP, génération IA) dans un pool
+borné de threads, par priorité et avec délai maximal, et conserve leurs résultats
+en mémoire pendant une durée limitée (éventuellement aussi dans SQLite).
+"""
+
+import json
+import time
+import asyncio
+import uuid
+import queue
+import sqlite3
+import logging
+import itertools
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .admission import COMMAND_ROUTES, Admission, RateLimitedError, get_admission_controller
+from .config import Config
+from .metrics import get_metrics_registry
+from .usage import set_usage_source
+from .utils import NotifyingCondition
+
+logger = logging.getLogger(__name__)
+
+# Priorités nommées: la plus petite valeur passe en premier
+PRIORITIES = {"high": 0, "normal": 5, "low": 9}
+
+# États d'une tâche ; les quatre derniers sont définitifs
+JOB_STATES = ("queued", "running", "done", "error", "cancelled", "timeout")
+FINAL_STATES = ("done", "error", "cancelled", "timeout")
+
+JOBS_FINISHED = get_metrics_registry().counter(
+    "aiterminal_jobs_total", "Tâches de fond terminées, par type et état final", ("kind", "status")
+)
+
+class JobCancelled(Exception):
+    """Levée dans une tâche annulée ou arrivée à échéance (voir Job.check)."""
+
+class QueueFullError(Exception):
+    """Levée quand la file d'attente a atteint `jobs_max_queued`."""
+
+class Job:
+    """Une tâche de fond : paramètres, état, progression et résultat."""
+    
+    # Transmettre la réponse de l'IA fragment par fragment (voir delta)
+    streaming = False
+    
+    def __init__(self, kind: str, params: Dict[str, Any], priority: int, timeout: float):
+        """
+        Initialise la tâche.
+        
+        Args:
+            kind (str): Type de tâche (ping, http, generate, analyze).
+            params (Dict[str, Any]): Paramètres transmis au gestionnaire.
+            priority (int): Priorité (0 = la plus haute).
+            timeout (float): Durée maximale d'exécution en secondes.
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.priority = priority
+        self.timeout = timeout
+        self.status = "queued"
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.progress: List[Any] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self._changed: Optional[threading.Condition] = None
+    
+    @property
+    def deadline(self) -> Optional[float]:
+        return self.started + self.timeout if self.started is not None else None
+    
+    def check(self):
+        """
+        Interrompt la tâche si elle a été annulée ou a dépassé son délai.
+        
+        Les gestionnaires l'appellent entre deux étapes (par exemple entre deux
+        réponses de ping) ; un appel bloquant unique n'est pas interrompu, mais son
+        résultat est ignoré une fois la tâche terminée.
+        
+        Raises:
+            JobCancelled: Si la tâche doit s'arrêter.
+        """
+        if self.cancel_event.is_set() or (self.deadline is not None and time.time() > self.deadline):
+            raise JobCancelled(self.id)
+    
+    def report(self, event: Any):
+        """
+        Ajoute un événement de progression, visible par /api/jobs/<id>?since=N.
+        
+        Args:
+            event (Any): Événement sérialisable en JSON (par exemple une réponse de ping).
+        """
+        self.check()
+        with self._changed:
+            self.progress.append(event)
+            self._changed.notify_all()
+    
+    def delta(self, text: str) -> bool:
+        """
+        Transmet un fragment de la réponse de l'IA (tâches avec `streaming`).
+        
+        Args:
+            text (str): Le fragment.
+        
+        Returns:
+            bool: False si la tâche doit s'arrêter (la génération est alors interrompue).
+        """
+        try:
+            self.report({"delta": text})
+        except JobCancelled:
+            return False
+        return True
+    
+    def to_dict(self, since: Optional[int] = None, with_result: bool = True) -> Dict[str, Any]:
+        """
+        Sérialise la tâche.
+        
+        Args:
+            since (int, optional): Ne renvoyer que les événements de progression à partir de cet indice.
+            with_result (bool): Inclure le résultat.
+        
+        Returns:
+            Dict[str, Any]: La tâche, avec 'progress_count' pour la requête suivante.
+        """
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "priority": self.priority,
+            "timeout": self.timeout,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "progress_count": len(self.progress),
+            "error": self.error
+        }
+        if since is not None:
+            data["progress"] = self.progress[max(0, since):]
+        if with_result:
+            data["result"] = self.result
+        return data
+
+class JobQueue:
+    """
+    File de tâches de fond avec pool de threads borné.
+    
+    Les tâches attendent dans une file à priorité (`jobs_max_queued` au plus) et
+    sont exécutées par `jobs_workers` threads. Une tâche qui dépasse son délai passe
+    à l'état 'timeout' dès que son état est consulté. Les tâches terminées sont
+    gardées `jobs_result_ttl` secondes ; avec `jobs_db_path`, elles sont aussi écrites
+    dans une base SQLite et restent consultables après un redémarrage.
+    """
+    
+    def __init__(self, config: Config, handlers: Dict[str, Callable[[Job], Any]]):
+        """
+        Initialise la file et démarre les threads.
+        
+        Args:
+            config (Config): L'objet de configuration.
+            handlers (Dict[str, Callable]): Gestionnaire de chaque type de tâche ; il reçoit
+                                            la tâche et retourne son résultat.
+        """
+        self.config = config
+        self.handlers = handlers
+        self.workers = max(1, int(config.get_value("jobs_workers", 4)))
+        self.max_queued = int(config.get_value("jobs_max_queued", 100))
+        self.result_ttl = float(config.get_value("jobs_result_ttl", 600))
+        self._jobs: Dict[str, Job] = {}
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._changed = NotifyingCondition()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._db_purged = 0.0
+        
+        path = config.get_value("jobs_db_path", "")
+        if path:
+            self._open_db(path)
+        for index in range(self.workers):
+            threading.Thread(target=self._work, name=f"aiterminal-job-{index}", daemon=True).start()
+    
+    def _open_db(self, path: str):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, finished REAL, data TEXT NOT NULL)"
+            )
+            self._db.execute("DELETE FROM jobs WHERE finished < ?", (time.time() - self.result_ttl,))
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de l'ouverture de la base des tâches {path}: {str(e)}")
+            raise Exception(f"Erreur lors de l'ouverture de la base des tâches {path}: {str(e)}")
+    
+    def submit(self, kind: str, params: Optional[Dict[str, Any]] = None, priority: Any = "normal",
+               timeout: Optional[float] = None) -> Job:
+        """
+        Ajoute une tâche à la file.
+        
+        Args:
+            kind (str): Type de tâche.
+            params (Dict[str, Any], optional): Paramètres de la tâche.
+            priority: 'high', 'normal', 'low' ou un entier de 0 (la plus haute) à 9.
+            timeout (float, optional): Délai maximal d'exécution (par défaut `jobs_timeout`,
+                                       plafonné à `jobs_max_timeout`).
+        
+        Returns:
+            Job: La tâche créée.
+        
+        Raises:
+            ValueError: Si le type, la priorité ou le délai est invalide.
+            QueueFullError: Si la file est pleine.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Type de tâche non reconnu: {kind} (attendu: {', '.join(self.handlers)})")
+        if isinstance(priority, str):
+            if priority not in PRIORITIES:
+                raise ValueError(f"Priorité non reconnue: {priority} (attendu: {', '.join(PRIORITIES)})")
+            priority = PRIORITIES[priority]
+        priority = int(priority)
+        if not 0 <= priority <= 9:
+            raise ValueError(f"Priorité hors limites: {priority} (de 0 à 9)")
+        max_timeout = float(self.config.get_value("jobs_max_timeout", 600))
+        timeout = float(timeout if timeout is not None else self.config.get_value("jobs_timeout", 60))
+        if timeout <= 0:
+            raise ValueError(f"Délai invalide: {timeout}")
+        
+        self._expire()
+        job = Job(kind, dict(params or {}), priority, min(timeout, max_timeout))
+        job._changed = self._changed
+        with self._changed:
+            if self._queue.qsize() >= self.max_queued:
+                raise QueueFullError(f"File des tâches pleine ({self.max_queued} en attente)")
+            self._jobs[job.id] = job
+        self._queue.put((priority, next(self._sequence), job.id))
+        return job
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Récupère une tâche (en mémoire, sinon dans la base SQLite).
+        
+        Args:
+            job_id (str): Identifiant de la tâche.
+        
+        Returns:
+            Optional[Job]: La tâche, ou None si elle est inconnue ou expirée.
+        """
+        self._expire()
+        job = self._jobs.get(job_id)
+        if job is None and self._db is not None:
+            with self._db_lock:
+                row = self._db.execute("SELECT data FROM jobs WHERE id = ? AND finished >= ?",
+                                       (job_id, time.time() - self.result_ttl)).fetchone()
+            if row:
+                data = json.loads(row[0])
+                job = Job(data["kind"], {}, data["priority"], data["timeout"])
+                job._changed = self._changed
+                job.__dict__.update({key: value for key, value in data.items() if key != "progress_count"})
+        return job
+    
+    def wait(self, job_id: str, since: int = 0, timeout: float = 0.0) -> Optional[Job]:
+        """
+        Attend un changement de la tâche (long polling).
+        
+        Retourne dès que la tâche est terminée ou a produit plus de `since` événements
+        de progression, ou au bout de `timeout` secondes.
+        
+        Args:
+            job_id (str): Identifiant de la tâche.
+            since (int): Nombre d'événements de progression déjà reçus par l'appelant.
+            timeout (float): Attente maximale en secondes.
+        
+        Returns:
+            Optional[Job]: La tâche, ou None si elle est inconnue.
+        """
+        job = self.get(job_id)
+        if job is None or timeout <= 0:
+            return job
+        end = time.monotonic() + timeout
+        with self._changed:
+            while job.status not in FINAL_STATES and len(job.progress) <= since:
+                remaining = end - time.monotonic()
+                if job.deadline is not None:
+                    remaining = min(remaining, job.deadline - time.time() + 0.01)
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+        self._expire()
+        return job
+    
+    async def wait_async(self, job_id: str, since: int = 0, timeout: float = 0.0) -> Optional[Job]:
+        """
+        Comme wait(), pour une coroutine : l'attente n'occupe pas de thread.
+        
+        Args:
+            job_id (str): Identifiant de la tâche.
+            since (int): Nombre d'événements de progression déjà reçus par l'appelant.
+            timeout (float): Attente maximale en secondes.
+        
+        Returns:
+            Optional[Job]: La tâche, ou None si elle est inconnue.
+        """
+        job = self.get(job_id)
+        if job is None or timeout <= 0:
+            return job
+        end = time.monotonic() + timeout
+        with self._changed.listen() as changed:
+            while True:
+                # Remis à zéro avant la vérification: une notification ultérieure n'est pas perdue
+                changed.clear()
+                if job.status in FINAL_STATES or len(job.progress) > since:
+                    break
+                remaining = end - time.monotonic()
+                if job.deadline is not None:
+                    remaining = min(remaining, job.deadline - time.time() + 0.01)
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        self._expire()
+        return job
+    
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Annule une tâche en attente ou en cours.
+        
+        Args:
+            job_id (str): Identifiant de la tâche.
+        
+        Returns:
+            Optional[Job]: La tâche, ou None si elle est inconnue.
+        """
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel_event.set()
+            self._finish(job, "cancelled", error="Tâche annulée")
+        return job
+    
+    def list(self) -> List[Job]:
+        """Liste les tâches en mémoire, des plus récentes aux plus anciennes."""
+        self._expire()
+        return sorted(self._jobs.values(), key=lambda job: job.created, reverse=True)
+    
+    def counts(self) -> Dict[str, int]:
+        """Nombre de tâches en mémoire par état."""
+        counts = dict.fromkeys(JOB_STATES, 0)
+        for job in list(self._jobs.values()):
+            counts[job.status] += 1
+        return counts
+    
+    def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None) -> bool:
+        with self._changed:
+            if job.status in FINAL_STATES:  # Annulée ou expirée pendant l'exécution: résultat ignoré
+                return False
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished = time.time()
+            self._changed.notify_all()
+        JOBS_FINISHED.inc(job.kind, status)
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute("INSERT OR REPLACE INTO jobs (id, finished, data) VALUES (?, ?, ?)",
+                                     (job.id, job.finished, json.dumps(dict(job.to_dict(0), params=job.params),
+                                                                       ensure_ascii=False, default=str)))
+                    self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Erreur lors de l'enregistrement de la tâche {job.id}: {str(e)}")
+        return True
+    
+    def _acquire(self, job: Job) -> Optional[Admission]:
+        """
+        Réserve la place de la tâche auprès de son service amont (voir AdmissionController).
+        
+        Tant que le service est saturé, la tâche reste en attente et la demande est
+        renouvelée, au plus pendant son délai d'exécution.
+        
+        Returns:
+            Optional[Admission]: La place, ou None si la tâche a été annulée entre-temps.
+        
+        Raises:
+            RateLimitedError: Si le service est resté saturé pendant tout le délai.
+        """
+        route = COMMAND_ROUTES.get(job.kind)
+        if route is None:
+            return Admission()
+        controller = get_admission_controller(self.config)
+        end = time.monotonic() + job.timeout
+        while True:
+            try:
+                return controller.acquire_upstream(route)
+            except RateLimitedError as e:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    raise
+                # Une place libérée n'est pas signalée: nouvel essai après l'estimation du service
+                if job.cancel_event.wait(min(max(e.retry_after, 0.05), 1.0, remaining)):
+                    return None
+    
+    def _expire(self):
+        """Passe à 'timeout' les tâches hors délai et oublie les résultats trop anciens."""
+        now = time.time()
+        for job in list(self._jobs.values()):
+            if job.status == "running" and now > job.deadline:
+                job.cancel_event.set()
+                self._finish(job, "timeout", error=f"Délai dépassé ({job.timeout:g} s)")
+            elif job.status in FINAL_STATES and now - job.finished > self.result_ttl:
+                self._jobs.pop(job.id, None)
+        if self._db is not None and now - self._db_purged > 60:
+            self._db_purged = now
+            with self._db_lock:
+                self._db.execute("DELETE FROM jobs WHERE finished < ?", (now - self.result_ttl,))
+                self._db.commit()
+    
+    def _work(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "queued":  # Annulée avant son tour
+                continue
+            try:
+                admission = self._acquire(job)
+            except RateLimitedError as e:
+                self._finish(job, "error", error=str(e))
+                continue
+            if admission is None:
+                continue
+            # Vérification et passage à 'running' sous le même verrou qu'une annulation
+            with self._changed:
+                if job.status != "queued":
+                    admission.release()
+                    continue
+                job.status = "running"
+                job.started = time.time()
+                self._changed.notify_all()
+            set_usage_source(f"/api/jobs:{job.kind}")
+            try:
+                result = self.handlers[job.kind](job)
+                if time.time() > job.deadline:  # Appel bloquant terminé après l'échéance
+                    raise JobCancelled(job.id)
+                self._finish(job, "done", result=result)
+            except JobCancelled:
+                self._expire()
+            except Exception as e:
+                logger.error(f"Erreur lors de la tâche {job.kind} {job.id}: {str(e)}")
+                self._finish(job, "error", error=str(e))
+            finally:
+                # Après une échéance, la place reste occupée tant que l'appel amont n'a pas rendu la main
+                admission.release()
+
+def default_handlers(services) -> Dict[str, Callable[[Job], Any]]:
+    """
+    Gestionnaires des tâches de l'interface web, adossés au registre des services.
+    
+    Args:
+        services (ServiceRegistry): Le registre des services.
+    
+    Returns:
+        Dict[str, Callable]: Gestionnaire par type de tâche (ping, http, generate, analyze).
+    """
+    def ping(job: Job):
+        host = job.params.get("host", "")
+        if not host:
+            raise ValueError("Aucun hôte fourni")
+        network = services.network
+        results = []
+        pings = network.iter_ping(host, int(job.params.get("count", 4)))
+        try:
+            for result in pings:
+                job.report(result)  # Interrompt le ping (processus tué) si la tâche est annulée
+                results.append(result)
+        finally:
+            pings.close()
+        return {"results": results, "summary": network.get_ping_summary(results)}
+    
+    def http(job: Job):
+        if not job.params.get("url"):
+            raise ValueError("Aucune URL fournie")
+        # Le délai HTTP ne dépasse pas celui de la tâche
+        return services.network.http_request(
+            url=job.params["url"],
+            method=job.params.get("method", "GET"),
+            headers_str=job.params.get("headers"),
+            data_str=job.params.get("data"),
+            timeout=min(float(job.params.get("timeout", 10)), job.timeout)
+        )
+    
+    def generate(job: Job):
+        if not job.params.get("prompt"):
+            raise ValueError("Aucun prompt fourni")
+        on_delta = job.delta if job.streaming else None
+        # Comme /api/generate: avec la clé 'session_id' (même nulle), la conversation continue
+        if "session_id" in job.params:
+            from .conversation import ConversationMemory, get_memory_store
+            
+            memory = ConversationMemory(services.config, get_memory_store())
+            chat = services.ai.chat(job.params["prompt"], job.params["session_id"] or None, memory=memory,
+                                    on_delta=on_delta)
+            return {"result": chat["response"], "session_id": chat["session_id"], "usage": chat["usage"]}
+        return {"result": services.ai.generate_text(job.params["prompt"], on_delta=on_delta)}
+    
+    def analyze(job: Job):
+        text = job.params.get("text", "")
+        analysis_type = job.params.get("type", "sentiment")
+        if not text:
+            raise ValueError("Aucun texte fourni")
+        if analysis_type == "sentiment":
+            return services.ai.analyze_sentiment(text)
+        if analysis_type == "summary":
+            return {"summary": services.ai.summarize_text(text)}
+        if analysis_type == "entities":
+            return services.ai.extract_entities(text)
+        raise ValueError(f"Type d'analyse non reconnu: {analysis_type}")
+    
+    return {"ping": ping, "http": http, "generate": generate, "analyze": analyze}
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue(services) -> JobQueue:
+    """
+    Récupère la file des tâches du processus (créée et démarrée au premier appel).
+    
+    Args:
+        services (ServiceRegistry): Le registre des services utilisé par les gestionnaires.
+    
+    Returns:
+        JobQueue: La file partagée.
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(services.config, default_handlers(services))
+            gauge = get_metrics_registry().gauge("aiterminal_jobs", "Tâches de fond en mémoire, par état", ("status",))
+            for status in JOB_STATES:
+                gauge.set_function(lambda status=status: _job_queue.counts()[status], status)
+        return _job_queue
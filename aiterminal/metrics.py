@@ -0,0 +1,392 @@
+"""
+Module des métriques d'exécution.
+Compteurs, jauges et histogrammes à seaux fixes, partagés par les services du
+processus et exposés au format texte de Prometheus (route /metrics).
+"""
+
+import math
+import time
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seaux de latence en secondes (ceux du client Prometheus de référence)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Appels sortants (API OpenAI, recherche, ping) : jusqu'à la minute
+UPSTREAM_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Metric(ABC):
+    """
+    Base des métriques : une valeur par combinaison d'étiquettes.
+    
+    Les combinaisons sont créées au premier usage. Chaque mise à jour ne coûte
+    qu'une recherche dans un dictionnaire et une addition sous verrou.
+    """
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Initialise la métrique.
+        
+        Args:
+            name (str): Nom Prometheus (par exemple 'aiterminal_http_requests_total').
+            documentation (str): Description affichée dans # HELP.
+            labelnames (Sequence[str]): Noms des étiquettes.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+    
+    def _key(self, labels: Sequence[str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: {len(self.labelnames)} étiquettes attendues, {len(labels)} reçues")
+        return tuple(str(label) for label in labels)
+    
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """Produit les échantillons (suffixe, étiquettes formatées, valeur)."""
+    
+    def render(self) -> List[str]:
+        """Retourne les lignes de la métrique au format texte de Prometheus."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    """Compteur monotone (requêtes, erreurs, succès de cache)."""
+    
+    kind = "counter"
+    
+    def inc(self, *labels: str, amount: float = 1.0):
+        """
+        Incrémente le compteur.
+        
+        Args:
+            *labels (str): Valeurs des étiquettes, dans l'ordre de labelnames.
+            amount (float): Incrément (positif).
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def get(self, *labels: str) -> float:
+        """Retourne la valeur courante du compteur."""
+        return self._values.get(self._key(labels), 0.0)
+    
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in sorted(items):
+            yield "", _label_text(self.labelnames, key), value
+
+class Gauge(Metric):
+    """Jauge : valeur instantanée, fixée par l'appelant ou calculée à la collecte."""
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+    
+    def set(self, value: float, *labels: str):
+        """Fixe la valeur de la jauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+    
+    def inc(self, *labels: str, amount: float = 1.0):
+        """Augmente la jauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def dec(self, *labels: str, amount: float = 1.0):
+        """Diminue la jauge."""
+        self.inc(*labels, amount=-amount)
+    
+    def set_function(self, function: Callable[[], float], *labels: str):
+        """
+        Calcule la valeur à chaque collecte plutôt qu'à chaque événement.
+        
+        Args:
+            function (Callable[[], float]): Fonction appelée par /metrics.
+            *labels (str): Valeurs des étiquettes.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+    
+    def get(self, *labels: str) -> float:
+        """Retourne la valeur courante de la jauge."""
+        key = self._key(labels)
+        function = self._functions.get(key)
+        return float(function()) if function is not None else self._values.get(key, 0.0)
+    
+    def samples(self):
+        with self._lock:
+            items = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                items[key] = float(function())
+            except Exception:
+                continue
+        for key, value in sorted(items.items()):
+            yield "", _label_text(self.labelnames, key), value
+
+class Histogram(Metric):
+    """
+    Histogramme à seaux fixes (latences).
+    
+    Chaque observation incrémente un seul seau ; les cumuls attendus par
+    Prometheus ne sont calculés qu'à la collecte.
+    """
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialise l'histogramme.
+        
+        Args:
+            name (str): Nom Prometheus (suffixé de _bucket, _sum et _count à l'exposition).
+            documentation (str): Description affichée dans # HELP.
+            labelnames (Sequence[str]): Noms des étiquettes ('le' est réservé).
+            buckets (Sequence[float]): Bornes supérieures croissantes des seaux.
+        """
+        if "le" in labelnames:
+            raise ValueError("L'étiquette 'le' est réservée aux histogrammes")
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+    
+    def observe(self, value: float, *labels: str):
+        """
+        Enregistre une observation.
+        
+        Args:
+            value (float): La valeur observée (en secondes pour une latence).
+            *labels (str): Valeurs des étiquettes.
+        """
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [compte par seau..., +Inf, somme]
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+    
+    @contextmanager
+    def time(self, *labels: str):
+        """Mesure la durée du bloc `with`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+    
+    def get_count(self, *labels: str) -> int:
+        """Retourne le nombre d'observations."""
+        state = self._values.get(self._key(labels))
+        return sum(state[:-1]) if state else 0
+    
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in sorted(items):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                yield "_bucket", _label_text(self.labelnames + ("le",), key + (_format_value(bound),)), cumulative
+            labels = _label_text(self.labelnames, key)
+            yield "_sum", labels, state[-1]
+            yield "_count", labels, cumulative
+
+class MetricsRegistry:
+    """Ensemble des métriques du processus."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"La métrique {name} existe déjà avec un autre type ou d'autres étiquettes")
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Retourne le compteur `name`, créé au premier appel."""
+        return self._register(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Retourne la jauge `name`, créée au premier appel."""
+        return self._register(Gauge, name, documentation, labelnames)
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Retourne l'histogramme `name`, créé au premier appel."""
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+    
+    def get(self, name: str) -> Optional[Metric]:
+        """Retourne une métrique enregistrée, ou None."""
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        """
+        Sérialise toutes les métriques au format texte de Prometheus (version 0.0.4).
+        
+        Returns:
+            str: Le document à servir sur /metrics.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+_registry = MetricsRegistry()
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Récupère le registre de métriques du processus.
+    
+    Returns:
+        MetricsRegistry: Le registre partagé.
+    """
+    return _registry
+
+# Métriques communes aux services
+HTTP_REQUEST_DURATION = _registry.histogram(
+    "aiterminal_http_request_duration_seconds",
+    "Durée des requêtes de l'API web, par route, méthode et statut",
+    ("route", "method", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = _registry.gauge(
+    "aiterminal_http_requests_in_progress",
+    "Requêtes de l'API web en cours de traitement"
+)
+UPSTREAM_DURATION = _registry.histogram(
+    "aiterminal_upstream_request_duration_seconds",
+    "Durée des appels sortants (OpenAI, DuckDuckGo, requêtes HTTP), par tentative",
+    ("service", "operation", "outcome"),
+    buckets=UPSTREAM_BUCKETS
+)
+PING_DURATION = _registry.histogram(
+    "aiterminal_ping_duration_seconds",
+    "Durée des sous-processus ping",
+    ("outcome",),
+    buckets=UPSTREAM_BUCKETS
+)
+CACHE_REQUESTS = _registry.counter(
+    "aiterminal_cache_requests_total",
+    "Consultations des caches (cache de prompt OpenAI, sessions en mémoire), par résultat",
+    ("cache", "result")
+)
+AI_TOKENS = _registry.counter(
+    "aiterminal_ai_tokens_total",
+    "Tokens consommés par les appels IA (prompt, dont cache, completion)",
+    ("kind",)
+)
+
+class MetricsMiddleware:
+    """
+    Middleware WSGI qui mesure les requêtes dont le chemin commence par `prefix`.
+    
+    Placé autour de l'application Flask plutôt que dans des hooks before/after_request,
+    il ne passe ni par les proxys de contexte ni par la répartition des hooks. La
+    route est le modèle d'URL résolu par Flask (par exemple '/api/system'), ce qui
+    borne le nombre de séries. La durée s'arrête au retour de l'application, avant
+    l'envoi du corps d'une réponse en flux.
+    """
+    
+    def __init__(self, app, prefix: str = "/api/"):
+        """
+        Initialise le middleware.
+        
+        Args:
+            app: L'application WSGI (par exemple flask_app.wsgi_app).
+            prefix (str): Préfixe des chemins mesurés.
+        """
+        self.app = app
+        self.prefix = prefix
+    
+    def __call__(self, environ, start_response):
+        if not environ.get("PATH_INFO", "").startswith(self.prefix):
+            return self.app(environ, start_response)
+        
+        seen = ["unmatched", "500"]
+        
+        def capture_status(status_line, headers, exc_info=None):
+            # Appelé avant la fin du contexte de requête: la requête Flask est encore
+            # référencée par Werkzeug dans l'environnement WSGI
+            rule = getattr(environ.get("werkzeug.request"), "url_rule", None)
+            if rule is not None:
+                seen[0] = rule.rule
+            seen[1] = status_line[:3]
+            return start_response(status_line, headers, exc_info)
+        
+        started = time.perf_counter()
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            return self.app(environ, capture_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, seen[0], environ.get("REQUEST_METHOD", ""), seen[1])
+
+@contextmanager
+def time_upstream(service: str, operation: str):
+    """
+    Mesure un appel sortant ; l'issue ('ok' ou 'error') dépend de l'exception levée.
+    
+    Args:
+        service (str): Le service appelé (openai, duckduckgo, http).
+        operation (str): L'opération (chat.completions, search, GET...).
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        UPSTREAM_DURATION.observe(time.perf_counter() - started, service, operation, outcome)
+
+def record_cache(cache: str, hit: bool):
+    """
+    Enregistre une consultation de cache.
+    
+    Args:
+        cache (str): Le nom du cache.
+        hit (bool): True si la valeur a été trouvée.
+    """
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
@@ -0,0 +1,379 @@
+"""
+Module du serveur OpenAI simulé.
+Fournit un remplaçant local de l'endpoint chat completions (JSON et streaming)
+pour les benchmarks et les tests de non-régression, sans appel facturé.
+
+Usage:
+    python -m aiterminal.mock_openai --port 8089 --latency lognormal:200:0.5 --error-rate 0.05
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import argparse
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from .utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Taille d'un bloc de cache de prompt et seuil minimal, comme l'API réelle
+PROMPT_CACHE_BLOCK = 128
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+class LatencyModel:
+    """
+    Distribution de latence configurable.
+    
+    Formats acceptés (valeurs en millisecondes):
+        fixed:50, uniform:20:200, normal:100:20, lognormal:200:0.5 (médiane, sigma)
+    """
+    
+    def __init__(self, spec: str = "fixed:0"):
+        """
+        Initialise la distribution.
+        
+        Args:
+            spec (str): Description de la distribution.
+        
+        Raises:
+            ValueError: Si la description est invalide.
+        """
+        parts = spec.split(":")
+        self.kind = parts[0]
+        try:
+            self.params = [float(p) for p in parts[1:]]
+        except ValueError:
+            raise ValueError(f"Distribution de latence invalide: {spec}")
+        
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Distribution de latence invalide: {spec}")
+        self.spec = spec
+    
+    def sample(self) -> float:
+        """
+        Tire une latence.
+        
+        Returns:
+            float: La latence en secondes.
+        """
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = random.uniform(*self.params)
+        elif self.kind == "normal":
+            value = random.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = random.lognormvariate(math.log(max(median, 1e-3)), sigma)
+        return max(0.0, value) / 1000.0
+
+class MockSettings:
+    """Paramètres de comportement du serveur simulé."""
+    
+    def __init__(self, latency: str = "fixed:0", error_rate: float = 0.0, error_statuses: Optional[List[int]] = None,
+                 retry_after: Optional[float] = 1.0, tokens_per_second: float = 0.0, completion_tokens: int = 32):
+        """
+        Initialise les paramètres.
+        
+        Args:
+            latency (str): Distribution de latence avant la réponse (ou le premier token).
+            error_rate (float): Proportion de requêtes en erreur (0.0 à 1.0).
+            error_statuses (List[int], optional): Codes d'erreur tirés au hasard (défaut: 429, 500, 503).
+            retry_after (float, optional): Valeur de l'en-tête Retry-After des réponses 429/503.
+            tokens_per_second (float): Débit de génération ; 0 pour une génération instantanée.
+            completion_tokens (int): Nombre de tokens générés pour les réponses texte.
+        """
+        self.latency = LatencyModel(latency)
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [429, 500, 503]
+        self.retry_after = retry_after
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+
+class MockOpenAIServer:
+    """
+    Serveur HTTP/1.1 asyncio imitant /v1/chat/completions.
+    
+    Il gère le keep-alive, le mode JSON (response_format), le streaming SSE
+    et simule le cache de prompt en renvoyant des cached_tokens pour les
+    préfixes de messages déjà vus.
+    """
+    
+    def __init__(self, settings: Optional[MockSettings] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialise le serveur.
+        
+        Args:
+            settings (MockSettings, optional): Le comportement simulé.
+            host (str): Adresse d'écoute.
+            port (int): Port d'écoute (0 pour un port libre).
+        """
+        self.settings = settings or MockSettings()
+        self.host = host
+        self.port = port
+        self.requests_served = 0
+        self._seen_prefixes = set()
+        self._server = None
+        self._loop = None
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        """URL de base à fournir au client OpenAI."""
+        return f"http://{self.host}:{self.port}/v1"
+    
+    async def start(self):
+        """Démarre l'écoute sur la boucle d'événements courante."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=2048)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def serve_forever(self, on_ready=None):
+        """
+        Démarre le serveur et le fait tourner jusqu'à annulation.
+        
+        Args:
+            on_ready (Callable[[str], None], optional): Appelé avec l'URL de base une fois à l'écoute.
+        """
+        await self.start()
+        if on_ready is not None:
+            on_ready(self.base_url)
+        async with self._server:
+            await self._server.serve_forever()
+    
+    def start_in_thread(self) -> str:
+        """
+        Démarre le serveur dans un thread d'arrière-plan.
+        
+        Returns:
+            str: L'URL de base du serveur.
+        """
+        started = threading.Event()
+        
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+            # Connexions encore ouvertes (keep-alive): annulées avant de fermer la boucle
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+        
+        self._thread = threading.Thread(target=run, name="mock-openai", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.base_url
+    
+    def stop(self):
+        """Arrête le serveur démarré avec start_in_thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, body = request
+                keep_alive = await self._dispatch(writer, method, path, body)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Erreur du serveur simulé: {str(e)}")
+        finally:
+            writer.close()
+    
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes]]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?", 1)[0], body
+    
+    async def _dispatch(self, writer, method: str, path: str, body: bytes) -> bool:
+        if method == "GET" and path in ("/v1/models", "/models"):
+            await self._send_json(writer, 200, {"object": "list", "data": [{"id": "gpt-4o", "object": "model"}]})
+            return True
+        if method == "GET" and path == "/health":
+            await self._send_json(writer, 200, {"status": "ok", "requests_served": self.requests_served})
+            return True
+        if method != "POST" or path not in ("/v1/chat/completions", "/chat/completions"):
+            await self._send_json(writer, 404, {"error": {"message": f"Route inconnue: {method} {path}"}})
+            return True
+        
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            await self._send_json(writer, 400, {"error": {"message": "JSON invalide", "type": "invalid_request_error"}})
+            return True
+        
+        self.requests_served += 1
+        await asyncio.sleep(self.settings.latency.sample())
+        
+        if self.settings.error_rate and random.random() < self.settings.error_rate:
+            status = random.choice(self.settings.error_statuses)
+            extra = {}
+            if status in (429, 503) and self.settings.retry_after is not None:
+                extra["retry-after"] = str(self.settings.retry_after)
+            await self._send_json(writer, status, {"error": {"message": "Erreur simulée", "type": "mock_error"}}, extra)
+            return True
+        
+        if payload.get("stream"):
+            await self._send_stream(writer, payload)
+            return False
+        await self._send_json(writer, 200, self._completion(payload))
+        return True
+    
+    def _usage(self, messages: List[Dict[str, Any]], completion_tokens: int) -> Dict[str, Any]:
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) + 4 for m in messages)
+        
+        # Cache de prompt simulé: plus long préfixe de messages déjà vu
+        cached_tokens = 0
+        digest = hashlib.sha1()
+        prefix_tokens = 0
+        for message in messages[:-1]:
+            digest.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+            prefix_tokens += estimate_tokens(str(message.get("content", ""))) + 4
+            key = digest.hexdigest()
+            if key in self._seen_prefixes:
+                cached_tokens = prefix_tokens
+            else:
+                self._seen_prefixes.add(key)
+        if cached_tokens < PROMPT_CACHE_MIN_TOKENS:
+            cached_tokens = 0
+        cached_tokens -= cached_tokens % PROMPT_CACHE_BLOCK
+        
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+    
+    def _content(self, payload: Dict[str, Any]) -> str:
+        messages = payload.get("messages") or [{}]
+        prompt = str(messages[-1].get("content", ""))
+        
+        if (payload.get("response_format") or {}).get("type") == "json_object":
+            lower = prompt.lower()
+            if "sentiment" in lower:
+                return json.dumps({"sentiment": "positive", "score": 0.8, "explanation": "Réponse simulée."})
+            if "entités" in lower or "entities" in lower:
+                return json.dumps({"entities": {"personnes": ["Alice"], "lieux": ["Paris"], "organisations": [], "dates": []}})
+            return json.dumps({"result": "Réponse simulée."})
+        
+        words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+        count = min(self.settings.completion_tokens, payload.get("max_tokens") or self.settings.completion_tokens)
+        return " ".join(words[i % len(words)] for i in range(count))
+    
+    def _completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        content = self._content(payload)
+        return {
+            "id": f"chatcmpl-mock{self.requests_served}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": self._usage(payload.get("messages") or [], estimate_tokens(content))
+        }
+    
+    async def _send_json(self, writer, status: int, data: Dict[str, Any], extra_headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data).encode("utf-8")
+        headers = [f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}",
+                   "content-type: application/json",
+                   f"content-length: {len(body)}"]
+        headers.extend(f"{k}: {v}" for k, v in (extra_headers or {}).items())
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+    
+    async def _send_stream(self, writer, payload: Dict[str, Any]):
+        writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\ncache-control: no-cache\r\n"
+                     b"connection: close\r\n\r\n")
+        content = self._content(payload)
+        tokens = content.split(" ")
+        delay = 1.0 / self.settings.tokens_per_second if self.settings.tokens_per_second else 0.0
+        base = {
+            "id": f"chatcmpl-mock{self.requests_served}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-4o")
+        }
+        
+        for index, token in enumerate(tokens):
+            piece = token if index == 0 else " " + token
+            chunk = dict(base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+            writer.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            await writer.drain()
+            if delay:
+                await asyncio.sleep(delay)
+        
+        final = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        writer.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            usage = dict(base, choices=[], usage=self._usage(payload.get("messages") or [], len(tokens)))
+            writer.write(f"data: {json.dumps(usage)}\n\n".encode("utf-8"))
+        writer.write(b"data: [DONE]\n\n")
+        await writer.drain()
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande du serveur simulé."""
+    parser = argparse.ArgumentParser(description="Serveur OpenAI simulé pour AITerminal")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089, help="Port d'écoute (0 pour un port libre)")
+    parser.add_argument("--latency", default="fixed:50", help="Distribution: fixed:MS, uniform:MIN:MAX, normal:MOY:ET, lognormal:MEDIANE:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion de réponses en erreur")
+    parser.add_argument("--error-statuses", default="429,500,503", help="Codes d'erreur injectés, séparés par des virgules")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="En-tête Retry-After des erreurs 429/503")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Débit de génération en streaming")
+    parser.add_argument("--completion-tokens", type=int, default=32, help="Tokens générés par réponse texte")
+    args = parser.parse_args(argv)
+    
+    settings = MockSettings(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(",") if s],
+        retry_after=args.retry_after,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens
+    )
+    server = MockOpenAIServer(settings, args.host, args.port)
+    
+    try:
+        # La première ligne affichée est lue par les scripts de benchmark pour connaître le port
+        asyncio.run(server.serve_forever(on_ready=lambda url: print(url, flush=True)))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    sys.exit(main())
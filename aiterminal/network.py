@@ -8,14 +8,84 @@ import logging
 import subprocess
 import platform
 import re
-import requests
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, Iterator, List, Any, Optional, Tuple
 import time
 
 from .config import Config
+from .metrics import PING_DURATION, time_upstream
+from .tracing import add_span, span, traced
 
 logger = logging.getLogger(__name__)
 
+# Méthodes suivies individuellement dans les métriques (les autres sont regroupées)
+HTTP_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+
+def _ping_command(host: str, count: int) -> List[str]:
+    """Construit la commande ping selon le système d'exploitation."""
+    if platform.system().lower() == "windows":
+        return ["ping", "-n", str(count), host]
+    return ["ping", "-c", str(count), host]  # Linux, macOS, etc.
+
+def _parse_ping_line(line: str) -> Optional[Dict[str, Any]]:
+    """
+    Interprète une ligne de sortie de ping.
+    
+    Args:
+        line (str): La ligne.
+    
+    Returns:
+        Optional[Dict[str, Any]]: Le résultat (success, message, time_ms), ou None si la ligne n'est pas une réponse.
+    """
+    # Pour les lignes contenant une réponse de ping
+    if "bytes from" in line.lower() or "Reply from" in line:
+        # Extraire le temps (ms)
+        time_match = re.search(r"time=(\d+\.?\d*)", line)
+        return {
+            "success": True,
+            "message": line.strip(),
+            "time_ms": float(time_match.group(1)) if time_match else None
+        }
+    # Pour les lignes indiquant une absence de réponse
+    if "request timed out" in line.lower() or "destination host unreachable" in line.lower():
+        return {
+            "success": False,
+            "message": line.strip(),
+            "time_ms": None
+        }
+    return None
+
+def _prepare_http(headers_str: Optional[str], data_str: Optional[str]) -> Tuple[Dict[str, str], Any]:
+    """
+    Décode les en-têtes (JSON) et le corps d'une requête HTTP.
+    
+    Args:
+        headers_str (str, optional): Les en-têtes au format JSON.
+        data_str (str, optional): Les données, décodées comme JSON si possible.
+    
+    Returns:
+        Tuple[Dict[str, str], Any]: Les en-têtes et les données (dict, chaîne ou None).
+    
+    Raises:
+        Exception: Si les en-têtes ne sont pas du JSON valide.
+    """
+    # Préparer les en-têtes
+    headers = {}
+    if headers_str:
+        try:
+            headers = json.loads(headers_str)
+        except json.JSONDecodeError:
+            raise Exception("Format d'en-têtes JSON invalide")
+    
+    # Préparer les données
+    data = None
+    if data_str:
+        # Tenter de parser comme JSON, sinon utiliser comme données brutes
+        try:
+            data = json.loads(data_str)
+        except json.JSONDecodeError:
+            data = data_str
+    return headers, data
+
 class NetworkService:
     """Service pour les fonctionnalités réseau."""
     
@@ -35,26 +105,36 @@ class NetworkService:
         Args:
             host (str): L'hôte à pinguer.
             count (int): Le nombre de paquets à envoyer.
-            
+        
         Returns:
             List[Dict[str, Any]]: Résultats des pings.
-            
+        
+        Raises:
+            Exception: Si une erreur se produit lors du ping.
+        """
+        return list(self.iter_ping(host, count))
+    
+    def iter_ping(self, host: str, count: int = 4) -> Iterator[Dict[str, Any]]:
+        """
+        Envoie des requêtes ping à un hôte et produit chaque réponse dès sa réception.
+        
+        Args:
+            host (str): L'hôte à pinguer.
+            count (int): Le nombre de paquets à envoyer.
+        
+        Yields:
+            Dict[str, Any]: Le résultat d'un ping (success, message, time_ms).
+        
         Raises:
             Exception: Si une erreur se produit lors du ping.
         """
-        results = []
+        received = 0
+        process = None
+        started = time.perf_counter()
         
         try:
-            # Détermine la commande ping selon le système d'exploitation
-            os_name = platform.system().lower()
-            
-            if os_name == "windows":
-                ping_cmd = ["ping", "-n", str(count), host]
-            else:  # Linux, macOS, etc.
-                ping_cmd = ["ping", "-c", str(count), host]
-            
             process = subprocess.Popen(
-                ping_cmd, 
+                _ping_command(host, count),
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 universal_newlines=True
@@ -62,37 +142,32 @@ class NetworkService:
             
             # Traiter chaque ligne de sortie
             for line in process.stdout:
-                # Pour les lignes contenant une réponse de ping
-                if "bytes from" in line.lower() or "Reply from" in line:
-                    # Extraire le temps (ms)
-                    time_match = re.search(r"time=(\d+\.?\d*)", line)
-                    time_ms = float(time_match.group(1)) if time_match else None
-                    
-                    results.append({
-                        "success": True,
-                        "message": line.strip(),
-                        "time_ms": time_ms
-                    })
-                # Pour les lignes indiquant une absence de réponse
-                elif "request timed out" in line.lower() or "destination host unreachable" in line.lower():
-                    results.append({
-                        "success": False,
-                        "message": line.strip(),
-                        "time_ms": None
-                    })
+                result = _parse_ping_line(line)
+                if result is not None:
+                    received += 1
+                    yield result
             
             # Si aucun résultat n'a été obtenu, c'est probablement une erreur
-            if not results:
+            if not received:
                 stderr_output = process.stderr.read()
                 if stderr_output:
                     raise Exception(f"Erreur de ping: {stderr_output}")
                 else:
                     raise Exception("Aucune réponse reçue du ping")
-            
-            return results
         except Exception as e:
             logger.error(f"Erreur lors du ping: {str(e)}")
             raise Exception(f"Erreur lors du ping: {str(e)}")
+        finally:
+            # Le consommateur peut s'arrêter avant la fin: ne pas laisser ping tourner
+            if process is not None:
+                if process.poll() is None:
+                    process.kill()
+                returncode = process.wait()
+                process.stdout.close()
+                process.stderr.close()
+                PING_DURATION.observe(time.perf_counter() - started, "ok" if returncode == 0 else "error")
+                # Span ajouté une fois terminé: le générateur ne peut pas le garder ouvert entre deux yield
+                add_span("network.ping", started, host=host, count=count, received=received)
     
     def get_ping_summary(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -124,6 +199,7 @@ class NetworkService:
             "avg_rtt": round(avg_rtt, 2) if avg_rtt else 0
         }
     
+    @traced("network.http_request")
     def http_request(
         self, 
         url: str, 
@@ -148,33 +224,23 @@ class NetworkService:
         Raises:
             Exception: Si une erreur se produit lors de la requête.
         """
+        # Importé ici: ping et les autres commandes n'ont pas à charger requests
+        import requests
+        
         try:
-            # Préparer les en-têtes
-            headers = {}
-            if headers_str:
-                try:
-                    headers = json.loads(headers_str)
-                except json.JSONDecodeError:
-                    raise Exception("Format d'en-têtes JSON invalide")
-            
-            # Préparer les données
-            data = None
-            if data_str:
-                # Tenter de parser comme JSON, sinon utiliser comme données brutes
-                try:
-                    data = json.loads(data_str)
-                except json.JSONDecodeError:
-                    data = data_str
+            headers, data = _prepare_http(headers_str, data_str)
             
             # Envoyer la requête
-            response = requests.request(
-                method=method.upper(),
-                url=url,
-                headers=headers,
-                json=data if isinstance(data, dict) else None,
-                data=data if not isinstance(data, dict) else None,
-                timeout=timeout
-            )
+            operation = method.upper() if method.upper() in HTTP_METHODS else "OTHER"
+            with span("http.send", method=method.upper(), url=url), time_upstream("http", operation):
+                response = requests.request(
+                    method=method.upper(),
+                    url=url,
+                    headers=headers,
+                    json=data if isinstance(data, dict) else None,
+                    data=data if not isinstance(data, dict) else None,
+                    timeout=timeout
+                )
             
             # Préparer le résultat
             result = {
@@ -185,11 +251,12 @@ class NetworkService:
             }
             
             # Tenter de parser le contenu comme JSON
-            try:
-                result["content"] = response.json()
-            except json.JSONDecodeError:
-                # Si ce n'est pas du JSON, utiliser le texte brut
-                result["content"] = response.text
+            with span("http.decode", bytes=len(response.content)):
+                try:
+                    result["content"] = response.json()
+                except json.JSONDecodeError:
+                    # Si ce n'est pas du JSON, utiliser le texte brut
+                    result["content"] = response.text
             
             return result
         except requests.exceptions.RequestException as e:
@@ -198,3 +265,147 @@ class NetworkService:
         except Exception as e:
             logger.error(f"Erreur inattendue: {str(e)}")
             raise Exception(f"Erreur inattendue: {str(e)}")
+
+class AsyncNetworkService(NetworkService):
+    """
+    Service réseau asynchrone, utilisé par le mode de service ASGI.
+    
+    ping et http_request sont des coroutines : la sortie du sous-processus ping est
+    lue par la boucle d'événements et les requêtes HTTP passent par le pool httpx
+    asynchrone partagé, sans thread bloqué pendant l'attente.
+    """
+    
+    async def ping(self, host: str, count: int = 4) -> List[Dict[str, Any]]:
+        """
+        Envoie des requêtes ping à un hôte.
+        
+        Args:
+            host (str): L'hôte à pinguer.
+            count (int): Le nombre de paquets à envoyer.
+        
+        Returns:
+            List[Dict[str, Any]]: Résultats des pings.
+        
+        Raises:
+            Exception: Si une erreur se produit lors du ping.
+        """
+        return [result async for result in self.iter_ping(host, count)]
+    
+    async def iter_ping(self, host: str, count: int = 4) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Envoie des requêtes ping à un hôte et produit chaque réponse dès sa réception.
+        
+        Args:
+            host (str): L'hôte à pinguer.
+            count (int): Le nombre de paquets à envoyer.
+        
+        Yields:
+            Dict[str, Any]: Le résultat d'un ping (success, message, time_ms).
+        
+        Raises:
+            Exception: Si une erreur se produit lors du ping.
+        """
+        # Importé ici: la commande ping de la CLI n'en a pas besoin
+        import asyncio
+        
+        received = 0
+        process = None
+        started = time.perf_counter()
+        
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *_ping_command(host, count),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            async for line in process.stdout:
+                result = _parse_ping_line(line.decode("utf-8", errors="replace"))
+                if result is not None:
+                    received += 1
+                    yield result
+            
+            if not received:
+                stderr_output = (await process.stderr.read()).decode("utf-8", errors="replace")
+                if stderr_output:
+                    raise Exception(f"Erreur de ping: {stderr_output}")
+                else:
+                    raise Exception("Aucune réponse reçue du ping")
+        except Exception as e:
+            logger.error(f"Erreur lors du ping: {str(e)}")
+            raise Exception(f"Erreur lors du ping: {str(e)}")
+        finally:
+            # Requête annulée (client parti) ou consommateur arrêté: ne pas laisser ping tourner
+            if process is not None:
+                if process.returncode is None:
+                    try:
+                        process.kill()
+                    except ProcessLookupError:
+                        pass
+                returncode = await process.wait()
+                PING_DURATION.observe(time.perf_counter() - started, "ok" if returncode == 0 else "error")
+                add_span("network.ping", started, host=host, count=count, received=received)
+    
+    @traced("network.http_request")
+    async def http_request(
+        self,
+        url: str,
+        method: str = "GET",
+        headers_str: Optional[str] = None,
+        data_str: Optional[str] = None,
+        timeout: int = 10
+    ) -> Dict[str, Any]:
+        """
+        Envoie une requête HTTP (voir NetworkService.http_request).
+        
+        Args:
+            url (str): L'URL pour la requête.
+            method (str): La méthode HTTP (GET, POST, etc.).
+            headers_str (str, optional): Les en-têtes au format JSON.
+            data_str (str, optional): Les données à envoyer (pour POST, PUT).
+            timeout (int): Le timeout en secondes.
+            
+        Returns:
+            Dict[str, Any]: Le résultat de la requête.
+            
+        Raises:
+            Exception: Si une erreur se produit lors de la requête.
+        """
+        import httpx
+        from .ai_services import get_async_http_client
+        
+        try:
+            headers, data = _prepare_http(headers_str, data_str)
+            
+            # Envoyer la requête (redirections suivies, comme avec requests)
+            operation = method.upper() if method.upper() in HTTP_METHODS else "OTHER"
+            with span("http.send", method=method.upper(), url=url), time_upstream("http", operation):
+                response = await get_async_http_client(self.config).request(
+                    method.upper(),
+                    url,
+                    headers=headers,
+                    json=data if isinstance(data, dict) else None,
+                    content=data_str if data is not None and not isinstance(data, dict) else None,
+                    timeout=timeout,
+                    follow_redirects=True
+                )
+            
+            result = {
+                "status_code": response.status_code,
+                "reason": response.reason_phrase,
+                "headers": dict(response.headers),
+                "url": str(response.url),
+            }
+            
+            with span("http.decode", bytes=len(response.content)):
+                try:
+                    result["content"] = response.json()
+                except ValueError:
+                    result["content"] = response.text
+            
+            return result
+        except httpx.HTTPError as e:
+            logger.error(f"Erreur lors de la requête HTTP: {str(e)}")
+            raise Exception(f"Erreur lors de la requête HTTP: {str(e)}")
+        except Exception as e:
+            logger.error(f"Erreur inattendue: {str(e)}")
+            raise Exception(f"Erreur inattendue: {str(e)}")
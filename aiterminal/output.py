@@ -0,0 +1,186 @@
+"""
+Module des formats de sortie de la CLI.
+Sérialise les résultats en JSON ou NDJSON, au fil de l'eau, pour les scripts et
+les pipelines ; le format 'table' reste l'affichage Rich habituel.
+"""
+
+import os
+import sys
+import json
+from contextvars import ContextVar
+from typing import Any, Optional
+
+OUTPUT_MODES = ("table", "json", "ndjson")
+
+# Au-delà, une réponse est écrite telle quelle: la coloration Rich devient très lente
+RICH_MAX_CHARS = 100000
+
+# Format de sortie de la commande en cours (par thread et par tâche asyncio)
+_current_mode: ContextVar[str] = ContextVar("aiterminal_output_mode", default="table")
+
+# orjson, chargé à la première sérialisation (~10 ms d'import épargnés à l'affichage en tableau)
+_orjson = False
+
+def _get_orjson():
+    global _orjson
+    if _orjson is False:
+        try:
+            import orjson
+        except ImportError:  # Sérialiseur de la bibliothèque standard, plus lent
+            orjson = None
+        _orjson = orjson
+    return _orjson
+
+def set_output_mode(mode: str):
+    """
+    Définit le format de sortie du contexte courant.
+    
+    Args:
+        mode (str): 'table', 'json' ou 'ndjson'.
+    
+    Returns:
+        Le jeton permettant de restaurer la valeur précédente.
+    
+    Raises:
+        ValueError: Si le format est inconnu.
+    """
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"Format de sortie inconnu: {mode} (disponibles: {', '.join(OUTPUT_MODES)})")
+    return _current_mode.set(mode)
+
+def get_output_mode() -> str:
+    """Retourne le format de sortie du contexte courant."""
+    return _current_mode.get()
+
+def is_machine_output() -> bool:
+    """Indique si la commande doit produire du JSON ou du NDJSON plutôt que des tableaux."""
+    return _current_mode.get() != "table"
+
+def dumps(value: Any, indent: bool = False) -> str:
+    """
+    Sérialise une valeur en JSON (orjson s'il est installé).
+    
+    Les types non sérialisables (dates, ensembles...) sont convertis en chaîne.
+    
+    Args:
+        value (Any): La valeur à sérialiser.
+        indent (bool): Indenter le résultat (2 espaces).
+    
+    Returns:
+        str: Le JSON.
+    """
+    orjson = _get_orjson()
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(value, option=option, default=str).decode("utf-8")
+        except TypeError:
+            # Entiers hors de la plage 64 bits, sous-classes exotiques: repli sur json
+            pass
+    if indent:
+        return json.dumps(value, ensure_ascii=False, indent=2, default=str)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+def loads(text: str) -> Any:
+    """
+    Analyse un document JSON (orjson s'il est installé).
+    
+    Raises:
+        ValueError: Si le texte n'est pas du JSON valide.
+    """
+    orjson = _get_orjson()
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def _write(stream, text: str):
+    try:
+        stream.write(text)
+        stream.flush()
+    except BrokenPipeError:
+        # Lecteur fermé (par exemple `| head`): les écritures suivantes sont ignorées
+        # et la commande s'arrête sans erreur (SystemExit échappe aux `except Exception`)
+        try:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), stream.fileno())
+        except (AttributeError, OSError, ValueError):
+            pass
+        raise SystemExit(0)
+
+class RecordWriter:
+    """
+    Écrit des enregistrements sur la sortie standard dès qu'ils sont produits.
+    
+    En NDJSON, un objet JSON par ligne. En JSON, un tableau écrit progressivement
+    ('[' au premier enregistrement, ']' à la fermeture), qui reste un document valide.
+    """
+    
+    def __init__(self, mode: Optional[str] = None, stream=None):
+        """
+        Initialise l'écrivain.
+        
+        Args:
+            mode (str, optional): 'json' ou 'ndjson' (par défaut le format courant).
+            stream: Flux de sortie (par défaut sys.stdout au moment de l'écriture).
+        """
+        self.mode = mode or get_output_mode()
+        self.stream = stream
+        self.count = 0
+        self._closed = False
+    
+    def write(self, record: Any):
+        """Écrit un enregistrement."""
+        if self.mode == "ndjson":
+            _write(self.stream or sys.stdout, dumps(record) + "\n")
+        else:
+            _write(self.stream or sys.stdout, ("[\n" if self.count == 0 else ",\n") + dumps(record))
+        self.count += 1
+    
+    def close(self):
+        """Termine la sortie (ferme le tableau JSON)."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.mode == "json":
+            _write(self.stream or sys.stdout, "\n]\n" if self.count else "[]\n")
+    
+    def __enter__(self) -> "RecordWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def emit(value: Any, stream=None):
+    """
+    Écrit un résultat unique au format courant.
+    
+    En JSON, la valeur est indentée ; en NDJSON, elle tient sur une ligne
+    (une liste produit une ligne par élément).
+    
+    Args:
+        value (Any): Le résultat.
+        stream: Flux de sortie (par défaut sys.stdout).
+    """
+    if get_output_mode() == "ndjson":
+        items = value if isinstance(value, list) else [value]
+        _write(stream or sys.stdout, "".join(dumps(item) + "\n" for item in items))
+    else:
+        _write(stream or sys.stdout, dumps(value, indent=True) + "\n")
+
+def print_response(response: Any):
+    """
+    Affiche une réponse dans la console (format 'table').
+    
+    Les réponses courtes passent par rich.print (coloration du JSON) ; au-delà de
+    RICH_MAX_CHARS, le texte est écrit directement sur la sortie standard.
+    
+    Args:
+        response (Any): La réponse (texte, dictionnaire ou liste).
+    """
+    from rich import print as rprint
+    from .utils import format_response
+    
+    text = format_response(response)
+    if len(text) > RICH_MAX_CHARS:
+        _write(sys.stdout, text + "\n")
+    else:
+        rprint(text)
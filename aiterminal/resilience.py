@@ -0,0 +1,324 @@
+"""
+Module de résilience.
+Fournit un disjoncteur (circuit breaker) et une politique de réessai
+avec backoff exponentiel pour les appels aux APIs externes.
+"""
+
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Levée lorsqu'un appel est refusé parce que le disjoncteur est ouvert."""
+    
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Disjoncteur '{name}' ouvert, nouvel essai dans {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """
+    Disjoncteur à trois états (fermé, ouvert, semi-ouvert).
+    
+    Après `failure_threshold` échecs consécutifs, le disjoncteur s'ouvre et
+    refuse immédiatement les appels pendant `reset_timeout` secondes. Il passe
+    ensuite en semi-ouvert et laisse passer au plus `half_open_max_calls`
+    appels de sonde : un succès le referme, un échec le rouvre.
+    """
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        """
+        Initialise le disjoncteur.
+        
+        Args:
+            name (str): Nom du disjoncteur (utilisé dans les logs et métriques).
+            failure_threshold (int): Nombre d'échecs consécutifs avant ouverture.
+            reset_timeout (float): Durée d'ouverture en secondes avant la sonde.
+            half_open_max_calls (int): Nombre d'appels de sonde simultanés autorisés.
+        """
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.half_open_max_calls = max(1, int(half_open_max_calls))
+        
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        
+        # Compteurs cumulés exposés dans les métriques
+        self._successes = 0
+        self._failures = 0
+        self._rejected = 0
+        self._opens = 0
+    
+    @property
+    def state(self) -> str:
+        """Retourne l'état courant, en tenant compte de l'expiration du délai d'ouverture."""
+        with self._lock:
+            return self._current_state()
+    
+    def _current_state(self) -> str:
+        # Doit être appelé avec le verrou acquis
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = STATE_HALF_OPEN
+            self._half_open_in_flight = 0
+            logger.info(f"Disjoncteur '{self.name}' semi-ouvert: envoi d'une requête de sonde")
+        return self._state
+    
+    def before_call(self):
+        """
+        Vérifie qu'un appel peut être effectué.
+        
+        Raises:
+            CircuitOpenError: Si le disjoncteur est ouvert ou si les sondes sont déjà en cours.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == STATE_CLOSED:
+                return
+            if state == STATE_HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return
+            self._rejected += 1
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(self.name, retry_in)
+    
+    def record_success(self):
+        """Enregistre un appel réussi."""
+        with self._lock:
+            self._successes += 1
+            self._consecutive_failures = 0
+            if self._state == STATE_HALF_OPEN:
+                logger.info(f"Disjoncteur '{self.name}' refermé après une sonde réussie")
+                self._half_open_in_flight = 0
+            self._state = STATE_CLOSED
+    
+    def record_failure(self):
+        """Enregistre un appel en échec et ouvre le disjoncteur si nécessaire."""
+        with self._lock:
+            self._failures += 1
+            self._consecutive_failures += 1
+            if self._state == STATE_HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != STATE_OPEN:
+                    self._opens += 1
+                    logger.warning(
+                        f"Disjoncteur '{self.name}' ouvert après {self._consecutive_failures} échec(s) "
+                        f"pour {self.reset_timeout:.0f}s"
+                    )
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+                self._half_open_in_flight = 0
+    
+    def release(self):
+        """Libère une place de sonde sans compter ni succès ni échec."""
+        with self._lock:
+            if self._state == STATE_HALF_OPEN and self._half_open_in_flight > 0:
+                self._half_open_in_flight -= 1
+    
+    def reset(self):
+        """Remet le disjoncteur à l'état fermé."""
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._consecutive_failures = 0
+            self._half_open_in_flight = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Récupère l'état et les compteurs du disjoncteur.
+        
+        Returns:
+            Dict[str, Any]: État et compteurs du disjoncteur.
+        """
+        with self._lock:
+            state = self._current_state()
+            retry_in = 0.0
+            if state == STATE_OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in": round(retry_in, 2),
+                "successes": self._successes,
+                "failures": self._failures,
+                "rejected": self._rejected,
+                "opens": self._opens,
+            }
+
+class RetryPolicy:
+    """
+    Politique de réessai avec backoff exponentiel et gigue complète.
+    
+    Seules les erreurs transitoires (429, 5xx, timeouts, erreurs de connexion)
+    sont réessayées. L'en-tête `Retry-After` renvoyé par le serveur est
+    respecté lorsqu'il est présent.
+    """
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        """
+        Initialise la politique de réessai.
+        
+        Args:
+            max_attempts (int): Nombre total de tentatives (1 = pas de réessai).
+            base_delay (float): Délai de base en secondes.
+            max_delay (float): Délai maximum entre deux tentatives en secondes.
+        """
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+    
+    @staticmethod
+    def status_code(error: Exception) -> Optional[int]:
+        """
+        Extrait le code HTTP d'une erreur d'API, s'il existe.
+        
+        Args:
+            error (Exception): L'erreur levée par le client.
+        
+        Returns:
+            Optional[int]: Le code HTTP ou None.
+        """
+        status = getattr(error, "status_code", None)
+        return status if isinstance(status, int) else None
+    
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Indique si une erreur est transitoire et mérite un réessai.
+        
+        Args:
+            error (Exception): L'erreur levée par le client.
+        
+        Returns:
+            bool: True si l'appel peut être réessayé.
+        """
+        if isinstance(error, CircuitOpenError):
+            return False
+        status = self.status_code(error)
+        if status is not None:
+            return status in (408, 409, 429) or status >= 500
+        # Erreurs de connexion et timeouts (APIConnectionError, APITimeoutError, ...)
+        return (isinstance(error, (ConnectionError, TimeoutError))
+                or type(error).__name__ in ("APIConnectionError", "APITimeoutError"))
+    
+    def is_failure(self, error: Exception) -> bool:
+        """
+        Indique si une erreur doit compter comme un échec pour le disjoncteur.
+        
+        Les erreurs de requête (400, 404, 422...) sont imputables à l'appelant
+        et ne doivent pas ouvrir le disjoncteur ; une clé invalide (401/403) oui.
+        
+        Args:
+            error (Exception): L'erreur levée par le client.
+        
+        Returns:
+            bool: True si l'erreur traduit une indisponibilité du service.
+        """
+        status = self.status_code(error)
+        if status is not None and status in (401, 403):
+            return True
+        return self.is_retryable(error)
+    
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        """
+        Lit le délai demandé par le serveur dans les en-têtes de la réponse.
+        
+        Args:
+            error (Exception): L'erreur levée par le client.
+        
+        Returns:
+            Optional[float]: Le délai en secondes, ou None s'il est absent.
+        """
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        
+        value = headers.get("retry-after-ms")
+        if value:
+            try:
+                return max(0.0, float(value) / 1000.0)
+            except ValueError:
+                pass
+        
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    
+    def compute_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """
+        Calcule le délai avant la prochaine tentative.
+        
+        Args:
+            attempt (int): Numéro de la tentative qui vient d'échouer (à partir de 1).
+            error (Exception): L'erreur levée par la tentative.
+        
+        Returns:
+            Optional[float]: Le délai en secondes, ou None s'il ne faut pas réessayer.
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(error):
+            return None
+        
+        server_delay = self.retry_after(error)
+        if server_delay is not None:
+            # Un Retry-After plus long que le délai maximum signifie qu'il vaut mieux échouer vite
+            return server_delay if server_delay <= self.max_delay else None
+        
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """
+    Récupère le disjoncteur partagé associé à un nom, en le créant si besoin.
+    
+    Le disjoncteur est commun à tout le processus afin que les instances
+    de services créées à chaque requête partagent le même état.
+    
+    Args:
+        name (str): Nom du disjoncteur.
+        **kwargs: Paramètres transmis à CircuitBreaker lors de la création.
+    
+    Returns:
+        CircuitBreaker: Le disjoncteur partagé.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **kwargs)
+            _breakers[name] = breaker
+        return breaker
+
+def get_all_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Récupère l'état de tous les disjoncteurs du processus.
+    
+    Returns:
+        Dict[str, Dict[str, Any]]: État de chaque disjoncteur, indexé par nom.
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.get_stats() for breaker in breakers}
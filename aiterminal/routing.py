@@ -0,0 +1,335 @@
+"""
+Module de routage des modèles.
+Choisit le modèle OpenAI de chaque appel selon la tâche, la taille du prompt,
+le budget de latence et les latences observées, avec repli en cas de timeout.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from .config import Config
+from .utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Bornes supérieures (ms) des histogrammes de latence par modèle
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 5000, 10000, 30000, float("inf"))
+
+# Poids de la moyenne mobile exponentielle des latences observées
+EWMA_ALPHA = 0.2
+
+TASKS = ("chat", "summary", "sentiment", "entities", "code")
+
+def is_timeout_error(error: Exception) -> bool:
+    """
+    Indique si une erreur correspond à un dépassement de délai.
+    
+    Args:
+        error (Exception): L'erreur levée par le client.
+    
+    Returns:
+        bool: True pour un timeout.
+    """
+    return isinstance(error, TimeoutError) or type(error).__name__ == "APITimeoutError"
+
+class ModelLatencyStats:
+    """Histogramme à seaux fixes et moyenne mobile des latences d'un modèle."""
+    
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.ewma_ms: Optional[float] = None
+        self.updated: Optional[float] = None
+        self.timeouts = 0
+        self.errors = 0
+    
+    def observe(self, latency_ms: float):
+        """Ajoute une latence observée."""
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                self.bucket_counts[index] += 1
+                break
+        self.count += 1
+        self.total_ms += latency_ms
+        self.ewma_ms = latency_ms if self.ewma_ms is None else (
+            EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * self.ewma_ms
+        )
+        self.updated = time.monotonic()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Sérialise les statistiques."""
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "ewma_ms": round(self.ewma_ms, 1) if self.ewma_ms is not None else None,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "histogram": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS_MS, self.bucket_counts)
+            }
+        }
+
+class RoutingStats:
+    """Décisions de routage récentes et latences par modèle, partagées par le processus."""
+    
+    def __init__(self, history: int = 200):
+        """
+        Initialise les statistiques.
+        
+        Args:
+            history (int): Nombre de décisions récentes conservées.
+        """
+        self._lock = threading.Lock()
+        self._models: Dict[str, ModelLatencyStats] = {}
+        self._decisions = deque(maxlen=history)
+        self._fallbacks = 0
+    
+    def observe(self, model: str, latency_s: float, error: Optional[Exception] = None):
+        """
+        Enregistre le résultat d'un appel à un modèle.
+        
+        Args:
+            model (str): Le modèle appelé.
+            latency_s (float): Durée de l'appel en secondes.
+            error (Exception, optional): L'erreur levée, le cas échéant.
+        """
+        with self._lock:
+            stats = self._models.setdefault(model, ModelLatencyStats())
+            if error is None:
+                stats.observe(latency_s * 1000.0)
+            elif is_timeout_error(error):
+                # Un timeout est une borne inférieure de la latence réelle: il doit peser dans la moyenne
+                stats.timeouts += 1
+                stats.observe(latency_s * 1000.0)
+            else:
+                stats.errors += 1
+    
+    def ewma_ms(self, model: str, max_age: Optional[float] = None) -> Optional[float]:
+        """
+        Latence moyenne récente d'un modèle en millisecondes.
+        
+        Args:
+            model (str): Le modèle.
+            max_age (float, optional): Âge maximal (secondes) de la dernière latence observée.
+        
+        Returns:
+            Optional[float]: La moyenne, ou None si le modèle n'a jamais été observé ou pas depuis `max_age` secondes.
+        """
+        with self._lock:
+            stats = self._models.get(model)
+            if stats is None or stats.updated is None:
+                return None
+            if max_age is not None and time.monotonic() - stats.updated > max_age:
+                return None
+            return stats.ewma_ms
+    
+    def record_decision(self, decision: "RouteDecision"):
+        """Ajoute une décision à l'historique."""
+        with self._lock:
+            if decision.fallback_used:
+                self._fallbacks += 1
+            self._decisions.append(decision.to_dict())
+    
+    def get_stats(self, recent: int = 20) -> Dict[str, Any]:
+        """
+        Récupère les statistiques de routage.
+        
+        Args:
+            recent (int): Nombre de décisions récentes à inclure.
+        
+        Returns:
+            Dict[str, Any]: Latences par modèle et décisions récentes.
+        """
+        with self._lock:
+            decisions = list(self._decisions)
+            return {
+                "models": {name: stats.to_dict() for name, stats in self._models.items()},
+                "fallbacks": self._fallbacks,
+                "decisions": decisions[-recent:] if recent else []
+            }
+    
+    def reset(self):
+        """Efface toutes les statistiques."""
+        with self._lock:
+            self._models.clear()
+            self._decisions.clear()
+            self._fallbacks = 0
+
+_stats = RoutingStats()
+
+def get_routing_stats() -> RoutingStats:
+    """
+    Récupère les statistiques de routage du processus.
+    
+    Returns:
+        RoutingStats: Les statistiques partagées.
+    """
+    return _stats
+
+class RouteDecision:
+    """Résultat du routage d'un appel: modèles candidats dans l'ordre et raison du choix."""
+    
+    def __init__(self, task: str, prompt_tokens: int, candidates: List[str], reason: str,
+                 primary_timeout: Optional[float] = None):
+        self.task = task
+        self.prompt_tokens = prompt_tokens
+        self.candidates = candidates
+        self.reason = reason
+        self.primary_timeout = primary_timeout
+        self.model_used: Optional[str] = None
+        self.fallback_used = False
+        self.timestamp = time.time()
+    
+    @property
+    def model(self) -> str:
+        """Le modèle choisi en premier."""
+        return self.candidates[0]
+    
+    def attempt_deadline(self, index: int, deadline: Optional[float]) -> Optional[float]:
+        """
+        Calcule l'échéance d'une tentative sur le candidat `index`.
+        
+        Le modèle principal est borné par `primary_timeout` lorsqu'un repli
+        existe, afin qu'il reste du temps pour le modèle secondaire.
+        
+        Args:
+            index (int): Position du candidat.
+            deadline (float, optional): Échéance globale de l'appel.
+        
+        Returns:
+            Optional[float]: L'échéance de la tentative.
+        """
+        if index == 0 and len(self.candidates) > 1 and self.primary_timeout:
+            primary_deadline = time.monotonic() + self.primary_timeout
+            return primary_deadline if deadline is None else min(deadline, primary_deadline)
+        return deadline
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Sérialise la décision."""
+        return {
+            "timestamp": round(self.timestamp, 3),
+            "task": self.task,
+            "prompt_tokens": self.prompt_tokens,
+            "model": self.model,
+            "model_used": self.model_used,
+            "fallback_used": self.fallback_used,
+            "reason": self.reason
+        }
+
+class ModelRouter:
+    """
+    Choisit un modèle par appel à partir de règles configurables.
+    
+    Les règles de `model_routing.rules` sont évaluées dans l'ordre ; la première
+    qui correspond fournit le modèle. Champs d'une règle :
+        tasks (list): tâches concernées (chat, summary, sentiment, entities, code)
+        min_prompt_tokens / max_prompt_tokens (int): bornes de taille du prompt
+        max_latency_ms (float): ignorée si la latence récente du modèle dépasse ce seuil
+        model (str): modèle à utiliser
+        timeout (float): délai de la tentative principale avant repli
+    
+    Un modèle écarté n'étant plus appelé, sa latence n'est plus mise à jour : elle
+    est oubliée au bout de `model_routing.stats_max_age` secondes, et le modèle
+    est de nouveau essayé.
+    """
+    
+    def __init__(self, config: Config, stats: Optional[RoutingStats] = None):
+        """
+        Initialise le routeur.
+        
+        Args:
+            config (Config): L'objet de configuration.
+            stats (RoutingStats, optional): Statistiques à utiliser (par défaut celles du processus).
+        """
+        self.config = config
+        self.stats = stats or get_routing_stats()
+    
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """Section model_routing de la configuration."""
+        return self.config.get_value("model_routing", {}) or {}
+    
+    def _fits_budget(self, model: str, budget_ms: Optional[float]) -> bool:
+        if budget_ms is None:
+            return True
+        observed = self.stats.ewma_ms(model, self.settings.get("stats_max_age"))
+        return observed is None or observed <= budget_ms
+    
+    def _rule_matches(self, rule: Dict[str, Any], task: str, prompt_tokens: int) -> bool:
+        tasks = rule.get("tasks")
+        if tasks and task not in tasks:
+            return False
+        if prompt_tokens < rule.get("min_prompt_tokens", 0):
+            return False
+        max_tokens = rule.get("max_prompt_tokens")
+        if max_tokens is not None and prompt_tokens > max_tokens:
+            return False
+        return bool(rule.get("model"))
+    
+    def route(self, task: str, messages: List[Dict[str, Any]], model: Optional[str] = None,
+              deadline: Optional[float] = None) -> RouteDecision:
+        """
+        Choisit le modèle d'un appel.
+        
+        Args:
+            task (str): Type de tâche (chat, summary, sentiment, entities, code).
+            messages (List[Dict[str, Any]]): Les messages envoyés.
+            model (str, optional): Modèle imposé par l'appelant (pas de routage).
+            deadline (float, optional): Échéance absolue de l'appel, utilisée comme budget de latence.
+        
+        Returns:
+            RouteDecision: Les modèles candidats et la raison du choix.
+        """
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        settings = self.settings
+        default_model = self.config.get_model()
+        
+        if model:
+            return RouteDecision(task, prompt_tokens, [model], "explicit")
+        if not settings.get("enabled", True):
+            return RouteDecision(task, prompt_tokens, [default_model], "disabled")
+        
+        call_budget_ms = None
+        if deadline is not None:
+            call_budget_ms = max(0.0, (deadline - time.monotonic()) * 1000.0)
+        
+        chosen, reason, primary_timeout = default_model, "default", settings.get("primary_timeout")
+        for index, rule in enumerate(settings.get("rules", [])):
+            if not self._rule_matches(rule, task, prompt_tokens):
+                continue
+            budget = rule.get("max_latency_ms")
+            if call_budget_ms is not None:
+                budget = call_budget_ms if budget is None else min(budget, call_budget_ms)
+            if not self._fits_budget(rule["model"], budget):
+                continue
+            chosen, reason = rule["model"], f"rule[{index}]"
+            primary_timeout = rule.get("timeout", primary_timeout)
+            break
+        
+        fallback_model = settings.get("fallback_model")
+        if reason == "default" and call_budget_ms is not None and not self._fits_budget(chosen, call_budget_ms):
+            # Le modèle par défaut est trop lent pour ce budget: essayer le modèle de repli en premier
+            if fallback_model and self._fits_budget(fallback_model, call_budget_ms):
+                chosen, reason = fallback_model, "latency_budget"
+        
+        candidates = [chosen]
+        for candidate in (fallback_model, default_model):
+            if candidate and candidate not in candidates:
+                candidates.append(candidate)
+                break
+        
+        return RouteDecision(task, prompt_tokens, candidates, reason, primary_timeout)
+    
+    def observe(self, model: str, latency_s: float, error: Optional[Exception] = None):
+        """Enregistre le résultat d'une tentative (voir RoutingStats.observe)."""
+        self.stats.observe(model, latency_s, error)
+    
+    def record_decision(self, decision: RouteDecision):
+        """Enregistre une décision terminée."""
+        self.stats.record_decision(decision)
+        logger.debug(f"Routage {decision.task}: {decision.model_used or decision.model} ({decision.reason})")
@@ -0,0 +1,428 @@
+"""
+Module d'exécution des scripts de commandes.
+Lit un fichier de commandes AITerminal (texte ou YAML), construit le graphe des
+dépendances entre étapes et exécute en parallèle, dans le processus courant, les
+étapes indépendantes.
+"""
+
+import os
+import re
+import json
+import time
+import shlex
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Optional, Callable, Set
+
+from .config import Config
+from .services import ServiceRegistry
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+# "id: commande" en début de ligne nomme une étape
+STEP_PREFIX = re.compile(r"^([A-Za-z_][\w-]*):\s+(.*)$")
+# ${id} ou ${id.champ.0.sous_champ}: résultat d'une étape précédente
+REFERENCE = re.compile(r"\$\{([A-Za-z_][\w-]*)((?:\.[\w-]+)*)\}")
+
+# Commandes utilisables dans un script
+SCRIPT_COMMANDS = ("ai", "analyze", "search", "ping", "sys", "http", "code")
+
+class ScriptStep:
+    """Une étape d'un script : une commande AITerminal et son résultat."""
+    
+    def __init__(self, step_id: str, args: List[str], needs: Optional[List[str]] = None, line: int = 0):
+        """
+        Initialise l'étape.
+        
+        Args:
+            step_id (str): Identifiant de l'étape.
+            args (List[str]): La commande et ses arguments (sans 'aiterminal').
+            needs (List[str], optional): Étapes à terminer avant celle-ci.
+            line (int): Ligne ou position de l'étape dans le script.
+        """
+        self.id = step_id
+        self.args = args
+        self.line = line
+        self.needs = set(needs or [])
+        self.depends_on: Set[str] = set()
+        self.status = "pending"
+        self.started = None
+        self.duration = None
+        self.result = None
+        self.error = None
+    
+    @property
+    def command(self) -> str:
+        return self.args[0] if self.args else ""
+    
+    def references(self) -> Set[str]:
+        """Identifiants des étapes dont les résultats sont utilisés dans les arguments."""
+        return {match.group(1) for arg in self.args for match in REFERENCE.finditer(arg)}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "command": shlex.join(self.args),
+            "depends_on": sorted(self.depends_on),
+            "status": self.status,
+            "started": round(self.started, 3) if self.started is not None else None,
+            "duration": round(self.duration, 3) if self.duration is not None else None,
+            "result": self.result,
+            "error": self.error
+        }
+
+def _command_args(command) -> List[str]:
+    args = shlex.split(command, comments=True) if isinstance(command, str) else [str(arg) for arg in command]
+    # Les lignes copiées d'un script shell commencent par 'aiterminal' ou 'python -m aiterminal'
+    if args[:3] == ["python", "-m", "aiterminal"]:
+        args = args[3:]
+    elif args[:1] == ["aiterminal"]:
+        args = args[1:]
+    return args
+
+def _parse_text(path: str) -> List[ScriptStep]:
+    steps = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, raw in enumerate(f, start=1):
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            match = STEP_PREFIX.match(line)
+            step_id, command = (match.group(1), match.group(2)) if match else (f"step{len(steps) + 1}", line)
+            try:
+                args = _command_args(command)
+            except ValueError as e:
+                raise Exception(f"Ligne {number}: {str(e)}")
+            if args:
+                steps.append(ScriptStep(step_id, args, line=number))
+    return steps
+
+def _parse_yaml(path: str) -> List[ScriptStep]:
+    try:
+        import yaml
+    except ImportError:
+        raise Exception("PyYAML est requis pour les scripts YAML (pip install pyyaml)")
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        data = yaml.safe_load(f) or []
+    items = data.get("steps", []) if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise Exception("Le script YAML doit contenir une liste d'étapes ('steps')")
+    
+    steps = []
+    for position, item in enumerate(items, start=1):
+        if isinstance(item, str):
+            item = {"command": item}
+        if not isinstance(item, dict) or "command" not in item:
+            raise Exception(f"Étape {position}: champ 'command' manquant")
+        needs = item.get("needs") or []
+        try:
+            args = _command_args(item["command"])
+        except ValueError as e:
+            raise Exception(f"Étape {position}: {str(e)}")
+        steps.append(ScriptStep(str(item.get("id") or f"step{position}"), args,
+                                needs=[needs] if isinstance(needs, str) else needs, line=position))
+    return steps
+
+def parse_script(path: str) -> List[ScriptStep]:
+    """
+    Lit un script de commandes.
+    
+    Format texte : une commande par ligne (le préfixe 'aiterminal' est facultatif),
+    éventuellement nommée par 'id: commande' ; '#' introduit un commentaire.
+    Format YAML (.yaml, .yml) : une liste d'étapes {id, command, needs}.
+    
+    Args:
+        path (str): Chemin du script.
+    
+    Returns:
+        List[ScriptStep]: Les étapes, dans l'ordre du script.
+    
+    Raises:
+        Exception: Si le script est illisible ou invalide.
+    """
+    if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+        steps = _parse_yaml(path)
+    else:
+        steps = _parse_text(path)
+    
+    seen = set()
+    for step in steps:
+        if step.id in seen:
+            raise Exception(f"Identifiant d'étape en double: {step.id}")
+        seen.add(step.id)
+    return steps
+
+def _text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+def _lookup(value: Any, path: List[str]) -> Any:
+    for key in path:
+        if isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        elif isinstance(value, dict) and key in value:
+            value = value[key]
+        else:
+            raise KeyError(key)
+    return value
+
+class ScriptRunner:
+    """
+    Exécute les étapes d'un script dans l'ordre de leurs dépendances.
+    
+    Une étape dépend des étapes citées dans ses arguments (${id} ou ${id.champ}),
+    de celles listées dans 'needs' et de celles qui écrivent un fichier qu'elle lit
+    (analyze --output puis analyze --input). Les étapes prêtes s'exécutent en
+    parallèle sur les services partagés ; celles dont une dépendance a échoué
+    sont ignorées.
+    """
+    
+    def __init__(self, config: Config, services: Optional[ServiceRegistry] = None,
+                 concurrency: Optional[int] = None):
+        """
+        Initialise l'exécuteur.
+        
+        Args:
+            config (Config): L'instance de configuration.
+            services (ServiceRegistry, optional): Les services à utiliser (par défaut, un nouveau registre).
+            concurrency (int, optional): Étapes simultanées maximum (par défaut run_concurrency).
+        """
+        self.config = config
+        self.services = services or ServiceRegistry(config)
+        self.concurrency = max(1, concurrency or config.get_value("run_concurrency", 4))
+        self._commands = None
+    
+    def parse_args(self, args: List[str]) -> Dict[str, Any]:
+        """
+        Analyse les arguments d'une commande avec les options de la CLI.
+        
+        Args:
+            args (List[str]): La commande et ses arguments.
+        
+        Returns:
+            Dict[str, Any]: Les paramètres de la commande, valeurs par défaut comprises.
+        
+        Raises:
+            Exception: Si la commande n'est pas utilisable dans un script ou si ses arguments sont invalides.
+        """
+        import click
+        
+        if not args or args[0] not in SCRIPT_COMMANDS:
+            raise Exception(f"Commande non prise en charge dans un script: {args[0] if args else ''} "
+                            f"(disponibles: {', '.join(SCRIPT_COMMANDS)})")
+        if self._commands is None:
+            import typer
+            from . import cli
+            self._commands = typer.main.get_command(cli.app).commands
+        
+        command = self._commands[args[0]]
+        try:
+            with command.make_context(args[0], list(args[1:])) as ctx:
+                return dict(ctx.params)
+        except click.ClickException as e:
+            raise Exception(f"{args[0]}: {e.format_message()}")
+    
+    def plan(self, steps: List[ScriptStep]) -> List[ScriptStep]:
+        """
+        Calcule les dépendances des étapes et vérifie que le graphe est acyclique.
+        
+        Args:
+            steps (List[ScriptStep]): Les étapes du script.
+        
+        Returns:
+            List[ScriptStep]: Les étapes, avec leurs dépendances renseignées.
+        
+        Raises:
+            Exception: Si une étape est invalide, cite une étape inconnue ou si les dépendances forment un cycle.
+        """
+        ids = {step.id for step in steps}
+        writers: Dict[str, str] = {}
+        for step in steps:
+            unknown = (step.references() | step.needs) - ids
+            if unknown:
+                raise Exception(f"Étape {step.id}: étape(s) inconnue(s) {', '.join(sorted(unknown))}")
+            step.depends_on = (step.references() | step.needs) - {step.id}
+            
+            # Les arguments avec références ne sont analysables qu'une fois les valeurs connues
+            if step.references() and step.command in SCRIPT_COMMANDS:
+                continue
+            params = self.parse_args(step.args)
+            if step.command == "analyze" and params.get("input"):
+                source = os.path.abspath(params["input"])
+                if source in writers:
+                    step.depends_on.add(writers[source])
+                writers[os.path.abspath(self._bulk_output(params))] = step.id
+        
+        # Tri topologique (Kahn) pour détecter les cycles
+        remaining = {step.id: set(step.depends_on) for step in steps}
+        while remaining:
+            ready = [step_id for step_id, deps in remaining.items() if not deps]
+            if not ready:
+                raise Exception(f"Dépendances circulaires entre les étapes: {', '.join(sorted(remaining))}")
+            for step_id in ready:
+                del remaining[step_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return steps
+    
+    def resolve(self, step: ScriptStep, results: Dict[str, ScriptStep]) -> List[str]:
+        """
+        Remplace les références ${id.champ} des arguments par les résultats des étapes citées.
+        
+        Args:
+            step (ScriptStep): L'étape à exécuter.
+            results (Dict[str, ScriptStep]): Les étapes terminées, par identifiant.
+        
+        Returns:
+            List[str]: Les arguments de la commande.
+        
+        Raises:
+            Exception: Si un champ cité n'existe pas dans le résultat.
+        """
+        def substitute(match):
+            path = [key for key in match.group(2).split(".") if key]
+            try:
+                return _text(_lookup(results[match.group(1)].result, path))
+            except KeyError as e:
+                raise Exception(f"Champ {str(e)} absent du résultat de l'étape {match.group(1)}")
+        
+        return [REFERENCE.sub(substitute, arg) for arg in step.args]
+    
+    def execute(self, args: List[str]) -> Any:
+        """
+        Exécute une commande et retourne son résultat structuré.
+        
+        Args:
+            args (List[str]): La commande et ses arguments.
+        
+        Returns:
+            Any: Le résultat (texte, dictionnaire ou liste selon la commande).
+        
+        Raises:
+            Exception: Si la commande échoue.
+        """
+        params = self.parse_args(args)
+        return getattr(self, f"_run_{args[0]}")(params)
+    
+    def _bulk_output(self, params: Dict[str, Any]) -> str:
+        return params.get("output") or f"{os.path.splitext(params['input'])[0]}.{params['type']}.jsonl"
+    
+    def _run_ai(self, params: Dict[str, Any]) -> str:
+        if not params.get("session"):
+            return self.services.ai.generate_text(params["prompt"], params.get("model"), params.get("temperature"))
+        if params.get("reset"):
+            self.services.ai.memory.clear(params["session"])
+        result = self.services.ai.chat(params["prompt"], params["session"], model=params.get("model"),
+                                       temperature=params.get("temperature"))
+        return result["response"]
+    
+    def _run_analyze(self, params: Dict[str, Any]) -> Any:
+        if params.get("input"):
+            from .bulk import BulkAnalyzer
+            
+            output = self._bulk_output(params)
+            analyzer = BulkAnalyzer(self.config, params["type"], concurrency=params.get("concurrency"),
+                                    rate_limit=params.get("rate"), text_field=params.get("field", "text"))
+            return analyzer.run(params["input"], output, resume=not params.get("restart"))
+        if not params.get("text"):
+            raise Exception("Indiquez un texte ou un fichier avec --input")
+        if params["type"] == "sentiment":
+            return self.services.ai.analyze_sentiment(params["text"])
+        if params["type"] == "summary":
+            return self.services.ai.summarize_text(params["text"])
+        if params["type"] == "entities":
+            return self.services.ai.extract_entities(params["text"])
+        raise Exception(f"Type d'analyse inconnu: {params['type']}")
+    
+    def _run_search(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.services.internet.search(params["query"], params["limit"])
+    
+    def _run_ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        results = self.services.network.ping(params["host"], params["count"])
+        return {"results": results, "summary": self.services.network.get_ping_summary(results)}
+    
+    def _run_sys(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        system = self.services.system
+        readers = {"cpu": system.get_cpu_info, "memory": system.get_memory_info,
+                   "disk": system.get_disk_info, "network": system.get_network_info}
+        if params["type"] == "processes":
+            return system.get_process_info(params["sort"], params["limit"])
+        if params["type"] != "all" and params["type"] not in readers:
+            raise Exception(f"Type d'information inconnu: {params['type']}")
+        return {name: reader() for name, reader in readers.items() if params["type"] in ("all", name)}
+    
+    def _run_http(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.services.network.http_request(params["url"], params["method"], params.get("headers"),
+                                                  params.get("data"), params["timeout"])
+    
+    def _run_code(self, params: Dict[str, Any]) -> str:
+        return self.services.ai.generate_code(params["description"], params["language"])
+    
+    def _run_step(self, step: ScriptStep, results: Dict[str, ScriptStep], origin: float):
+        step.status = "running"
+        step.started = time.monotonic() - origin
+        try:
+            with span(f"run.{step.id}", command=step.command):
+                step.result = self.execute(self.resolve(step, results))
+            step.status = "ok"
+        except Exception as e:
+            logger.error(f"Erreur à l'étape {step.id}: {str(e)}")
+            step.error = str(e)
+            step.status = "error"
+        finally:
+            step.duration = time.monotonic() - origin - step.started
+    
+    def run(self, steps: List[ScriptStep],
+            on_step: Optional[Callable[[ScriptStep], None]] = None) -> Dict[str, Any]:
+        """
+        Exécute les étapes, en parallèle dès que leurs dépendances sont terminées.
+        
+        Args:
+            steps (List[ScriptStep]): Les étapes du script.
+            on_step (Callable, optional): Appelée avec chaque étape terminée ou ignorée.
+        
+        Returns:
+            Dict[str, Any]: Le bilan: étapes, durée totale, durée cumulée des étapes et décomptes par état.
+        
+        Raises:
+            Exception: Si le script est invalide (voir plan).
+        """
+        self.plan(steps)
+        by_id = {step.id: step for step in steps}
+        pending = list(steps)
+        running = {}
+        origin = time.monotonic()
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="aiterminal-run") as executor:
+            while pending or running:
+                for step in list(pending):
+                    states = {by_id[dep].status for dep in step.depends_on}
+                    if states & {"error", "skipped"}:
+                        step.status = "skipped"
+                        step.error = "Dépendance en échec"
+                        pending.remove(step)
+                        if on_step:
+                            on_step(step)
+                    elif states <= {"ok"} and len(running) < self.concurrency:
+                        pending.remove(step)
+                        # Copie du contexte: les spans de l'étape se rattachent à la trace en cours
+                        running[executor.submit(contextvars.copy_context().run, self._run_step, step, by_id, origin)] = step
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    if on_step:
+                        on_step(step)
+        
+        counts = {status: sum(1 for step in steps if step.status == status) for status in ("ok", "error", "skipped")}
+        return {
+            "steps": [step.to_dict() for step in steps],
+            "elapsed": round(time.monotonic() - origin, 3),
+            "step_time": round(sum(step.duration or 0.0 for step in steps), 3),
+            **counts
+        }
@@ -0,0 +1,128 @@
+"""
+Module du registre des services.
+Crée la configuration et chaque service au premier accès, afin qu'une commande
+n'importe que les modules dont elle a besoin (OpenAI, requests, BeautifulSoup, psutil).
+"""
+
+import threading
+from typing import Optional, Set
+
+from .config import Config, get_shared_config
+from .tracing import span
+
+# Clés lues à la construction des services: leur modification impose de les recréer
+REBUILD_CONFIG_KEYS = {
+    "search_engine", "http_max_connections", "http_max_keepalive", "http_keepalive_expiry",
+    "circuit_failure_threshold", "circuit_reset_timeout",
+    "history_size", "history_max_tokens", "history_summary_max_tokens", "session_dir"
+}
+
+class ServiceRegistry:
+    """
+    Registre paresseux des services de l'application.
+    
+    Chaque propriété importe le module du service et construit l'instance au
+    premier accès, puis la réutilise. Les modules lourds ne sont donc chargés
+    que par les commandes qui s'en servent. Les services relisent la configuration
+    à chaque appel ; seules les clés lues à la construction (REBUILD_CONFIG_KEYS)
+    les font oublier, pour être reconstruits au prochain accès.
+    """
+    
+    def __init__(self, config: Optional[Config] = None):
+        """
+        Initialise le registre.
+        
+        Args:
+            config (Config, optional): Configuration à utiliser. Par défaut, la configuration
+                                       partagée du processus, obtenue au premier accès.
+        """
+        self._config = None
+        self._services = {}
+        self._lock = threading.RLock()
+        if config is not None:
+            self._attach(config)
+    
+    def _attach(self, config: Config):
+        self._config = config
+        config.subscribe(self._on_config_change)
+    
+    def _on_config_change(self, changed: Set[str]):
+        if changed & REBUILD_CONFIG_KEYS:
+            self.reset()
+    
+    @property
+    def config(self) -> Config:
+        """La configuration (config.json du répertoire courant par défaut)."""
+        if self._config is None:
+            with self._lock:
+                if self._config is None:
+                    self._attach(get_shared_config())
+        return self._config
+    
+    def _get(self, name: str, factory):
+        service = self._services.get(name)
+        if service is None:
+            with self._lock:
+                service = self._services.get(name)
+                if service is None:
+                    # Import du module et construction: souvent l'essentiel d'une commande à froid
+                    with span(f"services.{name}"):
+                        service = self._services[name] = factory()
+        return service
+    
+    @property
+    def ai(self):
+        """Le service IA synchrone (AIService)."""
+        def factory():
+            from .ai_services import AIService
+            return AIService(self.config)
+        return self._get("ai", factory)
+    
+    @property
+    def async_ai(self):
+        """Le service IA asynchrone (AsyncAIService), pour le mode de service ASGI."""
+        def factory():
+            from .ai_services import AsyncAIService
+            return AsyncAIService(self.config)
+        return self._get("async_ai", factory)
+    
+    @property
+    def network(self):
+        """Le service réseau (NetworkService)."""
+        def factory():
+            from .network import NetworkService
+            return NetworkService(self.config)
+        return self._get("network", factory)
+    
+    @property
+    def async_network(self):
+        """Le service réseau asynchrone (AsyncNetworkService), pour le mode de service ASGI."""
+        def factory():
+            from .network import AsyncNetworkService
+            return AsyncNetworkService(self.config)
+        return self._get("async_network", factory)
+    
+    @property
+    def system(self):
+        """Le service système (SystemService)."""
+        def factory():
+            from .system import SystemService
+            return SystemService(self.config)
+        return self._get("system", factory)
+    
+    @property
+    def internet(self):
+        """Le service internet (InternetService)."""
+        def factory():
+            from .internet import InternetService
+            return InternetService(self.config)
+        return self._get("internet", factory)
+    
+    def reset(self):
+        """Oublie les services construits: ils seront recréés avec la configuration actuelle."""
+        with self._lock:
+            self._services = {}
+    
+    def loaded(self) -> list:
+        """Liste les services déjà construits."""
+        return list(self._services)
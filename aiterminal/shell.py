@@ -0,0 +1,423 @@
+"""
+Module du shell interactif d'AITerminal.
+Exécute les commandes de la CLI dans un seul processus : les services, les pools
+de connexions et les caches restent chauds d'une commande à l'autre.
+"""
+
+import io
+import os
+import sys
+import time
+import shlex
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from rich.console import Console
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import readline
+except ImportError:  # Windows sans pyreadline: ni historique ni complétion
+    readline = None
+
+# Commandes propres au shell, en plus de celles de la CLI
+BUILTINS = {
+    "jobs": "Lister les tâches de fond",
+    "fg": "Attendre une tâche de fond et afficher sa sortie (fg [n])",
+    "exit": "Quitter le shell (ou Ctrl-D)",
+    "quit": "Quitter le shell"
+}
+
+class ConsoleRouter:
+    """
+    Console Rich qui délègue à la console du thread courant.
+    
+    Les commandes de la CLI écrivent sur une console globale ; pendant le shell,
+    chaque tâche de fond y associe sa propre console pour que sa sortie ne se
+    mélange ni à l'invite ni aux autres commandes.
+    """
+    
+    def __init__(self, default: Console):
+        self._default = default
+        self._local = threading.local()
+    
+    def bind(self, console: Optional[Console]):
+        """Associe une console au thread courant (None pour revenir à la console par défaut)."""
+        self._local.console = console
+    
+    def __getattr__(self, name):
+        return getattr(getattr(self._local, "console", None) or self._default, name)
+
+class StreamRouter:
+    """Flux texte (sys.stdout, sys.stderr) qui délègue au flux du thread courant."""
+    
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+    
+    def bind(self, stream):
+        """Associe un flux au thread courant (None pour revenir au flux par défaut)."""
+        self._local.stream = stream
+    
+    def __getattr__(self, name):
+        return getattr(getattr(self._local, "stream", None) or self._default, name)
+
+class ConsoleStream:
+    """Flux texte qui écrit dans une console Rich, dans l'ordre de ses autres sorties."""
+    
+    encoding = "utf-8"
+    
+    def __init__(self, console: Console):
+        self.console = console
+    
+    def write(self, text: str) -> int:
+        if text:
+            self.console.out(text, end="", highlight=False)
+        return len(text)
+    
+    def flush(self):
+        pass
+    
+    def isatty(self) -> bool:
+        return False
+
+class Job:
+    """Une commande exécutée en tâche de fond."""
+    
+    def __init__(self, job_id: int, line: str, width: int):
+        self.id = job_id
+        self.line = line
+        self.started = time.monotonic()
+        self.finished = None
+        self.code = None
+        self.reported = False
+        # Console non interactive: pas d'animation, sortie enregistrée pour être affichée à la fin
+        self.console = Console(file=io.StringIO(), record=True, force_terminal=False, width=width)
+        self.thread = None
+    
+    @property
+    def running(self) -> bool:
+        return self.finished is None
+    
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+class Shell:
+    """
+    Shell interactif : une invite qui exécute les commandes de la CLI dans le même processus.
+    
+    Une commande terminée par `&` s'exécute en tâche de fond ; sa sortie est
+    affichée quand elle se termine, avant l'invite suivante, ou avec `fg`.
+    """
+    
+    prompt = "aiterminal> "
+    
+    def __init__(self, config: Config):
+        """
+        Initialise le shell.
+        
+        Args:
+            config (Config): L'instance de configuration.
+        """
+        self.config = config
+        history_file = config.get_value("shell_history_file", "") or "~/.aiterminal_history"
+        self.history_file = os.path.expanduser(history_file)
+        self.history_size = config.get_value("shell_history_size", 1000)
+        self.jobs: Dict[int, Job] = {}
+        self._next_job = 1
+        self._jobs_lock = threading.Lock()
+        self._options = None
+        self._matches: List[str] = []
+    
+    def command_names(self) -> List[str]:
+        """Noms des commandes disponibles (CLI et shell)."""
+        from . import cli
+        names = [command.name for command in cli.app.registered_commands if command.name != "shell"]
+        return sorted(set(names) | set(BUILTINS))
+    
+    def command_options(self, command: str) -> List[str]:
+        """Options acceptées par une commande de la CLI."""
+        if self._options is None:
+            import click
+            import typer
+            from . import cli
+            
+            group = typer.main.get_command(cli.app)
+            self._options = {
+                name: sorted(opt for param in cmd.params if isinstance(param, click.Option)
+                             for opt in param.opts + param.secondary_opts)
+                for name, cmd in group.commands.items()
+            }
+        return self._options.get(command, [])
+    
+    def completions(self, before: str, text: str) -> List[str]:
+        """
+        Candidats de complétion pour le mot en cours.
+        
+        Args:
+            before (str): La ligne avant le mot en cours.
+            text (str): Le début du mot en cours.
+        
+        Returns:
+            List[str]: Les candidats commençant par `text`.
+        """
+        words = before.split()
+        if not words:
+            candidates = self.command_names()
+        elif words[0] == "fg":
+            candidates = [str(job_id) for job_id, job in self.jobs.items() if not job.reported]
+        else:
+            candidates = self.command_options(words[0])
+        return [candidate + " " for candidate in candidates if candidate.startswith(text)]
+    
+    def complete(self, text: str, state: int) -> Optional[str]:
+        """Fonction de complétion pour readline."""
+        if state == 0:
+            try:
+                before = readline.get_line_buffer()[:readline.get_begidx()]
+                self._matches = self.completions(before, text)
+            except Exception:
+                self._matches = []
+        return self._matches[state] if state < len(self._matches) else None
+    
+    def _setup_readline(self):
+        if readline is None:
+            return
+        try:
+            readline.read_history_file(self.history_file)
+        except (FileNotFoundError, OSError):
+            pass
+        readline.set_history_length(self.history_size)
+        readline.set_completer(self.complete)
+        readline.set_completer_delims(" \t\n")
+        if "libedit" in (readline.__doc__ or ""):
+            readline.parse_and_bind("bind ^I rl_complete")
+        else:
+            readline.parse_and_bind("tab: complete")
+    
+    def _save_history(self):
+        if readline is None:
+            return
+        try:
+            readline.write_history_file(self.history_file)
+        except OSError as e:
+            logger.warning(f"Impossible d'enregistrer l'historique du shell: {str(e)}")
+    
+    def execute(self, args: List[str]) -> int:
+        """
+        Exécute une commande de la CLI dans le processus courant.
+        
+        Args:
+            args (List[str]): Les arguments de la commande.
+        
+        Returns:
+            int: Le code de retour de la commande.
+        """
+        from . import cli
+        
+        try:
+            cli.app(args=args, prog_name="aiterminal")
+        except SystemExit as exit_error:
+            code = exit_error.code
+            return code if isinstance(code, int) else (0 if code is None else 1)
+        except Exception as e:
+            logger.error(f"Erreur non gérée: {str(e)}")
+            cli.console.print(f"[bold red]Erreur:[/bold red] {str(e)}")
+            return 1
+        return 0
+    
+    def start_job(self, line: str, args: List[str]) -> Job:
+        """
+        Lance une commande en tâche de fond.
+        
+        Args:
+            line (str): La ligne saisie (pour l'affichage).
+            args (List[str]): Les arguments de la commande.
+        
+        Returns:
+            Job: La tâche lancée.
+        """
+        from . import cli
+        
+        with self._jobs_lock:
+            job = Job(self._next_job, line, cli.console.width)
+            self.jobs[job.id] = job
+            self._next_job += 1
+        
+        # Routeurs installés par run(): le shell peut les retirer avant la fin de la tâche
+        routers = (cli.console, sys.stdout, sys.stderr)
+        
+        def run():
+            stream = ConsoleStream(job.console)
+            routers[0].bind(job.console)
+            routers[1].bind(stream)
+            routers[2].bind(stream)
+            try:
+                job.code = self.execute(args)
+            finally:
+                for router in routers:
+                    router.bind(None)
+                job.finished = time.monotonic()
+        
+        job.thread = threading.Thread(target=run, name=f"aiterminal-job-{job.id}", daemon=True)
+        job.thread.start()
+        return job
+    
+    def show_job(self, job: Job):
+        """Affiche la sortie d'une tâche terminée."""
+        from . import cli
+        
+        status = "terminée" if job.code == 0 else f"terminée (code {job.code})"
+        cli.console.print(f"[bold cyan][{job.id}][/bold cyan] {status} en {job.elapsed:.1f}s: {job.line}")
+        output = job.console.export_text(styles=cli.console.is_terminal)
+        if output:
+            sys.stdout.write(output)
+            sys.stdout.flush()
+        job.reported = True
+    
+    def report_finished(self):
+        """Affiche les tâches de fond terminées depuis la dernière invite."""
+        for job in list(self.jobs.values()):
+            if not job.running and not job.reported:
+                self.show_job(job)
+    
+    def list_jobs(self):
+        """Affiche les tâches de fond."""
+        from . import cli
+        from rich.table import Table
+        
+        if not self.jobs:
+            cli.console.print("[yellow]Aucune tâche de fond[/yellow]")
+            return
+        table = Table(title="Tâches de fond")
+        table.add_column("N°", style="cyan")
+        table.add_column("État", style="green")
+        table.add_column("Durée", justify="right")
+        table.add_column("Commande")
+        for job in self.jobs.values():
+            state = "en cours" if job.running else ("affichée" if job.reported else "terminée")
+            table.add_row(str(job.id), state, f"{job.elapsed:.1f}s", job.line)
+        cli.console.print(table)
+    
+    def foreground(self, job_arg: Optional[str]):
+        """Attend une tâche de fond (la plus récente par défaut) et affiche sa sortie."""
+        from . import cli
+        
+        pending = [job for job in self.jobs.values() if not job.reported]
+        if job_arg is None:
+            job = pending[-1] if pending else None
+        else:
+            job = self.jobs.get(int(job_arg)) if job_arg.isdigit() else None
+        if job is None or job.reported:
+            cli.console.print("[bold red]Erreur:[/bold red] aucune tâche correspondante")
+            return
+        try:
+            job.thread.join()
+        except KeyboardInterrupt:
+            # La tâche continue en arrière-plan
+            cli.console.print(f"\n[yellow][{job.id}] toujours en cours[/yellow]")
+            return
+        self.show_job(job)
+    
+    def show_help(self, args: List[str]):
+        """Affiche l'aide de la CLI suivie des commandes du shell."""
+        from . import cli
+        from rich.table import Table
+        
+        self.execute(args)
+        if len(args) > 1:
+            return
+        table = Table(title="Commandes du shell")
+        table.add_column("Commande", style="cyan")
+        table.add_column("Description", style="green")
+        table.add_row("<commande> &", "Exécuter une commande en tâche de fond")
+        for name, description in BUILTINS.items():
+            table.add_row(name, description)
+        cli.console.print(table)
+    
+    def handle_line(self, line: str) -> bool:
+        """
+        Traite une ligne saisie.
+        
+        Args:
+            line (str): La ligne saisie.
+        
+        Returns:
+            bool: False si le shell doit se terminer.
+        """
+        from . import cli
+        
+        line = line.strip()
+        background = line.endswith("&") and not line.endswith("\\&")
+        if background:
+            line = line[:-1].rstrip()
+        try:
+            args = shlex.split(line)
+        except ValueError as e:
+            cli.console.print(f"[bold red]Erreur de syntaxe:[/bold red] {str(e)}")
+            return True
+        if not args:
+            return True
+        
+        command = args[0]
+        if command in ("exit", "quit"):
+            return False
+        if command == "jobs":
+            self.list_jobs()
+        elif command == "fg":
+            self.foreground(args[1] if len(args) > 1 else None)
+        elif command == "shell":
+            cli.console.print("[yellow]Déjà dans le shell AITerminal[/yellow]")
+        elif command == "help" and not background:
+            self.show_help(args)
+        elif background:
+            job = self.start_job(line, args)
+            cli.console.print(f"[bold cyan][{job.id}][/bold cyan] {job.line}")
+        else:
+            self.execute(args)
+        return True
+    
+    def run(self):
+        """Boucle principale du shell (jusqu'à exit ou Ctrl-D)."""
+        from . import cli
+        
+        default_console = cli.console
+        stdout, stderr = sys.stdout, sys.stderr
+        cli.console = ConsoleRouter(default_console)
+        sys.stdout, sys.stderr = StreamRouter(stdout), StreamRouter(stderr)
+        self._setup_readline()
+        
+        default_console.print("[bold cyan]AITerminal[/bold cyan] - shell interactif "
+                              "(help pour l'aide, Tab pour compléter, exit pour quitter)")
+        warned = False
+        try:
+            while True:
+                self.report_finished()
+                try:
+                    line = input(self.prompt)
+                except KeyboardInterrupt:
+                    sys.stdout.write("\n")
+                    continue
+                except EOFError:
+                    sys.stdout.write("\n")
+                    line = "exit"
+                
+                if not self.handle_line(line):
+                    running = [job for job in self.jobs.values() if job.running]
+                    if running and not warned:
+                        # Les tâches de fond s'arrêtent avec le shell: confirmation par un second exit
+                        warned = True
+                        default_console.print(f"[yellow]{len(running)} tâche(s) en cours ; "
+                                              f"exit à nouveau pour quitter quand même[/yellow]")
+                        continue
+                    break
+                warned = False
+        finally:
+            self._save_history()
+            cli.console = default_console
+            sys.stdout, sys.stderr = stdout, stderr
@@ -4,15 +4,170 @@ Gère les fonctionnalités liées au système d'exploitation et aux ressources.
 """
 
 import os
+import time
+import heapq
 import platform
 import psutil
 import logging
-from typing import Dict, Any
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Any, List, Optional, Tuple
 
 from .config import Config
+from .tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Séries conservées par SystemSampler pour les sparklines
+HISTORY_SERIES = ("cpu", "memory", "disk_read", "disk_write", "net_recv", "net_sent")
+
+# Fenêtre de mesure maximale acceptée des clients HTTP (paramètre 'interval'), en secondes
+MAX_SAMPLE_INTERVAL = 5.0
+
+# Critères de tri de get_process_info
+PROCESS_SORT_KEYS = ("cpu", "memory", "threads", "files", "io")
+
+# Erreurs attendues d'un processus qui se termine ou n'est pas accessible
+PROCESS_ERRORS = (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess)
+
+class SystemSampler:
+    """
+    Échantillonne le système sans bloquer.
+    
+    Chaque appel à sample() calcule l'utilisation CPU et les débits disque et
+    réseau par différence avec l'appel précédent (psutil.cpu_percent(interval=None)
+    et compteurs cumulés), au lieu d'attendre une seconde. Le premier appel
+    sert de référence : ses débits sont nuls.
+    """
+    
+    def __init__(self, history: int = 60):
+        """
+        Initialise l'échantillonneur.
+        
+        Args:
+            history (int): Nombre de points conservés par série.
+        """
+        self.history: Dict[str, Deque[float]] = {name: deque(maxlen=max(1, history)) for name in HISTORY_SERIES}
+        self._last_time = None
+        self._last_disk = None
+        self._last_net = None
+        psutil.cpu_percent(percpu=True)  # Référence de la première mesure
+    
+    @staticmethod
+    def _rate(current, previous, field: str, elapsed: float) -> float:
+        if current is None or previous is None or elapsed <= 0:
+            return 0.0
+        # Compteur remis à zéro (redémarrage d'interface): pas de débit négatif
+        return max(0.0, (getattr(current, field) - getattr(previous, field)) / elapsed)
+    
+    def sample(self) -> Dict[str, Any]:
+        """
+        Mesure l'état du système depuis l'appel précédent.
+        
+        Returns:
+            Dict[str, Any]: time, cpu_percent, cpu_per_core, memory (total, used, percent,
+                            en octets) et débits disk_io et net_io en octets par seconde.
+        
+        Raises:
+            Exception: Si une erreur se produit lors de la mesure.
+        """
+        try:
+            now = time.monotonic()
+            per_core = psutil.cpu_percent(percpu=True)
+            memory = psutil.virtual_memory()
+            disk = psutil.disk_io_counters()
+            net = psutil.net_io_counters()
+        except Exception as e:
+            logger.error(f"Erreur lors de l'échantillonnage du système: {str(e)}")
+            raise Exception(f"Erreur lors de l'échantillonnage du système: {str(e)}")
+        
+        elapsed = now - self._last_time if self._last_time is not None else 0.0
+        sample = {
+            "time": time.time(),
+            "cpu_percent": round(sum(per_core) / len(per_core), 1) if per_core else 0.0,
+            "cpu_per_core": per_core,
+            "memory": {"total": memory.total, "used": memory.used, "percent": memory.percent},
+            "disk_io": {
+                "read_bytes_per_s": self._rate(disk, self._last_disk, "read_bytes", elapsed),
+                "write_bytes_per_s": self._rate(disk, self._last_disk, "write_bytes", elapsed)
+            },
+            "net_io": {
+                "recv_bytes_per_s": self._rate(net, self._last_net, "bytes_recv", elapsed),
+                "sent_bytes_per_s": self._rate(net, self._last_net, "bytes_sent", elapsed)
+            }
+        }
+        self._last_time, self._last_disk, self._last_net = now, disk, net
+        
+        for name, value in (
+            ("cpu", sample["cpu_percent"]),
+            ("memory", memory.percent),
+            ("disk_read", sample["disk_io"]["read_bytes_per_s"]),
+            ("disk_write", sample["disk_io"]["write_bytes_per_s"]),
+            ("net_recv", sample["net_io"]["recv_bytes_per_s"]),
+            ("net_sent", sample["net_io"]["sent_bytes_per_s"])
+        ):
+            self.history[name].append(value)
+        return sample
+
+class CounterRates:
+    """
+    Débits par seconde de compteurs cumulés psutil, par clé (disque, interface).
+    
+    Chaque appel compare un relevé au précédent. Si le précédent a moins de
+    `interval` secondes, l'appel attend le reste de la fenêtre ; s'il a plus de
+    `max_age` secondes (ou s'il n'existe pas), un relevé de référence est pris
+    puis l'appel attend `interval` secondes. Les appels réguliers ne bloquent donc pas.
+    L'attente se fait hors du verrou : un appel lent ne retient pas les autres.
+    """
+    
+    def __init__(self, read: Callable[[], Dict[str, Any]]):
+        """
+        Initialise le calcul et prend un premier relevé.
+        
+        Args:
+            read (Callable): Retourne les compteurs par clé (namedtuples psutil).
+        """
+        self.read = read
+        self._lock = threading.Lock()
+        self._last = self._snapshot()
+    
+    def _snapshot(self) -> Tuple[float, Dict[str, Any]]:
+        return time.monotonic(), self.read() or {}
+    
+    def rates(self, interval: float, max_age: float) -> Tuple[float, Dict[str, Dict[str, float]]]:
+        """
+        Calcule les débits depuis le relevé précédent.
+        
+        Args:
+            interval (float): Durée minimale de la fenêtre de mesure en secondes.
+            max_age (float): Âge maximal du relevé précédent pour être réutilisé.
+        
+        Returns:
+            Tuple[float, Dict[str, Dict[str, float]]]: La durée de la fenêtre et, par clé,
+            le débit par seconde de chaque champ (jamais négatif, un compteur pouvant repartir de zéro).
+        """
+        with self._lock:
+            previous_time, previous = self._last
+            age = time.monotonic() - previous_time
+            if age > max_age:
+                previous_time, previous = self._last = self._snapshot()
+                age = 0.0
+        if age < interval:
+            time.sleep(interval - age)
+        with self._lock:
+            now, current = self._last = self._snapshot()
+        
+        elapsed = now - previous_time
+        rates = {}
+        for key, counters in current.items():
+            before = previous.get(key)
+            if before is None or elapsed <= 0:
+                rates[key] = {field: 0.0 for field in counters._fields}
+                continue
+            rates[key] = {field: max(0.0, (value - getattr(before, field)) / elapsed)
+                          for field, value in zip(counters._fields, counters)}
+        return elapsed, rates
+
 class SystemService:
     """Service pour les fonctionnalités système."""
     
@@ -24,7 +179,20 @@ class SystemService:
             config (Config): L'objet de configuration.
         """
         self.config = config
+        # Objets Process conservés d'un appel à l'autre: cpu_percent() mesure depuis l'appel précédent
+        self._processes: Dict[int, psutil.Process] = {}
+        self._processes_lock = threading.Lock()
+        # Premier relevé dès la construction: la première mesure a souvent déjà sa fenêtre
+        self._disk_rates = CounterRates(lambda: psutil.disk_io_counters(perdisk=True))
+        self._net_rates = CounterRates(lambda: psutil.net_io_counters(pernic=True))
+    
+    def _sampling(self, interval: Optional[float]) -> Tuple[float, float]:
+        """Fenêtre de mesure des débits (paramètre ou sys_sample_interval) et âge maximal d'un relevé."""
+        if interval is None:
+            interval = self.config.get_value("sys_sample_interval", 1.0)
+        return max(0.0, interval), self.config.get_value("sys_sample_max_age", 30.0)
     
+    @traced("system.cpu")
     def get_cpu_info(self) -> Dict[str, Any]:
         """
         Récupère les informations sur le CPU.
@@ -48,6 +216,7 @@ class SystemService:
             logger.error(f"Erreur lors de la récupération des informations CPU: {str(e)}")
             raise Exception(f"Erreur lors de la récupération des informations CPU: {str(e)}")
     
+    @traced("system.memory")
     def get_memory_info(self) -> Dict[str, Any]:
         """
         Récupère les informations sur la mémoire.
@@ -70,65 +239,223 @@ class SystemService:
             logger.error(f"Erreur lors de la récupération des informations mémoire: {str(e)}")
             raise Exception(f"Erreur lors de la récupération des informations mémoire: {str(e)}")
     
-    def get_disk_info(self) -> Dict[str, Any]:
+    @traced("system.disk")
+    def get_disk_info(self, interval: Optional[float] = None) -> Dict[str, Any]:
         """
-        Récupère les informations sur le disque.
+        Récupère l'occupation des partitions et l'activité de chaque disque.
+        
+        Args:
+            interval (float, optional): Fenêtre de mesure des débits en secondes
+                                        (par défaut sys_sample_interval).
         
         Returns:
-            Dict[str, Any]: Informations sur le disque.
-            
+            Dict[str, Any]: interval (fenêtre réelle en secondes), partitions (device,
+                            mountpoint, fstype, total, used, free en octets, percent) et
+                            devices : par disque read_iops, write_iops, read_bytes_per_s,
+                            write_bytes_per_s et busy_percent (Linux).
+        
         Raises:
             Exception: Si une erreur se produit lors de la récupération des informations.
         """
         try:
-            disk = psutil.disk_usage('/')
-            return {
-                "total": round(disk.total / (1024**3), 2),  # GB
-                "used": round(disk.used / (1024**3), 2),  # GB
-                "free": round(disk.free / (1024**3), 2),  # GB
-                "percent": disk.percent
-            }
+            partitions = []
+            for partition in psutil.disk_partitions(all=False):
+                try:
+                    usage = psutil.disk_usage(partition.mountpoint)
+                except OSError:  # Point de montage inaccessible (droits, support retiré)
+                    continue
+                partitions.append({
+                    "device": partition.device,
+                    "mountpoint": partition.mountpoint,
+                    "fstype": partition.fstype,
+                    "total": usage.total,
+                    "used": usage.used,
+                    "free": usage.free,
+                    "percent": usage.percent
+                })
+            
+            elapsed, rates = self._disk_rates.rates(*self._sampling(interval))
+            devices = {}
+            for name, rate in rates.items():
+                devices[name] = {
+                    "read_iops": round(rate["read_count"], 2),
+                    "write_iops": round(rate["write_count"], 2),
+                    "read_bytes_per_s": round(rate["read_bytes"], 1),
+                    "write_bytes_per_s": round(rate["write_bytes"], 1)
+                }
+                if "busy_time" in rate:  # Millisecondes d'activité par seconde
+                    devices[name]["busy_percent"] = round(min(100.0, rate["busy_time"] / 10.0), 1)
+            return {"interval": round(elapsed, 3), "partitions": partitions, "devices": devices}
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des informations disque: {str(e)}")
             raise Exception(f"Erreur lors de la récupération des informations disque: {str(e)}")
     
-    def get_network_info(self) -> Dict[str, Any]:
+    @traced("system.network")
+    def get_network_info(self, interval: Optional[float] = None) -> Dict[str, Any]:
         """
-        Récupère les informations sur le réseau.
+        Récupère les débits et les taux d'erreur de chaque interface réseau.
+        
+        Args:
+            interval (float, optional): Fenêtre de mesure en secondes (par défaut sys_sample_interval).
         
         Returns:
-            Dict[str, Any]: Informations sur le réseau.
-            
+            Dict[str, Any]: interval (fenêtre réelle en secondes) et interfaces : par interface
+                            is_up, speed_mbps, recv/sent_bytes_per_s, recv/sent_packets_per_s,
+                            errin/errout/dropin/dropout_per_s et error_rate (erreurs et pertes
+                            par paquet sur la fenêtre).
+        
         Raises:
             Exception: Si une erreur se produit lors de la récupération des informations.
         """
         try:
-            net_io = psutil.net_io_counters()
-            return {
-                "bytes_sent": self._format_bytes(net_io.bytes_sent),
-                "bytes_recv": self._format_bytes(net_io.bytes_recv),
-                "packets_sent": net_io.packets_sent,
-                "packets_recv": net_io.packets_recv,
-                "errin": net_io.errin,
-                "errout": net_io.errout,
-                "dropin": net_io.dropin,
-                "dropout": net_io.dropout
-            }
+            elapsed, rates = self._net_rates.rates(*self._sampling(interval))
+            stats = psutil.net_if_stats()
+            interfaces = {}
+            for name, rate in rates.items():
+                packets = rate["packets_recv"] + rate["packets_sent"]
+                errors = rate["errin"] + rate["errout"] + rate["dropin"] + rate["dropout"]
+                interfaces[name] = {
+                    "is_up": stats[name].isup if name in stats else None,
+                    "speed_mbps": stats[name].speed if name in stats else None,
+                    "recv_bytes_per_s": round(rate["bytes_recv"], 1),
+                    "sent_bytes_per_s": round(rate["bytes_sent"], 1),
+                    "recv_packets_per_s": round(rate["packets_recv"], 2),
+                    "sent_packets_per_s": round(rate["packets_sent"], 2),
+                    "errin_per_s": round(rate["errin"], 2),
+                    "errout_per_s": round(rate["errout"], 2),
+                    "dropin_per_s": round(rate["dropin"], 2),
+                    "dropout_per_s": round(rate["dropout"], 2),
+                    "error_rate": round(errors / (packets + errors), 4) if packets + errors else 0.0
+                }
+            return {"interval": round(elapsed, 3), "interfaces": interfaces}
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des informations réseau: {str(e)}")
             raise Exception(f"Erreur lors de la récupération des informations réseau: {str(e)}")
     
-    def _format_bytes(self, bytes_value: int) -> str:
+    @traced("system.processes")
+    def get_process_info(self, sort_by: str = "cpu", limit: int = 10) -> Dict[str, Any]:
         """
-        Formate une valeur en octets en une chaîne lisible.
+        Récupère les processus les plus consommateurs.
+        
+        Tous les processus sont parcourus, mais seul le critère de tri est lu pour
+        chacun (dans un psutil.Process.oneshot()) ; les N premiers sont choisis
+        par tas, puis seuls ceux-ci sont détaillés. L'utilisation CPU est mesurée
+        depuis l'appel précédent ; au premier appel, une mesure de référence est
+        prise `process_sample_interval` secondes plus tôt.
         
         Args:
-            bytes_value (int): Valeur en octets.
-            
+            sort_by (str): Critère de tri (cpu, memory, threads, files, io).
+            limit (int): Nombre de processus retournés.
+        
         Returns:
-            str: Chaîne formatée.
+            Dict[str, Any]: total, sort_by et processes (pid, name, username, status,
+                            cpu_percent, memory_rss en octets, memory_percent, threads,
+                            open_files, io_read_bytes, io_write_bytes).
+        
+        Raises:
+            Exception: Si une erreur se produit lors de la récupération des informations.
+        """
+        if sort_by not in PROCESS_SORT_KEYS:
+            raise Exception(f"Critère de tri inconnu: {sort_by} (attendu: {', '.join(PROCESS_SORT_KEYS)})")
+        try:
+            with self._processes_lock:
+                if not self._processes:
+                    self._refresh_processes()
+                    time.sleep(max(0.0, self.config.get_value("process_sample_interval", 0.5)))
+                entries = self._refresh_processes(sort_by)
+                top = heapq.nlargest(max(0, limit), entries, key=lambda entry: entry[0])
+                total_memory = psutil.virtual_memory().total
+                processes = []
+                for _, cpu, process in top:
+                    details = self._process_details(process, cpu, total_memory)
+                    if details is not None:
+                        processes.append(details)
+            return {"total": len(entries), "sort_by": sort_by, "processes": processes}
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des processus: {str(e)}")
+            raise Exception(f"Erreur lors de la récupération des processus: {str(e)}")
+    
+    def _refresh_processes(self, sort_by: str = "cpu") -> List[Tuple[float, float, psutil.Process]]:
         """
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if bytes_value < 1024 or unit == 'TB':
-                return f"{bytes_value:.2f} {unit}"
-            bytes_value /= 1024
+        Met à jour le cache des processus et lit le critère de tri de chacun.
+        
+        Args:
+            sort_by (str): Critère de tri.
+        
+        Returns:
+            List[Tuple[float, float, psutil.Process]]: (critère, cpu_percent, processus).
+        """
+        cache = self._processes
+        current = {}
+        entries = []
+        for pid in psutil.pids():
+            process = cache.get(pid)
+            try:
+                if process is None:
+                    process = psutil.Process(pid)
+                with process.oneshot():
+                    # Appelé pour tous les processus, pour que chaque delta CPU couvre l'intervalle
+                    cpu = process.cpu_percent(interval=None)
+                    key = cpu if sort_by == "cpu" else self._process_sort_key(process, sort_by)
+            except PROCESS_ERRORS:
+                continue
+            current[pid] = process
+            entries.append((key, cpu, process))
+        # Les processus terminés sont oubliés
+        self._processes = current
+        return entries
+    
+    @staticmethod
+    def _process_sort_key(process: psutil.Process, sort_by: str) -> float:
+        if sort_by == "memory":
+            return process.memory_info().rss
+        if sort_by == "threads":
+            return process.num_threads()
+        if sort_by == "files":
+            return SystemService._count_open_files(process)
+        try:
+            io = process.io_counters()
+        except (AttributeError, psutil.AccessDenied):
+            return 0
+        return io.read_bytes + io.write_bytes
+    
+    @staticmethod
+    def _count_open_files(process: psutil.Process) -> int:
+        # Descripteurs (ou handles sous Windows): bien moins coûteux qu'open_files(), qui résout chaque chemin
+        try:
+            return process.num_fds() if hasattr(process, "num_fds") else process.num_handles()
+        except psutil.AccessDenied:
+            return 0
+    
+    def _process_details(self, process: psutil.Process, cpu: float, total_memory: int) -> Optional[Dict[str, Any]]:
+        """
+        Détaille un processus retenu, ou None s'il s'est terminé entre-temps.
+        """
+        try:
+            with process.oneshot():
+                rss = process.memory_info().rss
+                details = {
+                    "pid": process.pid,
+                    "name": process.name(),
+                    "username": None,
+                    "status": process.status(),
+                    "cpu_percent": round(cpu, 1),
+                    "memory_rss": rss,
+                    "memory_percent": round(rss / total_memory * 100, 2) if total_memory else 0.0,
+                    "threads": process.num_threads(),
+                    "open_files": self._count_open_files(process),
+                    "io_read_bytes": None,
+                    "io_write_bytes": None
+                }
+                try:
+                    details["username"] = process.username()
+                except (psutil.AccessDenied, KeyError):
+                    pass
+                try:
+                    io = process.io_counters()
+                    details["io_read_bytes"], details["io_write_bytes"] = io.read_bytes, io.write_bytes
+                except (AttributeError, psutil.AccessDenied):
+                    pass
+            return details
+        except PROCESS_ERRORS:
+            return None
@@ -0,0 +1,517 @@
+"""
+Module de l'historique des métriques système.
+Stockage en colonnes de largeur fixe (un fichier par résolution, lu par mmap),
+agrégé à l'écriture vers des résolutions plus grossières, et enregistreur de fond.
+"""
+
+import os
+import json
+import math
+import mmap
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import Config
+from .system import HISTORY_SERIES, SystemSampler
+
+logger = logging.getLogger(__name__)
+
+# Résolutions par défaut: (pas en secondes, rétention en secondes)
+DEFAULT_TIERS = ((10, 86400), (60, 8 * 86400), (3600, 400 * 86400))
+
+AGGREGATIONS = ("avg", "min", "max")
+
+MAGIC = b"AITSDB1\n"
+HEADER_SIZE = 4096  # Les colonnes commencent sur une page
+CELL = 8  # float64 et int64
+
+# Séries enregistrées: celles de SystemSampler et la latence ping (metrics_history_ping_host)
+RECORDED_SERIES = HISTORY_SERIES + ("ping_rtt",)
+
+# Colonnes par série: échantillons et agrégats du seau; 'time' est commune aux séries
+SERIES_FIELDS = ("count", "sum", "min", "max")
+
+class TimeSeriesFile:
+    """
+    Une résolution de l'historique : un anneau de `capacity` seaux de `step` secondes.
+    
+    Le fichier contient un en-tête JSON puis une colonne contiguë par champ :
+    `time` (début du seau, int64) et, pour chaque série, le nombre d'échantillons
+    (int64) puis somme, minimum et maximum (float64) : une série absente d'un
+    échantillon (ping en échec) ne pèse pas sur ses agrégats. Le seau d'un
+    instant t est `(t // step) % capacity` : l'écriture est en O(1), la taille
+    du fichier est fixe et les seaux les plus anciens sont écrasés à
+    l'expiration de la rétention.
+    """
+    
+    def __init__(self, path: str, step: int, capacity: int, series: Sequence[str], writable: bool = False):
+        """
+        Ouvre (ou crée, en écriture) le fichier.
+        
+        Args:
+            path (str): Chemin du fichier.
+            step (int): Durée d'un seau en secondes.
+            capacity (int): Nombre de seaux.
+            series (Sequence[str]): Noms des séries.
+            writable (bool): Ouvrir en écriture (un seul enregistreur à la fois).
+        
+        Raises:
+            FileNotFoundError: En lecture, si le fichier n'existe pas.
+            ValueError: En lecture, si le fichier a été créé avec un autre format.
+        """
+        self.path = path
+        self.step = int(step)
+        self.capacity = int(capacity)
+        self.series = tuple(series)
+        self.columns = ("time",) + tuple(f"{name}.{field}" for name in self.series for field in SERIES_FIELDS)
+        self.header = {"version": 2, "step": self.step, "capacity": self.capacity, "columns": list(self.columns)}
+        
+        if writable and not self._matches():
+            self._create()
+        self._file = open(path, "r+b" if writable else "rb")
+        try:
+            if not writable and not self._matches():
+                raise ValueError(f"Format inattendu: {path}")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        view = memoryview(self._mmap)
+        size = self.capacity * CELL
+        integer = ("time",) + tuple(f"{name}.count" for name in self.series)
+        self._views = {
+            name: view[HEADER_SIZE + index * size:HEADER_SIZE + (index + 1) * size].cast("q" if name in integer else "d")
+            for index, name in enumerate(self.columns)
+        }
+        view.release()
+    
+    def _matches(self) -> bool:
+        """Indique si le fichier existe avec le format attendu (sinon il est recréé en écriture)."""
+        try:
+            with open(self.path, "rb") as f:
+                head = f.read(HEADER_SIZE)
+            if not head.startswith(MAGIC):
+                return False
+            return json.loads(head[len(MAGIC):].split(b"\0", 1)[0]) == self.header
+        except (OSError, ValueError):
+            return False
+    
+    def _create(self):
+        if os.path.exists(self.path):
+            # Pas ou rétention modifiés: l'ancien fichier est gardé de côté plutôt qu'écrasé
+            logger.warning(f"Format de {self.path} modifié, ancien fichier renommé en {self.path}.old")
+            os.replace(self.path, f"{self.path}.old")
+        header = MAGIC + json.dumps(self.header).encode("utf-8")
+        if len(header) > HEADER_SIZE:
+            raise ValueError("Trop de séries pour l'en-tête")
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.truncate(HEADER_SIZE + len(self.columns) * self.capacity * CELL)  # Fichier creux: seaux vides (time = 0)
+        os.replace(tmp_path, self.path)
+    
+    def append(self, timestamp: float, values: Dict[str, float]):
+        """
+        Ajoute un échantillon au seau de son instant.
+        
+        Args:
+            timestamp (float): L'instant (secondes depuis l'epoch).
+            values (Dict[str, float]): Valeur par série (les séries absentes ou NaN sont ignorées).
+        """
+        start = int(timestamp // self.step) * self.step
+        slot = (start // self.step) % self.capacity
+        views = self._views
+        times = views["time"]
+        if times[slot] != start:
+            # Seau périmé: invalidé le temps de sa remise à zéro, pour les lecteurs d'autres processus
+            times[slot] = 0
+            for name in self.series:
+                views[f"{name}.count"][slot] = 0
+                views[f"{name}.sum"][slot] = 0.0
+                views[f"{name}.min"][slot] = math.inf
+                views[f"{name}.max"][slot] = -math.inf
+        else:
+            times[slot] = 0
+        for name in self.series:
+            value = values.get(name)
+            if value is None or value != value:
+                continue
+            views[f"{name}.count"][slot] += 1
+            views[f"{name}.sum"][slot] += value
+            if value < views[f"{name}.min"][slot]:
+                views[f"{name}.min"][slot] = value
+            if value > views[f"{name}.max"][slot]:
+                views[f"{name}.max"][slot] = value
+        times[slot] = start
+    
+    def read(self, start: float, end: float, series: Iterable[str],
+             field: str) -> Tuple[int, int, Dict[str, List[int]], Dict[str, List[float]]]:
+        """
+        Lit les seaux de l'intervalle [start, end], dans l'ordre chronologique.
+        
+        Args:
+            start (float): Début de l'intervalle.
+            end (float): Fin de l'intervalle.
+            series (Iterable[str]): Séries lues.
+            field (str): Champ lu (sum, min ou max).
+        
+        Returns:
+            Tuple: début du premier seau, nombre de seaux et, par série, le nombre
+            d'échantillons de chaque seau (0 pour un seau vide ou écrasé, dont le
+            début ne correspond pas à l'instant attendu) puis le champ de chaque seau.
+        """
+        series = list(series)
+        first = int(start // self.step)
+        last = int(end // self.step)
+        first = max(first, last - self.capacity + 1)
+        if last < first:
+            return first * self.step, 0, {name: [] for name in series}, {name: [] for name in series}
+        
+        # L'intervalle occupe au plus deux segments contigus de l'anneau
+        segments = []
+        index = first
+        while index <= last:
+            slot = index % self.capacity
+            length = min(last - index + 1, self.capacity - slot)
+            segments.append((slot, slot + length))
+            index += length
+        
+        def column(name: str) -> list:
+            view = self._views[name]
+            values = []
+            for low, high in segments:
+                values.extend(view[low:high].tolist())
+            return values
+        
+        expected = range(first * self.step, (last + 1) * self.step, self.step)
+        current = [time_ == slot_time for time_, slot_time in zip(column("time"), expected)]
+        counts = {
+            name: [count if valid else 0 for count, valid in zip(column(f"{name}.count"), current)]
+            for name in series
+        }
+        return first * self.step, len(current), counts, {name: column(f"{name}.{field}") for name in series}
+    
+    def flush(self):
+        """Écrit les pages modifiées sur le disque."""
+        self._mmap.flush()
+    
+    def close(self):
+        """Ferme le fichier."""
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        self._mmap.close()
+        self._file.close()
+
+class TimeSeriesStore:
+    """
+    Historique multi-résolution : chaque échantillon est agrégé dans toutes les
+    résolutions à l'écriture, et une requête lit la résolution la plus grossière
+    qui respecte le pas demandé et couvre l'intervalle.
+    """
+    
+    def __init__(self, directory: str, series: Sequence[str] = RECORDED_SERIES,
+                 tiers: Sequence[Sequence[int]] = DEFAULT_TIERS, writable: bool = False):
+        """
+        Initialise le stockage.
+        
+        Args:
+            directory (str): Répertoire des fichiers (un par résolution).
+            series (Sequence[str]): Noms des séries.
+            tiers (Sequence[Sequence[int]]): Résolutions (pas, rétention) en secondes.
+            writable (bool): Ouvrir en écriture.
+        """
+        self.directory = directory
+        self.series = tuple(series)
+        self.tiers = sorted((int(step), int(retention)) for step, retention in tiers)
+        self.writable = writable
+        self._files: Dict[int, TimeSeriesFile] = {}
+        self._lock = threading.Lock()
+        if writable:
+            os.makedirs(directory, exist_ok=True)
+    
+    def _file(self, step: int, retention: int) -> Optional[TimeSeriesFile]:
+        tier = self._files.get(step)
+        if tier is None:
+            path = os.path.join(self.directory, f"system_{step}s.tsdb")
+            try:
+                tier = self._files[step] = TimeSeriesFile(path, step, max(1, retention // step), self.series, self.writable)
+            except (OSError, ValueError):  # Rien n'a encore été enregistré à cette résolution
+                return None
+        return tier
+    
+    def append(self, timestamp: float, values: Dict[str, float]):
+        """
+        Enregistre un échantillon dans toutes les résolutions.
+        
+        Args:
+            timestamp (float): L'instant (secondes depuis l'epoch).
+            values (Dict[str, float]): Valeur par série.
+        """
+        with self._lock:
+            for step, retention in self.tiers:
+                self._file(step, retention).append(timestamp, values)
+    
+    def choose_tier(self, start: float, step: float, now: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Choisit la résolution d'une requête : la plus grossière dont le pas ne
+        dépasse pas `step` et dont la rétention couvre `start`, sinon celle dont
+        la rétention remonte le plus loin.
+        """
+        now = time.time() if now is None else now
+        candidates = [tier for tier in self.tiers if tier[0] <= step] or self.tiers[:1]
+        covering = [tier for tier in candidates if tier[1] >= now - start]
+        return covering[-1] if covering else max(candidates, key=lambda tier: tier[1])
+    
+    def query(self, start: float, end: float, step: Optional[float] = None, aggregation: str = "avg",
+              series: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Interroge l'historique.
+        
+        Args:
+            start (float): Début de l'intervalle (secondes depuis l'epoch).
+            end (float): Fin de l'intervalle.
+            step (float, optional): Pas du résultat (par défaut environ 120 points) ;
+                                    arrondi à un multiple du pas de la résolution lue.
+            aggregation (str): avg, min ou max.
+            series (Iterable[str], optional): Séries retournées (par défaut toutes).
+        
+        Returns:
+            Dict[str, Any]: start, end, step, resolution (pas de la résolution lue),
+                            aggregation, timestamps (début de chaque point) et series
+                            (une liste de valeurs par série, None sans échantillon).
+        
+        Raises:
+            ValueError: Si l'agrégation, une série ou l'intervalle est invalide.
+        """
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Agrégation inconnue: {aggregation} (attendu: {', '.join(AGGREGATIONS)})")
+        names = list(series) if series else list(self.series)
+        unknown = [name for name in names if name not in self.series]
+        if unknown:
+            raise ValueError(f"Série inconnue: {', '.join(unknown)} (attendu: {', '.join(self.series)})")
+        if end <= start:
+            raise ValueError("La fin de l'intervalle doit suivre son début")
+        if not step or step <= 0:
+            step = (end - start) / 120
+        
+        tier_step, retention = self.choose_tier(start, step)
+        factor = max(1, int(step // tier_step))
+        step = factor * tier_step
+        field = {"avg": "sum", "min": "min", "max": "max"}[aggregation]
+        with self._lock:
+            tier = self._file(tier_step, retention)
+            if tier is None:
+                origin, length = int(start // tier_step) * tier_step, 0
+                counts, columns = {name: [] for name in names}, {name: [] for name in names}
+            else:
+                origin, length, counts, columns = tier.read(start, end, names, field)
+        
+        # Points de `step` secondes: groupes réguliers de `factor` seaux, le premier éventuellement partiel
+        if factor == 1:
+            groups = None
+            timestamps = list(range(origin, origin + length * tier_step, tier_step))
+        else:
+            head = (step - origin % step) // tier_step % factor
+            bounds = [0] + list(range(head or factor, length, factor)) + [length]
+            groups = [(low, high) for low, high in zip(bounds, bounds[1:]) if high > low]
+            timestamps = [(origin + low * tier_step) // step * step for low, _ in groups]
+        
+        # Les seaux sans échantillon de la série contiennent des valeurs périmées: neutralisées avant
+        # l'agrégation ; un point sans aucun échantillon vaut None
+        neutral = {"sum": 0.0, "min": math.inf, "max": -math.inf}[field]
+        reduce = {"sum": sum, "min": min, "max": max}[field]
+        values: Dict[str, List[Optional[float]]] = {}
+        for name in names:
+            series_counts = counts[name]
+            cells = [value if count else neutral for value, count in zip(columns[name], series_counts)]
+            if groups is None:
+                reduced, totals = cells, series_counts
+            else:
+                reduced = [reduce(cells[low:high]) for low, high in groups]
+                totals = [sum(series_counts[low:high]) for low, high in groups]
+            if field == "sum":
+                values[name] = [value / total if total else None for value, total in zip(reduced, totals)]
+            else:
+                values[name] = [value if total else None for value, total in zip(reduced, totals)]
+        
+        return {
+            "start": start,
+            "end": end,
+            "step": step,
+            "resolution": tier_step,
+            "aggregation": aggregation,
+            "timestamps": timestamps,
+            "series": values
+        }
+    
+    def flush(self):
+        """Écrit les pages modifiées sur le disque."""
+        with self._lock:
+            for tier in self._files.values():
+                tier.flush()
+    
+    def close(self):
+        """Ferme les fichiers."""
+        with self._lock:
+            for tier in self._files.values():
+                tier.close()
+            self._files = {}
+
+def format_series_value(name: str, value: Optional[float]) -> str:
+    """Formate une valeur selon sa série : pourcentage, millisecondes ou débit."""
+    if value is None or value != value:
+        return "-"
+    if name in ("cpu", "memory"):
+        return f"{value:.1f} %"
+    if name == "ping_rtt":
+        return f"{value:.1f} ms"
+    for unit in ("o/s", "Ko/s", "Mo/s", "Go/s"):
+        if value < 1024 or unit == "Go/s":
+            return f"{value:.0f} {unit}" if unit == "o/s" else f"{value:.1f} {unit}"
+        value /= 1024
+
+def history_dir(config: Config) -> str:
+    """Répertoire de l'historique (par défaut 'metrics' à côté de config.json)."""
+    return config.get_value("metrics_history_dir") or os.path.join(
+        os.path.dirname(os.path.abspath(config.config_path)), "metrics"
+    )
+
+def history_tiers(config: Config) -> List[Tuple[int, int]]:
+    """Résolutions configurées (metrics_history_tiers), sinon DEFAULT_TIERS."""
+    tiers = config.get_value("metrics_history_tiers") or DEFAULT_TIERS
+    return [(int(step), int(retention)) for step, retention in tiers]
+
+class MetricsRecorder:
+    """
+    Enregistreur de fond : un échantillon système toutes les `metrics_history_interval`
+    secondes. Un verrou de fichier garantit un seul enregistreur par répertoire,
+    même si plusieurs processus (workers web, CLI) le démarrent.
+    
+    Si `metrics_history_ping_host` est défini, un second thread pingue l'hôte à la
+    même cadence ; un hôte injoignable ne retarde pas les échantillons système.
+    """
+    
+    def __init__(self, config: Config, store: Optional[TimeSeriesStore] = None):
+        """
+        Initialise l'enregistreur.
+        
+        Args:
+            config (Config): L'objet de configuration.
+            store (TimeSeriesStore, optional): Le stockage (par défaut celui de la configuration).
+        """
+        self.config = config
+        self.interval = max(1.0, float(config.get_value("metrics_history_interval", 10)))
+        self.store = store or TimeSeriesStore(history_dir(config), tiers=history_tiers(config), writable=True)
+        self.ping_host = config.get_value("metrics_history_ping_host", "")
+        self.samples = 0
+        self._ping_rtt: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_file = None
+    
+    def _acquire(self) -> bool:
+        try:
+            import fcntl
+        except ImportError:  # Windows: pas de verrou, un seul enregistreur est supposé
+            return True
+        self._lock_file = open(os.path.join(self.store.directory, "recorder.lock"), "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+    
+    def record(self, sampler: SystemSampler):
+        """Mesure le système et enregistre l'échantillon."""
+        sample = sampler.sample()
+        self.store.append(sample["time"], {
+            "cpu": sample["cpu_percent"],
+            "memory": sample["memory"]["percent"],
+            "disk_read": sample["disk_io"]["read_bytes_per_s"],
+            "disk_write": sample["disk_io"]["write_bytes_per_s"],
+            "net_recv": sample["net_io"]["recv_bytes_per_s"],
+            "net_sent": sample["net_io"]["sent_bytes_per_s"],
+            # Dernière latence mesurée, utilisée une seule fois: pas de valeur répétée si le ping échoue
+            "ping_rtt": self._ping_rtt
+        })
+        self._ping_rtt = None
+        self.samples += 1
+    
+    def ping_loop(self):
+        """Pingue metrics_history_ping_host à chaque période, jusqu'à stop()."""
+        from .network import NetworkService
+        
+        network = NetworkService(self.config)
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                for result in network.iter_ping(self.ping_host, 1):
+                    if result.get("success"):
+                        self._ping_rtt = result.get("time_ms")
+            except Exception as e:
+                logger.warning(f"Ping de {self.ping_host} impossible pour l'historique: {str(e)}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+    
+    def run(self):
+        """Enregistre jusqu'à stop(), à cadence fixe."""
+        sampler = SystemSampler(history=1)
+        # Le premier échantillon sert de référence aux débits
+        next_tick = time.monotonic() + self.interval
+        while not self._stop.wait(max(0.0, next_tick - time.monotonic())):
+            try:
+                self.record(sampler)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'enregistrement de l'historique: {str(e)}")
+            next_tick += self.interval
+            if next_tick < time.monotonic():  # Veille de la machine: pas de rattrapage
+                next_tick = time.monotonic() + self.interval
+        self.store.close()
+    
+    def start(self) -> bool:
+        """
+        Démarre l'enregistrement dans un thread de fond.
+        
+        Returns:
+            bool: False si un autre processus enregistre déjà dans ce répertoire.
+        """
+        if not self._acquire():
+            logger.info(f"Historique déjà enregistré par un autre processus ({self.store.directory})")
+            return False
+        self._thread = threading.Thread(target=self.run, name="aiterminal-history", daemon=True)
+        self._thread.start()
+        if self.ping_host:
+            threading.Thread(target=self.ping_loop, name="aiterminal-history-ping", daemon=True).start()
+        return True
+    
+    def stop(self):
+        """Arrête l'enregistrement et ferme les fichiers."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+_stores: Dict[str, TimeSeriesStore] = {}
+_stores_lock = threading.Lock()
+
+def get_history_store(config: Config) -> TimeSeriesStore:
+    """
+    Retourne le stockage en lecture du répertoire configuré (fichiers mmap partagés
+    entre les requêtes).
+    
+    Args:
+        config (Config): L'objet de configuration.
+    """
+    directory = history_dir(config)
+    tiers = history_tiers(config)
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None or store.tiers != sorted(tiers):
+            store = _stores[directory] = TimeSeriesStore(directory, tiers=tiers)
+        return store
@@ -0,0 +1,405 @@
+"""
+Module de traçage des durées.
+Spans imbriqués (arbre des durées d'une commande ou d'une requête), quasi gratuits
+quand aucune trace n'est active, avec export en piles repliées pour les outils de
+flamegraph et profilage cProfile optionnel.
+"""
+
+import time
+import inspect
+import functools
+import logging
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Span courant du contexte (thread ou tâche asyncio), None hors trace
+_current_span: ContextVar[Optional["Span"]] = ContextVar("aiterminal_span", default=None)
+
+# Extensions de fichier pour lesquelles --profile-output écrit les statistiques cProfile
+CPROFILE_EXTENSIONS = (".prof", ".pstats")
+
+class Span:
+    """Intervalle de temps nommé, avec ses attributs et ses sous-intervalles."""
+    
+    __slots__ = ("name", "attrs", "start", "end", "children")
+    
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None, start: Optional[float] = None):
+        """
+        Initialise le span.
+        
+        Args:
+            name (str): Nom de l'opération (par exemple 'ai.complete').
+            attrs (Dict[str, Any], optional): Attributs (modèle, hôte, tentative...).
+            start (float, optional): Début (horloge perf_counter), maintenant par défaut.
+        """
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter() if start is None else start
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+    
+    @property
+    def duration(self) -> float:
+        """Durée en secondes (jusqu'à maintenant si le span n'est pas terminé)."""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+    
+    def set(self, **attrs):
+        """Ajoute des attributs au span."""
+        self.attrs.update(attrs)
+    
+    def finish(self):
+        """Termine le span."""
+        if self.end is None:
+            self.end = time.perf_counter()
+    
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Convertit le span et ses enfants en dictionnaire sérialisable.
+        
+        Args:
+            origin (float, optional): Instant de référence des débuts (par défaut le début du span).
+        
+        Returns:
+            Dict[str, Any]: name, start_ms, duration_ms, attrs et children.
+        """
+        origin = self.start if origin is None else origin
+        data = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000.0, 3),
+            "duration_ms": round(self.duration * 1000.0, 3)
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+    
+    def collapsed(self, prefix: str = "") -> List[str]:
+        """
+        Exporte l'arbre en piles repliées (`a;b;c <µs>`), le format lu par
+        flamegraph.pl, speedscope ou inferno. Chaque ligne porte le temps propre
+        du span, hors enfants.
+        
+        Returns:
+            List[str]: Les lignes.
+        """
+        stack = f"{prefix};{self.name}" if prefix else self.name
+        own = self.duration - sum(child.duration for child in self.children)
+        lines = [f"{stack} {max(0, int(own * 1e6))}"]
+        for child in self.children:
+            lines.extend(child.collapsed(stack))
+        return lines
+
+class _SpanContext:
+    """Gestionnaire de contexte d'un span enfant du span courant."""
+    
+    __slots__ = ("parent", "span", "token")
+    
+    def __init__(self, parent: Span, name: str, attrs: Dict[str, Any]):
+        self.parent = parent
+        self.span = Span(name, attrs)
+        self.token = None
+    
+    def __enter__(self) -> Span:
+        self.span.start = time.perf_counter()
+        self.parent.children.append(self.span)
+        self.token = _current_span.set(self.span)
+        return self.span
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.span.finish()
+        if exc_type is not None:
+            self.span.attrs["error"] = exc_type.__name__
+        _current_span.reset(self.token)
+        return False
+
+class _NullSpan:
+    """Span inerte renvoyé hors trace : aucune allocation, aucune mesure."""
+    
+    __slots__ = ()
+    
+    def __enter__(self) -> "_NullSpan":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+    
+    def set(self, **attrs):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+def is_tracing() -> bool:
+    """Indique si une trace est active dans le contexte courant."""
+    return _current_span.get() is not None
+
+def span(name: str, **attrs):
+    """
+    Ouvre un span enfant du span courant : `with span("network.http", method="GET"):`.
+    
+    Hors trace, retourne NULL_SPAN (coût d'une lecture de ContextVar).
+    
+    Args:
+        name (str): Nom de l'opération.
+        **attrs: Attributs du span.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NULL_SPAN
+    return _SpanContext(parent, name, attrs)
+
+def add_span(name: str, start: float, **attrs) -> Optional[Span]:
+    """
+    Ajoute au span courant un span déjà terminé, mesuré par l'appelant.
+    
+    Utile pour les générateurs, dont le corps ne peut pas garder un span ouvert
+    entre deux `yield` sans y rattacher le code du consommateur.
+    
+    Args:
+        name (str): Nom de l'opération.
+        start (float): Début (horloge perf_counter) ; la fin est maintenant.
+        **attrs: Attributs du span.
+    
+    Returns:
+        Optional[Span]: Le span ajouté, ou None hors trace.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    child = Span(name, attrs, start=start)
+    child.finish()
+    parent.children.append(child)
+    return child
+
+def traced(name: str):
+    """
+    Décorateur : exécute la fonction (ou la coroutine) dans un span.
+    
+    Args:
+        name (str): Nom du span.
+    """
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def format_span_tree(root: Span, min_ms: float = 0.0) -> str:
+    """
+    Met en forme un arbre de spans pour le terminal.
+    
+    Args:
+        root (Span): La racine.
+        min_ms (float): Masque les spans plus courts (sauf la racine).
+    
+    Returns:
+        str: Une ligne par span : nom, durée, part de la racine et attributs.
+    """
+    total = root.duration or 1e-9
+    lines = []
+    
+    def walk(node: Span, label: str, prefix: str):
+        attrs = " ".join(f"{key}={value}" for key, value in node.attrs.items())
+        lines.append(f"{label:<48} {node.duration * 1000.0:>10.1f} ms {node.duration / total:>6.1%}  {attrs}".rstrip())
+        children = [child for child in node.children if child.duration * 1000.0 >= min_ms]
+        for index, child in enumerate(children):
+            last = index == len(children) - 1
+            walk(child, f"{prefix}{'└─ ' if last else '├─ '}{child.name}", prefix + ("   " if last else "│  "))
+    
+    walk(root, root.name, "")
+    return "\n".join(lines)
+
+class Profiler:
+    """
+    Session de profilage : une trace racine et, sur demande, cProfile.
+    
+    cProfile ne mesure que le thread qui l'a démarré ; les spans suivent aussi
+    les tâches asyncio et les threads lancés avec contextvars.copy_context().
+    """
+    
+    def __init__(self, name: str, cprofile: bool = False, **attrs):
+        """
+        Initialise la session.
+        
+        Args:
+            name (str): Nom du span racine (commande ou route).
+            cprofile (bool): Activer aussi cProfile.
+            **attrs: Attributs du span racine.
+        """
+        self.root = Span(name, attrs)
+        self.cprofile = cprofile
+        self.profile = None
+        self._token = None
+    
+    def start(self) -> Span:
+        """Démarre la trace dans le contexte courant et retourne la racine."""
+        self.root.start = time.perf_counter()
+        self._token = _current_span.set(self.root)
+        if self.cprofile:
+            import cProfile
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self.profile = profile
+            except ValueError as e:  # Un autre profileur est déjà actif
+                logger.warning(f"cProfile indisponible: {str(e)}")
+        return self.root
+    
+    def stop(self) -> Span:
+        """Arrête la trace (et cProfile) et retourne la racine."""
+        if self.profile is not None:
+            self.profile.disable()
+        self.root.finish()
+        if self._token is not None:
+            _current_span.reset(self._token)
+            self._token = None
+        return self.root
+    
+    def __enter__(self) -> Span:
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+    
+    def dump(self, path: str):
+        """
+        Écrit le profil dans un fichier.
+        
+        Avec l'extension .prof ou .pstats, les statistiques cProfile (snakeviz,
+        gprof2dot, flameprof) ; sinon les piles repliées des spans.
+        
+        Args:
+            path (str): Le fichier de sortie.
+        
+        Raises:
+            Exception: Si le fichier ne peut pas être écrit.
+        """
+        try:
+            if path.endswith(CPROFILE_EXTENSIONS):
+                if self.profile is None:
+                    raise ValueError("cProfile n'a pas été activé pour cette session")
+                self.profile.dump_stats(path)
+            else:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write("\n".join(self.root.collapsed()) + "\n")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'écriture du profil: {str(e)}")
+            raise Exception(f"Erreur lors de l'écriture du profil: {str(e)}")
+
+def wants_cprofile(path: Optional[str]) -> bool:
+    """Indique si un fichier de profil demande les statistiques cProfile."""
+    return bool(path) and path.endswith(CPROFILE_EXTENSIONS)
+
+class ProfileMiddleware:
+    """
+    Middleware WSGI : `?profile=1` ajoute l'arbre des spans à la réponse JSON.
+    
+    La réponse d'un objet JSON reçoit une clé 'profile' ; `?profile=collapsed`
+    remplace le corps par les piles repliées (text/plain). Sans le paramètre,
+    la requête passe directement à l'application. Les réponses en flux (SSE,
+    corps sans Content-Length) et, pour `?profile=1`, les réponses non JSON
+    sont transmises telles quelles : le profil ne couvre alors que la vue.
+    """
+    
+    def __init__(self, app, parameter: str = "profile"):
+        """
+        Initialise le middleware.
+        
+        Args:
+            app: L'application WSGI.
+            parameter (str): Nom du paramètre de requête.
+        """
+        self.app = app
+        self.parameter = parameter
+    
+    def __call__(self, environ, start_response):
+        query = environ.get("QUERY_STRING", "")
+        if self.parameter not in query:
+            return self.app(environ, start_response)
+        mode = parse_qs(query).get(self.parameter, [""])[-1]
+        if mode not in ("1", "true", "collapsed"):
+            return self.app(environ, start_response)
+        
+        captured = {}
+        chunks = []
+        
+        def capture(status, headers, exc_info=None):
+            if self._passthrough(mode, headers):
+                captured["passthrough"] = True
+                return start_response(status, headers, exc_info)
+            captured["status"] = status
+            captured["headers"] = headers
+            return chunks.append
+        
+        profiler = Profiler(f"{environ.get('REQUEST_METHOD', 'GET')} {environ.get('PATH_INFO', '')}")
+        profiler.start()
+        try:
+            result = self.app(environ, capture)
+            if captured.get("passthrough"):
+                # Le corps est produit au fil de l'eau : ne pas l'attendre
+                return result
+            try:
+                chunks.extend(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        finally:
+            root = profiler.stop()
+        
+        body = b"".join(chunks)
+        headers = [(key, value) for key, value in captured.get("headers", []) if key.lower() != "content-length"]
+        if mode == "collapsed":
+            body = ("\n".join(root.collapsed()) + "\n").encode("utf-8")
+            headers = [(key, value) for key, value in headers if key.lower() != "content-type"]
+            headers.append(("Content-Type", "text/plain; charset=utf-8"))
+        elif body[:1] == b"{" and any(key.lower() == "content-type" and "json" in value for key, value in headers):
+            from .output import dumps, loads
+            try:
+                data = loads(body)
+                data["profile"] = root.to_dict()
+                body = dumps(data).encode("utf-8")
+            except ValueError:
+                pass
+        headers.append(("Content-Length", str(len(body))))
+        start_response(captured.get("status", "500 INTERNAL SERVER ERROR"), headers)
+        return [body]
+    
+    @staticmethod
+    def _passthrough(mode: str, headers) -> bool:
+        """
+        Indique si la réponse doit être transmise sans être mise en mémoire.
+        
+        Args:
+            mode (str): Valeur du paramètre de profil.
+            headers: En-têtes de la réponse.
+        
+        Returns:
+            bool: True pour un flux, ou pour une réponse non JSON hors mode 'collapsed'.
+        """
+        content_type = ""
+        sized = False
+        for key, value in headers:
+            if key.lower() == "content-type":
+                content_type = value.lower()
+            elif key.lower() == "content-length":
+                sized = True
+        if not sized or content_type.startswith("text/event-stream"):
+            return True
+        return mode != "collapsed" and "json" not in content_type
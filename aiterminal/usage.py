@@ -0,0 +1,314 @@
+"""
+Module de comptabilité des appels IA.
+Enregistre les tokens, la latence, le modèle et le coût estimé de chaque appel,
+les agrège en mémoire et peut les journaliser au format NDJSON avec rotation.
+"""
+
+import os
+import json
+import glob
+import time
+import logging
+import threading
+import contextvars
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Any, List, Optional, Iterable
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Prix par défaut en dollars par million de tokens (entrée, entrée en cache, sortie)
+DEFAULT_PRICES = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60}
+}
+
+GROUP_KEYS = ("source", "task", "model")
+
+# Champs numériques d'un enregistrement, lus par UsageTracker.record
+RECORD_NUMBERS = ("prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms", "cache_hit", "error")
+
+# Origine des appels (commande CLI ou route web), positionnée par l'appelant
+_current_source = contextvars.ContextVar("aiterminal_usage_source", default="direct")
+
+def set_usage_source(source: str):
+    """
+    Définit l'origine des appels IA du contexte courant (par exemple 'cli:ai' ou '/api/generate').
+    
+    Args:
+        source (str): L'origine à associer aux prochains enregistrements.
+    
+    Returns:
+        Le jeton permettant de restaurer la valeur précédente.
+    """
+    return _current_source.set(source)
+
+def get_usage_source() -> str:
+    """Retourne l'origine des appels IA du contexte courant."""
+    return _current_source.get()
+
+def make_record(task: str, model: str, latency_s: float, usage: Any = None, error: bool = False,
+                source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Construit un enregistrement d'appel à partir de l'objet `usage` renvoyé par l'API.
+    
+    Args:
+        task (str): Type de tâche (chat, summary, sentiment, entities, code).
+        model (str): Le modèle effectivement utilisé.
+        latency_s (float): Durée totale de l'appel, réessais et repli compris.
+        usage: L'attribut `usage` de la réponse (peut être None).
+        error (bool): True si l'appel a échoué.
+        source (str, optional): Origine de l'appel (par défaut celle du contexte).
+    
+    Returns:
+        Dict[str, Any]: L'enregistrement.
+    """
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    return {
+        "ts": round(time.time(), 3),
+        "source": source or get_usage_source(),
+        "task": task,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cached_tokens": cached_tokens,
+        "latency_ms": round(latency_s * 1000.0, 1),
+        "cache_hit": cached_tokens > 0,
+        "error": error
+    }
+
+class UsageTracker:
+    """
+    Agrégateur en mémoire des appels IA.
+    
+    L'enregistrement se limite à quelques additions sous verrou ; la journalisation
+    NDJSON, si elle est activée, passe par un RotatingFileHandler dédié.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups: Dict[tuple, Dict[str, float]] = {}
+        self._started_at = time.time()
+        self._log_path: Optional[str] = None
+        self._log = logging.getLogger("aiterminal.usage.ndjson")
+        self._log.propagate = False
+        self._prices = DEFAULT_PRICES
+    
+    def configure(self, config: Config):
+        """
+        Applique la configuration (prix et journal NDJSON). Sans effet si rien n'a changé.
+        
+        Args:
+            config (Config): L'objet de configuration.
+        """
+        self._prices = {**DEFAULT_PRICES, **(config.get_value("model_prices", {}) or {})}
+        path = config.get_value("usage_log_path", "") or None
+        if path == self._log_path:
+            return
+        
+        with self._lock:
+            for handler in list(self._log.handlers):
+                self._log.removeHandler(handler)
+                handler.close()
+            self._log_path = path
+            if path:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                handler = RotatingFileHandler(
+                    path,
+                    maxBytes=config.get_value("usage_log_max_bytes", 10 * 1024 * 1024),
+                    backupCount=config.get_value("usage_log_backups", 3),
+                    encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self._log.addHandler(handler)
+                self._log.setLevel(logging.INFO)
+    
+    @property
+    def log_path(self) -> Optional[str]:
+        """Chemin du journal NDJSON, ou None s'il est désactivé."""
+        return self._log_path
+    
+    def cost(self, record: Dict[str, Any]) -> float:
+        """
+        Estime le coût d'un appel en dollars.
+        
+        Args:
+            record (Dict[str, Any]): L'enregistrement de l'appel.
+        
+        Returns:
+            float: Le coût estimé (0 si le modèle n'a pas de prix connu).
+        """
+        prices = self._prices.get(record["model"])
+        if not prices:
+            return 0.0
+        uncached = record["prompt_tokens"] - record["cached_tokens"]
+        return (uncached * prices["input"]
+                + record["cached_tokens"] * prices.get("cached_input", prices["input"])
+                + record["completion_tokens"] * prices["output"]) / 1_000_000
+    
+    def record(self, record: Dict[str, Any]):
+        """
+        Ajoute un enregistrement aux agrégats et au journal.
+        
+        Args:
+            record (Dict[str, Any]): L'enregistrement (voir make_record).
+        """
+        key = (record["source"], record["task"], record["model"])
+        cost = self.cost(record)
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = {
+                    "calls": 0, "errors": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                    "cached_tokens": 0, "latency_ms_total": 0.0, "latency_ms_max": 0.0, "cost_usd": 0.0
+                }
+            group["calls"] += 1
+            group["errors"] += record["error"]
+            group["cache_hits"] += record["cache_hit"]
+            group["prompt_tokens"] += record["prompt_tokens"]
+            group["completion_tokens"] += record["completion_tokens"]
+            group["cached_tokens"] += record["cached_tokens"]
+            group["latency_ms_total"] += record["latency_ms"]
+            if record["latency_ms"] > group["latency_ms_max"]:
+                group["latency_ms_max"] = record["latency_ms"]
+            group["cost_usd"] += cost
+        
+        if self._log_path:
+            self._log.info(json.dumps(record, separators=(",", ":")))
+    
+    def get_stats(self, group_by: Iterable[str] = GROUP_KEYS) -> Dict[str, Any]:
+        """
+        Récupère les agrégats en mémoire.
+        
+        Args:
+            group_by (Iterable[str]): Dimensions de regroupement parmi source, task et model.
+        
+        Returns:
+            Dict[str, Any]: Les totaux et les groupes.
+        """
+        with self._lock:
+            groups = [(dict(zip(GROUP_KEYS, key)), dict(values)) for key, values in self._groups.items()]
+        return summarize_groups(groups, group_by, since=self._started_at)
+    
+    def reset(self):
+        """Efface les agrégats en mémoire."""
+        with self._lock:
+            self._groups.clear()
+            self._started_at = time.time()
+
+def summarize_groups(groups: List[tuple], group_by: Iterable[str], since: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Regroupe des agrégats selon les dimensions demandées et calcule les totaux.
+    
+    Args:
+        groups (List[tuple]): Paires (dimensions, compteurs).
+        group_by (Iterable[str]): Dimensions de regroupement.
+        since (float, optional): Début de la période couverte (timestamp).
+    
+    Returns:
+        Dict[str, Any]: Les totaux et les groupes triés par coût décroissant.
+    """
+    group_by = [key for key in group_by if key in GROUP_KEYS]
+    merged: Dict[tuple, Dict[str, float]] = {}
+    for dims, values in groups:
+        key = tuple(dims[k] for k in group_by)
+        target = merged.setdefault(key, {})
+        for name, value in values.items():
+            if name == "latency_ms_max":
+                target[name] = max(target.get(name, 0.0), value)
+            else:
+                target[name] = target.get(name, 0) + value
+    
+    def finalize(values: Dict[str, float]) -> Dict[str, Any]:
+        calls = values.get("calls", 0)
+        result = {name: value for name, value in values.items() if name != "latency_ms_total"}
+        result["latency_ms_avg"] = round(values.get("latency_ms_total", 0.0) / calls, 1) if calls else 0.0
+        result["cost_usd"] = round(values.get("cost_usd", 0.0), 6)
+        return result
+    
+    totals: Dict[str, float] = {}
+    for values in merged.values():
+        for name, value in values.items():
+            if name == "latency_ms_max":
+                totals[name] = max(totals.get(name, 0.0), value)
+            else:
+                totals[name] = totals.get(name, 0) + value
+    
+    rows = [dict(zip(group_by, key), **finalize(values)) for key, values in merged.items()]
+    rows.sort(key=lambda row: row["cost_usd"], reverse=True)
+    return {
+        "since": since,
+        "group_by": group_by,
+        "totals": finalize(totals) if totals else {},
+        "groups": rows
+    }
+
+def load_usage_log(path: str, group_by: Iterable[str] = GROUP_KEYS, since: Optional[float] = None,
+                   tracker: Optional["UsageTracker"] = None) -> Dict[str, Any]:
+    """
+    Agrège les enregistrements d'un journal NDJSON (fichiers de rotation compris).
+    
+    Args:
+        path (str): Chemin du journal courant.
+        group_by (Iterable[str]): Dimensions de regroupement.
+        since (float, optional): Ignore les enregistrements antérieurs à ce timestamp.
+        tracker (UsageTracker, optional): Tracker utilisé pour le calcul des coûts.
+    
+    Returns:
+        Dict[str, Any]: Les totaux et les groupes (même format que UsageTracker.get_stats).
+    """
+    aggregator = UsageTracker()
+    if tracker is not None:
+        aggregator._prices = tracker._prices
+    
+    # Fichiers de rotation du plus ancien (suffixe le plus grand: .10 avant .9) au plus récent
+    rotated = []
+    for file_path in glob.glob(glob.escape(path) + ".*"):
+        suffix = file_path[len(path) + 1:]
+        if suffix.isdigit():
+            rotated.append((int(suffix), file_path))
+    rotated.sort(reverse=True)
+    
+    first_ts = None
+    for file_path in [file_path for _, file_path in rotated] + [path]:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not _is_valid_record(record):
+                    continue
+                if since is not None and record.get("ts", 0) < since:
+                    continue
+                if first_ts is None or record.get("ts", 0) < first_ts:
+                    first_ts = record.get("ts")
+                aggregator.record(record)
+    
+    stats = aggregator.get_stats(group_by)
+    stats["since"] = first_ts
+    return stats
+
+def _is_valid_record(record: Any) -> bool:
+    """Vérifie qu'une ligne du journal est un enregistrement complet (voir make_record)."""
+    return (isinstance(record, dict)
+            and all(isinstance(record.get(key), str) for key in GROUP_KEYS)
+            and all(isinstance(record.get(key), (int, float)) for key in RECORD_NUMBERS)
+            and isinstance(record.get("ts", 0), (int, float)))
+
+_tracker = UsageTracker()
+
+def get_usage_tracker() -> UsageTracker:
+    """
+    Récupère l'agrégateur d'usage du processus.
+    
+    Returns:
+        UsageTracker: L'agrégateur partagé.
+    """
+    return _tracker
@@ -3,32 +3,44 @@ Module d'utilitaires.
 Contient des fonctions et classes utilitaires pour l'application.
 """
 
-import json
+import re
 import logging
-from typing import Any, Dict, List, Union
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Union
+
+from .output import dumps, loads
 
 logger = logging.getLogger(__name__)
 
+# Au-delà, une chaîne JSON est affichée telle quelle, sans être analysée ni réindentée
+PRETTY_MAX_CHARS = 1000000
+
 def format_response(response: Any) -> str:
     """
     Formate une réponse pour l'affichage dans la console.
     
+    Les chaînes ne sont analysées comme JSON que si elles commencent par '{' ou '['
+    et ne dépassent pas PRETTY_MAX_CHARS caractères.
+    
     Args:
         response (Any): La réponse à formater.
-        
+    
     Returns:
         str: La réponse formatée.
     """
     try:
         if isinstance(response, (dict, list)):
             # Si c'est déjà un dict ou une liste, le formater en JSON
-            return json.dumps(response, indent=2, ensure_ascii=False)
+            return dumps(response, indent=True)
         elif isinstance(response, str):
-            # Si c'est une chaîne, essayer de la parser comme JSON
+            # Texte libre ou document trop grand: pas de nouvelle analyse
+            if response[:64].lstrip()[:1] not in ("{", "[") or len(response) > PRETTY_MAX_CHARS:
+                return response
+            # Si la chaîne ressemble à du JSON, essayer de la parser
             try:
-                parsed = json.loads(response)
-                return json.dumps(parsed, indent=2, ensure_ascii=False)
-            except json.JSONDecodeError:
+                return dumps(loads(response), indent=True)
+            except ValueError:
                 # Si ce n'est pas du JSON, retourner la chaîne telle quelle
                 return response
         else:
@@ -37,3 +49,81 @@ def format_response(response: Any) -> str:
     except Exception as e:
         logger.error(f"Erreur lors du formatage de la réponse: {str(e)}")
         return str(response)
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estime grossièrement le nombre de tokens d'un texte (~4 caractères par token).
+    
+    Args:
+        text (str): Le texte.
+    
+    Returns:
+        int: Le nombre de tokens estimé.
+    """
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+def parse_duration(value: str) -> float:
+    """
+    Convertit une durée lisible (ex: 90s, 15m, 24h, 7d) en secondes.
+    
+    Args:
+        value (str): La durée. Un nombre seul est interprété en secondes.
+        
+    Returns:
+        float: La durée en secondes.
+        
+    Raises:
+        ValueError: Si le format est invalide.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*", value or "")
+    if not match:
+        raise ValueError(f"Durée invalide: {value}")
+    units = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    return float(match.group(1)) * units[match.group(2)]
+
+class NotifyingCondition(threading.Condition):
+    """
+    Condition dont notify_all() réveille aussi des coroutines.
+    
+    Les threads attendent avec wait() comme d'habitude ; une coroutine s'inscrit avec
+    listen() et attend l'asyncio.Event obtenu, sans occuper de thread pendant l'attente.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._listeners = set()
+    
+    def notify_all(self):
+        super().notify_all()
+        for listener in list(self._listeners):
+            listener()
+    
+    @contextmanager
+    def listen(self) -> Iterator[Any]:
+        """
+        Inscrit la boucle d'événements courante le temps du bloc.
+        
+        Yields:
+            asyncio.Event: Positionné (dans la boucle) à chaque notify_all() ; à remettre
+                           à zéro avant de vérifier l'état attendu.
+        """
+        # Importé ici: la CLI utilise ce module sans asyncio
+        import asyncio
+        
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        
+        def listener():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Boucle déjà fermée
+                pass
+        
+        with self:
+            self._listeners.add(listener)
+        try:
+            yield event
+        finally:
+            with self:
+                self._listeners.discard(listener)
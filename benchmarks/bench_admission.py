@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark du contrôle d'admission : latence de /api/generate sous surcharge,
+avec et sans limites (admission_enabled).
+
+Lance le serveur OpenAI simulé et le serveur web (ASGI par défaut, ou gunicorn
+avec --server wsgi), dont le pool vers OpenAI est limité à --upstream connexions,
+puis pendant --duration secondes :
+  - abus : un client (clé d'API) envoie --clients requêtes simultanées pendant
+    qu'un autre envoie une requête par seconde ;
+  - foule : --clients clients (X-Forwarded-For distincts) envoient chacun une
+    requête par seconde, soit plus que le service amont ne peut en traiter.
+Les clients respectent Retry-After. Le script échoue (code 1) si, dans un
+scénario, le p99 des requêtes admises n'est pas divisé par au moins --target
+grâce au contrôle d'admission.
+
+Usage:
+    python benchmarks/bench_admission.py --clients 128 --upstream 32 --latency fixed:500 --duration 15 --target 2.5
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+from common import ROOT, MockServerProcess, WebServerProcess, percentile, print_row, summarize
+
+import httpx
+
+from aiterminal.ai_services import ShardedAsyncTransport
+
+PAYLOAD = {"prompt": "Explique le protocole HTTP en une phrase."}
+
+class Recorder:
+    """Latences des requêtes admises et des refus (429) d'un groupe de clients."""
+    
+    def __init__(self):
+        self.accepted = []
+        self.rejected = []
+        self.errors = 0
+
+async def client_loop(client: httpx.AsyncClient, url: str, headers, recorder: Recorder, deadline: float,
+                      interval: float = 0.0):
+    """Envoie des requêtes jusqu'à l'échéance, au plus une par `interval` secondes, en respectant Retry-After."""
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, json=PAYLOAD, headers=headers)
+        except httpx.HTTPError:
+            recorder.errors += 1
+            continue
+        elapsed = time.perf_counter() - start
+        if response.status_code == 429:
+            recorder.rejected.append(elapsed)
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            continue
+        recorder.accepted.append(elapsed)
+        recorder.errors += response.status_code >= 400
+        if interval > elapsed:
+            await asyncio.sleep(interval - elapsed)
+
+async def run_scenario(url: str, scenario: str, clients: int, duration: float) -> Recorder:
+    """Exécute un scénario ; retourne les mesures du client suivi (abus) ou de tous les clients (foule)."""
+    limits = httpx.Limits(max_connections=clients + 1, max_keepalive_connections=clients + 1)
+    observed = Recorder()
+    async with httpx.AsyncClient(transport=ShardedAsyncTransport(limits), timeout=120) as client:
+        # Préchauffage (import d'openai, connexions) hors mesure, avec un seau à part
+        await client.post(url, json=PAYLOAD)
+        deadline = time.monotonic() + duration
+        if scenario == "abus":
+            abuser = Recorder()
+            loops = [client_loop(client, url, {"X-API-Key": "bench-abusif"}, abuser, deadline)
+                     for _ in range(clients)]
+            loops.append(client_loop(client, url, {"X-API-Key": "bench-normal"}, observed, deadline, 1.0))
+        else:
+            loops = [client_loop(client, url, {"X-Forwarded-For": f"10.0.{i // 256}.{i % 256}"}, observed,
+                                 deadline, 1.0) for i in range(clients)]
+        await asyncio.gather(*loops)
+    return observed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=128, help="Requêtes simultanées du client abusif / nombre de clients")
+    parser.add_argument("--upstream", type=int, default=32, help="Connexions vers OpenAI (et limite upstream_concurrency)")
+    parser.add_argument("--latency", default="fixed:500", help="Latence du serveur simulé")
+    parser.add_argument("--duration", type=float, default=15.0, help="Durée de chaque mesure (secondes)")
+    parser.add_argument("--server", choices=("asgi", "wsgi"), default="asgi", help="Serveur web mesuré")
+    parser.add_argument("--target", type=float, default=2.5,
+                        help="Rapport minimal des p99 des requêtes admises, sans et avec contrôle d'admission")
+    parser.add_argument("--json", dest="json_output", help="Écrire les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+    
+    if args.server == "asgi":
+        command = [sys.executable, "-m", "aiterminal", "serve", "--host", "127.0.0.1", "--port", "{port}"]
+    else:
+        # Plus de threads que d'appels amont admis: les refus ne restent pas bloqués derrière les appels
+        command = [sys.executable, "-m", "gunicorn", "--threads", str(args.upstream * 2),
+                   "--bind", "127.0.0.1:{port}", "--pythonpath", ROOT, "main:app"]
+    results = {}
+    failed = False
+    with MockServerProcess("--latency", args.latency) as mock:
+        print(f"Serveur simulé: {mock.base_url} (latence {args.latency}), serveur {args.server}, "
+              f"{args.upstream} connexions vers OpenAI")
+        for scenario in ("abus", "foule"):
+            p99 = {}
+            for enabled in (False, True):
+                label = f"{scenario} {'avec' if enabled else 'sans'} limites"
+                with tempfile.TemporaryDirectory() as workdir:
+                    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+                        json.dump({
+                            "api_key": "sk-benchmark", "base_url": mock.base_url,
+                            "http_max_connections": args.upstream, "http_max_keepalive": args.upstream,
+                            "admission_enabled": enabled,
+                            "rate_limits": {"/api/generate": {"rate": 2, "burst": 10}},
+                            "upstream_concurrency": {"openai": args.upstream},
+                            "api_clients": {"bench-abusif": "abusif", "bench-normal": "normal"},
+                            "rate_limit_trust_proxy": True
+                        }, f)
+                    with WebServerProcess(command, workdir, os.path.join(workdir, "server.log")) as server:
+                        recorder = asyncio.run(run_scenario(server.url + "/api/generate", scenario,
+                                                            args.clients, args.duration))
+                stats = summarize(recorder.accepted, args.duration, recorder.errors)
+                stats["rejected"] = len(recorder.rejected)
+                stats["rejected_p50_ms"] = round(percentile(recorder.rejected, 50) * 1000, 1)
+                results[label] = stats
+                p99[enabled] = stats["p99_ms"]
+                print_row(label, stats)
+                print(f"{'':<28} refus={stats['rejected']} (p50 {stats['rejected_p50_ms']:.1f}ms)")
+            ratio = p99[False] / p99[True] if p99[True] else 0.0
+            print(f"{scenario}: p99 des requêtes admises {p99[False]:.0f}ms sans limites, "
+                  f"{p99[True]:.0f}ms avec (x{ratio:.1f})")
+            if ratio < args.target:
+                print(f"ÉCHEC: {scenario}: p99 divisé par {ratio:.1f} seulement (objectif x{args.target:g})")
+                failed = True
+    
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
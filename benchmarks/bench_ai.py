@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark de charge des services IA et des routes Flask associées.
+
+Lance le serveur OpenAI simulé, y pointe la configuration (base_url) puis
+mesure le débit et les latences de queue de chaque méthode d'AIService
+et des routes /api/generate et /api/analyze.
+
+Usage:
+    python benchmarks/bench_ai.py --requests 200 --concurrency 20 --latency lognormal:150:0.4
+"""
+
+import os
+import json
+import logging
+import argparse
+import tempfile
+
+from common import MockServerProcess, print_row, run_concurrent
+
+TEXT = "Alice est à Paris le 12/05/2024. Ce produit est excellent, je suis très content du service."
+
+def bench_service(args, results):
+    """Mesure chaque méthode d'AIService."""
+    from aiterminal.config import Config
+    from aiterminal.ai_services import AIService
+    
+    service = AIService(Config())
+    calls = {
+        "AIService.generate_text": lambda: service.generate_text("Explique le protocole HTTP en une phrase."),
+        "AIService.analyze_sentiment": lambda: service.analyze_sentiment(TEXT),
+        "AIService.summarize_text": lambda: service.summarize_text(TEXT),
+        "AIService.extract_entities": lambda: service.extract_entities(TEXT),
+        "AIService.generate_code": lambda: service.generate_code("Fonction de Fibonacci")
+    }
+    for name, call in calls.items():
+        stats = run_concurrent(call, args.requests, args.concurrency,
+                               is_error=lambda r: isinstance(r, dict) and ("offline_mode" in r or "error" in r))
+        results[name] = stats
+        print_row(name, stats)
+
+def bench_routes(args, results):
+    """Mesure les routes Flask avec le client de test WSGI (sans réseau côté serveur web)."""
+    import main
+    
+    client_app = main.app
+    routes = {
+        "POST /api/generate": ("/api/generate", {"prompt": "Explique le protocole HTTP en une phrase."}),
+        "POST /api/analyze sentiment": ("/api/analyze", {"text": TEXT, "type": "sentiment"}),
+        "POST /api/analyze summary": ("/api/analyze", {"text": TEXT, "type": "summary"}),
+        "POST /api/analyze entities": ("/api/analyze", {"text": TEXT, "type": "entities"})
+    }
+    for name, (path, payload) in routes.items():
+        def call(path=path, payload=payload):
+            with client_app.test_client() as client:
+                return client.post(path, json=payload)
+        
+        stats = run_concurrent(call, args.requests, args.concurrency, is_error=lambda r: r.status_code >= 400)
+        results[name] = stats
+        print_row(name, stats)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Appels par méthode/route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", default="lognormal:150:0.4", help="Distribution de latence du serveur simulé")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--skip-routes", action="store_true", help="Ne pas mesurer les routes Flask")
+    parser.add_argument("--json", dest="json_output", help="Écrire les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+    
+    # Les erreurs injectées ne doivent pas noyer les résultats (main.py configure aussi le logging)
+    logging.basicConfig(level=logging.CRITICAL)
+    
+    with MockServerProcess("--latency", args.latency, "--error-rate", str(args.error_rate)) as mock, \
+            tempfile.TemporaryDirectory() as workdir:
+        # main.py et la CLI lisent config.json dans le répertoire courant
+        os.chdir(workdir)
+        os.environ.pop("OPENAI_BASE_URL", None)
+        with open("config.json", "w", encoding="utf-8") as f:
+            json.dump({"api_key": "sk-benchmark", "base_url": mock.base_url, "admission_enabled": False,
+                       "http_max_connections": args.concurrency, "http_max_keepalive": args.concurrency}, f)
+        
+        print(f"Serveur simulé: {mock.base_url} (latence {args.latency}, erreurs {args.error_rate:.0%})")
+        results = {}
+        bench_service(args, results)
+        if not args.skip_routes:
+            bench_routes(args, results)
+    
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la détection d'anomalies (module aiterminal.anomaly).
+
+Génère --days jours de séries au pas d'une minute (cycle quotidien, bruit,
+tâche planifiée chaque jour à 9 h) et y injecte --inject anomalies, puis mesure :
+  - le temps de détection (EWMA et référence saisonnière vectorisées) ;
+  - les anomalies retrouvées parmi celles injectées ;
+  - le nombre d'appels à l'IA pour les expliquer, comparé au nombre de points.
+Le script échoue (code 1) si la détection dépasse --target ms ou manque une anomalie.
+
+Usage:
+    python benchmarks/bench_anomaly.py --days 7 --inject 5 --target 200
+"""
+
+import sys
+import time
+import random
+import argparse
+
+from common import ROOT, percentile  # noqa: F401 (ajoute la racine du dépôt à sys.path)
+
+import numpy as np
+
+from aiterminal.anomaly import AnomalyDetector
+from aiterminal.config import Config
+
+STEP = 60
+
+class CountingAI:
+    """Service IA factice qui compte les appels et répond une ligne par anomalie."""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def generate_text(self, prompt, temperature=None):
+        self.calls += 1
+        return "\n".join(f"{index}: explication simulée" for index in range(1, prompt.count("\n") + 2))
+
+def generate(days: float, inject: int, seed: int):
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    count = int(days * 86400 / STEP)
+    timestamps = np.arange(count, dtype=np.float64) * STEP + 1_700_000_000.0 // 86400 * 86400
+    hours = timestamps % 86400 / 3600
+    cpu = 30 + 15 * np.sin((hours - 8) / 24 * 2 * np.pi) + rng.normal(0, 2, count)
+    cpu[(hours >= 9) & (hours < 9.25)] += 50  # Tâche planifiée quotidienne: habituelle, donc non signalée
+    series = {
+        "cpu": cpu,
+        "memory": 45 + rng.normal(0, 0.5, count),
+        "net_recv": 2e5 + rng.normal(0, 2e4, count),
+        "ping_rtt": 15 + rng.normal(0, 1, count)
+    }
+    injected = []
+    last_day = count - 86400 // STEP
+    for _ in range(inject):
+        name = random.choice(list(series))
+        start = random.randrange(last_day, count - 30)
+        length = random.randint(1, 20)
+        series[name][start:start + length] += {"cpu": 40, "memory": 20, "net_recv": 5e6, "ping_rtt": 200}[name]
+        injected.append((name, timestamps[start]))
+    return timestamps, {name: values.tolist() for name, values in series.items()}, injected, timestamps[last_day]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=7, help="Jours d'historique générés (pas d'une minute)")
+    parser.add_argument("--inject", type=int, default=5, help="Anomalies injectées dans le dernier jour")
+    parser.add_argument("--runs", type=int, default=5, help="Mesures de la détection")
+    parser.add_argument("--seed", type=int, default=1, help="Graine aléatoire")
+    parser.add_argument("--target", type=float, default=200.0, help="Durée maximale de la détection (ms)")
+    args = parser.parse_args()
+    
+    timestamps, series, injected, since = generate(args.days, args.inject, args.seed)
+    points = len(timestamps) * len(series)
+    ai = CountingAI()
+    detector = AnomalyDetector(Config(overrides={"anomaly_explain_batch": 10}), ai)
+    
+    durations = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        anomalies = detector.detect(timestamps, series, STEP, since=since)
+        durations.append((time.perf_counter() - start) * 1000.0)
+    detector.explain(anomalies)
+    
+    found = [(name, at) for name, at in injected
+             if any(anomaly["series"] == name and anomaly["start"] <= at < anomaly["end"] for anomaly in anomalies)]
+    median = percentile(durations, 50)
+    print(f"points analysés: {points} ({len(series)} séries sur {args.days:g} jours)")
+    print(f"détection: médiane {median:.1f} ms, p95 {percentile(durations, 95):.1f} ms")
+    print(f"anomalies: {len(anomalies)} signalées, {len(found)}/{len(injected)} injectées retrouvées")
+    print(f"appels IA: {ai.calls} pour {len(anomalies)} anomalies et {points} points")
+    if median > args.target or len(found) < len(injected):
+        print(f"ÉCHEC: {median:.1f} ms (objectif {args.target:.0f} ms), {len(found)}/{len(injected)} anomalies retrouvées")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
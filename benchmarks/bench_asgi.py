@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark de charge : serveur WSGI (gunicorn à threads, main:app) contre mode
+ASGI (uvicorn, aiterminal.asgi:app).
+
+Lance le serveur OpenAI simulé, qui sert aussi de cible aux requêtes HTTP
+sortantes, puis chaque serveur web sur un port local, et lui envoie --requests
+requêtes par scénario et par niveau de concurrence avec un client asynchrone :
+  - POST /api/generate (appel OpenAI) ;
+  - POST /api/network/http (requête HTTP sortante vers le serveur simulé).
+Le script échoue (code 1) si, à la concurrence maximale, le débit ASGI de
+/api/generate n'atteint pas --target fois celui de WSGI.
+
+Usage:
+    python benchmarks/bench_asgi.py --concurrency 16 64 256 --requests 400 --latency fixed:1000 --target 3
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+from common import ROOT, MockServerProcess, WebServerProcess, print_row, summarize
+
+import httpx
+
+from aiterminal.ai_services import ShardedAsyncTransport
+
+async def load(url: str, payload, requests_count: int, concurrency: int):
+    """Envoie `requests_count` requêtes POST avec `concurrency` requêtes simultanées."""
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests_count))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    
+    # Sous-pools côté client aussi: sinon c'est le générateur de charge qui sature le CPU
+    async with httpx.AsyncClient(transport=ShardedAsyncTransport(limits), timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, json=payload)
+                    failed = response.status_code >= 400 or "error" in response.json()
+                except (httpx.HTTPError, ValueError):
+                    failed = True
+                latencies.append(time.perf_counter() - start)
+                errors += failed
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, elapsed, errors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256], help="Niveaux de concurrence")
+    parser.add_argument("--requests", type=int, default=400, help="Requêtes par scénario et par niveau")
+    parser.add_argument("--latency", default="fixed:1000", help="Latence du serveur simulé (celle d'un appel OpenAI)")
+    parser.add_argument("--workers", type=int, default=1, help="Processus de chaque serveur web")
+    parser.add_argument("--threads", type=int, default=16, help="Threads par processus gunicorn")
+    parser.add_argument("--target", type=float, default=3.0,
+                        help="Rapport minimal des débits ASGI/WSGI de /api/generate à la concurrence maximale")
+    parser.add_argument("--json", dest="json_output", help="Écrire les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+    
+    servers = {
+        "wsgi": [sys.executable, "-m", "gunicorn", "--workers", str(args.workers), "--threads", str(args.threads),
+                 "--bind", "127.0.0.1:{port}", "--pythonpath", ROOT, "main:app"],
+        "asgi": [sys.executable, "-m", "aiterminal", "serve", "--host", "127.0.0.1", "--port", "{port}",
+                 "--workers", str(args.workers)]
+    }
+    results = {}
+    with MockServerProcess("--latency", args.latency) as mock, tempfile.TemporaryDirectory() as workdir:
+        # Les deux serveurs lisent config.json dans leur répertoire courant
+        with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+            connections = max(args.concurrency)
+            # Sans contrôle d'admission: on mesure la capacité des serveurs, pas les limites
+            json.dump({"api_key": "sk-benchmark", "base_url": mock.base_url, "admission_enabled": False,
+                       "http_max_connections": connections, "http_max_keepalive": connections}, f)
+        scenarios = {
+            "generate": ("/api/generate", {"prompt": "Explique le protocole HTTP en une phrase."}),
+            "http": ("/api/network/http", {"url": f"{mock.base_url}/chat/completions", "method": "POST",
+                                           "data": json.dumps({"messages": [{"role": "user", "content": "ping"}]})})
+        }
+        print(f"Serveur simulé: {mock.base_url} (latence {args.latency}), "
+              f"{args.workers} processus, gunicorn à {args.threads} threads")
+        for name, command in servers.items():
+            with WebServerProcess(command, workdir, os.path.join(workdir, f"{name}.log")) as server:
+                for scenario, (path, payload) in scenarios.items():
+                    for concurrency in args.concurrency:
+                        stats = asyncio.run(load(server.url + path, payload, args.requests, concurrency))
+                        results[f"{name} {scenario} c={concurrency}"] = stats
+                        print_row(f"{name} {scenario} c={concurrency}", stats)
+    
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    
+    top = max(args.concurrency)
+    wsgi = results[f"wsgi generate c={top}"]["throughput"]
+    asgi = results[f"asgi generate c={top}"]["throughput"]
+    ratio = asgi / wsgi if wsgi else 0.0
+    print(f"débit /api/generate à c={top}: ASGI {asgi:.0f} req/s, WSGI {wsgi:.0f} req/s (x{ratio:.1f})")
+    if ratio < args.target:
+        print(f"ÉCHEC: ASGI x{ratio:.1f} par rapport à WSGI (objectif x{args.target:g})")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrence : AsyncAIService contre AIService + pool de threads.
+
+Mesure combien de requêtes simultanées un seul processus peut traiter face
+à un serveur compatible OpenAI local. Sans --base-url, le serveur simulé
+d'AITerminal est lancé automatiquement.
+
+Usage:
+    python benchmarks/bench_async_ai.py --concurrency 10 50 200 --latency fixed:500
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import logging
+import tempfile
+from contextlib import nullcontext
+
+from common import MockServerProcess, print_row, run_concurrent, summarize
+
+from aiterminal.config import Config
+from aiterminal.ai_services import AIService, AsyncAIService
+
+def bench_sync(config, concurrency, requests_count):
+    """Exécute le benchmark avec AIService et un pool de threads."""
+    service = AIService(config)
+    stats = run_concurrent(lambda: service.analyze_sentiment("Ce produit est excellent"), requests_count, concurrency)
+    print_row(f"sync  conc={concurrency}", stats)
+
+async def bench_async(config, concurrency, requests_count):
+    """Exécute le benchmark avec AsyncAIService sur une seule boucle d'événements."""
+    service = AsyncAIService(config)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    
+    async def call():
+        async with semaphore:
+            start = time.perf_counter()
+            await service.analyze_sentiment("Ce produit est excellent", timeout=30)
+            latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests_count)))
+    print_row(f"async conc={concurrency}", summarize(latencies, time.perf_counter() - start))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL"),
+                        help="URL d'un serveur compatible OpenAI local (défaut: serveur simulé)")
+    parser.add_argument("--latency", default="fixed:500", help="Latence du serveur simulé")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests", type=int, default=500, help="Requêtes par niveau de concurrence")
+    parser.add_argument("--skip-sync", action="store_true", help="Ne mesurer que le service asynchrone")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.CRITICAL)
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    
+    server = nullcontext() if args.base_url else MockServerProcess("--latency", args.latency)
+    with server, tempfile.TemporaryDirectory() as tmp:
+        os.environ["OPENAI_BASE_URL"] = args.base_url or server.base_url
+        config = Config(os.path.join(tmp, "config.json"), overrides={
+            "http_max_connections": max(args.concurrency),
+            "http_max_keepalive": max(args.concurrency),
+            "retry_max_attempts": 1
+        })
+        
+        for concurrency in args.concurrency:
+            if not args.skip_sync:
+                bench_sync(config, concurrency, args.requests)
+            asyncio.run(bench_async(config, concurrency, args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark du mode démon : durée d'une commande avec et sans démon.
+
+Pour chaque commande, mesure :
+  - le processus complet sans démon (`python -m aiterminal ...`) ;
+  - le processus complet avec démon (client léger + démon chaud) ;
+  - l'aller-retour client → démon seul, sans le démarrage de l'interpréteur.
+Le script échoue (code 1) si l'aller-retour médian dépasse --target ms.
+
+Usage:
+    python benchmarks/bench_daemon.py --runs 20 --target 50
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from common import ROOT, percentile
+
+COMMANDS = [
+    ["sys", "--type", "memory"],
+    ["config", "--show"],
+    ["stats"]
+]
+
+def run_process(args, cwd, daemon: bool) -> float:
+    """Durée en ms d'une commande lancée dans un nouveau processus."""
+    env = dict(os.environ, PYTHONPATH=ROOT, AITERMINAL_DAEMON="1" if daemon else "0")
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "aiterminal"] + args, cwd=cwd, env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return (time.perf_counter() - start) * 1000.0
+
+def round_trip(args) -> float:
+    """Durée en ms d'un aller-retour client → démon depuis ce processus."""
+    from aiterminal import client
+    
+    start = time.perf_counter()
+    sock = client.connect(client.socket_path())
+    if sock is None:
+        raise Exception("Le démon ne répond pas")
+    try:
+        client.request(sock, {"argv": args, "isatty": False, "columns": 100}, stdout=io.StringIO(), stderr=io.StringIO())
+    finally:
+        sock.close()
+    return (time.perf_counter() - start) * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Mesures par commande et par mode")
+    parser.add_argument("--target", type=float, default=50.0, help="Aller-retour médian maximal (ms)")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "config.json"), "w", encoding="utf-8") as f:
+            json.dump({"api_key": "", "daemon_idle_timeout": 60}, f)
+        
+        os.chdir(tmp)
+        from aiterminal import daemon
+        if daemon.start() is None:
+            print("Le démon n'a pas démarré")
+            sys.exit(1)
+        
+        failures = []
+        try:
+            print(f"{'commande':<22} {'sans démon p50':>15} {'avec démon p50':>15} {'aller-retour p50':>17} {'p95':>7}")
+            for command in COMMANDS:
+                cold = [run_process(command, tmp, daemon=False) for _ in range(args.runs)]
+                warm = [run_process(command, tmp, daemon=True) for _ in range(args.runs)]
+                trips = [round_trip(command) for _ in range(args.runs)]
+                median = percentile(trips, 50)
+                status = "ok" if median <= args.target else f"ÉCHEC (> {args.target:.0f} ms)"
+                if median > args.target:
+                    failures.append(" ".join(command))
+                print(f"{' '.join(command):<22} {percentile(cold, 50):>12.1f} ms {percentile(warm, 50):>12.1f} ms "
+                      f"{median:>14.1f} ms {percentile(trips, 95):>7.1f}  {status}")
+        finally:
+            daemon.control("stop")
+    
+    if failures:
+        print(f"\n{len(failures)} commande(s) au-dessus de la cible: {', '.join(failures)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'historique des métriques système (module aiterminal.timeseries).
+
+Remplit un répertoire temporaire avec --days jours d'échantillons toutes les
+--interval secondes, puis mesure :
+  - le coût d'un enregistrement (toutes les résolutions) ;
+  - la latence des requêtes sur 1 h, 24 h et 7 jours, au pas par défaut et au pas fin.
+Le script échoue (code 1) si une requête sur 7 jours au pas par défaut dépasse --target ms.
+
+Usage:
+    python benchmarks/bench_history.py --days 7 --target 20
+"""
+
+import os
+import sys
+import math
+import time
+import shutil
+import argparse
+import tempfile
+
+from common import ROOT, percentile  # noqa: F401 (ajoute la racine du dépôt à sys.path)
+
+from aiterminal.timeseries import TimeSeriesStore
+
+def fill(store: TimeSeriesStore, days: float, interval: float, now: float) -> float:
+    count = 0
+    timestamp = now - days * 86400
+    start = time.perf_counter()
+    while timestamp < now:
+        wave = 50 + 40 * math.sin(timestamp / 3600)
+        store.append(timestamp, {"cpu": wave, "memory": 30.0, "disk_read": 1e6, "disk_write": 2e6,
+                                 "net_recv": wave * 1e4, "net_sent": 5e3})
+        timestamp += interval
+        count += 1
+    return (time.perf_counter() - start) / count * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=7, help="Jours d'historique générés")
+    parser.add_argument("--interval", type=float, default=10, help="Période des échantillons (s)")
+    parser.add_argument("--runs", type=int, default=20, help="Mesures par requête")
+    parser.add_argument("--target", type=float, default=20.0, help="Latence maximale d'une requête sur 7 jours (ms)")
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix="aiterminal-history-")
+    try:
+        now = time.time()
+        writer = TimeSeriesStore(directory, writable=True)
+        append_us = fill(writer, args.days, args.interval, now)
+        writer.flush()
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"enregistrement: {append_us:.1f} µs/échantillon, {size / 1024 ** 2:.1f} Mo sur disque")
+        
+        reader = TimeSeriesStore(directory)
+        print(f"{'requête':<24} {'points':>7} {'résolution':>11} {'médiane (ms)':>13} {'p95 (ms)':>9}")
+        week_ms = 0.0
+        for label, duration, step in (("1 h", 3600, None), ("24 h", 86400, None), ("7 j", 7 * 86400, None),
+                                      ("24 h, pas 10 s", 86400, 10), ("7 j, pas 1 min", 7 * 86400, 60)):
+            durations = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                result = reader.query(now - duration, now, step)
+                durations.append((time.perf_counter() - start) * 1000.0)
+            median = percentile(durations, 50)
+            if label == "7 j":
+                week_ms = median
+            print(f"{label:<24} {len(result['timestamps']):>7} {result['resolution']:>9} s {median:>13.2f} "
+                  f"{percentile(durations, 95):>9.2f}")
+        reader.close()
+        writer.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    if week_ms > args.target:
+        print(f"ÉCHEC: {week_ms:.1f} ms pour 7 jours (objectif {args.target:.0f} ms)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
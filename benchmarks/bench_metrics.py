@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark du coût de l'instrumentation (module aiterminal.metrics).
+
+Mesure :
+  - le coût unitaire d'Histogram.observe et de Counter.inc, avec plusieurs threads ;
+  - la durée d'une requête Flask triviale sur /api/*, avec et sans MetricsMiddleware ;
+  - la durée de sérialisation de /metrics avec de nombreuses séries.
+Le script échoue (code 1) si le surcoût médian par requête dépasse --target µs.
+
+Usage:
+    python benchmarks/bench_metrics.py --requests 5000 --target 50
+"""
+
+import sys
+import time
+import logging
+import argparse
+import threading
+
+from common import ROOT, percentile  # noqa: F401 (ajoute la racine du dépôt à sys.path)
+
+from aiterminal.metrics import MetricsRegistry
+
+def bench_primitives(iterations: int, threads: int):
+    registry = MetricsRegistry()
+    histogram = registry.histogram("bench_seconds", "bench", ("route", "method", "status"))
+    counter = registry.counter("bench_total", "bench", ("cache", "result"))
+    
+    def observe():
+        for i in range(iterations):
+            histogram.observe(i % 1000 / 1000.0, "/api/generate", "POST", "200")
+    
+    def inc():
+        for _ in range(iterations):
+            counter.inc("sessions", "hit")
+    
+    for name, target in (("Histogram.observe", observe), ("Counter.inc", inc)):
+        workers = [threading.Thread(target=target) for _ in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<20} {threads} threads  {elapsed / (iterations * threads) * 1e9:>8.0f} ns/op")
+    
+    assert histogram.get_count("/api/generate", "POST", "200") == iterations * threads
+
+def time_requests(client, count: int):
+    durations = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.get("/api/bench")
+        durations.append((time.perf_counter() - start) * 1e6)
+    return durations
+
+def bench_flask(count: int) -> float:
+    import main
+    
+    app = main.app
+    app.add_url_rule("/api/bench", "bench", lambda: "ok")
+    client = app.test_client()
+    middleware = app.wsgi_app
+    
+    time_requests(client, 200)  # Préchauffage
+    # Séries courtes et alternées: la dérive de la machine pèse autant sur les deux variantes
+    timings = {True: [], False: []}
+    for _ in range(20):
+        for instrumented in (False, True):
+            app.wsgi_app = middleware if instrumented else middleware.app
+            timings[instrumented].extend(time_requests(client, max(1, count // 20)))
+    app.wsgi_app = middleware
+    
+    with_metrics = percentile(timings[True], 50)
+    without_metrics = percentile(timings[False], 50)
+    overhead = with_metrics - without_metrics
+    print(f"requête Flask        sans métriques {without_metrics:>7.1f} µs  avec {with_metrics:>7.1f} µs  "
+          f"surcoût {overhead:>5.1f} µs")
+    return overhead
+
+def bench_render(series: int):
+    registry = MetricsRegistry()
+    histogram = registry.histogram("bench_seconds", "bench", ("route", "status"))
+    for i in range(series):
+        histogram.observe(0.01, f"/api/route{i}", "200")
+    start = time.perf_counter()
+    text = registry.render()
+    elapsed = (time.perf_counter() - start) * 1000.0
+    print(f"rendu /metrics       {series} séries, {len(text) // 1024} Ko  {elapsed:>8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000, help="Opérations par thread")
+    parser.add_argument("--threads", type=int, default=4, help="Threads concurrents")
+    parser.add_argument("--requests", type=int, default=3000, help="Requêtes Flask par mesure")
+    parser.add_argument("--series", type=int, default=1000, help="Séries de l'histogramme rendu")
+    parser.add_argument("--target", type=float, default=50.0, help="Surcoût médian maximal par requête (µs)")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.CRITICAL)
+    bench_primitives(args.iterations, args.threads)
+    overhead = bench_flask(args.requests)
+    bench_render(args.series)
+    if overhead > args.target:
+        print(f"ÉCHEC: surcoût de {overhead:.1f} µs par requête (objectif {args.target:.0f} µs)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la mise en forme des sorties sur de gros volumes.
+
+Compare, pour un corps HTTP JSON volumineux et une longue liste d'enregistrements :
+  - l'ancien format_response (analyse puis réindentation systématiques, json) ;
+  - le format_response actuel (pas de nouvelle analyse au-delà de PRETTY_MAX_CHARS, orjson si disponible) ;
+  - la sérialisation --output json / ndjson (json de la bibliothèque standard et orjson) ;
+  - l'affichage par rich.print contre l'écriture directe de print_response.
+Mesure la durée médiane et le pic de mémoire Python (tracemalloc).
+
+Usage:
+    python benchmarks/bench_output.py --size-mb 20 --records 200000
+"""
+
+import io
+import json
+import time
+import argparse
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Any, Callable, Tuple
+
+from common import ROOT, percentile  # noqa: F401 (ajoute la racine du dépôt à sys.path)
+
+from aiterminal import output
+from aiterminal.output import RecordWriter, dumps, print_response
+from aiterminal.utils import format_response
+
+def legacy_format_response(response: Any) -> str:
+    """format_response avant l'optimisation (référence)."""
+    if isinstance(response, (dict, list)):
+        return json.dumps(response, indent=2, ensure_ascii=False)
+    if isinstance(response, str):
+        try:
+            return json.dumps(json.loads(response), indent=2, ensure_ascii=False)
+        except json.JSONDecodeError:
+            return response
+    return str(response)
+
+def measure(func: Callable[[], Any], runs: int) -> Tuple[float, float]:
+    """Retourne la durée médiane (ms) et le pic de mémoire (Mo) d'une fonction."""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000.0)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return percentile(durations, 50), peak / 1024 / 1024
+
+def make_records(count: int):
+    return [{"id": i, "title": f"Résultat {i}", "url": f"https://example.com/{i}",
+             "snippet": "lorem ipsum dolor sit amet " * 4, "score": i / count} for i in range(count)]
+
+def without_orjson(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Exécute func avec le sérialiseur de la bibliothèque standard."""
+    def wrapper():
+        saved = output._get_orjson()
+        output._orjson = None
+        try:
+            return func()
+        finally:
+            output._orjson = saved
+    return wrapper
+
+def write_records(records, mode: str):
+    sink = io.StringIO()
+    with RecordWriter(mode, stream=sink) as writer:
+        for record in records:
+            writer.write(record)
+    return sink
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=20.0, help="Taille du corps HTTP JSON (Mo)")
+    parser.add_argument("--records", type=int, default=200000, help="Nombre d'enregistrements")
+    parser.add_argument("--render-kb", type=int, default=500, help="Taille du texte affiché par rich.print (Ko)")
+    parser.add_argument("--runs", type=int, default=3, help="Mesures par cas")
+    args = parser.parse_args()
+    
+    records = make_records(args.records)
+    body = json.dumps({"data": make_records(int(args.size_mb * 1024 * 1024 / 210))})
+    render_text = json.dumps(make_records(int(args.render_kb * 1024 / 150)), indent=2)
+    
+    cases = [
+        (f"corps HTTP {len(body) / 1e6:.0f} Mo", "format_response (ancien)", lambda: legacy_format_response(body)),
+        (f"corps HTTP {len(body) / 1e6:.0f} Mo", "format_response", lambda: format_response(body)),
+        (f"{args.records} enregistrements", "format_response (ancien)", lambda: legacy_format_response(records)),
+        (f"{args.records} enregistrements", "format_response, json", without_orjson(lambda: format_response(records))),
+        (f"{args.records} enregistrements", "--output json, json", without_orjson(lambda: dumps(records, indent=True))),
+        (f"{args.records} enregistrements", "--output ndjson, json", without_orjson(lambda: write_records(records, "ndjson")))
+    ]
+    if output._get_orjson() is not None:
+        cases += [
+            (f"{args.records} enregistrements", "format_response, orjson", lambda: format_response(records)),
+            (f"{args.records} enregistrements", "--output json, orjson", lambda: dumps(records, indent=True)),
+            (f"{args.records} enregistrements", "--output ndjson, orjson", lambda: write_records(records, "ndjson"))
+        ]
+    else:
+        print("orjson non installé: seuls les cas json de la bibliothèque standard sont mesurés\n")
+    
+    def render_legacy():
+        import rich
+        rich.reconfigure(file=io.StringIO(), force_terminal=True, width=120)
+        try:
+            rich.print(legacy_format_response(render_text))
+        finally:
+            rich.reconfigure()
+    
+    def render_current():
+        with redirect_stdout(io.StringIO()):
+            print_response(render_text)
+    
+    cases += [
+        (f"affichage {len(render_text) // 1024} Ko", "rich.print (ancien)", render_legacy),
+        (f"affichage {len(render_text) // 1024} Ko", "print_response", render_current)
+    ]
+    
+    print(f"{'données':<24} {'méthode':<28} {'médiane (ms)':>13} {'pic mémoire (Mo)':>17}")
+    for data, method, func in cases:
+        median, peak = measure(func, args.runs)
+        print(f"{data:<24} {method:<28} {median:>13.1f} {peak:>17.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la table des processus (SystemService.get_process_info).
+
+Lance --spawn processus inactifs pour grossir la table, puis compare :
+  - la lecture naïve de tous les attributs de tous les processus
+    (psutil.process_iter avec attrs) suivie d'un tri complet ;
+  - get_process_info, cache chaud : critère de tri seul pour tous les
+    processus, sélection des N premiers par tas, détail des N seulement.
+Le script échoue (code 1) si get_process_info coûte plus de --target µs par processus.
+
+Usage:
+    python benchmarks/bench_processes.py --spawn 500 --limit 10 --target 200
+"""
+
+import sys
+import time
+import argparse
+import subprocess
+
+from common import ROOT, percentile  # noqa: F401 (ajoute la racine du dépôt à sys.path)
+
+import psutil
+
+from aiterminal.config import Config
+from aiterminal.system import SystemService
+
+NAIVE_ATTRS = ["pid", "name", "username", "status", "cpu_percent", "memory_info", "num_threads", "num_fds", "io_counters"]
+
+def naive(limit: int):
+    rows = [process.info for process in psutil.process_iter(NAIVE_ATTRS)]
+    return sorted(rows, key=lambda row: row["cpu_percent"] or 0.0, reverse=True)[:limit]
+
+def timed(func, runs: int) -> float:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000.0)
+    return percentile(durations, 50)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spawn", type=int, default=500, help="Processus inactifs ajoutés")
+    parser.add_argument("--limit", type=int, default=10, help="Processus retournés")
+    parser.add_argument("--runs", type=int, default=10, help="Mesures par variante")
+    parser.add_argument("--target", type=float, default=200.0, help="Coût maximal par processus (µs)")
+    args = parser.parse_args()
+    
+    children = [subprocess.Popen(["sleep", "600"]) for _ in range(args.spawn)]
+    try:
+        service = SystemService(Config(overrides={"process_sample_interval": 0.1}))
+        total = service.get_process_info("cpu", args.limit)["total"]  # Amorce le cache
+        print(f"processus: {total}")
+        print(f"{'variante':<28} {'médiane (ms)':>13} {'par processus (µs)':>19}")
+        naive_ms = timed(lambda: naive(args.limit), args.runs)
+        print(f"{'process_iter + tri':<28} {naive_ms:>13.1f} {naive_ms * 1000.0 / total:>19.1f}")
+        worst = 0.0
+        for sort_by in ("cpu", "memory", "io"):
+            elapsed = timed(lambda: service.get_process_info(sort_by, args.limit), args.runs)
+            worst = max(worst, elapsed * 1000.0 / total)
+            print(f"{'get_process_info ' + sort_by:<28} {elapsed:>13.1f} {elapsed * 1000.0 / total:>19.1f}")
+    finally:
+        for child in children:
+            child.kill()
+        for child in children:
+            child.wait()
+    if worst > args.target:
+        print(f"ÉCHEC: {worst:.1f} µs par processus (objectif {args.target:.0f} µs)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark du temps de démarrage de la CLI.
+
+Lance chaque commande avec `python -X importtime -m aiterminal`, mesure le temps
+d'import cumulé et la durée totale du processus, et vérifie qu'aucune commande
+ne charge un module lourd dont elle n'a pas besoin. Le script échoue (code 1)
+si une commande dépasse son budget ou importe un module interdit.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --budget-scale 2   # machine lente
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, Any, List, Set, Tuple
+
+from common import ROOT
+
+# Modules lourds chargés uniquement par les commandes qui s'en servent
+HEAVY_MODULES = ("openai", "httpx", "requests", "bs4", "psutil")
+
+# (nom, arguments, budget d'import en ms, modules lourds autorisés)
+COMMANDS = [
+    ("help", ["help"], 350, ()),
+    ("analyze (sans texte)", ["analyze"], 350, ()),
+    ("config --show", ["config", "--show"], 350, ()),
+    ("stats", ["stats"], 350, ()),
+    ("sys --type cpu", ["sys", "--type", "cpu"], 400, ("psutil",)),
+    ("ai (sans clé API)", ["ai", "bonjour"], 1400, ("openai", "httpx"))
+]
+
+def parse_importtime(stderr: str) -> Tuple[float, Set[str]]:
+    """
+    Analyse la sortie de `-X importtime`.
+    
+    Args:
+        stderr (str): La sortie d'erreur du processus.
+    
+    Returns:
+        Tuple[float, Set[str]]: Le temps d'import cumulé en ms et les modules de premier niveau importés.
+    """
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip().split(".")[0])
+        if not name.startswith("  "):
+            # Entrée de premier niveau (le nom est précédé d'une seule espace)
+            total_us += int(cumulative)
+    return total_us / 1000.0, modules
+
+def run_command(args: List[str], cwd: str) -> Dict[str, Any]:
+    """Exécute une commande de la CLI et mesure son démarrage."""
+    env = dict(os.environ, PYTHONPATH=ROOT, OPENAI_API_KEY="", AITERMINAL_DAEMON="0")
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "aiterminal"] + args,
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000.0
+    import_ms, modules = parse_importtime(completed.stderr)
+    return {"wall_ms": wall_ms, "import_ms": import_ms, "modules": modules, "returncode": completed.returncode}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Exécutions par commande (la meilleure est retenue)")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiplicateur des budgets")
+    args = parser.parse_args()
+    
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "config.json"), "w", encoding="utf-8") as f:
+            json.dump({"api_key": ""}, f)
+        
+        # Première exécution à vide: compilation des .pyc
+        run_command(["help"], tmp)
+        
+        print(f"{'commande':<22} {'import (ms)':>12} {'budget':>8} {'total (ms)':>11}  modules lourds")
+        for name, command, budget, allowed in COMMANDS:
+            runs = [run_command(command, tmp) for _ in range(args.runs)]
+            best = min(runs, key=lambda run: run["import_ms"])
+            budget_ms = budget * args.budget_scale
+            heavy = sorted(module for module in HEAVY_MODULES if module in best["modules"])
+            forbidden = [module for module in heavy if module not in allowed]
+            
+            status = "ok"
+            if best["returncode"] != 0:
+                status = f"ÉCHEC (code {best['returncode']})"
+            elif forbidden:
+                status = f"ÉCHEC (importe {', '.join(forbidden)})"
+            elif best["import_ms"] > budget_ms:
+                status = "ÉCHEC (budget dépassé)"
+            if status != "ok":
+                failures.append(name)
+            
+            print(f"{name:<22} {best['import_ms']:>12.1f} {budget_ms:>8.0f} {min(r['wall_ms'] for r in runs):>11.1f}  "
+                  f"{', '.join(heavy) or '-'}  {status}")
+    
+    if failures:
+        print(f"\n{len(failures)} commande(s) hors budget: {', '.join(failures)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
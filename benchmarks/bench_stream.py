@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark du flux SSE des métriques système (/api/system/stream).
+
+Abonne --clients clients au diffuseur partagé (un thread par client, comme un
+worker gunicorn à threads), les laisse recevoir pendant --duration secondes, et
+mesure :
+  - le temps CPU du processus par mesure diffusée, puis par client ;
+  - la taille moyenne d'un événement 'delta' comparée à l'état complet ;
+  - le coût d'une requête /api/system?type=all par client, pour comparaison.
+Le script échoue (code 1) si un client coûte plus de --target µs CPU par événement.
+
+Usage:
+    python benchmarks/bench_stream.py --clients 200 --interval 0.2 --duration 5 --target 100
+"""
+
+import sys
+import time
+import argparse
+import threading
+
+from common import ROOT, percentile  # noqa: F401 (ajoute la racine du dépôt à sys.path)
+
+from aiterminal.broadcast import SystemBroadcaster
+from aiterminal.config import Config
+from aiterminal.system import SystemService
+
+def run(clients: int, interval: float, duration: float):
+    broadcaster = SystemBroadcaster(Config(overrides={"metrics_stream_interval": interval}))
+    received = [[0, 0, 0] for _ in range(clients)]  # événements delta, octets delta, octets snapshot
+    stop = threading.Event()
+    
+    def client(index: int):
+        stream = broadcaster.subscribe()
+        for event in stream:
+            if event.startswith(b"id:"):
+                counters = received[index]
+                if b"event: delta" in event:
+                    counters[0] += 1
+                    counters[1] += len(event)
+                else:
+                    counters[2] = len(event)
+            if stop.is_set():
+                break
+        stream.close()
+    
+    threads = [threading.Thread(target=client, args=(index,), daemon=True) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(2 * interval)  # Les clients ont reçu l'état complet
+    start_cpu = time.process_time()
+    sequence = broadcaster._sequence
+    time.sleep(duration)
+    cpu = time.process_time() - start_cpu
+    events = broadcaster._sequence - sequence
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=2 * interval + 1)
+    deltas = sum(counters[0] for counters in received)
+    delta_bytes = sum(counters[1] for counters in received) / max(1, deltas)
+    snapshot_bytes = max(counters[2] for counters in received)
+    return cpu, events, deltas, delta_bytes, snapshot_bytes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="Clients abonnés")
+    parser.add_argument("--interval", type=float, default=0.2, help="Période des mesures (s)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Durée de la mesure (s)")
+    parser.add_argument("--target", type=float, default=100.0, help="Coût CPU maximal par client et par événement (µs)")
+    args = parser.parse_args()
+    
+    base_cpu, base_events, _, delta_bytes, snapshot_bytes = run(1, args.interval, args.duration)
+    cpu, events, deltas, _, _ = run(args.clients, args.interval, args.duration)
+    per_event_ms = cpu / max(1, events) * 1000.0
+    per_client_us = max(0.0, cpu / max(1, events) - base_cpu / max(1, base_events)) / args.clients * 1e6
+    print(f"1 client: {base_cpu / max(1, base_events) * 1000.0:.2f} ms CPU par mesure ({base_events} mesures)")
+    print(f"{args.clients} clients: {per_event_ms:.2f} ms CPU par mesure ({events} mesures, "
+          f"{deltas} événements reçus)")
+    print(f"coût par client: {per_client_us:.1f} µs CPU par événement")
+    print(f"taille: delta {delta_bytes:.0f} o en moyenne, état complet {snapshot_bytes} o")
+    
+    service = SystemService(Config())
+    durations = []
+    for _ in range(3):
+        start = time.process_time()
+        service.get_cpu_info()
+        service.get_memory_info()
+        service.get_disk_info(0.0)
+        service.get_network_info(0.0)
+        durations.append((time.process_time() - start) * 1e6)
+    print(f"/api/system?type=all: {percentile(durations, 50):.0f} µs CPU par appel et par client "
+          f"(plus 1 s d'attente pour le CPU)")
+    if per_client_us > args.target:
+        print(f"ÉCHEC: {per_client_us:.1f} µs par client et par événement (objectif {args.target:.0f} µs)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
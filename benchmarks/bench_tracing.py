@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark du coût des spans (module aiterminal.tracing).
+
+Compare, hors trace et pendant une trace :
+  - un appel de fonction nu et le même appel décoré par @traced ;
+  - un bloc `with span(...)` vide.
+Le script échoue (code 1) si un span hors trace coûte plus de --target ns.
+
+Usage:
+    python benchmarks/bench_tracing.py --iterations 200000 --target 1000
+"""
+
+import sys
+import time
+import argparse
+
+from common import ROOT  # noqa: F401 (ajoute la racine du dépôt à sys.path)
+
+from aiterminal.tracing import Profiler, span, traced
+
+def plain():
+    return None
+
+@traced("bench.traced")
+def decorated():
+    return None
+
+def with_span():
+    with span("bench.span", key="value"):
+        pass
+
+def cost_ns(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000, help="Appels par mesure")
+    parser.add_argument("--target", type=float, default=1000.0, help="Coût maximal d'un span hors trace (ns)")
+    args = parser.parse_args()
+    
+    baseline = cost_ns(plain, args.iterations)
+    disabled = {"@traced": cost_ns(decorated, args.iterations), "with span()": cost_ns(with_span, args.iterations)}
+    # Pendant une trace, chaque span est conservé: moins d'itérations pour borner la mémoire
+    traced_iterations = min(args.iterations, 50000)
+    with Profiler("bench"):
+        enabled = {"@traced": cost_ns(decorated, traced_iterations), "with span()": cost_ns(with_span, traced_iterations)}
+    
+    print(f"{'appel':<14} {'hors trace (ns)':>16} {'surcoût (ns)':>13} {'en trace (ns)':>14}")
+    print(f"{'fonction nue':<14} {baseline:>16.0f} {0:>13.0f} {baseline:>14.0f}")
+    worst = 0.0
+    for name in disabled:
+        overhead = disabled[name] - baseline
+        worst = max(worst, overhead)
+        print(f"{name:<14} {disabled[name]:>16.0f} {overhead:>13.0f} {enabled[name]:>14.0f}")
+    if worst > args.target:
+        print(f"ÉCHEC: un span hors trace coûte {worst:.0f} ns (objectif {args.target:.0f} ns)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
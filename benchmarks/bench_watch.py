@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark du tableau de bord `sys --watch`.
+
+Mesure le temps CPU consommé par image (échantillonnage psutil + rendu Rich
+dans un terminal simulé) et en déduit l'utilisation CPU à la période donnée.
+Le script échoue (code 1) si elle dépasse --target %.
+
+Usage:
+    python benchmarks/bench_watch.py --frames 50 --interval 1.0 --target 1.0
+"""
+
+import io
+import sys
+import time
+import argparse
+
+from common import ROOT, percentile  # noqa: F401 (ajoute la racine du dépôt à sys.path)
+
+from rich.console import Console
+from rich.live import Live
+
+from aiterminal.dashboard import SystemDashboard
+from aiterminal.system import SystemSampler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=50, help="Nombre d'images mesurées")
+    parser.add_argument("--interval", type=float, default=1.0, help="Période de rafraîchissement visée (s)")
+    parser.add_argument("--width", type=int, default=120, help="Largeur du terminal simulé")
+    parser.add_argument("--target", type=float, default=1.0, help="Utilisation CPU maximale (%%)")
+    args = parser.parse_args()
+    
+    sampler = SystemSampler(history=120)
+    for _ in range(120):  # Historique plein, comme après deux minutes d'affichage
+        sampler.sample()
+    console = Console(file=io.StringIO(), force_terminal=True, width=args.width)
+    dashboard = SystemDashboard(sampler, interval=0.1, console=console)
+    
+    # Même boucle que SystemDashboard.run, sans l'attente entre deux images
+    costs = []
+    with Live(console=console, auto_refresh=False) as live:
+        for _ in range(args.frames):
+            start = time.process_time()
+            frame = dashboard.render(sampler.sample())
+            if frame is not None:
+                live.update(frame, refresh=True)
+                dashboard.redraws += 1
+            costs.append((time.process_time() - start) * 1000.0)
+            time.sleep(0.02)
+    
+    median = percentile(costs, 50)
+    usage = median / 1000.0 / args.interval * 100.0
+    print(f"images: {args.frames}  redessinées: {dashboard.redraws}  sortie: {len(console.file.getvalue()) // 1024} Ko")
+    print(f"CPU par image: médiane {median:.2f} ms, p95 {percentile(costs, 95):.2f} ms")
+    print(f"utilisation CPU à {args.interval:g} s: {usage:.2f} %")
+    if usage > args.target:
+        print(f"ÉCHEC: {usage:.2f} % de CPU (objectif {args.target:g} %)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Outils communs aux scripts de benchmark.
+Démarrage du serveur OpenAI simulé, exécution concurrente et statistiques de latence.
+"""
+
+import os
+import sys
+import time
+import socket
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def percentile(values: List[float], pct: float) -> float:
+    """Retourne le percentile `pct` (0-100) d'une liste de valeurs."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """
+    Calcule le débit et les latences de queue d'une série d'appels.
+    
+    Args:
+        latencies (List[float]): Latences individuelles en secondes.
+        elapsed (float): Durée totale de la série en secondes.
+        errors (int): Nombre d'appels en erreur.
+    
+    Returns:
+        Dict[str, Any]: Débit (req/s) et percentiles en millisecondes.
+    """
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1) if latencies else 0.0
+    }
+
+def print_row(label: str, stats: Dict[str, Any]):
+    """Affiche une ligne de résultat alignée."""
+    print(
+        f"{label:<28} req={stats['requests']:<6} err={stats['errors']:<4} "
+        f"débit={stats['throughput']:8.1f} req/s  p50={stats['p50_ms']:7.1f}ms  "
+        f"p95={stats['p95_ms']:7.1f}ms  p99={stats['p99_ms']:7.1f}ms  max={stats['max_ms']:7.1f}ms"
+    )
+
+def run_concurrent(call: Callable[[], Any], requests_count: int, concurrency: int,
+                   is_error: Optional[Callable[[Any], bool]] = None) -> Dict[str, Any]:
+    """
+    Exécute `call` plusieurs fois avec un pool de threads et mesure chaque appel.
+    
+    Args:
+        call (Callable[[], Any]): L'appel à mesurer.
+        requests_count (int): Nombre total d'appels.
+        concurrency (int): Nombre d'appels simultanés.
+        is_error (Callable[[Any], bool], optional): Indique si un résultat est une erreur.
+    
+    Returns:
+        Dict[str, Any]: Les statistiques de la série (voir summarize).
+    """
+    def timed(_):
+        start = time.perf_counter()
+        try:
+            result = call()
+            failed = bool(is_error and is_error(result))
+        except Exception:
+            failed = True
+        return time.perf_counter() - start, failed
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, range(requests_count)))
+    elapsed = time.perf_counter() - start
+    return summarize([o[0] for o in outcomes], elapsed, sum(1 for o in outcomes if o[1]))
+
+class MockServerProcess:
+    """Serveur OpenAI simulé lancé dans un processus séparé (pour ne pas partager le GIL)."""
+    
+    def __init__(self, *args: str):
+        """
+        Lance le serveur.
+        
+        Args:
+            *args (str): Options supplémentaires de `python -m aiterminal.mock_openai`.
+        """
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "aiterminal.mock_openai", "--port", "0", *args],
+            stdout=subprocess.PIPE,
+            text=True,
+            cwd=ROOT
+        )
+        self.base_url = self.process.stdout.readline().strip()
+        if not self.base_url:
+            self.process.kill()
+            raise RuntimeError("Le serveur OpenAI simulé n'a pas démarré")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait(timeout=5)
+
+class WebServerProcess:
+    """Serveur web lancé dans un processus séparé, prêt quand /metrics répond."""
+    
+    def __init__(self, command, workdir: str, log_path: str):
+        """
+        Lance le serveur et attend qu'il réponde.
+        
+        Args:
+            command (list): La commande ; '{port}' y est remplacé par un port libre.
+            workdir (str): Répertoire courant (contient config.json).
+            log_path (str): Fichier recevant la sortie du serveur.
+        """
+        # Importé ici: les benchmarks sans serveur web n'en dépendent pas
+        import httpx
+        
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        self.log = open(log_path, "w", encoding="utf-8")
+        self.process = subprocess.Popen([part.replace("{port}", str(self.port)) for part in command],
+                                        cwd=workdir, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                if httpx.get(f"{self.url}/metrics", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        self.close()
+        raise RuntimeError(f"Le serveur n'a pas démarré (voir {log_path})")
+    
+    def close(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
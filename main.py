@@ -7,8 +7,9 @@ et des capacités d'analyse internet.
 
 import sys
 import os
+import time
 import logging
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, g, render_template, jsonify, request
 
 # Configurer le logging
 logging.basicConfig(
@@ -23,6 +24,62 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "aiterminal_secret_key")
 
+from aiterminal.services import ServiceRegistry
+
+# Services partagés par les requêtes (clients HTTP, caches) ; la configuration
+# est rechargée à chaud quand config.json change
+services = ServiceRegistry()
+
+from aiterminal.admission import RateLimitedError, RequestTooLargeError, get_admission_controller
+from aiterminal.metrics import CONTENT_TYPE, MetricsMiddleware, get_metrics_registry
+from aiterminal.tracing import ProfileMiddleware
+from aiterminal.system import MAX_SAMPLE_INTERVAL, PROCESS_SORT_KEYS
+
+# Historique des métriques système (metrics_history): un seul processus enregistre, les autres lisent
+if services.config.get_value("metrics_history", False):
+    from aiterminal.timeseries import MetricsRecorder
+    MetricsRecorder(services.config).start()
+
+# Canal WebSocket /ws du terminal web (si flask-sock est installé)
+from aiterminal.channel import register_websocket
+register_websocket(app, services)
+
+# Durée des requêtes /api/* par route, méthode et statut ; arbre des spans avec ?profile=1
+app.wsgi_app = ProfileMiddleware(MetricsMiddleware(app.wsgi_app))
+
+@app.before_request
+def tag_usage_source():
+    """Associe les appels IA de la requête à sa route pour la comptabilité d'usage"""
+    from aiterminal.usage import set_usage_source
+    set_usage_source(request.path)
+
+@app.before_request
+def admit_request():
+    """Contrôle d'admission: débit par client et par route, appels simultanés par service amont (429 au-delà)"""
+    if request.url_rule is None:
+        return None
+    try:
+        g.admission = get_admission_controller(services.config).admit_request(
+            request.url_rule.rule, request.headers, request.remote_addr, lambda: request.get_json(silent=True)
+        )
+    except RateLimitedError as e:
+        return jsonify({"error": str(e), "retry_after": round(e.retry_after, 2)}), 429, e.headers
+    except RequestTooLargeError as e:
+        return jsonify({"error": str(e)}), 400
+    return None
+
+@app.teardown_request
+def release_admission(error=None):
+    """Libère la place de la requête auprès du service amont"""
+    admission = g.pop('admission', None)
+    if admission is not None:
+        admission.release()
+
+@app.route('/metrics')
+def metrics():
+    """Métriques du processus au format texte de Prometheus"""
+    return Response(get_metrics_registry().render(), content_type=CONTENT_TYPE)
+
 @app.route('/')
 def index():
     """Page d'accueil de l'interface web d'AITerminal"""
@@ -38,14 +95,20 @@ def generate():
         return jsonify({"error": "Aucun prompt fourni"}), 400
     
     try:
-        from aiterminal.config import Config
-        from aiterminal.ai_services import AIService
+        from aiterminal.conversation import ConversationMemory, get_memory_store
         
-        config = Config()
-        ai_service = AIService(config)
+        ai_service = services.ai
+        
+        # Avec la clé 'session_id' (même nulle), la réponse tient compte des échanges précédents
+        if 'session_id' in data:
+            memory = ConversationMemory(services.config, get_memory_store())
+            chat = ai_service.chat(prompt, data['session_id'] or None, memory=memory)
+            return jsonify({"result": chat["response"], "session_id": chat["session_id"], "usage": chat["usage"]})
         
         result = ai_service.generate_text(prompt)
         return jsonify({"result": result})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -60,11 +123,7 @@ def analyze():
         return jsonify({"error": "Aucun texte fourni"}), 400
     
     try:
-        from aiterminal.config import Config
-        from aiterminal.ai_services import AIService
-        
-        config = Config()
-        ai_service = AIService(config)
+        ai_service = services.ai
         
         if analysis_type == 'sentiment':
             result = ai_service.analyze_sentiment(text)
@@ -83,28 +142,40 @@ def analyze():
 def system_info():
     """API pour récupérer des informations système"""
     info_type = request.args.get('type', 'all')
+    try:
+        interval = float(request.args['interval']) if 'interval' in request.args else None
+        if interval is not None:
+            # La mesure occupe un thread du serveur: fenêtre bornée
+            interval = min(interval, MAX_SAMPLE_INTERVAL)
+    except ValueError:
+        return jsonify({"error": "Le paramètre 'interval' doit être un nombre"}), 400
     
     try:
-        from aiterminal.config import Config
-        from aiterminal.system import SystemService
-        
-        config = Config()
-        system_service = SystemService(config)
+        system_service = services.system
         
         if info_type == 'cpu':
             result = system_service.get_cpu_info()
         elif info_type == 'memory':
             result = system_service.get_memory_info()
         elif info_type == 'disk':
-            result = system_service.get_disk_info()
+            result = system_service.get_disk_info(interval)
         elif info_type == 'network':
-            result = system_service.get_network_info()
+            result = system_service.get_network_info(interval)
+        elif info_type == 'processes':
+            sort_by = request.args.get('sort', 'cpu')
+            if sort_by not in PROCESS_SORT_KEYS:
+                return jsonify({"error": f"Critère de tri non reconnu: {sort_by}"}), 400
+            try:
+                limit = int(request.args.get('limit', 10))
+            except ValueError:
+                return jsonify({"error": "Le paramètre 'limit' doit être un entier"}), 400
+            result = system_service.get_process_info(sort_by, limit)
         elif info_type == 'all':
             result = {
                 'cpu': system_service.get_cpu_info(),
                 'memory': system_service.get_memory_info(),
-                'disk': system_service.get_disk_info(),
-                'network': system_service.get_network_info()
+                'disk': system_service.get_disk_info(interval),
+                'network': system_service.get_network_info(interval)
             }
         else:
             return jsonify({"error": f"Type d'information non reconnu: {info_type}"}), 400
@@ -113,6 +184,56 @@ def system_info():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/system/stream', methods=['GET'])
+def system_stream():
+    """Flux SSE des métriques système: état complet, puis uniquement les champs modifiés"""
+    from aiterminal.broadcast import get_system_broadcaster
+    
+    return Response(get_system_broadcaster(services.config).subscribe(), content_type='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/system/history', methods=['GET'])
+def system_history():
+    """API pour interroger l'historique des métriques système"""
+    from aiterminal.timeseries import get_history_store
+    from aiterminal.utils import parse_duration
+    
+    try:
+        end = float(request.args['end']) if 'end' in request.args else time.time()
+        if 'start' in request.args:
+            start = float(request.args['start'])
+        else:
+            start = end - parse_duration(request.args.get('range', '24h'))
+        step = parse_duration(request.args['step']) if 'step' in request.args else None
+        series = [name for name in request.args.get('series', '').split(',') if name] or None
+        result = get_history_store(services.config).query(start, end, step, request.args.get('agg', 'avg'), series)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(result)
+
+@app.route('/api/system/anomalies', methods=['GET'])
+def system_anomalies():
+    """API pour détecter (et expliquer) les anomalies de l'historique des métriques"""
+    from aiterminal.anomaly import AnomalyDetector
+    from aiterminal.utils import parse_duration
+    
+    try:
+        end = time.time()
+        start = end - parse_duration(request.args.get('range', '24h'))
+        baseline = parse_duration(request.args.get('baseline', '7d'))
+        step = parse_duration(request.args.get('step', '1m'))
+        explain = request.args.get('explain') in ('1', 'true')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        detector = AnomalyDetector(services.config, services.ai if explain else None)
+        result = detector.analyze(start, end, baseline, step, explain)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(result)
+
 @app.route('/api/network/ping', methods=['POST'])
 def ping():
     """API pour effectuer un ping"""
@@ -124,11 +245,7 @@ def ping():
         return jsonify({"error": "Aucun hôte fourni"}), 400
     
     try:
-        from aiterminal.config import Config
-        from aiterminal.network import NetworkService
-        
-        config = Config()
-        network_service = NetworkService(config)
+        network_service = services.network
         
         results = network_service.ping(host, count)
         summary = network_service.get_ping_summary(results)
@@ -151,11 +268,7 @@ def http_request():
         return jsonify({"error": "Aucune URL fournie"}), 400
     
     try:
-        from aiterminal.config import Config
-        from aiterminal.network import NetworkService
-        
-        config = Config()
-        network_service = NetworkService(config)
+        network_service = services.network
         
         result = network_service.http_request(
             url=url,
@@ -169,6 +282,116 @@ def http_request():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """API pour lancer une opération longue (ping, http, generate, analyze) en tâche de fond"""
+    from aiterminal.jobs import QueueFullError, get_job_queue
+    
+    data = request.json or {}
+    # Jetons de la route équivalente à la soumission ; la place amont est prise par le worker (JobQueue._acquire)
+    controller = get_admission_controller(services.config)
+    try:
+        controller.admit_command(
+            controller.identify(request.headers, request.remote_addr), data.get('kind', ''), data.get('params'),
+            hold_upstream=False
+        )
+    except RateLimitedError as e:
+        return jsonify({"error": str(e), "retry_after": round(e.retry_after, 2)}), 429, e.headers
+    except RequestTooLargeError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        job = get_job_queue(services).submit(
+            data.get('kind', ''), data.get('params'), data.get('priority', 'normal'), data.get('timeout')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(job.to_dict(with_result=False)), 202, {"Location": f"/api/jobs/{job.id}"}
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """API pour lister les tâches de fond en mémoire"""
+    from aiterminal.jobs import get_job_queue
+    
+    job_queue = get_job_queue(services)
+    return jsonify({"jobs": [job.to_dict(with_result=False) for job in job_queue.list()],
+                    "counts": job_queue.counts()})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """API pour suivre une tâche: ?since=N renvoie la progression à partir du N-ième événement,
+    ?wait=S attend jusqu'à S secondes un changement (long polling)"""
+    from aiterminal.jobs import get_job_queue
+    
+    try:
+        since = int(request.args.get('since', 0))
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), 30.0)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    job = get_job_queue(services).wait(job_id, since, wait)
+    if job is None:
+        return jsonify({"error": f"Tâche inconnue ou expirée: {job_id}"}), 404
+    return jsonify(job.to_dict(since=since))
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """API pour récupérer le résultat d'une tâche (202 tant qu'elle n'est pas terminée)"""
+    from aiterminal.jobs import get_job_queue
+    
+    job = get_job_queue(services).get(job_id)
+    if job is None:
+        return jsonify({"error": f"Tâche inconnue ou expirée: {job_id}"}), 404
+    if job.status in ('queued', 'running'):
+        return jsonify(job.to_dict(with_result=False)), 202
+    if job.status != 'done':
+        return jsonify({"error": job.error, "status": job.status}), 504 if job.status == 'timeout' else 500
+    return jsonify(job.result)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """API pour annuler une tâche en attente ou en cours"""
+    from aiterminal.jobs import get_job_queue
+    
+    job = get_job_queue(services).cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Tâche inconnue ou expirée: {job_id}"}), 404
+    return jsonify(job.to_dict(with_result=False))
+
+@app.route('/api/stats', methods=['GET'])
+def usage_stats():
+    """API pour consulter l'usage des tokens, la latence et le coût des appels IA"""
+    group_by = [key for key in request.args.get('by', 'source,task,model').split(',') if key]
+    origin = request.args.get('source', 'memory')
+    
+    try:
+        from aiterminal.resilience import get_all_breaker_stats
+        from aiterminal.routing import get_routing_stats
+        from aiterminal.usage import get_usage_tracker, load_usage_log
+        
+        tracker = get_usage_tracker()
+        tracker.configure(services.config)
+        
+        if origin == 'log':
+            if not tracker.log_path:
+                return jsonify({"error": "Journal d'usage désactivé (usage_log_path)"}), 400
+            usage = load_usage_log(tracker.log_path, group_by, tracker=tracker)
+        elif origin == 'memory':
+            usage = tracker.get_stats(group_by)
+        else:
+            return jsonify({"error": f"Source non reconnue: {origin}"}), 400
+        
+        return jsonify({
+            "usage": usage,
+            "routing": get_routing_stats().get_stats(),
+            "circuit_breakers": get_all_breaker_stats(),
+            "admission": get_admission_controller(services.config).get_stats()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 def main():
     """Point d'entrée principal de l'application CLI"""
     from aiterminal.cli import run_cli
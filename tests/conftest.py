@@ -0,0 +1,27 @@
+"""
+Configuration commune des tests.
+Rend le paquet importable depuis la racine du dépôt et fournit une configuration
+isolée (config.json dans un répertoire temporaire, sans variables AITERMINAL_*).
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from aiterminal.config import ENV_PREFIX, Config
+
+@pytest.fixture
+def make_config(tmp_path, monkeypatch):
+    """Fabrique de Config lisant un config.json temporaire ; les arguments nommés sont des surcharges."""
+    for key in list(os.environ):
+        if key.startswith(ENV_PREFIX):
+            monkeypatch.delenv(key)
+    
+    def factory(**overrides):
+        return Config(str(tmp_path / "config.json"), overrides=overrides)
+    return factory
@@ -0,0 +1,163 @@
+"""Tests du contrôle d'admission : seaux à jetons, concurrence amont, libération, identité et réponses 429."""
+
+import pytest
+
+from aiterminal import admission
+from aiterminal.admission import (ADMISSION_REJECTED, AdmissionController, RateLimitedError, RequestTooLargeError,
+                                  TokenBucket, request_cost)
+from aiterminal.services import ServiceRegistry
+
+class FakeClock:
+    """Remplace le module time d'admission : l'horloge n'avance qu'à la demande."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(admission, "time", fake)
+    return fake
+
+def test_token_bucket_refills_up_to_burst():
+    bucket = TokenBucket(2, now=0.0)
+    assert bucket.take(1, rate=1, burst=2, now=0.0) == 0
+    assert bucket.take(1, rate=1, burst=2, now=0.0) == 0
+    assert bucket.take(1, rate=1, burst=2, now=0.0) == pytest.approx(1.0)
+    assert bucket.take(1, rate=1, burst=2, now=0.5) == pytest.approx(0.5)
+    # Un long repos ne remplit le seau que jusqu'à la rafale
+    assert bucket.take(2, rate=1, burst=2, now=100.0) == 0
+    assert bucket.take(1, rate=1, burst=2, now=100.0) == pytest.approx(1.0)
+
+def test_request_cost():
+    assert request_cost("/api/network/ping", {"count": 6}) == 6
+    assert request_cost("/api/network/ping", {}) == 4
+    assert request_cost("/api/network/ping", {"count": 0}) == 1
+    assert request_cost("/api/network/ping", {"count": "beaucoup"}) == 1
+    assert request_cost("/api/network/ping", ["liste"]) == 1
+    assert request_cost("/api/generate", {"count": 6}) == 1
+
+def test_rate_limit_per_client_and_route(make_config, clock):
+    controller = AdmissionController(make_config(rate_limits={"/api/generate": {"rate": 0.5, "burst": 2}}))
+    before = ADMISSION_REJECTED.get("/api/generate", "rate")
+    controller.admit("ip:a", "/api/generate")
+    controller.admit("ip:a", "/api/generate")
+    with pytest.raises(RateLimitedError) as error:
+        controller.admit("ip:a", "/api/generate")
+    assert error.value.reason == "rate"
+    assert error.value.retry_after == pytest.approx(2.0)
+    assert ADMISSION_REJECTED.get("/api/generate", "rate") == before + 1
+    # Seau distinct par client ; route absente de rate_limits: pas de limite
+    controller.admit("ip:b", "/api/generate")
+    for _ in range(10):
+        controller.admit("ip:a", "/api/system")
+    clock.now += 2
+    controller.admit("ip:a", "/api/generate")
+
+def test_request_too_large(make_config, clock):
+    controller = AdmissionController(make_config(rate_limits={"/api/network/ping": {"rate": 2, "burst": 20}}))
+    with pytest.raises(RequestTooLargeError):
+        controller.admit("ip:a", "/api/network/ping", cost=21)
+    controller.admit("ip:a", "/api/network/ping", cost=20)
+
+def test_concurrency_rejection_keeps_tokens(make_config, clock):
+    controller = AdmissionController(make_config(rate_limits={"/api/generate": {"rate": 0.01, "burst": 2}},
+                                                 upstream_concurrency={"openai": 1}))
+    first = controller.admit("ip:a", "/api/generate")
+    assert controller.get_stats()["in_flight"] == {"openai": 1}
+    with pytest.raises(RateLimitedError) as error:
+        controller.admit("ip:a", "/api/generate")
+    assert error.value.reason == "concurrency"
+    clock.now += 4
+    first.release()
+    # Le refus n'a pas coûté de jeton: le second est encore disponible
+    with controller.admit("ip:a", "/api/generate"):
+        assert controller.get_stats()["in_flight"] == {"openai": 1}
+    assert controller.get_stats()["in_flight"] == {"openai": 0}
+    # Retry-After estimé d'après la durée moyenne des appels
+    assert controller.get_stats()["average_duration"]["openai"] == pytest.approx(4 * 0.8)
+    controller.admit("ip:b", "/api/analyze")
+    with pytest.raises(RateLimitedError) as error:
+        controller.admit("ip:c", "/api/analyze")
+    assert error.value.retry_after == pytest.approx(3.2)
+
+def test_release_is_idempotent(make_config, clock):
+    controller = AdmissionController(make_config(upstream_concurrency={"http": 2}))
+    first = controller.admit("ip:a", "/api/network/http")
+    second = controller.admit("ip:a", "/api/network/http")
+    first.release()
+    first.release()
+    assert controller.get_stats()["in_flight"] == {"http": 1}
+    second.release()
+    assert controller.get_stats()["in_flight"] == {"http": 0}
+
+def test_admission_disabled(make_config, clock):
+    controller = AdmissionController(make_config(admission_enabled=False,
+                                                 rate_limits={"/api/generate": {"rate": 0.01, "burst": 1}},
+                                                 upstream_concurrency={"openai": 1}))
+    for _ in range(5):
+        controller.admit("ip:a", "/api/generate", cost=10)
+    assert controller.get_stats()["in_flight"] == {}
+
+def test_retry_after_header_rounds_up():
+    assert RateLimitedError("x", 0.05, "rate").headers == {"Retry-After": "1"}
+    assert RateLimitedError("x", 1.0, "rate").headers == {"Retry-After": "1"}
+    assert RateLimitedError("x", 2.1, "rate").headers == {"Retry-After": "3"}
+
+def test_identify(make_config):
+    controller = AdmissionController(make_config(api_clients={"secret": "outil"}))
+    assert controller.identify({"X-API-Key": "secret"}, "10.0.0.1") == "key:outil"
+    assert controller.identify({"Authorization": "Bearer secret"}, "10.0.0.1") == "key:outil"
+    # Clé inconnue: l'adresse, pour ne pas contourner la limite en changeant de clé
+    assert controller.identify({"X-API-Key": "autre"}, "10.0.0.1") == "ip:10.0.0.1"
+    assert controller.identify({"X-Forwarded-For": "1.2.3.4"}, "10.0.0.1") == "ip:10.0.0.1"
+    assert controller.identify({}, None) == "ip:inconnue"
+    controller = AdmissionController(make_config(rate_limit_trust_proxy=True))
+    assert controller.identify({"X-Forwarded-For": "1.2.3.4, 10.0.0.2"}, "10.0.0.1") == "ip:1.2.3.4"
+
+def test_least_recent_bucket_evicted(make_config, clock):
+    controller = AdmissionController(make_config(rate_limits={"/api/generate": {"rate": 0.01, "burst": 1}},
+                                                 rate_limit_max_clients=2))
+    controller.admit("ip:a", "/api/generate")
+    controller.admit("ip:b", "/api/generate")
+    with pytest.raises(RateLimitedError):
+        controller.admit("ip:a", "/api/generate")  # 'a' redevient le plus récent
+    controller.admit("ip:c", "/api/generate")
+    assert controller.get_stats()["buckets"] == 2
+    # Le seau de 'b' a été oublié: il repart plein
+    controller.admit("ip:b", "/api/generate")
+    with pytest.raises(RateLimitedError):
+        controller.admit("ip:c", "/api/generate")
+
+def test_admit_command_uses_equivalent_route(make_config, clock):
+    controller = AdmissionController(make_config(rate_limits={"/api/network/ping": {"rate": 1, "burst": 4}}))
+    with pytest.raises(RequestTooLargeError):
+        controller.admit_command("ip:a", "ping", {"count": 5})
+    controller.admit_command("ip:a", "ping", {"count": 4})
+    with pytest.raises(RateLimitedError):
+        controller.admit_command("ip:a", "ping", {"count": 1})
+    controller.admit_command("ip:a", "system", {})
+
+def test_flask_rejects_with_429_and_releases(make_config, monkeypatch):
+    main = pytest.importorskip("main")
+    config = make_config(rate_limits={"/api/generate": {"rate": 0.01, "burst": 1},
+                                      "/api/network/ping": {"rate": 1, "burst": 4}},
+                         upstream_concurrency={"openai": 4})
+    controller = AdmissionController(config)
+    monkeypatch.setattr(main, "services", ServiceRegistry(config))
+    monkeypatch.setattr(admission, "_controller", controller)
+    client = main.app.test_client()
+    
+    assert client.post("/api/generate", json={}).status_code == 400  # Aucun prompt: jeton consommé
+    assert controller.get_stats()["in_flight"] == {"openai": 0}
+    response = client.post("/api/generate", json={"prompt": "a"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.get_json()["retry_after"] > 0
+    assert "Trop de requêtes" in response.get_json()["error"]
+    response = client.post("/api/network/ping", json={"host": "h", "count": 10})
+    assert response.status_code == 400
+    assert "trop coûteuse" in response.get_json()["error"]
@@ -0,0 +1,117 @@
+"""Tests de la détection d'anomalies : EWMA, fenêtres, seaux vides et explications hors ligne."""
+
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from aiterminal.anomaly import AnomalyDetector, ewma, ewma_zscores, find_windows
+from aiterminal.timeseries import TimeSeriesStore
+
+STEP = 60
+
+class FakeAI:
+    """Service IA simulé : répond `response`, ou sa réponse de repli si `offline`."""
+    
+    def __init__(self, response="", offline=False):
+        self.response = response
+        self.offline = offline
+        self.prompts = []
+    
+    def _fallback_response(self, prompt):
+        return "Je fonctionne actuellement en mode hors ligne."
+    
+    def generate_text(self, prompt, temperature=None):
+        self.prompts.append(prompt)
+        return self._fallback_response(prompt) if self.offline else self.response
+
+def record(tmp_path, end, values):
+    """Enregistre un point par minute se terminant à `end` ; None laisse le seau vide."""
+    store = TimeSeriesStore(str(tmp_path / "metrics"), tiers=((STEP, 86400),), writable=True)
+    for offset, value in enumerate(values):
+        if value is not None:
+            store.append(end - (len(values) - offset) * STEP, {"cpu": value, "memory": 40.0})
+    store.close()
+
+@pytest.fixture
+def detector_config(make_config, tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    
+    def factory(**overrides):
+        return make_config(metrics_history_dir=str(tmp_path / "metrics"), metrics_history_tiers=[[STEP, 86400]],
+                           **overrides)
+    return factory
+
+def test_ewma_matches_recurrence():
+    values = np.random.default_rng(1).normal(50, 10, 500)
+    expected = [values[0]]
+    for value in values[1:]:
+        expected.append(0.9 * expected[-1] + 0.1 * value)
+    assert np.allclose(ewma(values, 0.1), expected)
+
+def test_find_windows_merges_close_flags():
+    flags = np.zeros(20, dtype=bool)
+    flags[[2, 3, 6, 15]] = True
+    assert find_windows(flags, merge_gap=3) == [(2, 6), (15, 15)]
+
+def test_warmup_starts_at_first_sample():
+    values = np.array([np.nan] * 50 + [20.0, 21.0, 60.0] + [20.0] * 10)
+    zscores, _, _ = ewma_zscores(values, 0.1, 2.0)
+    # La mise en route ne doit pas être consommée par les seaux vides de tête
+    assert not zscores[:70].any()
+
+def test_detect_spike_and_ignores_missing_series(detector_config):
+    detector = AnomalyDetector(detector_config())
+    timestamps = [i * STEP for i in range(200)]
+    cpu = [20.0 + (i % 2) for i in range(200)]
+    cpu[150:153] = [95.0, 96.0, 94.0]
+    anomalies = detector.detect(timestamps, {"cpu": cpu, "ping_rtt": [None] * 200}, STEP)
+    assert [anomaly["series"] for anomaly in anomalies] == ["cpu"]
+    assert anomalies[0]["start"] == 150 * STEP
+    assert anomalies[0]["points"] == 3
+    assert anomalies[0]["context"] == {"ping_rtt": None}
+
+def test_analyze_skips_empty_buckets(detector_config, tmp_path):
+    end = (time.time() // STEP) * STEP
+    # Un trou au milieu (enregistreur arrêté) et aucun échantillon ping_rtt
+    values = [20.0 + (i % 2) for i in range(240)]
+    values[100:130] = [None] * 30
+    values[-3:] = [95.0, 96.0, 94.0]
+    record(tmp_path, end, values)
+    result = AnomalyDetector(detector_config()).analyze(end - 3600, end, baseline=86400, step=STEP)
+    assert result["points"] == 210
+    assert [anomaly["series"] for anomaly in result["anomalies"]] == ["cpu"]
+    assert result["anomalies"][0]["peak_value"] >= 94.0
+
+def test_analyze_without_history(detector_config):
+    end = time.time()
+    result = AnomalyDetector(detector_config()).analyze(end - 3600, end, step=STEP)
+    assert (result["points"], result["anomalies"]) == (0, [])
+
+def spikes():
+    cpu = [20.0 + (i % 2) for i in range(200)]
+    cpu[100:102] = [90.0, 90.0]
+    cpu[180:182] = [95.0, 95.0]
+    return [i * STEP for i in range(200)], {"cpu": cpu}
+
+def test_explain_batches_and_parses_lines(detector_config):
+    timestamps, series = spikes()
+    ai = FakeAI("1: sauvegarde\n2: mise à jour")
+    detector = AnomalyDetector(detector_config(api_key="sk-test", anomaly_explain_batch=5), ai)
+    anomalies = detector.explain(detector.detect(timestamps, series, STEP))
+    assert len(ai.prompts) == 1
+    assert [anomaly["explanation"] for anomaly in anomalies] == ["sauvegarde", "mise à jour"]
+    assert not any(anomaly["explanation_unavailable"] for anomaly in anomalies)
+
+@pytest.mark.parametrize("api_key, offline", [("", False), ("sk-test", True)])
+def test_explain_offline_marks_unavailable(detector_config, api_key, offline):
+    timestamps, series = spikes()
+    ai = FakeAI("1: ne doit pas servir", offline=offline)
+    detector = AnomalyDetector(detector_config(api_key=api_key), ai)
+    anomalies = detector.explain(detector.detect(timestamps, series, STEP))
+    assert anomalies
+    # Pas de réponse de repli présentée comme une explication
+    assert all(anomaly["explanation"] is None for anomaly in anomalies)
+    assert all(anomaly["explanation_unavailable"] for anomaly in anomalies)
+    assert len(ai.prompts) == (1 if api_key else 0)
@@ -0,0 +1,172 @@
+"""Tests de l'application ASGI : routage, réponses, admission, flux SSE et cycle de vie."""
+
+import json
+import asyncio
+
+import pytest
+
+from aiterminal import admission, asgi, broadcast
+from aiterminal.admission import AdmissionController
+from aiterminal.asgi import Response, make_response
+from aiterminal.services import ServiceRegistry
+from aiterminal.system import MAX_SAMPLE_INTERVAL
+
+def http_scope(method, path, query=b"", headers=()):
+    return {"type": "http", "method": method, "path": path, "query_string": query,
+            "headers": list(headers), "client": ("127.0.0.1", 50000)}
+
+async def call(app, method, path, body=b"", query=b"", headers=(), chunks=None):
+    """
+    Exécute une requête ; `chunks` limite la lecture d'une réponse en flux, après
+    quoi le client se déconnecte.
+    """
+    sent = []
+    received = asyncio.Event()
+    requests = [{"type": "http.request", "body": body, "more_body": False}]
+    
+    async def receive():
+        if requests:
+            return requests.pop(0)
+        await received.wait()
+        return {"type": "http.disconnect"}
+    
+    async def send(message):
+        sent.append(message)
+        parts = [item for item in sent if item["type"] == "http.response.body" and item.get("body")]
+        if chunks is not None and len(parts) >= chunks:
+            received.set()
+    
+    await asyncio.wait_for(app(http_scope(method, path, query, headers), receive, send), 5)
+    start = sent[0]
+    body = b"".join(item.get("body", b"") for item in sent[1:])
+    return start["status"], {key.decode(): value.decode() for key, value in start["headers"]}, body
+
+@pytest.fixture
+def registry(make_config, monkeypatch):
+    """Services et contrôleur d'admission propres au test, pour l'application ASGI."""
+    def use(**overrides):
+        config = make_config(**overrides)
+        services = ServiceRegistry(config)
+        monkeypatch.setattr(asgi, "services", services)
+        monkeypatch.setattr(asgi.app, "services", services)
+        monkeypatch.setattr(admission, "_controller", AdmissionController(config))
+        monkeypatch.setattr(asgi.app, "_stopping", None)
+        return services
+    return use
+
+def test_make_response_like_flask():
+    response = make_response(({"a": 1}, 201, {"Location": "/x"}))
+    assert (response.status, response.headers, json.loads(response.body)) == (201, {"Location": "/x"}, {"a": 1})
+    assert make_response(Response("texte", content_type="text/plain")).body == b"texte"
+    assert make_response(["é"]).body == '["é"]'.encode("utf-8")
+
+def test_routing_errors(registry):
+    registry()
+    status, _, body = asyncio.run(call(asgi.app, "GET", "/api/absent"))
+    assert status == 404
+    assert asyncio.run(call(asgi.app, "DELETE", "/api/system"))[0] == 405
+    status, _, body = asyncio.run(call(asgi.app, "POST", "/api/generate", body=b"{pas du json"))
+    assert status == 400
+    assert json.loads(body)["error"] == "Corps JSON invalide"
+
+def test_system_route_and_interval_clamp(registry, monkeypatch):
+    services = registry()
+    seen = []
+    monkeypatch.setattr(services.system, "get_memory_info", lambda: {"percent": 42})
+    monkeypatch.setattr(services.system, "get_disk_info", lambda interval=None: seen.append(interval) or {})
+    status, headers, body = asyncio.run(call(asgi.app, "GET", "/api/system", query=b"type=memory"))
+    assert (status, json.loads(body)) == (200, {"percent": 42})
+    assert headers["content-length"] == str(len(body))
+    assert asyncio.run(call(asgi.app, "GET", "/api/system", query=b"type=disk&interval=600"))[0] == 200
+    assert asyncio.run(call(asgi.app, "GET", "/api/system", query=b"type=disk&interval=x"))[0] == 400
+    assert seen == [MAX_SAMPLE_INTERVAL]
+
+def test_admission_rejects_with_retry_after(registry):
+    registry(rate_limits={"/api/network/ping": {"rate": 0.5, "burst": 4}})
+    # Coût d'un ping: un jeton par paquet, au-delà de la rafale la requête est refusée d'emblée
+    status, _, body = asyncio.run(call(asgi.app, "POST", "/api/network/ping", body=b'{"count": 10}'))
+    assert status == 400
+    assert "trop coûteuse" in json.loads(body)["error"]
+    status, _, _ = asyncio.run(call(asgi.app, "POST", "/api/network/ping", body=b'{"count": 4}'))
+    assert status == 400  # Aucun hôte: refus du gestionnaire, jetons consommés
+    status, headers, body = asyncio.run(call(asgi.app, "POST", "/api/network/ping", body=b'{"count": 4}'))
+    assert status == 429
+    assert int(headers["retry-after"]) >= 1
+    assert json.loads(body)["retry_after"] > 0
+
+def test_job_submission_uses_route_limits(registry, monkeypatch):
+    from aiterminal import jobs
+    
+    services = registry(rate_limits={"/api/generate": {"rate": 0.01, "burst": 1}})
+    monkeypatch.setattr(jobs, "_job_queue", jobs.JobQueue(services.config, {"generate": lambda job: "texte"}))
+    submit = b'{"kind": "generate", "params": {"prompt": "a"}}'
+    assert asyncio.run(call(asgi.app, "POST", "/api/jobs", body=submit))[0] == 202
+    status, headers, body = asyncio.run(call(asgi.app, "POST", "/api/jobs", body=submit))
+    assert status == 429
+    assert "/api/generate" in json.loads(body)["error"]
+    assert int(headers["retry-after"]) >= 1
+
+class FakeBroadcaster:
+    """Diffuseur simulé : des événements numérotés sans fin ; note la fermeture du flux."""
+    
+    def __init__(self):
+        self.closed = asyncio.Event()
+    
+    async def subscribe_async(self):
+        try:
+            index = 0
+            while True:
+                index += 1
+                yield f"id: {index}\n\n".encode()
+                await asyncio.sleep(0.01)
+        finally:
+            self.closed.set()
+
+def test_stream_ends_on_disconnect(registry, monkeypatch):
+    registry()
+    fake = FakeBroadcaster()
+    monkeypatch.setattr(broadcast, "_broadcaster", fake)
+    status, headers, body = asyncio.run(call(asgi.app, "GET", "/api/system/stream", chunks=3))
+    assert status == 200
+    assert headers["content-type"] == "text/event-stream"
+    assert "content-length" not in headers
+    assert body.startswith(b"id: 1\n\nid: 2\n\nid: 3\n\n")
+    assert fake.closed.is_set()
+
+def test_stream_ends_on_shutdown(registry, monkeypatch):
+    registry()
+    fake = FakeBroadcaster()
+    monkeypatch.setattr(broadcast, "_broadcaster", fake)
+    
+    async def run():
+        request = asyncio.ensure_future(call(asgi.app, "GET", "/api/system/stream"))
+        await asyncio.sleep(0.05)
+        asgi.app.stopping.set()
+        return await request
+    
+    status, _, body = asyncio.run(run())
+    assert status == 200
+    assert body.startswith(b"id: 1")
+    assert fake.closed.is_set()
+
+def test_lifespan_startup_and_shutdown(registry, monkeypatch):
+    registry()
+    installed = []
+    monkeypatch.setattr(asgi.signal, "signal", lambda signum, handler: installed.append(signum))
+    
+    async def run():
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+        
+        async def receive():
+            return messages.pop(0)
+        
+        async def send(message):
+            sent.append(message["type"])
+        
+        await asgi.app({"type": "lifespan"}, receive, send)
+        return sent
+    
+    assert asyncio.run(run()) == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert asgi.app.stopping.is_set()
+    assert len(installed) == 2
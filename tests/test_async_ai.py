@@ -0,0 +1,108 @@
+"""Tests d'AsyncAIService : réessais, échéances, repli, annulation, concurrence bornée et pools HTTP par boucle."""
+
+import time
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from aiterminal.ai_services import AsyncAIService, BaseAIService, get_async_http_client
+from aiterminal.resilience import CircuitBreaker
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+class FakeAsyncClient:
+    """Client AsyncOpenAI factice : erreurs initiales puis réponses, avec mesure de la concurrence."""
+    
+    def __init__(self, errors=(), delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+        self.models = []
+        self.active = 0
+        self.max_active = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+    
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.models.append(kwargs["model"])
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.errors:
+                raise self.errors.pop(0)
+            return completion(f"réponse: {kwargs['messages'][-1]['content']}")
+        finally:
+            self.active -= 1
+
+@pytest.fixture
+def service(make_config):
+    service = AsyncAIService(make_config(api_key="sk-test", retry_base_delay=0.001, retry_max_attempts=3))
+    service.circuit_breaker = CircuitBreaker("test-async-openai")
+    return service
+
+def use_client(service, client):
+    service._get_client = lambda: client
+    return client
+
+def test_base_service_is_abstract(make_config):
+    with pytest.raises(TypeError):
+        BaseAIService(make_config())
+
+def test_generate_retries_transient_errors(service):
+    client = use_client(service, FakeAsyncClient(errors=[ConnectionError("coupure")]))
+    result = asyncio.run(service.generate_text("bonjour"))
+    assert result == "réponse: bonjour"
+    assert client.calls == 2
+    assert service.circuit_breaker.get_stats()["failures"] == 1
+
+def test_expired_deadline_fails_without_calling(service):
+    client = use_client(service, FakeAsyncClient())
+    with pytest.raises(TimeoutError):
+        asyncio.run(service._create_completion(deadline=time.monotonic() - 1, model="gpt-4o", messages=[]))
+    assert client.calls == 0
+
+def test_timeout_falls_back_to_secondary_model(make_config):
+    service = AsyncAIService(make_config(api_key="sk-test", retry_max_attempts=1, model="grand",
+                                         model_routing={"enabled": True, "fallback_model": "secours"}))
+    service.circuit_breaker = CircuitBreaker("test-async-openai")
+    client = use_client(service, FakeAsyncClient(errors=[TimeoutError("lent")]))
+    assert asyncio.run(service.summarize_text("texte")) == f"réponse: {service._summary_prompt('texte')}"
+    assert client.models == ["grand", "secours"]
+
+def test_cancelled_call_releases_probe(service):
+    use_client(service, FakeAsyncClient(delay=10))
+    service.circuit_breaker = CircuitBreaker("test-async-openai", failure_threshold=1, reset_timeout=0)
+    service.circuit_breaker.record_failure()
+    
+    async def cancel():
+        task = asyncio.create_task(service.generate_text("bonjour"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    asyncio.run(cancel())
+    # La sonde annulée a rendu sa place: un nouvel appel est admis
+    service.circuit_breaker.before_call()
+    assert service.circuit_breaker.get_stats()["failures"] == 1
+
+def test_analyze_many_bounds_concurrency_and_keeps_order(service):
+    client = use_client(service, FakeAsyncClient(delay=0.01))
+    texts = [f"texte {i}" for i in range(12)]
+    results = asyncio.run(service.analyze_many(texts, "summary", concurrency=3))
+    assert client.max_active <= 3
+    assert results == [f"réponse: {service._summary_prompt(text)}" for text in texts]
+
+def test_async_http_client_shared_per_loop(make_config):
+    config = make_config()
+    
+    async def clients():
+        return get_async_http_client(config), get_async_http_client(config)
+    
+    first, second = asyncio.run(clients())
+    third, _ = asyncio.run(clients())
+    assert first is second
+    assert third is not first
@@ -0,0 +1,119 @@
+"""Tests de la diffusion SSE des métriques : aplatissement, deltas partagés, rattrapage et arrêt du thread."""
+
+import json
+import time
+import asyncio
+import itertools
+
+import pytest
+
+from aiterminal import broadcast, system
+from aiterminal.broadcast import SystemBroadcaster, encode_event, flatten
+
+class FakeSampler:
+    """Échantillonneur simulé : la mémoire augmente d'un point par mesure, l'interface 'eth1' disparaît."""
+    
+    def __init__(self, history=1):
+        self.count = itertools.count()
+    
+    def sample(self):
+        index = next(self.count)
+        sample = {"cpu_percent": 10.0, "memory": {"percent": 50.0 + index}}
+        if index == 0:
+            sample["net"] = {"eth1": 1}
+        return sample
+
+@pytest.fixture
+def broadcaster(make_config, monkeypatch):
+    monkeypatch.setattr(system, "SystemSampler", FakeSampler)
+    return SystemBroadcaster(make_config(metrics_stream_interval=0.1))
+
+def parse(event):
+    fields = dict(line.split(": ", 1) for line in event.decode("utf-8").strip().splitlines())
+    return int(fields["id"]), fields["event"], json.loads(fields["data"])
+
+def test_flatten_and_encode():
+    assert flatten({"a": {"b": 1.26, "c": [3, 4]}, "d": "x"}) == {"a.b": 1.3, "a.c.0": 3, "a.c.1": 4, "d": "x"}
+    assert encode_event(7, "delta", {"k": None}) == b'id: 7\nevent: delta\ndata: {"k":null}\n\n'
+
+def test_snapshot_then_deltas(broadcaster):
+    stream = broadcaster.subscribe()
+    assert next(stream).startswith(b"retry: 200")
+    sequence, event, data = parse(next(stream))
+    assert event == "snapshot"
+    assert data["memory.percent"] == 50.0 + sequence - 1
+    following = [parse(next(stream)) for _ in range(2)]
+    assert [event for _, event, _ in following] == ["delta", "delta"]
+    assert following[1][0] == following[0][0] + 1
+    # Seuls les champs modifiés, et null pour une clé disparue
+    assert set(following[0][2]) <= {"memory.percent", "net.eth1"}
+    assert "cpu_percent" not in following[1][2]
+    stream.close()
+
+def test_removed_key_sent_as_null(broadcaster):
+    stream = broadcaster.subscribe()
+    next(stream)
+    _, event, data = parse(next(stream))
+    if "net.eth1" in data:  # Premier état reçu avant la deuxième mesure
+        _, event, data = parse(next(stream))
+        assert data["net.eth1"] is None
+    else:
+        assert event == "snapshot"
+    stream.close()
+
+def test_clients_share_delta_bytes(broadcaster):
+    first, second = broadcaster.subscribe(), broadcaster.subscribe()
+    for stream in (first, second):
+        next(stream)
+        next(stream)
+    deltas = [next(first), next(second)]
+    if deltas[0] != deltas[1]:  # Une mesure est tombée entre les deux lectures: l'un a rattrapé par snapshot
+        deltas = [next(first), next(second)]
+    assert deltas[0] is deltas[1]
+    first.close()
+    second.close()
+
+def test_missed_tick_gets_snapshot(broadcaster):
+    stream = broadcaster.subscribe()
+    next(stream)
+    first, _, _ = parse(next(stream))
+    time.sleep(0.35)
+    sequence, event, _ = parse(next(stream))
+    assert sequence > first + 1
+    assert event == "snapshot"
+    stream.close()
+
+def test_sampler_stops_without_subscribers(broadcaster):
+    stream = broadcaster.subscribe()
+    next(stream)
+    next(stream)
+    assert broadcaster.subscribers == 1
+    stream.close()
+    assert broadcaster.subscribers == 0
+    deadline = time.monotonic() + 2
+    while broadcaster._running and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert not broadcaster._running
+
+def test_async_subscriber(broadcaster):
+    async def read(count):
+        stream = broadcaster.subscribe_async()
+        events = [await stream.__anext__() for _ in range(count)]
+        await stream.aclose()
+        return events
+    
+    events = asyncio.run(read(3))
+    assert events[0].startswith(b"retry:")
+    assert [parse(event)[1] for event in events[1:]] == ["snapshot", "delta"]
+    assert broadcaster.subscribers == 0
+
+def test_stream_route_with_profile(broadcaster, monkeypatch):
+    main = pytest.importorskip("main")
+    monkeypatch.setattr(broadcast, "_broadcaster", broadcaster)
+    for query in ("", "?profile=1"):
+        response = main.app.test_client().get(f"/api/system/stream{query}", buffered=False)
+        assert response.mimetype == "text/event-stream"
+        chunks = iter(response.response)
+        assert next(chunks).startswith(b"retry:")
+        assert parse(next(chunks))[1] == "snapshot"
+        response.close()
@@ -0,0 +1,106 @@
+"""Tests de l'analyse en masse : lecture des formats, enregistrements invalides, ordre et reprise."""
+
+import json
+import asyncio
+
+import pytest
+
+from aiterminal import bulk
+from aiterminal.bulk import BulkAnalyzer, count_records, iter_records
+
+class Interrupted(Exception):
+    """Interruption simulée d'une exécution."""
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    """Remplace AsyncAIService : chaque analyse renvoie le texte reçu, dans le désordre."""
+    texts = []
+    
+    class FakeService:
+        def __init__(self, config):
+            pass
+        
+        def get_analysis_handler(self, analysis_type):
+            async def handler(text, timeout=None):
+                texts.append(text)
+                # Les premiers enregistrements finissent en dernier: l'écriture doit rester ordonnée
+                await asyncio.sleep(0.01 if len(texts) % 3 == 0 else 0)
+                return {"sentiment": "neutral", "text": text}
+            return handler
+    
+    monkeypatch.setattr(bulk, "AsyncAIService", FakeService)
+    return texts
+
+def write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+def read_output(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_iter_records_formats(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text("id,text\n1,premier\n2,second\n", encoding="utf-8")
+    assert [(i, text) for i, _, text in iter_records(str(csv_path))] == [(0, "premier"), (1, "second")]
+    assert count_records(str(csv_path)) == 2
+    txt_path = write_lines(tmp_path / "data.txt", ["un", "", "deux"])
+    assert [text for _, _, text in iter_records(txt_path, skip=1)] == ["deux"]
+
+def test_iter_records_reports_invalid_json_lines(tmp_path):
+    path = write_lines(tmp_path / "data.jsonl", [
+        '{"text": "valide", "id": 7}', '{pas du json', '[1, 2]', '{"autre": "champ"}', '"une chaîne"'
+    ])
+    records = list(iter_records(path))
+    assert [index for index, _, _ in records] == [0, 1, 2, 3, 4]
+    assert records[0][2] == "valide"
+    assert records[4][2] == "une chaîne"
+    for _, record, text in records[1:4]:
+        assert text is None
+        assert record["error"]
+
+def test_run_writes_errors_and_continues(tmp_path, make_config, analyzed):
+    path = write_lines(tmp_path / "data.jsonl", ['{"text": "a", "id": 1}', '{cassé', '{"text": "b"}', '3'])
+    output = str(tmp_path / "out.jsonl")
+    summary = BulkAnalyzer(make_config(), concurrency=2).run(path, output)
+    entries = read_output(output)
+    assert [entry["index"] for entry in entries] == [0, 1, 2, 3]
+    assert entries[0] == {"index": 0, "id": 1, "result": {"sentiment": "neutral", "text": "a"}}
+    assert "JSON invalide" in entries[1]["error"]
+    assert "Objet JSON attendu" in entries[3]["error"]
+    assert summary["completed"] and summary["errors"] == 2
+    # Les enregistrements invalides ne coûtent pas d'appel
+    assert sorted(analyzed) == ["a", "b"]
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path, make_config, analyzed):
+    path = write_lines(tmp_path / "data.jsonl", [json.dumps({"text": f"t{i}"}) for i in range(40)])
+    output = str(tmp_path / "out.jsonl")
+    analyzer = BulkAnalyzer(make_config(bulk_checkpoint_interval=0), concurrency=4)
+    
+    def stop_midway(progress):
+        if progress["done"] >= 15:
+            raise Interrupted()
+    
+    with pytest.raises(Interrupted):
+        analyzer.run(path, output, on_progress=stop_midway, progress_interval=0)
+    checkpoint = analyzer.load_checkpoint(path, output)
+    assert not checkpoint["completed"]
+    assert 15 <= checkpoint["done"] < 40
+    calls_before = len(analyzed)
+    
+    summary = analyzer.run(path, output)
+    assert summary["skipped"] == checkpoint["done"]
+    assert summary["processed"] == 40 - checkpoint["done"]
+    assert len(analyzed) - calls_before == 40 - checkpoint["done"]
+    entries = read_output(output)
+    assert [entry["index"] for entry in entries] == list(range(40))
+    assert [entry["result"]["text"] for entry in entries] == [f"t{i}" for i in range(40)]
+    assert analyzer.run(path, output)["completed"] is True
+
+def test_checkpoint_must_match_run(tmp_path, make_config, analyzed):
+    path = write_lines(tmp_path / "data.jsonl", ['{"text": "a"}'])
+    output = str(tmp_path / "out.jsonl")
+    BulkAnalyzer(make_config()).run(path, output)
+    with pytest.raises(Exception, match="--restart"):
+        BulkAnalyzer(make_config(), analysis_type="summary").run(path, output)
+    assert BulkAnalyzer(make_config(), analysis_type="summary").run(path, output, resume=False)["processed"] == 1
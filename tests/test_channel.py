@@ -0,0 +1,178 @@
+"""Tests du canal WebSocket : commandes multiplexées, annulation, limites, admission et file d'envoi."""
+
+import json
+import time
+import threading
+
+import pytest
+
+from aiterminal.admission import AdmissionController
+from aiterminal.channel import CHANNEL_DROPPED, TerminalChannel, register_websocket
+from aiterminal.services import ServiceRegistry
+
+def wait_for(predicate, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > end:
+            raise AssertionError("condition non atteinte")
+        time.sleep(0.01)
+
+@pytest.fixture
+def open_channel(make_config):
+    """Ouvre un canal dont les messages envoyés sont décodés dans `channel.sent`."""
+    channels = []
+    
+    def factory(send=None, **overrides):
+        config = make_config(**overrides)
+        sent = []
+        
+        def record(text):
+            if send is not None:
+                send(text)
+            sent.append(json.loads(text))
+        
+        channel = TerminalChannel(ServiceRegistry(config), record, "ip:test")
+        channel.admission = AdmissionController(config)
+        channel.sent = sent
+        channels.append(channel)
+        return channel
+    
+    yield factory
+    for channel in channels:
+        channel.close()
+
+def events(channel, command_id):
+    return [(message["event"], message["data"]) for message in channel.sent if message["id"] == command_id]
+
+def test_invalid_and_unknown_messages(open_channel):
+    channel = open_channel()
+    channel.handle("pas du json")
+    channel.handle(json.dumps({"type": "ping"}))
+    channel.handle(json.dumps({"id": 1, "type": "inconnu"}))
+    wait_for(lambda: len(channel.sent) == 3)
+    assert [message["event"] for message in channel.sent] == ["error"] * 3
+    assert channel.sent[2]["id"] == "1"
+
+def test_streamed_command_events_in_order(open_channel):
+    channel = open_channel()
+    
+    def talk(command):
+        command.delta("Bon")
+        command.delta("jour")
+        command.report({"step": 1})
+        return {"done": True}
+    
+    channel.handlers["talk"] = talk
+    channel.handle(json.dumps({"id": "a", "type": "talk"}))
+    wait_for(lambda: events(channel, "a")[-1:] == [("result", {"done": True})])
+    assert events(channel, "a") == [("delta", "Bon"), ("delta", "jour"), ("progress", {"step": 1}),
+                                    ("result", {"done": True})]
+    wait_for(lambda: not channel._commands)
+
+def test_system_command(open_channel, monkeypatch):
+    channel = open_channel()
+    monkeypatch.setattr(channel.services.system, "get_memory_info", lambda: {"percent": 42})
+    channel.handle(json.dumps({"id": "m", "type": "system", "params": {"info": "memory"}}))
+    channel.handle(json.dumps({"id": "x", "type": "system", "params": {"info": "gpu"}}))
+    wait_for(lambda: len(channel.sent) == 2)
+    assert events(channel, "m") == [("result", {"percent": 42})]
+    assert events(channel, "x")[0][0] == "error"
+
+def test_cancel_running_command(open_channel):
+    channel = open_channel()
+    
+    def loop(command):
+        while True:
+            command.report("tic")
+            time.sleep(0.01)
+    
+    channel.handlers["loop"] = loop
+    channel.handle(json.dumps({"id": "l", "type": "loop"}))
+    wait_for(lambda: events(channel, "l"))
+    channel.handle(json.dumps({"id": "l", "type": "cancel"}))
+    wait_for(lambda: events(channel, "l")[-1][0] == "cancelled")
+    wait_for(lambda: not channel._commands)
+
+def test_command_limits(open_channel):
+    channel = open_channel(ws_max_commands=1)
+    gate = threading.Event()
+    channel.handlers["block"] = lambda command: gate.wait(5)
+    channel.handle(json.dumps({"id": "1", "type": "block"}))
+    channel.handle(json.dumps({"id": "1", "type": "block"}))
+    channel.handle(json.dumps({"id": "2", "type": "block"}))
+    wait_for(lambda: len(channel.sent) == 2)
+    assert "déjà utilisé" in events(channel, "1")[0][1]
+    assert "Trop de commandes" in events(channel, "2")[0][1]
+    gate.set()
+    wait_for(lambda: events(channel, "1")[-1:] == [("result", True)])
+
+def test_commands_use_route_admission(open_channel):
+    channel = open_channel(rate_limits={"/api/generate": {"rate": 0.01, "burst": 1}},
+                           upstream_concurrency={"openai": 1})
+    channel.handlers["generate"] = lambda command: "texte"
+    channel.handle(json.dumps({"id": "1", "type": "generate", "params": {"prompt": "a"}}))
+    wait_for(lambda: events(channel, "1"))
+    channel.handle(json.dumps({"id": "2", "type": "generate", "params": {"prompt": "b"}}))
+    wait_for(lambda: events(channel, "2"))
+    assert events(channel, "1") == [("result", "texte")]
+    assert events(channel, "2")[0][0] == "error"
+    assert "Trop de requêtes" in events(channel, "2")[0][1]
+    # La place auprès d'OpenAI est rendue à la fin de la commande
+    wait_for(lambda: channel.admission.get_stats()["in_flight"] == {"openai": 0})
+
+def test_rejected_command_releases_upstream_slot(open_channel, monkeypatch):
+    channel = open_channel(upstream_concurrency={"openai": 1})
+    channel.handle(json.dumps({"id": "1", "type": "generate", "params": ["prompt"]}))
+    wait_for(lambda: events(channel, "1"))
+    assert events(channel, "1")[0] == ("error", "Paramètres invalides: objet JSON attendu")
+    
+    def refuse(*args, **kwargs):
+        raise RuntimeError("can't start new thread")
+    
+    monkeypatch.setattr(threading, "Thread", refuse)
+    channel.handle(json.dumps({"id": "2", "type": "generate", "params": {"prompt": "a"}}))
+    wait_for(lambda: events(channel, "2"))
+    assert events(channel, "2") == [("error", "can't start new thread")]
+    assert "2" not in channel._commands
+    assert channel.admission.get_stats()["in_flight"] == {"openai": 0}
+
+def test_watch_drops_samples_for_slow_client(open_channel):
+    gate = threading.Event()
+    channel = open_channel(send=lambda text: gate.wait(5), ws_send_queue=1)
+    before = CHANNEL_DROPPED.get()
+    channel.handle(json.dumps({"id": "w", "type": "watch", "params": {"interval": 0.2}}))
+    wait_for(lambda: CHANNEL_DROPPED.get() > before, timeout=10)
+    channel.handle(json.dumps({"id": "w", "type": "cancel"}))
+    gate.set()
+    wait_for(lambda: events(channel, "w")[-1:] == [("cancelled", None)])
+
+def test_close_cancels_commands_and_send_error_closes(open_channel):
+    channel = open_channel()
+    started = threading.Event()
+    
+    def wait_cancel(command):
+        started.set()
+        command.cancel_event.wait(5)
+        command.check()
+    
+    channel.handlers["wait"] = wait_cancel
+    channel.handle(json.dumps({"id": "c", "type": "wait"}))
+    assert started.wait(5)
+    command = channel._commands["c"]
+    channel.close()
+    assert command.cancel_event.is_set()
+    
+    def broken(text):
+        raise OSError("connexion perdue")
+    
+    failing = open_channel(send=broken)
+    failing.send(None, "progress", 1)
+    wait_for(failing.closed.is_set)
+    assert failing.send(None, "progress", 2) is False
+
+def test_register_websocket_route(make_config):
+    flask = pytest.importorskip("flask")
+    pytest.importorskip("flask_sock")
+    app = flask.Flask(__name__)
+    assert register_websocket(app, ServiceRegistry(make_config()))
+    assert "/ws" in [rule.rule for rule in app.url_map.iter_rules()]
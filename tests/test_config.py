@@ -0,0 +1,72 @@
+"""Tests de la configuration : couches, valeurs imbriquées, écriture atomique et commande config."""
+
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from aiterminal import cli
+from aiterminal.config import DEFAULT_CONFIG, Config
+from aiterminal.services import ServiceRegistry
+
+def test_layers_precedence(make_config, tmp_path, monkeypatch):
+    (tmp_path / "config.json").write_text(json.dumps({"model": "fichier", "temperature": 0.1}), encoding="utf-8")
+    monkeypatch.setenv("AITERMINAL_TEMPERATURE", "0.5")
+    config = make_config(history_size=3)
+    assert config.get_value("model") == "fichier"
+    assert config.get_value("temperature") == 0.5
+    assert config.get_value("history_size") == 3
+    assert config.get_value("http_max_connections") == DEFAULT_CONFIG["http_max_connections"]
+
+def test_nested_defaults_are_not_shared(make_config):
+    expected = json.dumps(DEFAULT_CONFIG["model_routing"], sort_keys=True)
+    first = make_config()
+    first.get_value("model_routing")["rules"].append({"model": "modifié"})
+    first.get_value("model_routing")["enabled"] = False
+    assert json.dumps(DEFAULT_CONFIG["model_routing"], sort_keys=True) == expected
+    assert make_config().get_value("model_routing")["enabled"] is True
+
+def test_set_value_writes_file_and_notifies(make_config, tmp_path):
+    config = make_config()
+    changes = []
+    
+    def on_change(changed):
+        changes.append(changed)
+    
+    config.subscribe(on_change)
+    config.set_value("model", "gpt-4o-mini")
+    assert json.loads((tmp_path / "config.json").read_text(encoding="utf-8")) == {"model": "gpt-4o-mini"}
+    assert changes == [{"model"}]
+    assert list(tmp_path.glob(".config.*")) == []
+
+def test_set_value_failure_raises(tmp_path):
+    config = Config(str(tmp_path / "absent" / "config.json"))
+    with pytest.raises(Exception):
+        config.set_value("model", "gpt-4o-mini")
+
+def test_set_value_keeps_unreadable_file(make_config, tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text('{"model": "gpt-4o", "history_size": 3,', encoding="utf-8")
+    config = make_config()
+    with pytest.raises(Exception, match="illisible"):
+        config.set_value("temperature", 0.2)
+    assert path.read_text(encoding="utf-8") == '{"model": "gpt-4o", "history_size": 3,'
+    path.write_text("[1, 2]", encoding="utf-8")
+    with pytest.raises(Exception, match="objet JSON"):
+        config.set_value("temperature", 0.2)
+    assert path.read_text(encoding="utf-8") == "[1, 2]"
+
+def test_configure_command_reports_write_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "services", ServiceRegistry(Config(str(tmp_path / "absent" / "config.json"))))
+    result = CliRunner().invoke(cli.app, ["config", "--model", "gpt-4o-mini"])
+    assert result.exit_code == 1
+    assert "Erreur" in result.output
+    assert result.exception is None or isinstance(result.exception, SystemExit)
+
+def test_configure_command_updates_model(tmp_path, monkeypatch):
+    config = Config(str(tmp_path / "config.json"))
+    monkeypatch.setattr(cli, "services", ServiceRegistry(config))
+    result = CliRunner().invoke(cli.app, ["--output", "json", "config", "--model", "gpt-4o-mini"])
+    assert result.exit_code == 0
+    assert json.loads(result.output) == {"updated": ["model"]}
+    assert config.get_value("model") == "gpt-4o-mini"
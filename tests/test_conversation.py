@@ -0,0 +1,85 @@
+"""Tests de la mémoire conversationnelle : budget, compactage et écritures simultanées d'une session."""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from aiterminal.conversation import (SYSTEM_PROMPT, ConversationMemory, FileSessionStore, MemorySessionStore,
+                                     validate_session_id)
+
+@pytest.fixture
+def memory(make_config):
+    return ConversationMemory(make_config(history_size=3, history_max_tokens=3000), MemorySessionStore())
+
+def test_session_id_validation():
+    assert validate_session_id("abc-12_3.x") == "abc-12_3.x"
+    for bad in ("", "../etc", "a/b", "x" * 65):
+        with pytest.raises(ValueError):
+            validate_session_id(bad)
+
+def test_messages_keep_a_stable_prefix(memory):
+    session = memory.load("s1")
+    first = memory.build_messages(session, "bonjour")
+    memory.record_exchange(session, "bonjour", "salut")
+    second = memory.build_messages(memory.load("s1"), "ça va ?")
+    assert first[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert second[:len(first)] == first
+    assert second[-2:] == [{"role": "assistant", "content": "salut"}, {"role": "user", "content": "ça va ?"}]
+
+def test_compaction_when_buffer_is_full(memory):
+    session = memory.load("s1")
+    for i in range(3):
+        memory.append(session, f"question {i}", f"réponse {i}")
+    assert memory.needs_compaction(session, "suite")
+    evicted = memory.evict(session)
+    assert [turn[0] for turn in evicted] == ["user", "assistant"] * (len(evicted) // 2)
+    memory.apply_summary(session, memory.offline_summary(session, evicted), evicted)
+    assert "question 0" in session.summary
+    assert session.summarized_messages == len(evicted)
+
+def test_none_answer_is_not_stored(memory):
+    session = memory.load("s1")
+    memory.record_exchange(session, "question", None)
+    assert len(session.turns) == 0
+    assert len(memory.load("s1").turns) == 0
+
+def test_stale_session_merges_concurrent_exchange(memory):
+    first = memory.load("s1")
+    second = memory.load("s1")
+    memory.record_exchange(first, "question A", "réponse A")
+    # Chargée avant l'enregistrement de A: son échange s'ajoute à la version enregistrée
+    memory.record_exchange(second, "question B", "réponse B")
+    stored = [turn[1] for turn in memory.load("s1").turns]
+    assert stored == ["question A", "réponse A", "question B", "réponse B"]
+    assert [turn[1] for turn in second.turns] == stored
+    assert not memory.save(first)
+
+def test_concurrent_exchanges_on_file_store(make_config, tmp_path):
+    memory = ConversationMemory(make_config(history_size=50), FileSessionStore(str(tmp_path / "sessions")))
+    barrier = threading.Barrier(8)
+    
+    def worker(index):
+        session = memory.load("partagee")
+        barrier.wait()
+        memory.record_exchange(session, f"question {index}", f"réponse {index}")
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    prompts = {turn[1] for turn in memory.load("partagee").turns if turn[0] == "user"}
+    assert prompts == {f"question {i}" for i in range(8)}
+
+def test_chat_with_empty_content_returns_empty_answer(make_config, memory):
+    from aiterminal.ai_services import AIService
+    from aiterminal.resilience import CircuitBreaker
+    
+    service = AIService(make_config(api_key="sk-test"))
+    service.circuit_breaker = CircuitBreaker("test-conversation")
+    response = SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content=None))])
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: response)))
+    result = service.chat("bonjour", session_id="s1", memory=memory)
+    assert result["response"] == ""
+    assert result["messages"] == 0
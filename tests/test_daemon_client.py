@@ -0,0 +1,137 @@
+"""Tests du client du démon : répertoire privé des sockets, vérification du propriétaire, journal et environnement."""
+
+import io
+import os
+import json
+import stat
+import socket
+import threading
+
+import pytest
+
+from aiterminal import cli, client
+from aiterminal.config import DEFAULT_CONFIG
+from aiterminal.daemon import DaemonServer
+from aiterminal.output import set_output_mode
+from aiterminal.services import ServiceRegistry
+
+@pytest.fixture
+def runtime(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    return tmp_path / "aiterminal"
+
+def listen(path):
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(path))
+    server.listen(1)
+    return server
+
+def test_socket_path_in_private_directory(runtime, tmp_path):
+    path = client.socket_path(str(tmp_path))
+    assert os.path.dirname(path) == str(runtime)
+    assert stat.S_IMODE(os.stat(runtime).st_mode) == 0o700
+    assert client.socket_path(str(tmp_path)) == path
+    assert client.socket_path(str(tmp_path / "autre")) != path
+
+def test_permissive_directory_is_restricted(runtime):
+    runtime.mkdir(mode=0o777)
+    os.chmod(runtime, 0o777)
+    client.runtime_dir()
+    assert stat.S_IMODE(os.stat(runtime).st_mode) == 0o700
+
+def test_symlinked_directory_is_rejected(runtime, tmp_path):
+    (tmp_path / "ailleurs").mkdir()
+    os.symlink(tmp_path / "ailleurs", runtime)
+    with pytest.raises(PermissionError):
+        client.socket_path()
+
+def test_fallback_directory_is_per_user(tmp_path, monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    assert client.runtime_dir() == str(tmp_path / f"aiterminal-{os.getuid()}")
+
+def test_connect_checks_socket_owner(runtime):
+    runtime.mkdir(mode=0o700)
+    path = runtime / "test.sock"
+    server = listen(path)
+    try:
+        sock = client.connect(str(path))
+        assert sock is not None
+        sock.close()
+        if os.getuid() == 0:
+            # Socket d'un autre utilisateur: aucune connexion
+            os.chown(path, 12345, 12345)
+            assert client.connect(str(path)) is None
+    finally:
+        server.close()
+
+def test_connect_ignores_missing_or_regular_files(runtime):
+    runtime.mkdir(mode=0o700)
+    assert client.connect(str(runtime / "absent.sock")) is None
+    (runtime / "fichier.sock").write_text("")
+    assert client.connect(str(runtime / "fichier.sock")) is None
+
+def test_spawn_refuses_symlinked_log(runtime, tmp_path):
+    path = client.socket_path(str(tmp_path))
+    target = tmp_path / "cible"
+    target.write_text("intact")
+    os.symlink(target, path + ".log")
+    with pytest.raises(OSError):
+        client.spawn_daemon(str(tmp_path))
+    assert target.read_text() == "intact"
+
+@pytest.fixture
+def daemon(tmp_path, make_config, monkeypatch):
+    """Démon servi dans un thread de ce processus, sur une configuration de test."""
+    services = ServiceRegistry(make_config())
+    monkeypatch.setattr(services.system, "get_memory_info",
+                        lambda: {"total": 8, "used": 4, "available": 4, "percent": 50.0})
+    monkeypatch.setattr(cli, "services", services)
+    server = DaemonServer(str(tmp_path / "d.sock"), idle_timeout=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    def run(argv, env):
+        sock = client.connect(server.path)
+        out = io.StringIO()
+        try:
+            code = client.request(sock, {"argv": argv, "env": env}, stdout=out, stderr=io.StringIO())
+        finally:
+            sock.close()
+        return code, out.getvalue()
+    
+    yield run
+    server.shutdown()
+    server.server_close()
+    set_output_mode("table")
+
+def test_daemon_applies_client_output_variable(daemon, monkeypatch):
+    # Environnement du démon différent de celui du client
+    monkeypatch.setenv("AITERMINAL_OUTPUT", "table")
+    code, output = daemon(["sys", "--type", "memory"], {"AITERMINAL_OUTPUT": "json"})
+    assert code == 0
+    assert json.loads(output) == {"memory": {"total": 8, "used": 4, "available": 4, "percent": 50.0}}
+    code, output = daemon(["sys", "--type", "memory"], {})
+    assert "--- Mémoire ---" in output
+    assert os.environ["AITERMINAL_OUTPUT"] == "table"
+
+def test_forward_sends_client_variables(monkeypatch):
+    sent = []
+    monkeypatch.setenv("AITERMINAL_DAEMON", "1")
+    monkeypatch.setenv("AITERMINAL_OUTPUT", "json")
+    monkeypatch.setenv("OPENAI_API_KEY", "secret")
+    monkeypatch.setattr(client, "socket_path", lambda: "/inutilisé")
+    monkeypatch.setattr(client, "connect", lambda path: socket.socket(socket.AF_UNIX, socket.SOCK_STREAM))
+    monkeypatch.setattr(client, "request", lambda sock, payload: sent.append(payload) or 0)
+    assert client.forward(["sys", "--type", "memory"]) == 0
+    assert sent[0]["env"] == {"AITERMINAL_DAEMON": "1", "AITERMINAL_OUTPUT": "json"}
+
+def test_daemon_config_layers_follow_client(daemon, monkeypatch):
+    monkeypatch.setenv("AITERMINAL_TEMPERATURE", "0.9")
+    show = ["--output", "json", "config", "--show"]
+    # Défauts < fichier < environnement du client < --set
+    assert json.loads(daemon(show, {"AITERMINAL_TEMPERATURE": "0.5"})[1])["temperature"] == 0.5
+    output = daemon(["--set", "temperature=0.2"] + show, {"AITERMINAL_TEMPERATURE": "0.5"})[1]
+    assert json.loads(output)["temperature"] == 0.2
+    assert json.loads(daemon(show, {})[1])["temperature"] == DEFAULT_CONFIG["temperature"]
+    # Entre deux commandes, le démon retrouve son propre environnement
+    assert cli.services.config.get_value("temperature") == 0.9
@@ -0,0 +1,97 @@
+"""Tests du tableau de bord système : sparklines, échantillonnage non bloquant et rendu différentiel."""
+
+import io
+import json
+from collections import namedtuple
+
+import pytest
+from rich.console import Console
+from typer.testing import CliRunner
+
+from aiterminal import cli, system
+from aiterminal.dashboard import SPARK_CHARS, SystemDashboard, format_rate, sparkline
+from aiterminal.services import ServiceRegistry
+from aiterminal.system import SystemSampler
+
+Memory = namedtuple("Memory", "total used percent")
+Disk = namedtuple("Disk", "read_bytes write_bytes")
+Net = namedtuple("Net", "bytes_recv bytes_sent")
+
+@pytest.fixture
+def fake_psutil(monkeypatch):
+    """Compteurs système contrôlés par le test, et horloge monotone avançant d'une seconde par mesure."""
+    state = {"cores": [10.0, 30.0], "disk": Disk(0, 0), "net": Net(0, 0), "now": 100.0}
+    
+    def monotonic():
+        state["now"] += 1.0
+        return state["now"]
+    
+    monkeypatch.setattr(system.psutil, "cpu_percent", lambda percpu=False, interval=None: list(state["cores"]))
+    monkeypatch.setattr(system.psutil, "virtual_memory", lambda: Memory(8 * 1024 ** 3, 2 * 1024 ** 3, 25.0))
+    monkeypatch.setattr(system.psutil, "disk_io_counters", lambda: state["disk"])
+    monkeypatch.setattr(system.psutil, "net_io_counters", lambda: state["net"])
+    monkeypatch.setattr(system.time, "monotonic", monotonic)
+    return state
+
+def test_sparkline_scaling():
+    assert sparkline([0, 50, 100], 5, 100.0) == "  " + SPARK_CHARS[0] + SPARK_CHARS[4] + SPARK_CHARS[-1]
+    assert sparkline([1, 2, 3, 4], 2) == SPARK_CHARS[5] + SPARK_CHARS[-1]
+    assert sparkline([0, 0], 3) == " " + SPARK_CHARS[0] * 2
+    assert sparkline([5], 0) == ""
+
+def test_format_rate_units():
+    assert format_rate(512) == "512 o/s"
+    assert format_rate(1536) == "1.5 Ko/s"
+    assert format_rate(3 * 1024 ** 4) == "3072.0 Go/s"
+
+def test_sampler_rates_from_counter_deltas(fake_psutil):
+    sampler = SystemSampler(history=2)
+    first = sampler.sample()
+    assert first["cpu_percent"] == 20.0
+    assert first["disk_io"]["read_bytes_per_s"] == 0.0
+    
+    fake_psutil["disk"] = Disk(2048, 1024)
+    fake_psutil["net"] = Net(500, 100)
+    second = sampler.sample()
+    assert second["disk_io"] == {"read_bytes_per_s": 2048.0, "write_bytes_per_s": 1024.0}
+    assert second["net_io"] == {"recv_bytes_per_s": 500.0, "sent_bytes_per_s": 100.0}
+    
+    # Compteur remis à zéro: débit nul plutôt que négatif
+    fake_psutil["net"] = Net(0, 0)
+    third = sampler.sample()
+    assert third["net_io"]["recv_bytes_per_s"] == 0.0
+    assert list(sampler.history["disk_read"]) == [2048.0, 0.0]
+
+def test_dashboard_redraws_only_changes(fake_psutil):
+    stream = io.StringIO()
+    dashboard = SystemDashboard(SystemSampler(history=10), 1.0, Console(file=stream, width=80, force_terminal=False))
+    sample = dashboard.sampler.sample()
+    frame = dashboard.render(sample)
+    assert frame is not None
+    texts = list(dashboard._texts)
+    assert all(text.cell_len <= 80 for text in texts)
+    # Image identique: rien à redessiner
+    assert dashboard.render(sample) is None
+    
+    fake_psutil["cores"] = [10.0, 90.0]
+    assert dashboard.render(dashboard.sampler.sample()) is not None
+    # La ligne d'en-tête n'a pas changé: le même Text est réutilisé
+    assert dashboard._texts[0] is texts[0]
+    assert dashboard._texts[1] is not texts[1]
+
+def test_dashboard_run_counts_frames(fake_psutil, monkeypatch):
+    monkeypatch.setattr("aiterminal.dashboard.time.sleep", lambda delay: None)
+    stream = io.StringIO()
+    dashboard = SystemDashboard(SystemSampler(), 0.1, Console(file=stream, width=80))
+    dashboard.run(count=3)
+    assert dashboard.frames == 3
+    assert 1 <= dashboard.redraws <= 3
+    assert "Mémoire" in stream.getvalue()
+
+def test_watch_command_emits_ndjson(fake_psutil, make_config, monkeypatch):
+    monkeypatch.setattr(cli, "services", ServiceRegistry(make_config()))
+    result = CliRunner().invoke(cli.app, ["--output", "ndjson", "sys", "--watch", "--interval", "0.1", "--count", "2"])
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert len(records) == 2
+    assert records[1]["memory"]["percent"] == 25.0
@@ -0,0 +1,264 @@
+"""Tests de la file des tâches de fond : priorités, annulation, délais, long polling et persistance."""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from aiterminal import admission, jobs
+from aiterminal.admission import AdmissionController, RateLimitedError
+from aiterminal.jobs import FINAL_STATES, JobQueue, QueueFullError
+from aiterminal.services import ServiceRegistry
+from aiterminal.utils import NotifyingCondition
+
+def make_queue(make_config, handlers, **overrides):
+    settings = {"jobs_workers": 1, "jobs_timeout": 5}
+    settings.update(overrides)
+    return JobQueue(make_config(**settings), handlers)
+
+def wait_final(queue, job, timeout=5.0):
+    end = time.monotonic() + timeout
+    while job.status not in FINAL_STATES and time.monotonic() < end:
+        queue.wait(job.id, len(job.progress), 0.1)
+    return job
+
+def test_job_result_and_progress(make_config):
+    def count(job):
+        for index in range(3):
+            job.report(index)
+        return {"total": 3}
+    
+    queue = make_queue(make_config, {"count": count})
+    job = wait_final(queue, queue.submit("count"))
+    assert job.status == "done"
+    assert job.result == {"total": 3}
+    assert job.to_dict(since=1)["progress"] == [1, 2]
+
+def test_priority_order(make_config):
+    gate = threading.Event()
+    order = []
+    
+    def record(job):
+        gate.wait(5)
+        order.append(job.params["name"])
+    
+    queue = make_queue(make_config, {"record": record})
+    first = queue.submit("record", {"name": "premier"})
+    while first.status == "queued":
+        time.sleep(0.01)
+    jobs = [queue.submit("record", {"name": name}, priority)
+            for name, priority in (("bas", "low"), ("normal", "normal"), ("haut", "high"))]
+    gate.set()
+    for job in jobs:
+        wait_final(queue, job)
+    assert order == ["premier", "haut", "normal", "bas"]
+
+def test_validation_and_full_queue(make_config):
+    gate = threading.Event()
+    queue = make_queue(make_config, {"block": lambda job: gate.wait(5)}, jobs_max_queued=1)
+    with pytest.raises(ValueError):
+        queue.submit("inconnu")
+    with pytest.raises(ValueError):
+        queue.submit("block", priority="urgent")
+    with pytest.raises(ValueError):
+        queue.submit("block", timeout=0)
+    running = queue.submit("block")
+    while running.status == "queued":
+        time.sleep(0.01)
+    queue.submit("block")
+    with pytest.raises(QueueFullError):
+        queue.submit("block")
+    gate.set()
+
+def test_cancel_queued_job_never_runs(make_config):
+    gate = threading.Event()
+    ran = []
+    
+    def work(job):
+        ran.append(job.id)
+        gate.wait(5)
+    
+    queue = make_queue(make_config, {"work": work})
+    blocker = queue.submit("work")
+    waiting = queue.submit("work")
+    assert queue.cancel(waiting.id).status == "cancelled"
+    gate.set()
+    wait_final(queue, blocker)
+    time.sleep(0.05)
+    assert ran == [blocker.id]
+    assert waiting.status == "cancelled"
+    assert waiting.started is None
+
+def test_cancel_running_job_stops_it(make_config):
+    started = threading.Event()
+    
+    def loop(job):
+        started.set()
+        while True:
+            job.check()
+            time.sleep(0.01)
+    
+    queue = make_queue(make_config, {"loop": loop})
+    job = queue.submit("loop")
+    assert started.wait(5)
+    queue.cancel(job.id)
+    assert job.status == "cancelled"
+    assert job.error == "Tâche annulée"
+    # Le worker est libéré pour la tâche suivante
+    follow = wait_final(queue, queue.submit("loop", timeout=0.2))
+    assert follow.status == "timeout"
+
+class CancelOnAcquire(NotifyingCondition):
+    """Condition qui exécute `hook` une fois, dans un worker, juste avant d'être acquise."""
+    
+    hook = None
+    
+    def __enter__(self):
+        hook, self.hook = self.hook, None
+        if hook is not None and threading.current_thread().name.startswith("aiterminal-job"):
+            hook()
+        elif hook is not None:
+            self.hook = hook
+        return super().__enter__()
+
+def test_cancel_racing_worker_start(make_config):
+    # Annulation entre la sortie de la file et le passage à 'running': la tâche ne doit pas démarrer
+    ran = []
+    queue = make_queue(make_config, {"noop": lambda job: ran.append(job.id) or "fait"})
+    queue._changed = CancelOnAcquire()
+    # La tâche est enregistrée avant d'entrer dans la file: le crochet la trouve toujours
+    queue._changed.hook = lambda: [queue.cancel(job_id) for job_id in list(queue._jobs)]
+    job = queue.submit("noop")
+    time.sleep(0.2)
+    assert job.status == "cancelled"
+    assert ran == []
+    assert job.started is None
+
+def test_blocking_call_past_deadline_is_timeout(make_config):
+    queue = make_queue(make_config, {"slow": lambda job: time.sleep(0.3) or "trop tard"})
+    job = wait_final(queue, queue.submit("slow", timeout=0.1))
+    assert job.status == "timeout"
+    time.sleep(0.3)
+    assert job.result is None
+
+def test_wait_async_wakes_on_progress(make_config):
+    gate = threading.Event()
+    
+    def step(job):
+        gate.wait(5)
+        job.report("étape")
+        return "fini"
+    
+    queue = make_queue(make_config, {"step": step})
+    job = queue.submit("step")
+    
+    async def poll():
+        threading.Timer(0.05, gate.set).start()
+        start = time.monotonic()
+        found = await queue.wait_async(job.id, 0, 5.0)
+        return found, time.monotonic() - start
+    
+    found, elapsed = asyncio.run(poll())
+    assert found.progress[:1] == ["étape"]
+    assert elapsed < 2.0
+
+def test_finished_jobs_persist_in_sqlite(make_config, tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = make_queue(make_config, {"echo": lambda job: job.params}, jobs_db_path=path)
+    job = wait_final(queue, queue.submit("echo", {"a": 1}))
+    restarted = make_queue(make_config, {"echo": lambda job: job.params}, jobs_db_path=path)
+    found = restarted.get(job.id)
+    assert (found.status, found.result) == ("done", {"a": 1})
+
+@pytest.fixture
+def controller(monkeypatch):
+    """Contrôleur d'admission du processus, propre au test."""
+    def use(config):
+        monkeypatch.setattr(admission, "_controller", AdmissionController(config))
+        return admission._controller
+    return use
+
+def in_flight(controller, upstream):
+    return controller.get_stats()["in_flight"].get(upstream, 0)
+
+def wait_until(predicate, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "condition non atteinte"
+        time.sleep(0.01)
+
+def test_only_running_jobs_hold_upstream_slots(make_config, controller):
+    config = make_config(jobs_workers=2, jobs_timeout=5, upstream_concurrency={"ping": 3})
+    limits = controller(config)
+    gate = threading.Event()
+    queue = JobQueue(config, {"ping": lambda job: gate.wait(5)})
+    submitted = [queue.submit("ping") for _ in range(5)]
+    wait_until(lambda: queue.counts()["running"] == 2)
+    assert in_flight(limits, "ping") == 2
+    # La place restante revient à un appel synchrone, malgré les trois tâches en attente
+    with limits.admit("ip:autre", "/api/network/ping"):
+        with pytest.raises(RateLimitedError):
+            limits.admit("ip:autre", "/api/network/ping")
+    gate.set()
+    for job in submitted:
+        assert wait_final(queue, job).status == "done"
+    wait_until(lambda: in_flight(limits, "ping") == 0)
+
+def test_job_waits_for_saturated_upstream(make_config, controller):
+    config = make_config(jobs_workers=1, jobs_timeout=5, upstream_concurrency={"openai": 1})
+    limits = controller(config)
+    queue = JobQueue(config, {"generate": lambda job: "texte"})
+    held = limits.admit("ip:autre", "/api/generate")
+    
+    expired = wait_final(queue, queue.submit("generate", timeout=0.3))
+    assert expired.status == "error"
+    assert "saturé" in expired.error
+    assert expired.started is None
+    
+    cancelled = queue.submit("generate")
+    time.sleep(0.1)
+    queue.cancel(cancelled.id)
+    waiting = queue.submit("generate")
+    time.sleep(0.1)
+    assert waiting.status == "queued"
+    held.release()
+    assert wait_final(queue, waiting).status == "done"
+    assert cancelled.status == "cancelled" and cancelled.started is None
+    wait_until(lambda: in_flight(limits, "openai") == 0)
+
+def test_submit_api_applies_route_admission(make_config, controller, monkeypatch):
+    main = pytest.importorskip("main")
+    config = make_config(jobs_workers=2, rate_limits={"/api/network/ping": {"rate": 0.01, "burst": 20}},
+                         upstream_concurrency={"ping": 8})
+    services = ServiceRegistry(config)
+    limits = controller(config)
+    gate = threading.Event()
+    monkeypatch.setattr(main, "services", services)
+    monkeypatch.setattr(services.network, "ping", lambda host, count: [{"time": 1.0}])
+    monkeypatch.setattr(services.network, "get_ping_summary", lambda results: {"received": 1})
+    monkeypatch.setattr(jobs, "_job_queue", JobQueue(config, {"ping": lambda job: gate.wait(5)}))
+    client = main.app.test_client()
+    submit = {"kind": "ping", "params": {"host": "h", "count": 2}}
+    
+    response = client.post("/api/jobs", json={"kind": "ping", "params": {"host": "h", "count": 21}})
+    assert response.status_code == 400
+    assert "trop coûteuse" in response.get_json()["error"]
+    for _ in range(8):
+        assert client.post("/api/jobs", json=submit).status_code == 202
+    wait_until(lambda: jobs._job_queue.counts()["running"] == 2)
+    # Seules les tâches en cours occupent le service: un ping synchrone passe
+    assert in_flight(limits, "ping") == 2
+    response = client.post("/api/network/ping", json={"host": "h", "count": 1},
+                           environ_base={"REMOTE_ADDR": "10.0.0.2"})
+    assert response.status_code == 200
+    # Les jetons sont pris à la soumission: 16 + 2 + 2, puis la rafale est épuisée
+    assert client.post("/api/jobs", json=submit).status_code == 202
+    assert client.post("/api/jobs", json=submit).status_code == 202
+    response = client.post("/api/jobs", json=submit)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert "Trop de requêtes" in response.get_json()["error"]
+    gate.set()
+    wait_until(lambda: jobs._job_queue.counts()["done"] == 10)
+    wait_until(lambda: in_flight(limits, "ping") == 0)
@@ -0,0 +1,79 @@
+"""Tests des métriques : compteurs, jauges, histogrammes, format Prometheus et middleware WSGI."""
+
+import pytest
+
+from aiterminal.metrics import HTTP_REQUEST_DURATION, Metric, MetricsMiddleware, MetricsRegistry
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+def test_metric_base_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("m", "doc")
+
+def test_counter_render_and_label_escaping(registry):
+    counter = registry.counter("test_total", "Compteur de test", ("route",))
+    counter.inc('/a"b')
+    counter.inc('/a"b', amount=2)
+    counter.inc("/c")
+    assert counter.get('/a"b') == 3
+    assert counter.render() == [
+        "# HELP test_total Compteur de test",
+        "# TYPE test_total counter",
+        'test_total{route="/a\\"b"} 3',
+        'test_total{route="/c"} 1'
+    ]
+    with pytest.raises(ValueError):
+        counter.inc()
+
+def test_gauge_values_and_functions(registry):
+    gauge = registry.gauge("test_gauge", "Jauge", ("name",))
+    gauge.set(5, "a")
+    gauge.dec("a", amount=2)
+    gauge.set_function(lambda: 7.5, "b")
+    gauge.set_function(lambda: 1 / 0, "c")
+    assert gauge.get("a") == 3
+    assert gauge.get("b") == 7.5
+    # Une fonction en erreur est ignorée à la collecte
+    assert gauge.render()[2:] == ['test_gauge{name="a"} 3', 'test_gauge{name="b"} 7.5']
+
+def test_histogram_cumulative_buckets(registry):
+    histogram = registry.histogram("test_seconds", "Durées", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.get_count() == 4
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{le="0.1"} 2',
+        'test_seconds_bucket{le="1"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        "test_seconds_sum 3.65",
+        "test_seconds_count 4"
+    ]
+    with pytest.raises(ValueError):
+        registry.histogram("autre", "doc", ("le",))
+
+def test_registry_reuses_and_checks_metrics(registry):
+    assert registry.counter("x_total", "doc") is registry.counter("x_total", "doc")
+    with pytest.raises(ValueError):
+        registry.gauge("x_total", "doc")
+    with pytest.raises(ValueError):
+        registry.counter("x_total", "doc", ("autre",))
+    assert registry.render().startswith("# HELP x_total doc\n")
+
+def test_middleware_labels_by_route_template():
+    flask = pytest.importorskip("flask")
+    app = flask.Flask(__name__)
+    
+    @app.route("/api/items/<item_id>")
+    def item(item_id):
+        return {"id": item_id}
+    
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app)
+    before = HTTP_REQUEST_DURATION.get_count("/api/items/<item_id>", "GET", "200")
+    client = app.test_client()
+    assert client.get("/api/items/1").status_code == 200
+    assert client.get("/api/items/2").status_code == 200
+    assert client.get("/api/absent").status_code == 404
+    assert HTTP_REQUEST_DURATION.get_count("/api/items/<item_id>", "GET", "200") == before + 2
+    assert HTTP_REQUEST_DURATION.get_count("unmatched", "GET", "404") >= 1
@@ -0,0 +1,67 @@
+"""Tests du serveur OpenAI simulé, utilisé de bout en bout par AIService."""
+
+import httpx
+import pytest
+
+from aiterminal.ai_services import AIService
+from aiterminal.mock_openai import LatencyModel, MockOpenAIServer, MockSettings
+from aiterminal.resilience import CircuitBreaker
+
+@pytest.fixture
+def mock_server():
+    server = MockOpenAIServer(MockSettings())
+    server.start_in_thread()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def service(make_config, mock_server):
+    service = AIService(make_config(api_key="sk-test", base_url=mock_server.base_url, retry_max_attempts=1))
+    service.circuit_breaker = CircuitBreaker("test-mock-openai")
+    return service
+
+@pytest.mark.parametrize("spec", ["fixed:10", "uniform:1:5", "normal:100:20", "lognormal:200:0.5"])
+def test_latency_model_samples_non_negative_seconds(spec):
+    model = LatencyModel(spec)
+    assert all(0 <= model.sample() < 10 for _ in range(50))
+
+@pytest.mark.parametrize("spec", ["fixed", "fixed:a", "gamma:1:2", "uniform:1"])
+def test_latency_model_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        LatencyModel(spec)
+
+def test_completion_through_ai_service(service, mock_server):
+    text = service.generate_text("Bonjour", timeout=10)
+    assert text.startswith("lorem ipsum")
+    assert mock_server.requests_served == 1
+
+def test_streaming_through_ai_service(service):
+    parts = []
+    text = service.generate_text("Bonjour", timeout=10, on_delta=parts.append)
+    assert len(parts) > 1
+    assert "".join(parts) == text
+
+def test_json_mode_sentiment(service):
+    result = service.analyze_sentiment("Une journée excellente", timeout=10)
+    assert result["sentiment"] == "positive"
+
+def test_injected_errors_carry_retry_after(mock_server):
+    mock_server.settings = MockSettings(error_rate=1.0, error_statuses=[429], retry_after=2)
+    response = httpx.post(f"{mock_server.base_url}/chat/completions", json={"messages": []})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+
+def test_injected_errors_count_against_breaker(service, mock_server):
+    mock_server.settings = MockSettings(error_rate=1.0, error_statuses=[503])
+    text = service.generate_text("Bonjour", timeout=10)
+    # Réponse hors ligne après l'échec de l'appel
+    assert not text.startswith("lorem")
+    assert service.circuit_breaker.get_stats()["failures"] == 1
+
+def test_repeated_prefix_reports_cached_tokens(mock_server):
+    history = [{"role": "system", "content": "contexte " * 2000}, {"role": "user", "content": "question"}]
+    url = f"{mock_server.base_url}/chat/completions"
+    first = httpx.post(url, json={"messages": history}).json()["usage"]
+    second = httpx.post(url, json={"messages": history}).json()["usage"]
+    assert first["prompt_tokens_details"]["cached_tokens"] == 0
+    assert second["prompt_tokens_details"]["cached_tokens"] > 0
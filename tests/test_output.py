@@ -0,0 +1,88 @@
+"""Tests des formats de sortie : sérialisation (orjson ou json), écriture en flux et tubes fermés."""
+
+import io
+import json
+import datetime
+import threading
+
+import pytest
+
+from aiterminal import output
+from aiterminal.output import RecordWriter, dumps, emit, get_output_mode, loads, set_output_mode
+
+@pytest.fixture(params=["orjson", "json"])
+def serializer(request, monkeypatch):
+    """Exécute le test avec orjson (s'il est installé) puis avec le repli sur json."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+        monkeypatch.setattr(output, "_orjson", False)
+    else:
+        monkeypatch.setattr(output, "_orjson", None)
+    return request.param
+
+@pytest.fixture
+def mode():
+    tokens = []
+    
+    def use(value):
+        tokens.append(set_output_mode(value))
+    
+    yield use
+    for token in reversed(tokens):
+        output._current_mode.reset(token)
+
+def test_dumps_handles_unusual_values(serializer):
+    value = {"texte": "é", 1: [True, None], "date": datetime.date(2026, 1, 2), "grand": 2 ** 70}
+    decoded = json.loads(dumps(value))
+    assert decoded == {"texte": "é", "1": [True, None], "date": "2026-01-02", "grand": 2 ** 70}
+    assert "\n" not in dumps(value)
+    assert dumps({"a": 1}, indent=True) == '{\n  "a": 1\n}'
+    assert loads('{"a": [1]}') == {"a": [1]}
+
+def test_record_writer_json_array_is_valid(serializer):
+    stream = io.StringIO()
+    with RecordWriter("json", stream) as writer:
+        for i in range(3):
+            writer.write({"n": i})
+    assert json.loads(stream.getvalue()) == [{"n": 0}, {"n": 1}, {"n": 2}]
+    empty = io.StringIO()
+    RecordWriter("json", empty).close()
+    assert json.loads(empty.getvalue()) == []
+
+def test_record_writer_ndjson(serializer):
+    stream = io.StringIO()
+    writer = RecordWriter("ndjson", stream)
+    writer.write({"n": 1})
+    writer.write(["a"])
+    writer.close()
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == [{"n": 1}, ["a"]]
+
+def test_emit_follows_current_mode(mode):
+    mode("ndjson")
+    stream = io.StringIO()
+    emit([{"n": 1}, {"n": 2}], stream)
+    assert stream.getvalue() == '{"n":1}\n{"n":2}\n'
+    mode("json")
+    stream = io.StringIO()
+    emit({"n": 1}, stream)
+    assert json.loads(stream.getvalue()) == {"n": 1}
+
+def test_output_mode_validation_and_isolation(mode):
+    with pytest.raises(ValueError):
+        set_output_mode("xml")
+    mode("json")
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(get_output_mode()))
+    thread.start()
+    thread.join()
+    assert get_output_mode() == "json"
+    assert seen == ["table"]
+
+def test_closed_pipe_ends_quietly():
+    class ClosedPipe(io.StringIO):
+        def write(self, text):
+            raise BrokenPipeError()
+    
+    with pytest.raises(SystemExit) as excinfo:
+        RecordWriter("ndjson", ClosedPipe()).write({"n": 1})
+    assert excinfo.value.code == 0
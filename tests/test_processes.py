@@ -0,0 +1,133 @@
+"""Tests de la table des processus : sélection des N premiers, détails, processus disparus et API."""
+
+from collections import namedtuple
+
+import psutil
+import pytest
+from typer.testing import CliRunner
+
+from aiterminal import cli, system
+from aiterminal.services import ServiceRegistry
+from aiterminal.system import SystemService
+
+MemoryInfo = namedtuple("MemoryInfo", "rss")
+IOCounters = namedtuple("IOCounters", "read_bytes write_bytes")
+
+class FakeProcess:
+    """Processus simulé ; compte les lectures de détails pour vérifier qu'elles se limitent aux N retenus."""
+    
+    def __init__(self, pid, cpu=0.0, rss=0, threads=1, fds=3, io=(0, 0), gone=False):
+        self.pid = pid
+        self._cpu, self._rss, self._threads, self._fds, self._io = cpu, rss, threads, fds, io
+        self.gone = gone
+        self.details = 0
+    
+    def oneshot(self):
+        if self.gone:
+            raise psutil.NoSuchProcess(self.pid)
+        return _Null()
+    
+    def cpu_percent(self, interval=None):
+        return self._cpu
+    
+    def memory_info(self):
+        return MemoryInfo(self._rss)
+    
+    def num_threads(self):
+        return self._threads
+    
+    def num_fds(self):
+        return self._fds
+    
+    def io_counters(self):
+        return IOCounters(*self._io)
+    
+    def name(self):
+        self.details += 1
+        return f"proc{self.pid}"
+    
+    def status(self):
+        return "running"
+    
+    def username(self):
+        raise psutil.AccessDenied(self.pid)
+
+class _Null:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+@pytest.fixture
+def table(monkeypatch):
+    processes = {
+        1: FakeProcess(1, cpu=5.0, rss=300, threads=2, io=(10, 0)),
+        2: FakeProcess(2, cpu=50.0, rss=100, threads=9, fds=40),
+        3: FakeProcess(3, cpu=20.0, rss=200, threads=4, io=(500, 500))
+    }
+    constructed = []
+    
+    def make(pid):
+        constructed.append(pid)
+        return processes[pid]
+    
+    monkeypatch.setattr(system.psutil, "pids", lambda: list(processes))
+    monkeypatch.setattr(system.psutil, "Process", make)
+    monkeypatch.setattr(system.psutil, "virtual_memory", lambda: namedtuple("VM", "total")(1000))
+    return processes, constructed
+
+@pytest.fixture
+def service(make_config):
+    return SystemService(make_config(process_sample_interval=0))
+
+@pytest.mark.parametrize("sort_by, expected", [
+    ("cpu", [2, 3]), ("memory", [1, 3]), ("threads", [2, 3]), ("files", [2, 1]), ("io", [3, 1])
+])
+def test_top_processes_by_key(table, service, sort_by, expected):
+    info = service.get_process_info(sort_by, 2)
+    assert info["total"] == 3
+    assert [process["pid"] for process in info["processes"]] == expected
+
+def test_only_top_processes_are_detailed(table, service):
+    processes, _ = table
+    info = service.get_process_info("cpu", 1)
+    first = info["processes"][0]
+    assert first == {
+        "pid": 2, "name": "proc2", "username": None, "status": "running", "cpu_percent": 50.0,
+        "memory_rss": 100, "memory_percent": 10.0, "threads": 9, "open_files": 40,
+        "io_read_bytes": 0, "io_write_bytes": 0
+    }
+    assert [processes[pid].details for pid in (1, 2, 3)] == [0, 1, 0]
+
+def test_process_objects_cached_and_pruned(table, service):
+    processes, constructed = table
+    service.get_process_info("cpu", 3)
+    service.get_process_info("cpu", 3)
+    # Créés une seule fois: cpu_percent() mesure depuis l'appel précédent
+    assert sorted(constructed) == [1, 2, 3]
+    processes[2].gone = True
+    info = service.get_process_info("cpu", 3)
+    assert [process["pid"] for process in info["processes"]] == [3, 1]
+    assert info["total"] == 2
+    assert 2 not in service._processes
+
+def test_unknown_sort_key_rejected(service):
+    with pytest.raises(Exception, match="inconnu"):
+        service.get_process_info("nom")
+
+def test_processes_command_json(table, make_config, monkeypatch):
+    monkeypatch.setattr(cli, "services", ServiceRegistry(make_config(process_sample_interval=0)))
+    result = CliRunner().invoke(cli.app, ["--output", "json", "sys", "--type", "processes", "--limit", "1"])
+    assert result.exit_code == 0
+    assert '"pid":2' in result.output.replace(" ", "")
+
+def test_processes_api_validates_parameters(table, make_config, monkeypatch):
+    main = pytest.importorskip("main")
+    monkeypatch.setattr(main, "services", ServiceRegistry(make_config(process_sample_interval=0)))
+    client = main.app.test_client()
+    assert client.get("/api/system?type=processes&sort=nom").status_code == 400
+    assert client.get("/api/system?type=processes&limit=x").status_code == 400
+    response = client.get("/api/system?type=processes&sort=memory&limit=1")
+    assert response.status_code == 200
+    assert [process["pid"] for process in response.get_json()["processes"]] == [1]
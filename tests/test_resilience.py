@@ -0,0 +1,144 @@
+"""Tests du disjoncteur, de la politique de réessai et de leur usage par AIService."""
+
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from aiterminal.resilience import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker, CircuitOpenError, RetryPolicy
+
+class StatusError(Exception):
+    """Erreur d'API factice portant un code HTTP et des en-têtes."""
+    
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert 0 < excinfo.value.retry_in <= 60
+    assert breaker.get_stats()["rejected"] == 1
+
+def test_breaker_success_resets_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+
+def test_breaker_half_open_allows_one_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state == STATE_HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+
+def test_breaker_release_frees_probe_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == STATE_HALF_OPEN
+
+@pytest.mark.parametrize("status, retryable", [(429, True), (500, True), (503, True), (408, True),
+                                               (400, False), (401, False), (404, False)])
+def test_retry_policy_retryable_statuses(status, retryable):
+    assert RetryPolicy().is_retryable(StatusError(status)) is retryable
+
+def test_retry_policy_auth_errors_count_as_failures():
+    policy = RetryPolicy()
+    assert policy.is_failure(StatusError(401))
+    assert not policy.is_failure(StatusError(400))
+    assert policy.is_failure(ConnectionError())
+    assert not policy.is_retryable(CircuitOpenError("test", 1.0))
+
+def test_retry_policy_backoff_is_bounded():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=2.0)
+    for attempt in range(1, 5):
+        delay = policy.compute_delay(attempt, TimeoutError())
+        assert 0 <= delay <= min(2.0, 0.5 * 2 ** (attempt - 1))
+    assert policy.compute_delay(5, TimeoutError()) is None
+    assert policy.compute_delay(1, StatusError(400)) is None
+
+def test_retry_policy_honours_retry_after():
+    policy = RetryPolicy(max_delay=8.0)
+    assert policy.compute_delay(1, StatusError(429, {"retry-after": "3"})) == 3.0
+    assert policy.compute_delay(1, StatusError(429, {"retry-after-ms": "250"})) == 0.25
+    # Plus long que max_delay: échec immédiat plutôt qu'une longue attente
+    assert policy.compute_delay(1, StatusError(503, {"retry-after": "60"})) is None
+
+class FakeStream:
+    """Flux de complétion factice : fragments puis, éventuellement, une erreur."""
+    
+    def __init__(self, parts, error=None):
+        self.parts = parts
+        self.error = error
+        self.closed = False
+    
+    def __iter__(self):
+        for part in self.parts:
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+        if self.error is not None:
+            raise self.error
+    
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def ai_service(make_config):
+    from aiterminal.ai_services import AIService
+    
+    service = AIService(make_config(api_key="sk-test", retry_max_attempts=1))
+    service.circuit_breaker = CircuitBreaker("test-openai", failure_threshold=5)
+    return service
+
+def fake_client(stream):
+    create = lambda **kwargs: stream
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+def test_stream_success_recorded_after_reading(ai_service):
+    stream = FakeStream(["Bon", "jour"])
+    ai_service.client = fake_client(stream)
+    seen = []
+    
+    def on_delta(text):
+        # Le flux n'est pas encore lu: l'appel n'est pas encore compté comme réussi
+        seen.append(ai_service.circuit_breaker.get_stats()["successes"])
+    
+    response = ai_service._complete("chat", [{"role": "user", "content": "salut"}], on_delta=on_delta)
+    assert response.choices[0].message.content == "Bonjour"
+    assert seen == [0, 0]
+    assert ai_service.circuit_breaker.get_stats()["successes"] == 1
+    assert stream.closed
+
+def test_stream_interrupted_counts_as_failure(ai_service):
+    ai_service.client = fake_client(FakeStream(["Bon"], httpx.ReadError("connexion coupée")))
+    with pytest.raises(httpx.ReadError):
+        ai_service._complete("chat", [{"role": "user", "content": "salut"}], on_delta=lambda text: None)
+    stats = ai_service.circuit_breaker.get_stats()
+    assert stats["failures"] == 1
+    assert stats["successes"] == 0
@@ -0,0 +1,67 @@
+"""Tests du routage des modèles : règles, budget de latence et oubli des latences anciennes."""
+
+import time
+
+import pytest
+
+from aiterminal.routing import ModelRouter, RoutingStats
+
+RULES = [{"tasks": ["summary"], "max_prompt_tokens": 500, "max_latency_ms": 1000, "model": "petit"}]
+
+def make_router(make_config, stats_max_age=300):
+    config = make_config(model="grand", model_routing={
+        "enabled": True, "fallback_model": "secours", "primary_timeout": 15, "stats_max_age": stats_max_age,
+        "rules": RULES
+    })
+    return ModelRouter(config, RoutingStats())
+
+@pytest.fixture
+def router(make_config):
+    return make_router(make_config)
+
+def messages(text="Résume ce texte."):
+    return [{"role": "user", "content": text}]
+
+def test_rule_matches_task_and_size(router):
+    decision = router.route("summary", messages())
+    assert decision.candidates == ["petit", "secours"]
+    assert decision.reason == "rule[0]"
+    assert router.route("chat", messages()).model == "grand"
+    assert router.route("summary", messages("mot " * 2000)).model == "grand"
+
+def test_explicit_model_bypasses_rules(router):
+    decision = router.route("summary", messages(), model="imposé")
+    assert decision.candidates == ["imposé"]
+    assert decision.reason == "explicit"
+
+def test_slow_model_skipped_while_stats_are_fresh(router):
+    router.observe("petit", 5.0)
+    assert router.route("summary", messages()).model == "grand"
+
+def test_timeouts_weigh_in_the_latency(router):
+    router.observe("petit", 2.0, TimeoutError())
+    assert router.stats.get_stats()["models"]["petit"]["timeouts"] == 1
+    assert router.route("summary", messages()).model == "grand"
+
+def test_stale_latency_is_forgotten(make_config):
+    router = make_router(make_config, stats_max_age=0.05)
+    router.observe("petit", 5.0)
+    assert router.route("summary", messages()).model == "grand"
+    time.sleep(0.06)
+    # Plus d'observation récente: le modèle écarté est de nouveau essayé
+    decision = router.route("summary", messages())
+    assert decision.model == "petit"
+    assert router.stats.get_stats()["models"]["petit"]["ewma_ms"] == 5000.0
+
+def test_call_budget_prefers_faster_fallback(router):
+    router.observe("grand", 3.0)
+    router.observe("secours", 0.2)
+    decision = router.route("chat", messages(), deadline=time.monotonic() + 1.0)
+    assert decision.candidates[0] == "secours"
+    assert decision.reason == "latency_budget"
+
+def test_primary_deadline_leaves_room_for_fallback(router):
+    decision = router.route("summary", messages())
+    deadline = time.monotonic() + 60
+    assert decision.attempt_deadline(0, deadline) < deadline
+    assert decision.attempt_deadline(1, deadline) == deadline
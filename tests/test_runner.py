@@ -0,0 +1,100 @@
+"""Tests des scripts de commandes : lecture, graphe des dépendances et exécution parallèle."""
+
+import time
+import threading
+
+import pytest
+
+from aiterminal.runner import ScriptRunner, ScriptStep, parse_script
+
+@pytest.fixture
+def runner(make_config):
+    return ScriptRunner(make_config(), concurrency=4)
+
+def fake_execute(runner, results, delay=0.05):
+    """Remplace l'exécution des commandes : résultat choisi par le dernier argument, 'ping' échoue."""
+    state = {"active": 0, "max_active": 0}
+    lock = threading.Lock()
+    
+    def execute(args):
+        with lock:
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        try:
+            time.sleep(delay)
+            if args[0] == "ping":
+                raise Exception("hôte injoignable")
+            return results.get(args[-1], args[-1])
+        finally:
+            with lock:
+                state["active"] -= 1
+    
+    runner.execute = execute
+    return state
+
+def test_parse_text_script(tmp_path):
+    path = tmp_path / "script.txt"
+    path.write_text("# commentaire\n\naiterminal sys --type cpu\nresume: ai \"Résume ${step1}\"  # fin\n",
+                    encoding="utf-8")
+    steps = parse_script(str(path))
+    assert [(step.id, step.args, step.line) for step in steps] == [
+        ("step1", ["sys", "--type", "cpu"], 3), ("resume", ["ai", "Résume ${step1}"], 4)
+    ]
+    assert steps[1].references() == {"step1"}
+
+def test_parse_yaml_script(tmp_path):
+    pytest.importorskip("yaml")
+    path = tmp_path / "script.yaml"
+    path.write_text("steps:\n  - id: a\n    command: sys --type cpu\n  - command: [ai, bonjour]\n    needs: a\n",
+                    encoding="utf-8")
+    steps = parse_script(str(path))
+    assert [step.id for step in steps] == ["a", "step2"]
+    assert steps[1].args == ["ai", "bonjour"]
+    assert steps[1].needs == {"a"}
+
+def test_duplicate_step_ids_rejected(tmp_path):
+    path = tmp_path / "script.txt"
+    path.write_text("a: sys\na: sys\n", encoding="utf-8")
+    with pytest.raises(Exception, match="double"):
+        parse_script(str(path))
+
+def test_plan_dependencies_and_errors(runner):
+    steps = runner.plan([
+        ScriptStep("a", ["sys", "--type", "cpu"]),
+        ScriptStep("b", ["ai", "${a.cpu}"]),
+        ScriptStep("c", ["sys"], needs=["b"])
+    ])
+    assert [step.depends_on for step in steps] == [set(), {"a"}, {"b"}]
+    with pytest.raises(Exception, match="inconnue"):
+        runner.plan([ScriptStep("a", ["ai", "${z}"])])
+    with pytest.raises(Exception, match="circulaires"):
+        runner.plan([ScriptStep("a", ["ai", "${b}"]), ScriptStep("b", ["ai", "${a}"])])
+    with pytest.raises(Exception, match="non prise en charge"):
+        runner.plan([ScriptStep("a", ["daemon", "start"])])
+
+def test_analyze_output_feeds_next_input(runner, tmp_path):
+    first = ScriptStep("a", ["analyze", "--input", str(tmp_path / "in.jsonl"), "--output", str(tmp_path / "x.jsonl")])
+    second = ScriptStep("b", ["analyze", "--input", str(tmp_path / "x.jsonl")])
+    runner.plan([first, second])
+    assert second.depends_on == {"a"}
+
+def test_run_parallel_with_references_and_skips(runner):
+    state = fake_execute(runner, {"cpu": {"cpu": {"percent": 12}}})
+    steps = [
+        ScriptStep("a", ["sys", "--type", "cpu"]),
+        ScriptStep("b", ["sys", "--type", "memory"]),
+        ScriptStep("c", ["ai", "Charge: ${a.cpu.percent}"]),
+        ScriptStep("p", ["ping", "exemple.invalid"]),
+        ScriptStep("d", ["ai", "Après ${p}"]),
+        ScriptStep("e", ["ai", "fin"], needs=["d"])
+    ]
+    summary = runner.run(steps)
+    by_id = {step["id"]: step for step in summary["steps"]}
+    assert by_id["c"]["result"] == "Charge: 12"
+    assert by_id["p"]["status"] == "error"
+    assert by_id["d"]["status"] == "skipped"
+    assert by_id["e"]["status"] == "skipped"
+    assert (summary["ok"], summary["error"], summary["skipped"]) == (3, 1, 2)
+    # Les étapes indépendantes (a, b, p) se chevauchent
+    assert state["max_active"] >= 2
+    assert summary["elapsed"] < summary["step_time"]
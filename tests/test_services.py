@@ -0,0 +1,46 @@
+"""Tests du registre paresseux des services et du coût de démarrage de la CLI."""
+
+import os
+import sys
+import json
+import subprocess
+
+from aiterminal.services import ServiceRegistry
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def test_services_built_on_first_access(make_config):
+    registry = ServiceRegistry(make_config())
+    assert registry.loaded() == []
+    system = registry.system
+    assert registry.system is system
+    assert registry.loaded() == ["system"]
+
+def test_rebuild_keys_reset_services(make_config):
+    config = make_config()
+    registry = ServiceRegistry(config)
+    system = registry.system
+    config.set_value("model", "gpt-4o-mini")
+    assert registry.system is system
+    config.set_value("history_size", 4)
+    assert registry.loaded() == []
+    assert registry.system is not system
+
+def test_help_does_not_import_service_modules(tmp_path):
+    (tmp_path / "config.json").write_text(json.dumps({}), encoding="utf-8")
+    code = (
+        "import sys\n"
+        "from aiterminal.cli import run_cli\n"
+        "sys.argv = ['aiterminal', 'help']\n"
+        "try:\n"
+        "    run_cli()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "heavy = ('openai', 'httpx', 'requests', 'bs4', 'psutil')\n"
+        "print('chargés:', ','.join(name for name in heavy if name in sys.modules))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True,
+                            timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == "chargés: "
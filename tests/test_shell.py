@@ -0,0 +1,58 @@
+"""Tests du shell interactif : complétion, tâches de fond et sortie par tâche."""
+
+import builtins
+import itertools
+
+import pytest
+
+from aiterminal import cli
+from aiterminal.shell import Shell
+
+@pytest.fixture
+def shell(make_config, tmp_path):
+    return Shell(make_config(shell_history_file=str(tmp_path / "history")))
+
+def run_lines(shell, monkeypatch, lines):
+    # Puis exit autant que nécessaire (confirmation si des tâches sont en cours)
+    lines = itertools.chain(lines, itertools.repeat("exit"))
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(lines))
+    shell.run()
+
+def test_completes_commands_and_options(shell):
+    assert "ai " in shell.completions("", "a")
+    assert "jobs " in shell.completions("", "jo")
+    assert "shell " not in shell.completions("", "")
+    assert "--type " in shell.completions("sys ", "--t")
+    assert shell.completions("inconnue ", "-") == []
+
+def test_background_job_output_shown_with_fg(shell, monkeypatch, capsys):
+    run_lines(shell, monkeypatch, ["help &", "jobs", "fg 1", "exit"])
+    output = capsys.readouterr().out
+    job = shell.jobs[1]
+    assert job.code == 0 and job.reported
+    assert "[1] help" in output
+    assert "Tâches de fond" in output
+    # Sortie de la tâche enregistrée sur sa propre console puis affichée par fg
+    assert "terminée" in output
+    assert job.console.export_text(clear=False) in output
+
+def test_shell_restores_console_and_streams(shell, monkeypatch):
+    import sys
+    
+    console, stdout = cli.console, sys.stdout
+    run_lines(shell, monkeypatch, ["help", "quit"])
+    assert cli.console is console
+    assert sys.stdout is stdout
+
+def test_syntax_error_keeps_shell_running(shell, capsys):
+    assert shell.handle_line('ai "non fermé') is True
+    assert "Erreur de syntaxe" in capsys.readouterr().out
+    assert shell.handle_line("exit") is False
+
+def test_fg_completion_lists_pending_jobs(shell, monkeypatch):
+    run_lines(shell, monkeypatch, ["help &"])
+    shell.jobs[1].thread.join()
+    assert shell.jobs[1].code == 0
+    assert shell.completions("fg ", "") == ["1 "]
+    shell.report_finished()
+    assert shell.completions("fg ", "") == []
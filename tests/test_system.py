@@ -0,0 +1,64 @@
+"""Tests des débits de compteurs : fenêtre de mesure, relevé périmé, verrou et borne de l'API."""
+
+import time
+import threading
+from collections import namedtuple
+
+import pytest
+
+from aiterminal.services import ServiceRegistry
+from aiterminal.system import MAX_SAMPLE_INTERVAL, CounterRates
+
+Counters = namedtuple("Counters", "read_bytes write_bytes")
+
+def make_rates(values):
+    """CounterRates lisant la valeur courante de `values` (modifiable par le test)."""
+    return CounterRates(lambda: {"sda": Counters(*values["sda"])} if values.get("sda") else {})
+
+def test_rates_from_previous_snapshot():
+    values = {"sda": (0, 100)}
+    rates = make_rates(values)
+    values["sda"] = (1000, 0)
+    elapsed, result = rates.rates(0.05, 30.0)
+    assert elapsed >= 0.05
+    assert result["sda"]["read_bytes"] == pytest.approx(1000 / elapsed)
+    # Compteur repartant de zéro: jamais de débit négatif
+    assert result["sda"]["write_bytes"] == 0.0
+
+def test_stale_snapshot_is_replaced():
+    values = {"sda": (0, 0)}
+    rates = make_rates(values)
+    values["sda"] = (10 ** 9, 0)
+    # Relevé de plus de max_age: nouvelle référence, donc débit nul sur la fenêtre
+    elapsed, result = rates.rates(0.02, 0.0)
+    assert elapsed >= 0.02
+    assert result["sda"]["read_bytes"] == 0.0
+
+def test_new_key_has_zero_rate():
+    values = {}
+    rates = make_rates(values)
+    values["sda"] = (500, 500)
+    _, result = rates.rates(0.0, 30.0)
+    assert result == {"sda": {"read_bytes": 0.0, "write_bytes": 0.0}}
+
+def test_waiting_call_does_not_block_others():
+    rates = make_rates({"sda": (0, 0)})
+    slow = threading.Thread(target=rates.rates, args=(0.5, 30.0))
+    slow.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    rates.rates(0.0, 30.0)
+    assert time.monotonic() - start < 0.2
+    slow.join()
+
+def test_api_interval_is_clamped(make_config, monkeypatch):
+    main = pytest.importorskip("main")
+    registry = ServiceRegistry(make_config())
+    seen = []
+    monkeypatch.setattr(registry.system, "get_disk_info", lambda interval=None: seen.append(interval) or {})
+    monkeypatch.setattr(main, "services", registry)
+    client = main.app.test_client()
+    assert client.get("/api/system?type=disk&interval=3600").status_code == 200
+    assert client.get("/api/system?type=disk&interval=0.2").status_code == 200
+    assert client.get("/api/system?type=disk&interval=x").status_code == 400
+    assert seen == [MAX_SAMPLE_INTERVAL, 0.2]
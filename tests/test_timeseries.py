@@ -0,0 +1,77 @@
+"""Tests de l'historique des métriques : seaux, agrégations, séries partielles ou absentes et résolutions."""
+
+import pytest
+
+from aiterminal.timeseries import TimeSeriesStore
+
+T0 = 1_699_999_980  # Multiple de 10, 20 et 60
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeSeriesStore(str(tmp_path), series=("cpu", "ping_rtt"), tiers=((10, 600), (60, 3600)), writable=True)
+    yield store
+    store.close()
+
+def test_bucket_aggregations(store):
+    for offset, cpu in ((0, 10.0), (5, 30.0), (10, 50.0)):
+        store.append(T0 + offset, {"cpu": cpu})
+    now = T0 + 20
+    for aggregation, expected in (("avg", [20.0, 50.0]), ("min", [10.0, 50.0]), ("max", [30.0, 50.0])):
+        result = store.query(T0, T0 + 19, 10, aggregation, ["cpu"])
+        assert result["timestamps"] == [T0, T0 + 10]
+        assert result["series"]["cpu"] == expected
+    assert store.choose_tier(T0, 10, now) == (10, 600)
+
+def test_partial_series_averages_its_own_samples(store):
+    # La latence n'est mesurée qu'une fois sur deux: sa moyenne ne compte pas les échantillons sans ping
+    store.append(T0, {"cpu": 10.0, "ping_rtt": 40.0})
+    store.append(T0 + 1, {"cpu": 20.0, "ping_rtt": None})
+    store.append(T0 + 2, {"cpu": 30.0, "ping_rtt": float("nan")})
+    store.append(T0 + 3, {"cpu": 40.0, "ping_rtt": 20.0})
+    result = store.query(T0, T0 + 9, 10)
+    assert result["series"] == {"cpu": [25.0], "ping_rtt": [30.0]}
+
+def test_absent_series_is_none(store):
+    store.append(T0, {"cpu": 10.0})
+    store.append(T0 + 10, {"cpu": 20.0})
+    for aggregation in ("avg", "min", "max"):
+        # Ni 0, ni inf/-inf pour une série sans aucun échantillon
+        assert store.query(T0, T0 + 19, 10, aggregation)["series"]["ping_rtt"] == [None, None]
+        assert store.query(T0, T0 + 19, 20, aggregation)["series"]["ping_rtt"] == [None]
+
+def test_empty_buckets_are_none(store):
+    store.append(T0, {"cpu": 10.0})
+    store.append(T0 + 30, {"cpu": 40.0})
+    result = store.query(T0, T0 + 39, 10, "max", ["cpu"])
+    assert result["series"]["cpu"] == [10.0, None, None, 40.0]
+    grouped = store.query(T0, T0 + 39, 20, "min", ["cpu"])
+    assert grouped["timestamps"] == [T0, T0 + 20]
+    assert grouped["series"]["cpu"] == [10.0, 40.0]
+
+def test_overwritten_bucket_is_reset(store):
+    store.append(T0, {"cpu": 10.0, "ping_rtt": 5.0})
+    # Même emplacement de l'anneau (60 seaux de 10 s) une rétention plus tard
+    store.append(T0 + 600, {"cpu": 90.0})
+    assert store.query(T0, T0 + 9, 10)["series"] == {"cpu": [None], "ping_rtt": [None]}
+    later = store.query(T0 + 600, T0 + 609, 10)
+    assert later["series"] == {"cpu": [90.0], "ping_rtt": [None]}
+
+def test_reader_sees_writer_and_coarse_tier(store, tmp_path):
+    for offset in range(0, 120, 10):
+        store.append(T0 + offset, {"cpu": float(offset)})
+    store.flush()
+    reader = TimeSeriesStore(str(tmp_path), series=("cpu", "ping_rtt"), tiers=((10, 600), (60, 3600)))
+    try:
+        result = reader.query(T0, T0 + 119, 60, "avg", ["cpu"])
+        assert result["resolution"] == 60
+        assert result["series"]["cpu"] == [25.0, 85.0]
+    finally:
+        reader.close()
+
+def test_query_validation(store):
+    with pytest.raises(ValueError):
+        store.query(T0, T0 + 10, aggregation="median")
+    with pytest.raises(ValueError):
+        store.query(T0, T0 + 10, series=["disk"])
+    with pytest.raises(ValueError):
+        store.query(T0 + 10, T0)
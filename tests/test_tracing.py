@@ -0,0 +1,70 @@
+"""Tests du traçage : spans, profileur et middleware `?profile=`."""
+
+import json
+
+import pytest
+
+from aiterminal.tracing import Profiler, ProfileMiddleware, is_tracing, span
+
+@pytest.fixture
+def app():
+    flask = pytest.importorskip("flask")
+    app = flask.Flask(__name__)
+    state = {"sent": 0}
+    
+    @app.route("/json")
+    def data():
+        with span("travail", n=1):
+            pass
+        return {"ok": True}
+    
+    @app.route("/page")
+    def page():
+        return "<p>page</p>"
+    
+    @app.route("/stream")
+    def stream():
+        def generate():
+            while True:
+                state["sent"] += 1
+                yield f"data: {state['sent']}\n\n"
+        return flask.Response(generate(), mimetype="text/event-stream")
+    
+    app.wsgi_app = ProfileMiddleware(app.wsgi_app)
+    app.state = state
+    return app
+
+def test_spans_are_free_outside_a_trace():
+    assert not is_tracing()
+    with span("hors trace"):
+        assert not is_tracing()
+    with Profiler("racine") as root:
+        with span("enfant", k="v"):
+            assert is_tracing()
+    assert [child.name for child in root.children] == ["enfant"]
+
+def test_profile_added_to_json_response(app):
+    response = app.test_client().get("/json?profile=1")
+    data = json.loads(response.data)
+    assert data["ok"] is True
+    assert data["profile"]["name"] == "GET /json"
+    assert int(response.headers["Content-Length"]) == len(response.data)
+
+def test_profile_collapsed_replaces_body(app):
+    response = app.test_client().get("/json?profile=collapsed")
+    assert response.mimetype == "text/plain"
+    assert response.get_data(as_text=True).startswith("GET /json")
+
+def test_non_json_response_passes_through(app):
+    response = app.test_client().get("/page?profile=1")
+    assert response.get_data(as_text=True) == "<p>page</p>"
+    assert response.mimetype == "text/html"
+
+def test_stream_is_not_buffered(app):
+    # Un flux infini doit rester consommable morceau par morceau
+    for mode in ("1", "collapsed"):
+        response = app.test_client().get(f"/stream?profile={mode}", buffered=False)
+        first = next(response.response)
+        response.close()
+        assert first.startswith(b"data: ")
+    assert app.state["sent"] <= 4
@@ -0,0 +1,86 @@
+"""Tests du suivi d'usage : enregistrements, coûts, regroupements et relecture du journal NDJSON."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from aiterminal.usage import UsageTracker, load_usage_log, make_record
+
+def usage(prompt, completion, cached=0):
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion,
+                           prompt_tokens_details=SimpleNamespace(cached_tokens=cached))
+
+def record(ts, task="chat", model="gpt-4o", source="cli:ai", prompt=1000, completion=100):
+    return dict(make_record(task, model, 0.5, usage(prompt, completion), source=source), ts=ts)
+
+def write_log(path, records, extra_lines=()):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in [json.dumps(r) for r in records] + list(extra_lines):
+            f.write(line + "\n")
+
+def test_make_record_reads_usage():
+    result = make_record("summary", "gpt-4o-mini", 1.2345, usage(500, 50, cached=256), source="/api/analyze")
+    assert result["prompt_tokens"] == 500
+    assert result["cached_tokens"] == 256
+    assert result["cache_hit"] is True
+    assert result["latency_ms"] == 1234.5
+    assert make_record("chat", "gpt-4o", 0.1)["prompt_tokens"] == 0
+
+def test_cost_discounts_cached_tokens():
+    tracker = UsageTracker()
+    full = tracker.cost(record(0, prompt=1_000_000, completion=0))
+    cached = tracker.cost(dict(record(0, prompt=1_000_000, completion=0), cached_tokens=1_000_000))
+    assert full == pytest.approx(2.50)
+    assert cached == pytest.approx(1.25)
+    assert tracker.cost(record(0, model="inconnu")) == 0.0
+
+def test_stats_group_by_dimensions():
+    tracker = UsageTracker()
+    tracker.record(record(1, task="chat"))
+    tracker.record(record(2, task="summary"))
+    tracker.record(record(3, task="summary", model="gpt-4o-mini"))
+    stats = tracker.get_stats(["task"])
+    assert stats["totals"]["calls"] == 3
+    assert {row["task"]: row["calls"] for row in stats["groups"]} == {"chat": 1, "summary": 2}
+    assert stats["groups"][0]["task"] == "summary"
+
+def test_load_usage_log_orders_rotations_numerically(tmp_path):
+    path = str(tmp_path / "usage.log")
+    # .10 est plus ancien que .9, lui-même plus ancien que .2
+    write_log(path + ".10", [record(100)])
+    write_log(path + ".9", [record(200)])
+    write_log(path + ".2", [record(300)])
+    write_log(path, [record(400)])
+    write_log(path + ".lock", [record(1)])
+    stats = load_usage_log(path)
+    assert stats["totals"]["calls"] == 4
+    assert stats["since"] == 100
+    assert load_usage_log(path, since=250)["totals"]["calls"] == 2
+
+def test_load_usage_log_skips_invalid_lines(tmp_path):
+    path = str(tmp_path / "usage.log")
+    write_log(path, [record(10), record(20)], extra_lines=["pas du json", "[1, 2]", "42", "null", ""])
+    stats = load_usage_log(path, group_by=["model"])
+    assert stats["totals"]["calls"] == 2
+    assert stats["groups"][0]["model"] == "gpt-4o"
+
+def test_load_usage_log_skips_incomplete_records(tmp_path):
+    path = str(tmp_path / "usage.log")
+    incomplete = [{"ts": 1, "model": "x"}, dict(record(30), source=None), dict(record(40), prompt_tokens="12"),
+                  dict(record(50), ts="hier")]
+    broken = dict(record(60))
+    del broken["latency_ms"]
+    write_log(path, [record(10)] + incomplete + [broken, record(20)])
+    stats = load_usage_log(path, since=5)
+    assert stats["totals"]["calls"] == 2
+    assert stats["since"] == 10
+
+def test_tracker_writes_ndjson_log(tmp_path, make_config):
+    path = str(tmp_path / "logs" / "usage.log")
+    tracker = UsageTracker()
+    tracker.configure(make_config(usage_log_path=path))
+    tracker.record(record(5))
+    tracker.record(record(6, task="code"))
+    assert load_usage_log(path, tracker=tracker)["totals"]["calls"] == 2
+    tracker.configure(make_config(usage_log_path=""))